@@ -1,11 +1,16 @@
 """API client for handling requests to various language models."""
 
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 import config
+import subsystems
 import tools  # Import your tools module
 from mock_responses import MockResponseGenerator, MockToolExecutor
-from rag import add_to_rag, retrieve_from_rag, save_rag_index
+from rag import add_to_rag, persist_rag_index, retrieve_from_rag
 
 try:
     import local_model
@@ -40,49 +45,130 @@ elif API_PROVIDER == "anthropic" and (
 grok_client, gemini_model, openai_client, anthropic_client = None, None, None, None
 mock_generator, mock_tools = None, None
 
-if USE_MOCK_MODE:
-    print("Using mock mode.")
+
+def _use_mock_mode():
+    global USE_MOCK_MODE, mock_generator, mock_tools
+
+    USE_MOCK_MODE = True
     mock_generator = MockResponseGenerator()
     mock_tools = MockToolExecutor()
-else:
-    if API_PROVIDER == "grok":
+
+
+def _init_provider():
+    """Construct the provider SDK client; falls back to mock mode on failure.
+
+    Provider SDKs are slow to import, so the client is built on the first
+    query or by the service warm-up rather than at import. Clients that are
+    already set are left alone.
+    """
+    global grok_client, gemini_model, openai_client, anthropic_client, anthropic
+
+    if USE_MOCK_MODE:
+        return
+    if API_PROVIDER == "grok" and grok_client is None:
         try:
             from openai import OpenAI
             grok_client = OpenAI(api_key=config.GROK_API_KEY, base_url="https://api.x.ai/v1")
         except Exception as e:
             print(f"Warning: Failed to initialize Grok client: {e}. Falling back to mock mode.")
-            USE_MOCK_MODE = True
-            mock_generator = MockResponseGenerator()
-            mock_tools = MockToolExecutor()
-    elif API_PROVIDER == "gemini":
+            _use_mock_mode()
+    elif API_PROVIDER == "gemini" and gemini_model is None:
         try:
             import google.generativeai as genai
             genai.configure(api_key=config.GEMINI_API_KEY)
             gemini_model = genai.GenerativeModel("gemini-pro")
         except Exception as e:
             print(f"Warning: Failed to initialize Gemini client: {e}. Falling back to mock mode.")
-            USE_MOCK_MODE = True
-            mock_generator = MockResponseGenerator()
-            mock_tools = MockToolExecutor()
-    elif API_PROVIDER == "openai":
+            _use_mock_mode()
+    elif API_PROVIDER == "openai" and openai_client is None:
         try:
             from openai import OpenAI
             openai_client = OpenAI(api_key=config.OPENAI_API_KEY)
         except Exception as e:
             print(f"Warning: Failed to initialize OpenAI client: {e}. Falling back to mock mode.")
-            USE_MOCK_MODE = True
-            mock_generator = MockResponseGenerator()
-            mock_tools = MockToolExecutor()
-    elif API_PROVIDER == "anthropic":
+            _use_mock_mode()
+    elif API_PROVIDER == "anthropic" and anthropic_client is None:
         try:
             import anthropic
             anthropic_client = anthropic.Anthropic(api_key=config.ANTHROPIC_API_KEY)
         except Exception as e:
             print(f"Warning: Failed to initialize Anthropic client: {e}. "
                   f"Falling back to mock mode.")
-            USE_MOCK_MODE = True
-            mock_generator = MockResponseGenerator()
-            mock_tools = MockToolExecutor()
+            _use_mock_mode()
+
+
+if USE_MOCK_MODE:
+    print("Using mock mode.")
+    _use_mock_mode()
+_provider = subsystems.register("llm_provider", _init_provider)
+
+
+# Shared by all chat workers; tool calls are I/O bound (PubMed, PubChem, ...).
+_tool_executor = ThreadPoolExecutor(
+    max_workers=config.TOOL_CALL_WORKERS, thread_name_prefix="tool-call"
+)
+
+
+def _invoke_tool(func_name, arguments):
+    args = json.loads(arguments or "{}")
+    try:
+        return getattr(tools, func_name)(**args)
+    except AttributeError as e:
+        return {"error": str(e)}
+
+
+def _run_tool_calls(calls):
+    """Execute the (name, arguments) tool calls of one model turn concurrently.
+
+    Results are returned in the order of ``calls``. A call that raises or
+    exceeds its timeout (``config.TOOL_CALL_TIMEOUTS`` or the default) yields
+    an error result instead of failing the whole turn; its late result is
+    discarded. The pool is shared by all chat workers, so the timeout runs
+    from when a call starts executing, not from submission: a call may first
+    wait up to the same timeout for a free worker, and one still queued after
+    that is cancelled and reported as not started.
+    Completed results are recorded in the RAG store in one batch.
+    """
+    started = [threading.Event() for _ in calls]
+    started_at = [0.0] * len(calls)
+
+    def run(index, func_name, arguments):
+        started_at[index] = time.monotonic()
+        started[index].set()
+        return _invoke_tool(func_name, arguments)
+
+    submitted = time.monotonic()
+    futures = [
+        _tool_executor.submit(run, index, name, arguments)
+        for index, (name, arguments) in enumerate(calls)
+    ]
+
+    results = []
+    for index, ((func_name, _), future) in enumerate(zip(calls, futures)):
+        timeout = config.TOOL_CALL_TIMEOUTS.get(func_name, config.TOOL_CALL_TIMEOUT)
+        queue_remaining = max(submitted + timeout - time.monotonic(), 0)
+        if not started[index].wait(queue_remaining) and future.cancel():
+            results.append(
+                {"error": f"{func_name} was not started within {timeout:g}s; tool workers are busy"}
+            )
+            continue
+        started[index].wait()  # cancel() lost the race, so the call is starting
+        remaining = max(started_at[index] + timeout - time.monotonic(), 0)
+        try:
+            results.append(future.result(timeout=remaining))
+        except FutureTimeoutError:
+            results.append({"error": f"{func_name} timed out after {timeout:g}s"})
+        except Exception as e:
+            results.append({"error": f"{func_name} failed: {e}"})
+
+    records = [
+        f"[Tool: {func_name}] {json.dumps(result)}"
+        for (func_name, _), result in zip(calls, results)
+        if not (isinstance(result, dict) and set(result) == {"error"})
+    ]
+    if records:
+        add_to_rag(records)
+    return results
 
 
 def process_grok_query(user_query, rag_context, model_name="grok-4"):
@@ -107,22 +193,16 @@ def process_grok_query(user_query, rag_context, model_name="grok-4"):
         # Handle tool calls
         while response.choices[0].message.tool_calls:
             messages.append(response.choices[0].message)
-            for tool_call in response.choices[0].message.tool_calls:
-                func_name = tool_call.function.name
-                args = json.loads(tool_call.function.arguments)
-
-                try:
-                    tool_result = getattr(tools, func_name)(**args)
-                except AttributeError as e:
-                    tool_result = {"error": str(e)}
-
-                add_to_rag([f"[Tool: {func_name}] {json.dumps(tool_result)}"])
-
+            tool_calls = response.choices[0].message.tool_calls
+            tool_results = _run_tool_calls(
+                [(call.function.name, call.function.arguments) for call in tool_calls]
+            )
+            for tool_call, tool_result in zip(tool_calls, tool_results):
                 messages.append(
                     {
                         "role": "tool",
                         "tool_call_id": tool_call.id,
-                        "name": func_name,
+                        "name": tool_call.function.name,
                         "content": json.dumps(tool_result),
                     }
                 )
@@ -180,22 +260,16 @@ def process_openai_query(user_query, rag_context):
         # Handle tool calls
         while response.choices[0].message.tool_calls:
             messages.append(response.choices[0].message)
-            for tool_call in response.choices[0].message.tool_calls:
-                func_name = tool_call.function.name
-                args = json.loads(tool_call.function.arguments)
-
-                try:
-                    tool_result = getattr(tools, func_name)(**args)
-                except AttributeError as e:
-                    tool_result = {"error": str(e)}
-
-                add_to_rag([f"[Tool: {func_name}] {json.dumps(tool_result)}"])
-
+            tool_calls = response.choices[0].message.tool_calls
+            tool_results = _run_tool_calls(
+                [(call.function.name, call.function.arguments) for call in tool_calls]
+            )
+            for tool_call, tool_result in zip(tool_calls, tool_results):
                 messages.append(
                     {
                         "role": "tool",
                         "tool_call_id": tool_call.id,
-                        "name": func_name,
+                        "name": tool_call.function.name,
                         "content": json.dumps(tool_result),
                     }
                 )
@@ -263,9 +337,10 @@ def process_query(user_query, model=None):
 
     if model == "local-qwen-medical":
         response = process_local_query(user_query, rag_context)
-        save_rag_index()
+        persist_rag_index()
         return response
 
+    _provider.get()
     if USE_MOCK_MODE:
         # Mock mode logic remains the same
         return mock_generator.get_response(user_query)
@@ -281,16 +356,199 @@ def process_query(user_query, model=None):
     else:
         return "Error: Invalid API provider specified in config."
 
-    save_rag_index()
+    persist_rag_index()
     return response
 
 
+def _stream_chat_completion(client, model_name, messages):
+    """Stream an OpenAI-compatible chat completion, resolving tool calls.
+
+    Content deltas are yielded as they arrive. When the model asks for tools,
+    the streamed tool-call fragments are reassembled, executed, and the
+    conversation is continued with another streamed request.
+    """
+    while True:
+        stream = client.chat.completions.create(
+            model=model_name,
+            messages=messages,
+            tools=config.TOOL_DEFINITIONS,
+            tool_choice="auto",
+            stream=True,
+        )
+
+        content_parts = []
+        pending_calls = {}
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content_parts.append(delta.content)
+                yield delta.content
+            for call_delta in delta.tool_calls or []:
+                call = pending_calls.setdefault(
+                    call_delta.index, {"id": None, "name": "", "arguments": ""}
+                )
+                if call_delta.id:
+                    call["id"] = call_delta.id
+                if call_delta.function is not None:
+                    call["name"] += call_delta.function.name or ""
+                    call["arguments"] += call_delta.function.arguments or ""
+
+        if not pending_calls:
+            return
+
+        ordered_calls = [pending_calls[index] for index in sorted(pending_calls)]
+        messages.append(
+            {
+                "role": "assistant",
+                "content": "".join(content_parts) or None,
+                "tool_calls": [
+                    {
+                        "id": call["id"],
+                        "type": "function",
+                        "function": {"name": call["name"], "arguments": call["arguments"]},
+                    }
+                    for call in ordered_calls
+                ],
+            }
+        )
+        tool_results = _run_tool_calls(
+            [(call["name"], call["arguments"] or "{}") for call in ordered_calls]
+        )
+        for call, tool_result in zip(ordered_calls, tool_results):
+            messages.append(
+                {
+                    "role": "tool",
+                    "tool_call_id": call["id"],
+                    "name": call["name"],
+                    "content": json.dumps(tool_result),
+                }
+            )
+
+
+def stream_grok_query(user_query, rag_context, model_name="grok-4"):
+    """Stream a response from the Grok API."""
+    augmented_query = (
+        f"{user_query}\n\nRetrieved Context:\n{rag_context}" if rag_context else user_query
+    )
+
+    messages = [
+        {"role": "system", "content": config.SYSTEM_PROMPT},
+        {"role": "user", "content": augmented_query},
+    ]
+
+    try:
+        yield from _stream_chat_completion(grok_client, model_name or "grok-4", messages)
+    except Exception as e:
+        print(f"Grok API call failed: {e}. Using mock response.")
+        yield f"⚠️ **API Error - Using Demo Mode**\n\n{mock_generator.get_response(user_query)}"
+
+
+def stream_openai_query(user_query, rag_context):
+    """Stream a response from the OpenAI API."""
+    augmented_query = (
+        f"{user_query}\n\nRetrieved Context:\n{rag_context}" if rag_context else user_query
+    )
+
+    messages = [
+        {"role": "system", "content": config.SYSTEM_PROMPT},
+        {"role": "user", "content": augmented_query},
+    ]
+
+    try:
+        yield from _stream_chat_completion(openai_client, "gpt-4", messages)
+    except Exception as e:
+        print(f"OpenAI API call failed: {e}. Using mock response.")
+        yield f"⚠️ **API Error - Using Demo Mode**\n\n{mock_generator.get_response(user_query)}"
+
+
+def stream_gemini_query(user_query, rag_context):
+    """Stream a response from the Gemini API."""
+    augmented_query = (
+        f"{user_query}\n\nRetrieved Context:\n{rag_context}" if rag_context else user_query
+    )
+    full_prompt = f"{config.SYSTEM_PROMPT}\n\nUser Query: {augmented_query}"
+
+    try:
+        for chunk in gemini_model.generate_content(full_prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+    except Exception as e:
+        print(f"Gemini API call failed: {e}. Using mock response.")
+        yield f"⚠️ **API Error - Using Demo Mode**\n\n{mock_generator.get_response(user_query)}"
+
+
+def stream_anthropic_query(user_query, rag_context):
+    """Stream a response from the Anthropic API."""
+    augmented_query = (
+        f"{user_query}\n\nRetrieved Context:\n{rag_context}" if rag_context else user_query
+    )
+
+    try:
+        with anthropic_client.messages.stream(
+            model="claude-3-opus-20240229",
+            system=config.SYSTEM_PROMPT,
+            messages=[{"role": "user", "content": augmented_query}],
+            max_tokens=1024,
+        ) as stream:
+            yield from stream.text_stream
+    except (anthropic.APIError, anthropic.APIConnectionError) as e:
+        print(f"Anthropic API call failed: {e}. Using mock response.")
+        yield f"⚠️ **API Error - Using Demo Mode**\n\n{mock_generator.get_response(user_query)}"
+
+
+def stream_local_query(user_query, rag_context):
+    """Stream tokens from the locally hosted fine-tuned Qwen model."""
+    if local_model is None or local_model.get_status().get("state") != "ready":
+        # Not ready: reuse the blocking path for its status messages.
+        yield process_local_query(user_query, rag_context)
+        return
+    try:
+        yield from local_model.stream_response(user_query, rag_context)
+    except RuntimeError as e:
+        yield f"⚠️ {e}"
+
+
+def stream_query(user_query, model=None):
+    """
+    Streaming counterpart of process_query that yields response text chunks.
+    """
+    rag_context = retrieve_from_rag(user_query)
+
+    if model == "local-qwen-medical":
+        yield from stream_local_query(user_query, rag_context)
+        persist_rag_index()
+        return
+
+    _provider.get()
+    if USE_MOCK_MODE:
+        yield from mock_generator.get_streaming_response(user_query)
+        return
+
+    if API_PROVIDER == "grok":
+        chunks = stream_grok_query(user_query, rag_context, model_name=model)
+    elif API_PROVIDER == "gemini":
+        chunks = stream_gemini_query(user_query, rag_context)
+    elif API_PROVIDER == "openai":
+        chunks = stream_openai_query(user_query, rag_context)
+    elif API_PROVIDER == "anthropic":
+        chunks = stream_anthropic_query(user_query, rag_context)
+    else:
+        yield "Error: Invalid API provider specified in config."
+        return
+
+    yield from chunks
+    persist_rag_index()
+
+
 def process_query_with_context(user_query, conversation_history=None):
     """
     Process query with conversation history support.
     """
     rag_context = retrieve_from_rag(user_query)
 
+    _provider.get()
     if USE_MOCK_MODE:
         # Simplified mock response for conversational context
         return mock_generator.get_response(user_query), []
@@ -1,17 +1,192 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from api_client import process_query
+from api_client import process_query, stream_query
 import os
+import config
 import local_model
+import subsystems
+import tools
+
+
+class ChatQueueFull(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class ChatQueueTimeout(Exception):
+    """Raised when a request waited in the queue longer than allowed."""
+
+
+_STREAM_END = object()
+
+
+class ChatExecutor:
+    """Bounded thread pool with admission control for blocking chat work.
+
+    ``process_query`` does embedding, FAISS search, remote LLM calls and tool
+    loops synchronously, so it must never run on the event loop thread. At
+    most ``max_workers`` requests run at once and up to ``max_queue_depth``
+    more may wait; anything beyond that is rejected immediately, and queued
+    work that has waited longer than ``queue_timeout`` seconds is dropped
+    before it starts.
+    """
+
+    def __init__(self, max_workers: int, max_queue_depth: int, queue_timeout: float):
+        self.max_workers = max(max_workers, 1)
+        self.max_queue_depth = max(max_queue_depth, 0)
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="chat-worker"
+        )
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue_depth:
+                self._rejected += 1
+                raise ChatQueueFull()
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _start_job(self, enqueued_at: float) -> None:
+        """Called on the worker thread; drops requests that queued too long."""
+        with self._lock:
+            if time.monotonic() - enqueued_at > self.queue_timeout:
+                self._timed_out += 1
+                raise ChatQueueTimeout()
+            self._running += 1
+
+    def _finish_job(self) -> None:
+        with self._lock:
+            self._running -= 1
+            self._completed += 1
+
+    async def run(self, func, *args, **kwargs):
+        """Run ``func`` on the pool, raising if the request is not admitted."""
+        self._admit()
+        enqueued_at = time.monotonic()
+
+        def job():
+            self._start_job(enqueued_at)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._finish_job()
+
+        try:
+            future = self._executor.submit(job)
+        except BaseException:
+            self._release()
+            raise
+        # Free the slot when the job finishes, not when the awaiter does: a
+        # cancelled request (client disconnect) leaves a started job running.
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def stream(self, func, *args, **kwargs):
+        """Run generator ``func`` on the pool and relay its items asynchronously.
+
+        Admission happens immediately (so callers can still answer 429 before
+        a response starts); the worker stays occupied until the generator is
+        exhausted or the consumer goes away.
+        """
+        self._admit()
+        loop = asyncio.get_running_loop()
+        items: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        enqueued_at = time.monotonic()
+
+        def job():
+            try:
+                self._start_job(enqueued_at)
+                try:
+                    for item in func(*args, **kwargs):
+                        if cancelled.is_set():
+                            break
+                        loop.call_soon_threadsafe(items.put_nowait, (item, None))
+                finally:
+                    self._finish_job()
+            except BaseException as exc:  # noqa: BLE001 - re-raised on the event loop
+                loop.call_soon_threadsafe(items.put_nowait, (_STREAM_END, exc))
+            else:
+                loop.call_soon_threadsafe(items.put_nowait, (_STREAM_END, None))
+            finally:
+                self._release()
+
+        self._executor.submit(job)
+
+        async def relay():
+            try:
+                while True:
+                    item, error = await items.get()
+                    if item is _STREAM_END:
+                        if error is not None:
+                            raise error
+                        return
+                    yield item
+            finally:
+                cancelled.set()
+
+        return relay()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue_depth": self.max_queue_depth,
+                "running": self._running,
+                "queued": self._in_flight - self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+chat_executor = ChatExecutor(
+    max_workers=config.CHAT_WORKER_THREADS,
+    max_queue_depth=config.CHAT_MAX_QUEUE_DEPTH,
+    queue_timeout=config.CHAT_QUEUE_TIMEOUT,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the index, models and SDK clients without holding up startup;
+    # requests arriving first simply initialise what they need.
+    if config.WARM_UP_SUBSYSTEMS:
+        subsystems.warm_up_in_background(config.WARM_UP_SUBSYSTEMS)
+    yield
+    chat_executor.shutdown()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Biomedical RAG API",
     description="An API for the RAG-enhanced biomedical chatbot.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+
 # Define the request body model
 class ChatRequest(BaseModel):
     query: str
@@ -27,28 +202,91 @@ async def chat_endpoint(request: ChatRequest):
     Receives a query, processes it through the RAG and LLM,
     and returns the response.
     """
-    # This function from api_client.py does all the heavy lifting
-    response_text = process_query(request.query, model=request.model)
+    # process_query from api_client.py does all the heavy (blocking) lifting,
+    # so it runs on the worker pool to keep the event loop responsive.
+    try:
+        response_text = await chat_executor.run(process_query, request.query, model=request.model)
+    except ChatQueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many concurrent chat requests. Please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+    except ChatQueueTimeout:
+        raise HTTPException(
+            status_code=503,
+            detail="Chat service is overloaded. Please retry shortly.",
+            headers={"Retry-After": "5"},
+        )
     return ChatResponse(response=response_text)
 
 
+def _sse_event(payload, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streams the response as Server-Sent Events while it is generated.
+    Each event carries an OpenAI-style ``choices[0].delta.content`` chunk and
+    the stream ends with ``data: [DONE]``.
+    """
+    try:
+        chunks = chat_executor.stream(stream_query, request.query, model=request.model)
+    except ChatQueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many concurrent chat requests. Please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+
+    async def event_source():
+        try:
+            async for chunk in chunks:
+                yield _sse_event({"choices": [{"delta": {"content": chunk}}]})
+        except ChatQueueTimeout:
+            yield _sse_event(
+                {"error": {"message": "Chat service is overloaded. Please retry shortly."}},
+                event="error",
+            )
+        except Exception as exc:
+            yield _sse_event({"error": {"message": f"Generation failed: {exc}"}}, event="error")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Plain ``def`` endpoints run on FastAPI's threadpool: the first call may
+# import torch to probe the hardware, which must not block the event loop.
 @app.get("/api/models/local/status")
-async def local_model_status():
+def local_model_status():
     """Return readiness information for the local Qwen model."""
     return local_model.get_status()
 
 
 @app.post("/api/models/local/download")
-async def local_model_download():
+def local_model_download():
     """Trigger the background download/load of the local Qwen model."""
     return local_model.start_download()
 
 @app.get("/api/health")
 async def health_check():
     """
-    A simple health check endpoint.
+    A simple health check endpoint, including chat worker pool load,
+    outbound tool request latencies and which subsystems are initialised.
     """
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "chat_pool": chat_executor.stats(),
+        "tool_http": tools.http_session.stats(),
+        "subsystems": subsystems.status(),
+    }
 
 if __name__ == "__main__":
     # Get port from environment variable or use 8000 as default
@@ -0,0 +1,102 @@
+"""Recall-vs-latency benchmark for the RAG ANN index factories.
+
+Builds each index type from ``rag_pipeline.build_ann_index`` over synthetic,
+clustered, L2-normalised vectors (the shape of MiniLM embeddings) and compares
+recall@k and query throughput against the exact ``IndexFlatIP`` baseline for a
+sweep of ``nprobe`` / ``efSearch`` values.
+
+Usage:
+    python benchmarks/ann_benchmark.py --num-vectors 200000 --dimension 384
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rag_pipeline import ANNIndexConfig, build_ann_index  # noqa: E402
+
+
+def synthetic_embeddings(count: int, dimension: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension), dtype=np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centers[labels] + 0.35 * rng.standard_normal((count, dimension), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(row_found) & set(row_truth)) for row_found, row_truth in zip(found, truth))
+    return hits / truth.size
+
+
+def timed_search(index, queries, k, params=None):
+    start = time.perf_counter()
+    if params is None:
+        _, ids = index.search(queries, k)
+    else:
+        _, ids = index.search(queries, k, params=params)
+    elapsed = time.perf_counter() - start
+    return ids, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--num-vectors", type=int, default=100_000)
+    parser.add_argument("--num-queries", type=int, default=1_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    data = synthetic_embeddings(args.num_vectors, args.dimension, args.clusters, args.seed)
+    queries = synthetic_embeddings(args.num_queries, args.dimension, args.clusters, args.seed + 1)
+
+    flat = faiss.IndexFlatIP(args.dimension)
+    flat.add(data)
+    truth, flat_seconds = timed_search(flat, queries, args.top_k)
+
+    print(f"{args.num_vectors} vectors x {args.dimension} dims, {args.num_queries} queries, k={args.top_k}")
+    print(f"{'index':<10} {'param':<14} {'build s':>8} {'recall':>7} {'ms/query':>9} {'QPS':>9}")
+    print(
+        f"{'flat_ip':<10} {'-':<14} {0.0:>8.2f} {1.0:>7.3f} "
+        f"{1000 * flat_seconds / args.num_queries:>9.3f} {args.num_queries / flat_seconds:>9.0f}"
+    )
+
+    config = ANNIndexConfig()
+    sweeps = {
+        "hnsw": [("efSearch", value) for value in (16, 32, 64, 128, 256)],
+        "ivf_flat": [("nprobe", value) for value in (1, 4, 16, 64)],
+        "ivf_pq": [("nprobe", value) for value in (1, 4, 16, 64)],
+    }
+    for kind, settings in sweeps.items():
+        start = time.perf_counter()
+        index = build_ann_index(kind, args.dimension, args.num_vectors, config)
+        if not index.is_trained:
+            index.train(data)
+        index.add(data)
+        build_seconds = time.perf_counter() - start
+
+        for name, value in settings:
+            if name == "nprobe":
+                params = faiss.SearchParametersIVF(nprobe=value)
+            else:
+                params = faiss.SearchParametersHNSW(efSearch=max(value, args.top_k))
+            found, seconds = timed_search(index, queries, args.top_k, params)
+            print(
+                f"{kind:<10} {f'{name}={value}':<14} {build_seconds:>8.2f} "
+                f"{recall_at_k(found, truth):>7.3f} "
+                f"{1000 * seconds / args.num_queries:>9.3f} {args.num_queries / seconds:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Query latency and batch throughput of the embedding backends.
+
+Loads ``config.RAG_MODEL`` with each requested backend (exporting the ONNX
+variants on first use) and reports single-query latency percentiles, the
+throughput of batched document encoding, and how far each backend's cosine
+scores drift from the ``sentence_transformers`` float32 reference.
+
+Usage:
+    python benchmarks/embedding_benchmark.py --backends sentence_transformers onnx onnx_int8
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from embedding_backends import EMBEDDING_BACKENDS, load_embedder  # noqa: E402
+
+TOPICS = [
+    "BRCA1 mutations and hereditary breast cancer risk",
+    "metformin mechanism in type 2 diabetes",
+    "CRISPR-Cas9 off-target effects in human cells",
+    "warfarin dosing and CYP2C9 genotype",
+    "PD-1 checkpoint inhibitors in melanoma",
+    "tau aggregation in Alzheimer disease",
+    "antibiotic resistance via beta-lactamase expression",
+    "mRNA vaccine lipid nanoparticle delivery",
+]
+
+
+def make_documents(count: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    words = " ".join(TOPICS).split()
+    return [
+        f"{TOPICS[index % len(TOPICS)]}. " + " ".join(rng.choice(words, size=rng.integers(20, 120)))
+        for index in range(count)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", choices=EMBEDDING_BACKENDS, default=list(EMBEDDING_BACKENDS))
+    parser.add_argument("--model", default=config.RAG_MODEL)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--cache-dir", default=config.RAG_ONNX_CACHE_DIR)
+    args = parser.parse_args()
+
+    queries = [TOPICS[index % len(TOPICS)] + f" question {index}" for index in range(args.queries)]
+    documents = make_documents(args.documents, seed=0)
+    reference = None
+    print(f"{args.model}: {args.queries} single queries, {args.documents} documents in batches of {args.batch_size}")
+    print(f"{'backend':22} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'docs/s':>9} {'min cos':>8} {'max |dscore|':>13}")
+    for backend in args.backends:
+        start = time.perf_counter()
+        embedder = load_embedder(args.model, backend, cache_dir=args.cache_dir)
+        load_seconds = time.perf_counter() - start
+        embedder.encode(queries[:4], normalize_embeddings=True)  # warm up
+
+        latencies = []
+        query_vectors = []
+        for query in queries:
+            start = time.perf_counter()
+            query_vectors.append(embedder.encode([query], normalize_embeddings=True)[0])
+            latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        document_vectors = embedder.encode(documents, normalize_embeddings=True, batch_size=args.batch_size)
+        throughput = len(documents) / (time.perf_counter() - start)
+        query_vectors = np.vstack(query_vectors)
+
+        row = (
+            f"{backend:22} {load_seconds:7.1f} {np.percentile(latencies, 50) * 1000:8.2f}"
+            f" {np.percentile(latencies, 95) * 1000:8.2f} {throughput:9.0f}"
+        )
+        if backend == "sentence_transformers":
+            reference = (query_vectors, document_vectors)
+        if reference is not None:
+            cosine = np.sum(document_vectors * reference[1], axis=1).min()
+            drift = np.abs(query_vectors @ document_vectors.T - reference[0] @ reference[1].T).max()
+            row += f" {cosine:8.4f} {drift:13.4f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""BM25 keyword index build time, size and query latency for hybrid retrieval.
+
+Builds a ``rag_keyword_index.BM25Index`` over synthetic chunks (a Zipf
+vocabulary plus one rare identifier per chunk, the shape of biomedical text
+with gene symbols), saves and reloads it, and reports keyword search latency
+percentiles for the in-memory tail and the memory-mapped snapshot against the
+pipeline's ``RAG_HYBRID_KEYWORD_BUDGET``.
+
+Usage:
+    python benchmarks/hybrid_benchmark.py --num-chunks 1000000
+    python benchmarks/hybrid_benchmark.py --num-chunks 100000 --chunk-length 120
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from rag_keyword_index import KEYWORD_INDEX_SUFFIX, BM25Index  # noqa: E402
+from rag_persistence import atomic_write  # noqa: E402
+
+
+def synthetic_chunks(count: int, length: int, vocabulary: int, identifiers: int, seed: int):
+    rng = np.random.default_rng(seed)
+    words = np.array([f"w{i}" for i in range(vocabulary)], dtype=object)
+    genes = np.array([f"gene{i}" for i in range(identifiers)], dtype=object)
+    for _ in range(count):
+        ranks = np.minimum(rng.zipf(1.2, length), vocabulary) - 1
+        tokens = words[ranks].tolist()
+        tokens.append(genes[rng.integers(identifiers)])
+        yield tokens
+
+
+def synthetic_queries(count: int, vocabulary: int, identifiers: int, seed: int):
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(count):
+        terms = [f"w{rank}" for rank in rng.integers(0, min(vocabulary, 2000), rng.integers(2, 5))]
+        terms.append(f"gene{rng.integers(identifiers)}")
+        queries.append(" ".join(terms))
+    return queries
+
+
+def latency(index: BM25Index, queries, k: int) -> np.ndarray:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, k)
+        timings.append(time.perf_counter() - start)
+    return 1000 * np.array(timings)
+
+
+def report(label: str, timings: np.ndarray, budget_ms: float) -> None:
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    within = np.mean(timings <= budget_ms)
+    print(
+        f"{label:<10} p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  p99 {p99:7.2f} ms  "
+        f"max {timings.max():7.2f} ms  within {budget_ms:.0f} ms budget: {within:.1%}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--num-chunks", type=int, default=1_000_000)
+    parser.add_argument("--chunk-length", type=int, default=80, help="tokens per chunk")
+    parser.add_argument("--vocabulary", type=int, default=200_000)
+    parser.add_argument("--identifiers", type=int, default=50_000)
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=config.RAG_TOP_K * 4)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--budget-ms", type=float, default=1000 * config.RAG_HYBRID_KEYWORD_BUDGET)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    index = BM25Index()
+    start = time.perf_counter()
+    batch = []
+    for tokens in synthetic_chunks(
+        args.num_chunks, args.chunk_length, args.vocabulary, args.identifiers, args.seed
+    ):
+        batch.append(tokens)
+        if len(batch) == args.batch_size:
+            index.add(len(index), batch)
+            batch = []
+    if batch:
+        index.add(len(index), batch)
+    build_seconds = time.perf_counter() - start
+    stats = index.stats()
+    print(
+        f"{args.num_chunks} chunks x {args.chunk_length} tokens: indexed in {build_seconds:.1f}s "
+        f"({args.num_chunks / build_seconds:,.0f} chunks/s), {stats['tail_terms']:,} terms, "
+        f"{stats['postings']:,} postings"
+    )
+
+    queries = synthetic_queries(args.num_queries, args.vocabulary, args.identifiers, args.seed + 1)
+    index.search(queries[0], args.top_k)  # warm-up
+    report("tail", latency(index, queries, args.top_k), args.budget_ms)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "index.faiss" + KEYWORD_INDEX_SUFFIX)
+        start = time.perf_counter()
+        snapshot = index.snapshot()
+        atomic_write(path, snapshot.write, binary=True)
+        index.rebase(path, snapshot)
+        save_seconds = time.perf_counter() - start
+        size = os.path.getsize(path)
+        print(
+            f"saved in {save_seconds:.1f}s: {size / 2**20:.1f} MiB on disk "
+            f"({size / max(stats['postings'], 1):.1f} B/posting)"
+        )
+
+        reloaded = BM25Index()
+        start = time.perf_counter()
+        reloaded.load(path)
+        print(f"loaded (memory-mapped) in {1000 * (time.perf_counter() - start):.1f} ms")
+        reloaded.search(queries[0], args.top_k)
+        report("snapshot", latency(reloaded, queries, args.top_k), args.budget_ms)
+        del index, reloaded
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Throughput and peak memory of slab-wise medical image analysis.
+
+Writes a synthetic CT phantom to a temporary ``.npy`` and ``.nii`` file, then
+times ``measurement``, ``segmentation`` (mask written to disk) and
+``enhancement`` through ``medical_imaging.analyze_image`` for several worker
+counts. It reports voxels/s and the peak Python heap seen by ``tracemalloc``,
+against a baseline that loads the whole volume into memory and thresholds
+it with NumPy.
+
+Usage:
+    python benchmarks/image_benchmark.py --shape 256 512 512 --workers 1 2 4
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from medical_imaging import analyze_image, create_output, make_phantom  # noqa: E402
+
+
+def measure(function):
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def in_memory_baseline(path: str) -> None:
+    volume = np.load(path).astype(np.float32)
+    mask = volume >= 300
+    volume.mean(), volume.std(), int(mask.sum()), float(volume[mask].mean())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shape", type=int, nargs=3, default=(256, 512, 512), metavar=("SLICES", "ROWS", "COLUMNS"))
+    parser.add_argument("--workers", type=int, nargs="+", default=(1, 2, 4))
+    parser.add_argument("--slab-voxels", type=int, default=8_000_000)
+    args = parser.parse_args()
+
+    voxels = int(np.prod(args.shape))
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {suffix: str(Path(directory) / f"phantom{suffix}") for suffix in (".npy", ".nii")}
+        for path in paths.values():
+            output = create_output(path, args.shape, np.int16, (1.0, 0.7, 0.7))
+            make_phantom(args.shape, out=output)
+            del output
+        print(f"phantom {tuple(args.shape)} int16, {voxels * 2 / 2**20:.0f} MiB per file")
+
+        seconds, peak = measure(lambda: in_memory_baseline(paths[".npy"]))
+        print(f"{'in-memory numpy':34} {voxels / seconds / 1e6:8.1f} Mvox/s  peak {peak / 2**20:8.1f} MiB")
+
+        for suffix, path in paths.items():
+            for analysis in ("measurement", "segmentation", "enhancement"):
+                options = {} if analysis == "measurement" else {"output_path": str(Path(directory) / f"out{suffix}")}
+                if analysis == "segmentation":
+                    options["threshold"] = 300
+                for workers in args.workers:
+                    seconds, peak = measure(lambda: analyze_image(
+                        path, "CT", analysis, workers=workers, slab_voxels=args.slab_voxels, **options
+                    ))
+                    label = f"{suffix} {analysis} x{workers}"
+                    print(f"{label:34} {voxels / seconds / 1e6:8.1f} Mvox/s  peak {peak / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Vectorised closed-form PK vs. per-subject ODE integration.
+
+Runs a suite of population scenarios (one/two compartments; bolus, infusion
+and oral; single and multiple dosing) through
+``pharmacokinetics.simulate_concentrations`` in one call per scenario and
+reports subjects/s. When SciPy is installed, a sample of subjects is also
+integrated one at a time with ``solve_ivp`` to give a per-subject baseline
+(extrapolated to the whole population) and to check the maximum deviation.
+
+Usage:
+    python benchmarks/pk_benchmark.py --subjects 5000 --time-points 241
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pharmacokinetics import disposition, sample_population, simulate_concentrations  # noqa: E402
+
+SCENARIOS = {
+    "1cmt bolus x1": dict(model="one_compartment", route="iv_bolus", n_doses=1),
+    "1cmt infusion x7": dict(model="one_compartment", route="infusion", n_doses=7, infusion_duration=1.0),
+    "1cmt oral x14": dict(model="one_compartment", route="oral", n_doses=14),
+    "2cmt bolus x7": dict(model="two_compartment", route="iv_bolus", n_doses=7),
+    "2cmt oral x14": dict(model="two_compartment", route="oral", n_doses=14),
+}
+INTERVAL = 12.0
+
+
+def ode_profile(times, dose, subject, scenario):
+    """Integrate one subject's compartment ODEs dose by dose."""
+
+    from scipy.integrate import solve_ivp
+
+    two = scenario["model"] == "two_compartment"
+    volume = subject["volume"]
+    k12 = subject.get("k12", 0.0) if two else 0.0
+    k21 = subject.get("k21", 0.0) if two else 0.0
+    _, _, clearance = disposition(subject["half_life"], volume, scenario["model"], k12, k21)
+    k10 = float(clearance[0, 0]) / volume
+    ka = subject.get("absorption_rate", 1.0)
+    route = scenario["route"]
+    tinf = scenario.get("infusion_duration", 1.0)
+    n_doses = scenario["n_doses"]
+
+    def rhs(t, y):
+        gut, central, peripheral = y
+        since = t % INTERVAL
+        infusing = route == "infusion" and since < tinf and t < n_doses * INTERVAL
+        rate_in = dose / tinf if infusing else 0.0
+        return [
+            -ka * gut,
+            ka * gut + rate_in - (k10 + k12) * central + k21 * peripheral,
+            k12 * central - k21 * peripheral,
+        ]
+
+    state = np.zeros(3)
+    bounds = [k * INTERVAL for k in range(n_doses)] + [times[-1]]
+    profile = np.zeros_like(times)
+    for k in range(n_doses):
+        if route == "oral":
+            state[0] += dose
+        elif route == "iv_bolus":
+            state[1] += dose
+        start, end = bounds[k], max(bounds[k + 1], bounds[k])
+        inside = (times >= start) & (times <= end)
+        solution = solve_ivp(
+            rhs, (start, end), state, t_eval=times[inside], rtol=1e-8, atol=1e-10,
+            max_step=tinf / 4 if route == "infusion" else np.inf, dense_output=True,
+        )
+        profile[inside] = solution.y[1] / volume
+        state = solution.sol(end)
+    return profile
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subjects", type=int, default=5000)
+    parser.add_argument("--time-points", type=int, default=241)
+    parser.add_argument("--ode-sample", type=int, default=20, help="subjects integrated with SciPy")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    population = sample_population(
+        args.subjects, 0.3, args.seed,
+        half_life=8.0, volume=40.0, absorption_rate=1.0, k12=0.5, k21=0.3,
+    )
+    population["k21"] = np.maximum(population["k21"], np.log(2) / population["half_life"] * 1.01)
+    dose = 100.0
+
+    try:
+        import scipy  # noqa: F401
+    except ImportError:
+        print("SciPy is not installed; skipping the ODE baseline.")
+        args.ode_sample = 0
+
+    print(f"{args.subjects} subjects x {args.time_points} time points")
+    print(f"{'scenario':18} {'numpy ms':>10} {'subjects/s':>12} {'ode ms (extrap.)':>18} {'speedup':>9} {'max |diff|':>11}")
+    for name, scenario in SCENARIOS.items():
+        times = np.linspace(0, (scenario["n_doses"] + 2) * INTERVAL, args.time_points)
+        subjects = dict(population)
+        if scenario["model"] == "one_compartment":
+            subjects.pop("k12"), subjects.pop("k21")
+        if scenario["route"] != "oral":
+            subjects.pop("absorption_rate")
+
+        start = time.perf_counter()
+        profiles = simulate_concentrations(times, dose, dosing_interval=INTERVAL, **subjects, **scenario)
+        seconds = time.perf_counter() - start
+
+        row = f"{name:18} {seconds * 1000:10.1f} {args.subjects / seconds:12.0f}"
+        if args.ode_sample:
+            sample = min(args.ode_sample, args.subjects)
+            start = time.perf_counter()
+            deviation = 0.0
+            for index in range(sample):
+                subject = {key: float(values[index]) for key, values in subjects.items()}
+                reference = ode_profile(times, dose, subject, scenario)
+                deviation = max(deviation, float(np.abs(reference - profiles[index]).max()))
+            ode_seconds = (time.perf_counter() - start) / sample * args.subjects
+            row += f" {ode_seconds * 1000:18.0f} {ode_seconds / seconds:8.0f}x {deviation:11.2e}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
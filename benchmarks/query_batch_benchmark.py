@@ -0,0 +1,78 @@
+"""Throughput of batched vs. one-at-a-time RAG retrieval.
+
+Ingests a synthetic corpus into an in-memory ``FlexibleRAGPipeline`` and
+compares ``query()`` called in a loop against ``query_batch()`` for batch
+sizes 1-256. The query embedding cache is disabled so every query pays for
+its embedding, as in an evaluation run over distinct queries.
+
+Usage:
+    python benchmarks/query_batch_benchmark.py --num-chunks 20000 --num-queries 512
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config  # noqa: E402
+from rag_pipeline import FlexibleRAGPipeline  # noqa: E402
+
+VOCABULARY = (
+    "gene protein receptor kinase inhibitor tumor cell pathway mutation expression "
+    "antibody vaccine trial dose patient clinical sequence enzyme binding therapy"
+).split()
+
+
+def synthetic_texts(count: int, words: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(VOCABULARY) for _ in range(words)) for _ in range(count)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=config.RAG_MODEL)
+    parser.add_argument("--index-factory", default="flat_ip")
+    parser.add_argument("--num-chunks", type=int, default=10_000)
+    parser.add_argument("--num-queries", type=int, default=256)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-sizes", default="1,4,16,64,256")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    pipeline = FlexibleRAGPipeline(
+        args.model,
+        index_factory=args.index_factory,
+        query_cache_size=0,
+        deduplicate=False,
+    )
+    start = time.perf_counter()
+    pipeline.add_texts(synthetic_texts(args.num_chunks, 40, args.seed), auto_chunk=False)
+    print(f"ingested {args.num_chunks} chunks in {time.perf_counter() - start:.1f}s")
+
+    queries = synthetic_texts(args.num_queries, 6, args.seed + 1)
+    pipeline.query(queries[0])  # warm up the model
+
+    start = time.perf_counter()
+    for query in queries:
+        pipeline.query(query, top_k=args.top_k)
+    sequential = time.perf_counter() - start
+    print(f"{'batch':>6} {'QPS':>9} {'ms/query':>9} {'speedup':>8}")
+    print(f"{'loop':>6} {len(queries) / sequential:>9.1f} {1000 * sequential / len(queries):>9.2f} {1.0:>8.2f}")
+
+    for batch_size in (int(value) for value in args.batch_sizes.split(",")):
+        start = time.perf_counter()
+        for offset in range(0, len(queries), batch_size):
+            pipeline.query_batch(queries[offset:offset + batch_size], top_k=args.top_k)
+        seconds = time.perf_counter() - start
+        print(
+            f"{batch_size:>6} {len(queries) / seconds:>9.1f} "
+            f"{1000 * seconds / len(queries):>9.2f} {sequential / seconds:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Per-record Biopython vs. vectorised batch sequence analysis.
+
+Generates random DNA reads and times GC content, transcription and
+translation through ``Bio.Seq`` one record at a time (the original
+``tools.analyze_sequence`` path) against ``sequence_analysis.analyze_records``
+over packed ``uint8`` blocks, checking that both produce the same columns.
+
+Usage:
+    python benchmarks/sequence_benchmark.py --reads 20000 --read-length 150
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sequence_analysis import analyze_records  # noqa: E402
+
+
+def random_reads(count: int, length: int, seed: int):
+    rng = np.random.default_rng(seed)
+    bases = np.frombuffer(b"ACGT", dtype=np.uint8)[rng.integers(0, 4, size=(count, length))]
+    return [(f"read{i}", row.tobytes()) for i, row in enumerate(bases)]
+
+
+def biopython_columns(records):
+    from Bio.Seq import Seq
+    from Bio.SeqUtils import gc_fraction
+
+    gc, transcription, translation = [], [], []
+    for _, sequence in records:
+        seq = Seq(sequence.decode("ascii"))
+        gc.append(round(gc_fraction(seq) * 100, 2))
+        transcription.append(str(seq.transcribe()))
+        translation.append(str(seq[: len(seq) // 3 * 3].translate()))
+    return {"gc_content": gc, "transcription": transcription, "translation": translation}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reads", type=int, default=20_000)
+    parser.add_argument("--read-length", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    records = random_reads(args.reads, args.read_length, args.seed)
+    bases = args.reads * args.read_length
+
+    start = time.perf_counter()
+    batch = analyze_records(records, "DNA", include_sequences=True)["columns"]
+    batch_seconds = time.perf_counter() - start
+    print(f"numpy batch     {batch_seconds * 1000:9.1f} ms  {bases / batch_seconds / 1e6:8.1f} Mbases/s")
+
+    try:
+        start = time.perf_counter()
+        reference = biopython_columns(records)
+        bio_seconds = time.perf_counter() - start
+    except ImportError:
+        print("Biopython is not installed; skipping the per-record baseline.")
+        return
+    print(f"biopython loop  {bio_seconds * 1000:9.1f} ms  {bases / bio_seconds / 1e6:8.1f} Mbases/s")
+    print(f"speedup         {bio_seconds / batch_seconds:9.1f}x")
+
+    for name, values in reference.items():
+        if batch[name] != values:
+            raise SystemExit(f"Mismatch in {name}")
+    print("Columns match Biopython.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Memory saved versus recall lost for the RAG vector storage codecs.
+
+Stores the same synthetic, clustered, L2-normalised vectors with each
+``vector_codec`` (float32, float16, sq8, pq) through ``rag_pipeline``'s index
+builders and reports the index memory, recall@k against exact float32 search,
+and the recall and latency after exact re-scoring of ``--rescore-factor * k``
+candidates from the on-disk float store.
+
+Usage:
+    python benchmarks/vector_storage_benchmark.py --num-vectors 200000 --dimension 384
+    python benchmarks/vector_storage_benchmark.py --factories flat hnsw
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ann_benchmark import recall_at_k, synthetic_embeddings  # noqa: E402
+from rag_pipeline import (  # noqa: E402
+    VECTOR_CODECS,
+    ANNIndexConfig,
+    build_ann_index,
+    build_flat_index,
+    index_memory_bytes,
+)
+from rag_vector_store import FloatVectorStore, rescore  # noqa: E402
+
+
+def build(factory: str, codec: str, data, config: ANNIndexConfig):
+    if factory == "flat":
+        index = build_flat_index(codec, data.shape[1], faiss.METRIC_INNER_PRODUCT, config)
+    else:
+        index = build_ann_index(factory, data.shape[1], len(data), config, codec)
+    if not index.is_trained:
+        index.train(data)
+    index.add(data)
+    return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--num-vectors", type=int, default=100_000)
+    parser.add_argument("--num-queries", type=int, default=1_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--factories", nargs="+", choices=["flat", "hnsw", "ivf_flat"], default=["flat"])
+    parser.add_argument("--codecs", nargs="+", choices=VECTOR_CODECS, default=list(VECTOR_CODECS))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    data = synthetic_embeddings(args.num_vectors, args.dimension, args.clusters, args.seed)
+    queries = synthetic_embeddings(args.num_queries, args.dimension, args.clusters, args.seed + 1)
+    exact = faiss.IndexFlatIP(args.dimension)
+    exact.add(data)
+    _, truth = exact.search(queries, args.top_k)
+    float32_bytes = data.nbytes
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = FloatVectorStore(args.dimension, str(Path(directory) / "bench.vectors"))
+        store.append(data)
+        store.flush()
+        print(
+            f"{args.num_vectors} vectors x {args.dimension} dims, {args.num_queries} queries, "
+            f"k={args.top_k}, re-scoring {args.rescore_factor}x candidates "
+            f"(float store {store.nbytes / 2**20:.1f} MiB on disk)"
+        )
+        print(
+            f"{'index':<10} {'codec':<8} {'MiB':>8} {'B/vec':>7} {'saved':>7} {'recall':>7} "
+            f"{'ms/q':>7} {'rescored':>9} {'ms/q':>7}"
+        )
+        config = ANNIndexConfig()
+        fetch = args.top_k * args.rescore_factor
+        for factory in args.factories:
+            for codec in args.codecs:
+                index = build(factory, codec, data, config)
+                memory = index_memory_bytes(index)
+
+                start = time.perf_counter()
+                _, found = index.search(queries, args.top_k)
+                plain_ms = 1000 * (time.perf_counter() - start) / args.num_queries
+
+                start = time.perf_counter()
+                _, candidates = index.search(queries, fetch)
+                _, rescored = rescore(queries, candidates, store, args.top_k, inner_product=True)
+                rescored_ms = 1000 * (time.perf_counter() - start) / args.num_queries
+
+                print(
+                    f"{factory:<10} {codec:<8} {memory / 2**20:>8.1f} {memory / args.num_vectors:>7.1f} "
+                    f"{1 - memory / float32_bytes:>7.1%} {recall_at_k(found, truth):>7.3f} {plain_ms:>7.3f} "
+                    f"{recall_at_k(rescored, truth):>9.3f} {rescored_ms:>7.3f}"
+                )
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
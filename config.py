@@ -58,13 +58,18 @@ TOOL_DEFINITIONS = [
                 "properties": {
                     "sequence": {
                         "type": "string",
-                        "description": "Biological sequence to analyze",
+                        "description": "Biological sequence to analyze, or multi-record FASTA text",
                     },
                     "sequence_type": {
                         "type": "string",
                         "enum": ["DNA", "RNA", "protein"],
                         "description": "Type of biological sequence",
                     },
+                    "include_sequences": {
+                        "type": "boolean",
+                        "description": "For FASTA input, also return per-record transcriptions and translations",
+                        "default": False,
+                    },
                 },
                 "required": ["sequence", "sequence_type"],
             },
@@ -106,21 +111,58 @@ TOOL_DEFINITIONS = [
         "type": "function",
         "function": {
             "name": "simulate_pharmacokinetics",
-            "description": "Simulate drug pharmacokinetics (PK) parameters",
+            "description": (
+                "Simulate plasma concentration-time profiles and exposure metrics "
+                "(Cmax, Tmax, AUC, clearance) for a one- or two-compartment model, "
+                "for one subject or a virtual population"
+            ),
             "parameters": {
                 "type": "object",
                 "properties": {
-                    "dose": {"type": "number", "description": "Drug dose in mg"},
-                    "half_life": {"type": "number", "description": "Drug half-life in hours"},
+                    "dose": {"type": "number", "description": "Drug dose in mg (per dose)"},
+                    "half_life": {"type": "number", "description": "Terminal half-life in hours"},
                     "volume_distribution": {
                         "type": "number",
-                        "description": "Volume of distribution in L/kg",
+                        "description": "Volume of distribution (central volume for two compartments) in L/kg",
                     },
                     "time_points": {
                         "type": "integer",
                         "description": "Number of time points to simulate",
                         "default": 24,
                     },
+                    "duration": {
+                        "type": "number",
+                        "description": "Simulated time span in hours (default: regimen plus five half-lives)",
+                    },
+                    "weight_kg": {"type": "number", "description": "Body weight in kg", "default": 70},
+                    "model": {
+                        "type": "string",
+                        "enum": ["one_compartment", "two_compartment"],
+                        "default": "one_compartment",
+                    },
+                    "route": {
+                        "type": "string",
+                        "enum": ["iv_bolus", "infusion", "oral"],
+                        "default": "iv_bolus",
+                    },
+                    "absorption_rate": {"type": "number", "description": "Oral absorption rate constant ka in 1/h"},
+                    "bioavailability": {"type": "number", "description": "Oral bioavailability F (0-1)"},
+                    "infusion_duration": {"type": "number", "description": "Infusion duration in hours"},
+                    "k12": {"type": "number", "description": "Central to peripheral rate constant in 1/h (two compartments)"},
+                    "k21": {"type": "number", "description": "Peripheral to central rate constant in 1/h (two compartments)"},
+                    "n_doses": {"type": "integer", "description": "Number of doses", "default": 1},
+                    "dosing_interval": {"type": "number", "description": "Hours between doses"},
+                    "n_subjects": {
+                        "type": "integer",
+                        "description": "Virtual subjects for a population simulation (returns percentile bands)",
+                        "default": 1,
+                    },
+                    "variability": {
+                        "type": "number",
+                        "description": "Between-subject coefficient of variation of PK parameters",
+                        "default": 0.3,
+                    },
+                    "seed": {"type": "integer", "description": "Random seed for the population"},
                 },
                 "required": ["dose", "half_life", "volume_distribution"],
             },
@@ -130,13 +172,16 @@ TOOL_DEFINITIONS = [
         "type": "function",
         "function": {
             "name": "analyze_medical_image",
-            "description": "Analyze medical images for basic metrics",
+            "description": (
+                "Analyze a medical image volume (.npy, .nii, .nii.gz or DICOM): intensity and "
+                "size measurements, threshold segmentation or contrast enhancement"
+            ),
             "parameters": {
                 "type": "object",
                 "properties": {
                     "image_path": {
                         "type": "string",
-                        "description": "Path to the medical image file",
+                        "description": "Path to the medical image file, relative to the image directory",
                     },
                     "modality": {
                         "type": "string",
@@ -152,6 +197,20 @@ TOOL_DEFINITIONS = [
                             "registration",
                         ],
                         "description": "Type of analysis to perform",
+                        "default": "measurement",
+                    },
+                    "threshold": {
+                        "type": "number",
+                        "description": "Segmentation threshold (HU for CT); Otsu's method when omitted",
+                    },
+                    "window": {
+                        "type": "string",
+                        "enum": ["auto", "soft_tissue", "lung", "bone", "brain"],
+                        "description": "Enhancement window: a CT preset, or 'auto' percentile stretch",
+                    },
+                    "smoothing_sigma": {
+                        "type": "number",
+                        "description": "In-plane Gaussian smoothing (pixels) for enhancement",
                     },
                 },
                 "required": ["image_path", "modality"],
@@ -165,6 +224,59 @@ RAG_TOP_K = 3  # Number of similar documents to retrieve
 RAG_CHUNK_SIZE = 1000  # Maximum chunk size for text splitting
 RAG_MODEL = "all-MiniLM-L6-v2"  # Embedding model for RAG
 
+# Vector index: "flat_ip"/"flat_l2" are exact; "hnsw", "ivf_flat" and "ivf_pq"
+# start exact and are promoted to an approximate index once the store holds
+# RAG_ANN_PROMOTION_THRESHOLD chunks.
+RAG_INDEX_FACTORY = "hnsw"
+RAG_ANN_PROMOTION_THRESHOLD = 50000
+RAG_ANN_NPROBE = 16  # IVF lists probed per query (higher = better recall, slower)
+RAG_ANN_EF_SEARCH = 64  # HNSW candidate list size per query
+# Metadata-filtered queries search only matching chunks; filters matching at
+# most this many chunks are scored exactly instead of through the ANN index.
+RAG_FILTER_EXACT_THRESHOLD = 4096
+# Vector storage codec: "float32" (4*d bytes per chunk), "float16" (2*d),
+# "sq8" (d) or "pq" (d/8 bytes). sq8 and pq need training, so they start as
+# float32 until RAG_ANN_PROMOTION_THRESHOLD chunks. RAG_RESCORE re-ranks
+# RAG_RESCORE_FACTOR * candidates exactly using float32 copies kept on disk
+# (rag_index.faiss.vectors, memory-mapped) to recover most of the lost recall.
+RAG_VECTOR_CODEC = "float32"
+RAG_RESCORE = False
+RAG_RESCORE_FACTOR = 4
+
+# Hybrid retrieval: a BM25 keyword index (rag_index.faiss.bm25) is searched in
+# parallel with the vectors and the two rankings are merged by reciprocal rank
+# fusion (score = sum of weight / (RRF_K + rank)). Queries containing
+# identifiers (BRCA1, rs334, NM_007294.4) weight the keyword ranking by
+# IDENTIFIER_BOOST. Keyword results later than KEYWORD_BUDGET seconds are
+# dropped and the query is answered from the dense results alone. Results keep
+# the vector similarity in ``score``; the fused value is in ``fused_score``.
+RAG_HYBRID_SEARCH = False
+RAG_HYBRID_KEYWORD_WEIGHT = 1.0
+RAG_HYBRID_IDENTIFIER_BOOST = 2.0
+RAG_HYBRID_RRF_K = 60
+RAG_HYBRID_KEYWORD_BUDGET = 0.05
+
+# In-memory LRU of query embeddings keyed by model + normalized query text.
+# Set either limit to 0 to disable.
+RAG_QUERY_CACHE_SIZE = 1024  # Maximum cached query embeddings
+RAG_QUERY_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Memory cap for cached vectors
+
+# Embedding backend: "sentence_transformers" (PyTorch, float32), or "onnx" /
+# "onnx_int8" to run RAG_MODEL through ONNX Runtime (int8: quantized weights,
+# fastest on CPU). ONNX exports are built on first use and cached in
+# RAG_ONNX_CACHE_DIR. Requires: pip install onnxruntime onnx
+RAG_EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "sentence_transformers")
+RAG_ONNX_CACHE_DIR = os.getenv("RAG_ONNX_CACHE_DIR", "models/onnx")
+
+# Shared embedding server (python embedding_server.py): processes embed through
+# it instead of each loading RAG_MODEL. "unix:/path.sock" or "host:port"; None
+# loads the model in-process. Unreachable servers fall back to in-process.
+RAG_EMBEDDING_SERVER = os.getenv("RAG_EMBEDDING_SERVER") or None
+# Server-side micro-batching: wait up to BATCH_WAIT seconds for concurrent
+# requests and encode up to MAX_BATCH_SIZE texts per model call.
+EMBEDDING_SERVER_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_SERVER_MAX_BATCH_SIZE", "64"))
+EMBEDDING_SERVER_BATCH_WAIT = float(os.getenv("EMBEDDING_SERVER_BATCH_WAIT", "0.005"))
+
 # Optional: Biomedical-specific embedding model (requires more resources)
 # RAG_MODEL = "dmis-lab/biobert-base-cased-v1.2"  # For GPU environments
 
@@ -172,6 +284,103 @@ RAG_MODEL = "all-MiniLM-L6-v2"  # Embedding model for RAG
 RAG_INDEX_PATH = "rag_index.faiss"
 RAG_DOCUMENTS_PATH = "documents.jsonl"
 
+# Snapshot layout: "packed" writes a memory-mapped chunk store (offset table,
+# text blob and columnar metadata) so only retrieved chunks are decoded;
+# "jsonl" keeps the one-object-per-line format. Both formats are readable.
+RAG_DOCUMENT_FORMAT = "packed"
+RAG_MMAP_INDEX = True  # Map the FAISS index file instead of reading it into memory
+
+# Bulk ingestion (rag.ingest_corpus / python rag_ingest.py): chunking runs in
+# RAG_INGEST_WORKERS processes and chunks are embedded RAG_INGEST_BATCH_SIZE at
+# a time; progress is checkpointed every RAG_INGEST_CHECKPOINT_INTERVAL batches.
+RAG_INGEST_BATCH_SIZE = 256
+RAG_INGEST_WORKERS = int(os.getenv("RAG_INGEST_WORKERS", str(max((os.cpu_count() or 2) - 1, 1))))
+RAG_INGEST_CHECKPOINT_INTERVAL = 20
+
+# Ingest deduplication: chunks whose normalized text is already stored are
+# skipped. Chunk embeddings are cached on disk by content hash so re-ingesting
+# an unchanged corpus does not run the embedding model (None disables).
+RAG_DEDUPLICATE = True
+RAG_EMBEDDING_CACHE_PATH = "embedding_cache.sqlite"
+
+# RAG persistence: "append" streams new chunks to a write-ahead log that a
+# background writer flushes and periodically compacts into the snapshot files;
+# "snapshot" rewrites the full index and documents on every save.
+RAG_PERSISTENCE_MODE = "append"
+RAG_WAL_FLUSH_INTERVAL = 2.0  # Seconds between background write-ahead log flushes
+RAG_WAL_FLUSH_BATCH_SIZE = 64  # Pending chunks that trigger an early flush
+RAG_WAL_COMPACT_THRESHOLD = 5000  # Logged chunks before compacting into a snapshot
+
+# Chat API concurrency: blocking chat work runs on a bounded thread pool.
+# Requests beyond workers + queue depth are rejected with HTTP 429, and
+# requests that wait in the queue longer than the timeout get HTTP 503.
+CHAT_WORKER_THREADS = int(os.getenv("CHAT_WORKER_THREADS", "4"))
+CHAT_MAX_QUEUE_DEPTH = int(os.getenv("CHAT_MAX_QUEUE_DEPTH", "16"))
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "30"))
+
+# Heavy subsystems (RAG index, embedding model, provider SDK client, cached
+# local model) initialise on first use so imports stay fast. The API service
+# warms the listed ones up in the background at startup; "" disables that.
+WARM_UP_SUBSYSTEMS = [
+    name.strip()
+    for name in os.getenv("WARM_UP_SUBSYSTEMS", "rag_index,embedder,llm_provider,local_model").split(",")
+    if name.strip()
+]
+
+# Tool calls requested in one model turn run concurrently on a shared pool.
+# A call exceeding its timeout (counted from when it starts running) returns an
+# error result to the model; one left waiting that long for a worker is dropped.
+TOOL_CALL_WORKERS = int(os.getenv("TOOL_CALL_WORKERS", "8"))
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "30"))  # Seconds
+TOOL_CALL_TIMEOUTS = {
+    "search_pubmed": 25.0,  # Two NCBI round-trips, each with a 10 s request timeout
+}
+
+# Outbound tool HTTP: one keep-alive session pooled per host. Requests to NCBI
+# are rate limited to 3/s, or 10/s when PUBMED_API_KEY is set; 429 and 5xx
+# responses are retried with exponential backoff (or the Retry-After header).
+PUBMED_API_KEY = os.getenv("PUBMED_API_KEY")
+PUBMED_EMAIL = os.getenv("PUBMED_EMAIL")
+TOOL_HTTP_POOL_CONNECTIONS = 4  # Hosts with a cached connection pool
+TOOL_HTTP_POOL_MAXSIZE = int(os.getenv("TOOL_HTTP_POOL_MAXSIZE", "8"))  # Connections per host
+TOOL_HTTP_MAX_RETRIES = 3
+TOOL_HTTP_BACKOFF_FACTOR = 0.5  # Seconds; attempt n waits up to factor * 2**n
+
+# PubMed E-utilities cache: esearch PMID lists (keyed by normalized query and
+# max_results) and parsed efetch articles (keyed by PMID) are kept in SQLite so
+# repeated and overlapping searches skip NCBI. Set the path to "" to disable.
+PUBMED_CACHE_PATH = os.getenv("PUBMED_CACHE_PATH", "pubmed_cache.sqlite")
+PUBMED_CACHE_TTL = 7 * 24 * 3600  # Seconds before a cached result is refetched
+PUBMED_CACHE_MAX_ENTRIES = 50_000  # Per table; least recently used rows are evicted
+
+# PubMed harvesting (rag.harvest_pubmed / python pubmed_harvest.py): efetch
+# pages of PUBMED_HARVEST_BATCH_SIZE records, PUBMED_HARVEST_WORKERS at a time
+# (the shared rate limiter still caps NCBI traffic).
+PUBMED_HARVEST_BATCH_SIZE = 500
+PUBMED_HARVEST_WORKERS = 3
+
+# Batch (FASTA) sequence analysis returns per-record columns for at most this
+# many records; the summary always covers the whole input.
+SEQUENCE_BATCH_MAX_ROWS = 1000
+
+# Drug property calculation: lists of SMILES are split into chunks computed on
+# DRUG_PROPERTY_WORKERS processes; results are cached by canonical SMILES.
+DRUG_PROPERTY_WORKERS = int(os.getenv("DRUG_PROPERTY_WORKERS", str(max((os.cpu_count() or 2) - 1, 1))))
+DRUG_PROPERTY_CHUNK_SIZE = 512
+DRUG_PROPERTY_CACHE_SIZE = 100_000
+
+# Pharmacokinetic simulation limits (population size and grid resolution).
+PK_MAX_SUBJECTS = 10_000
+PK_MAX_TIME_POINTS = 2_000
+
+# Medical image analysis reads volumes in slabs of at most
+# MEDICAL_IMAGE_SLAB_VOXELS voxels on MEDICAL_IMAGE_WORKERS threads. The
+# analyze_medical_image tool only reads images inside MEDICAL_IMAGE_DIR (paths
+# are resolved relative to it); set it to "" to refuse all image paths.
+MEDICAL_IMAGE_SLAB_VOXELS = int(os.getenv("MEDICAL_IMAGE_SLAB_VOXELS", "8000000"))
+MEDICAL_IMAGE_WORKERS = int(os.getenv("MEDICAL_IMAGE_WORKERS", str(min(os.cpu_count() or 1, 4))))
+MEDICAL_IMAGE_DIR = os.getenv("MEDICAL_IMAGE_DIR", "medical_images")
+
 # Session Configuration
 MAX_CONVERSATION_LENGTH = 50  # Maximum number of messages to keep in context
 SAVE_CONVERSATION = True  # Whether to save conversation history
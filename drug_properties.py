@@ -0,0 +1,327 @@
+"""Batch molecular property calculation for compound libraries.
+
+``tools.calculate_drug_properties`` parses one SMILES and computes every
+descriptor per call. Screening libraries hold 10k-1M compounds, so this
+module:
+
+* computes only the requested descriptors,
+* splits the input stream into chunks that a process pool works through
+  (results are yielded in input order as chunks complete, with a bounded
+  number of chunks in flight so memory does not grow with the library),
+* caches results by canonical SMILES, so repeated compounds (and different
+  spellings of the same compound) are computed once.
+
+Usage:
+    python drug_properties.py library.smi -o properties.jsonl --properties molecular_weight logp
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from rdkit import Chem, RDLogger
+    from rdkit.Chem import Descriptors, Lipinski
+    RDKIT_AVAILABLE = True
+except ImportError:
+    RDKIT_AVAILABLE = False
+
+if RDKIT_AVAILABLE:
+    PROPERTY_FUNCTIONS: Dict[str, Callable[[Any], float]] = {
+        "molecular_weight": Descriptors.MolWt,
+        "logp": Descriptors.MolLogP,
+        "hbd": Lipinski.NumHDonors,
+        "hba": Lipinski.NumHAcceptors,
+        "rotatable_bonds": Lipinski.NumRotatableBonds,
+        "tpsa": Descriptors.TPSA,
+    }
+else:
+    PROPERTY_FUNCTIONS = {}
+
+DEFAULT_PROPERTIES = ("molecular_weight", "logp", "hbd", "hba", "rotatable_bonds", "tpsa")
+# Spellings accepted in requests (``config.TOOL_DEFINITIONS`` advertises "logP").
+_ALIASES = {"logP": "logp", "mw": "molecular_weight", "TPSA": "tpsa"}
+
+
+def resolve_properties(properties: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """Canonical, de-duplicated property names; raises ``ValueError`` on unknown ones."""
+
+    if not properties:
+        return DEFAULT_PROPERTIES
+    resolved = tuple(dict.fromkeys(_ALIASES.get(name, name) for name in properties))
+    unknown = [name for name in resolved if name not in DEFAULT_PROPERTIES]
+    if unknown:
+        raise ValueError(
+            f"Unknown properties: {', '.join(unknown)}. Available: {', '.join(DEFAULT_PROPERTIES)}."
+        )
+    return resolved
+
+
+def compute_properties(
+    smiles: str,
+    properties: Sequence[str] = DEFAULT_PROPERTIES,
+    cache: Optional["PropertyCache"] = None,
+) -> Dict[str, Any]:
+    """Descriptors for one SMILES, plus its canonical form (or an ``error``).
+
+    With a ``cache``, a compound already computed under another spelling is
+    answered after parsing, without recomputing descriptors.
+    """
+
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        return {"smiles": smiles, "error": "Invalid SMILES string provided."}
+    canonical = Chem.MolToSmiles(mol)
+    if cache is not None:
+        hit = cache.get(canonical, properties, count=False)
+        if hit is not None:
+            hit["smiles"] = smiles
+            cache.put(hit)  # remember this spelling
+            return hit
+    result: Dict[str, Any] = {"smiles": smiles, "canonical_smiles": canonical}
+    for name in properties:
+        result[name] = PROPERTY_FUNCTIONS[name](mol)
+    if cache is not None:
+        cache.put(result)
+    return result
+
+
+def compute_chunk(smiles: Sequence[str], properties: Sequence[str]) -> List[Dict[str, Any]]:
+    """Process-pool work unit: compute one chunk of SMILES."""
+
+    RDLogger.DisableLog("rdApp.*")  # invalid SMILES are reported per row
+    # Duplicates within the chunk are computed once.
+    local = PropertyCache(max_entries=len(smiles))
+    return [
+        local.get(item, properties, count=False) or compute_properties(item, properties, local)
+        for item in smiles
+    ]
+
+
+class PropertyCache:
+    """Thread-safe LRU of computed descriptors keyed by canonical SMILES.
+
+    Input spellings are remembered as aliases of their canonical form, so a
+    lookup by the raw SMILES needs no parsing.
+    """
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self.max_entries = max(max_entries, 0)
+        self._values: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._aliases: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, smiles: str, properties: Sequence[str], *, count: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """Cached result for ``smiles`` (raw or canonical) covering ``properties``."""
+
+        with self._lock:
+            canonical = self._aliases.get(smiles, smiles)
+            values = self._values.get(canonical)
+            if values is None or any(name not in values for name in properties):
+                if count:
+                    self.misses += 1
+                return None
+            self._values.move_to_end(canonical)
+            self.hits += 1
+            return {
+                "smiles": smiles,
+                "canonical_smiles": canonical,
+                **{name: values[name] for name in properties},
+            }
+
+    def put(self, result: Dict[str, Any]) -> None:
+        canonical = result.get("canonical_smiles")
+        if canonical is None or self.max_entries == 0:
+            return
+        values = {key: value for key, value in result.items() if key in DEFAULT_PROPERTIES}
+        with self._lock:
+            merged = self._values.pop(canonical, {})
+            merged.update(values)
+            self._values[canonical] = merged
+            if result["smiles"] != canonical:
+                self._aliases[result["smiles"]] = canonical
+                self._aliases.move_to_end(result["smiles"])
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+            while len(self._aliases) > self.max_entries:
+                self._aliases.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._values)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._values),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def iter_smiles_file(path: str) -> Iterator[str]:
+    """SMILES from a ``.smi`` / text file (optionally gzip-compressed).
+
+    The first whitespace-separated column of each line is used; blank lines,
+    ``#`` comments and a leading ``smiles`` header are skipped.
+    """
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as handle:
+        for number, line in enumerate(handle):
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            if number == 0 and fields[0].lower() == "smiles":
+                continue
+            yield fields[0]
+
+
+def iter_batch_properties(
+    smiles: Iterable[str],
+    properties: Optional[Iterable[str]] = None,
+    *,
+    workers: Optional[int] = None,
+    chunk_size: int = 512,
+    cache: Optional[PropertyCache] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield one result per input SMILES, in input order, as chunks finish.
+
+    Inputs that fit in a single chunk, or ``workers=0``, are computed in this
+    process; larger streams are spread over a spawn-context process pool.
+    """
+
+    if not RDKIT_AVAILABLE:
+        raise RuntimeError("RDKit is not installed. Install it with: pip install rdkit")
+    names = resolve_properties(properties)
+    if workers is None:
+        workers = max((os.cpu_count() or 2) - 1, 1)
+    blocks = _blocks(iter(smiles), max(chunk_size, 1))
+    first = next(blocks, None)
+    if first is None:
+        return
+    second = next(blocks, None)
+    if workers == 0 or second is None:
+        RDLogger.DisableLog("rdApp.*")
+        for block in itertools.chain([first], [] if second is None else [second], blocks):
+            for item in block:
+                yield _cached_compute(item, names, cache)
+        return
+
+    def split(block: List[str]) -> Tuple[List[Optional[Dict[str, Any]]], List[int], List[str]]:
+        """Fill in cache hits; return the positions and SMILES still to compute."""
+
+        results: List[Optional[Dict[str, Any]]] = []
+        positions: List[int] = []
+        pending: List[str] = []
+        for position, item in enumerate(block):
+            hit = cache.get(item, names) if cache is not None else None
+            results.append(hit)
+            if hit is None:
+                positions.append(position)
+                pending.append(item)
+        return results, positions, pending
+
+    def merged(results, positions, future: Optional[Future]) -> Iterator[Dict[str, Any]]:
+        for position, result in zip(positions, future.result() if future is not None else []):
+            results[position] = result
+            if cache is not None and "error" not in result:
+                cache.put(result)
+        yield from results
+
+    # Spawned workers import only this module and RDKit.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        in_flight: Deque[Tuple[List[Optional[Dict[str, Any]]], List[int], Optional[Future]]] = deque()
+        for block in itertools.chain([first, second], blocks):
+            results, positions, pending = split(block)
+            future = pool.submit(compute_chunk, pending, names) if pending else None
+            in_flight.append((results, positions, future))
+            if len(in_flight) >= workers * 2:
+                yield from merged(*in_flight.popleft())
+        while in_flight:
+            yield from merged(*in_flight.popleft())
+
+
+def _blocks(iterator: Iterator[str], size: int) -> Iterator[List[str]]:
+    while True:
+        block = list(itertools.islice(iterator, size))
+        if not block:
+            return
+        yield block
+
+
+def _cached_compute(smiles: str, names: Sequence[str], cache: Optional[PropertyCache]) -> Dict[str, Any]:
+    hit = cache.get(smiles, names) if cache is not None else None
+    return hit if hit is not None else compute_properties(smiles, names, cache)
+
+
+def write_batch_properties(
+    smiles: Iterable[str],
+    handle,
+    properties: Optional[Iterable[str]] = None,
+    **kwargs: Any,
+) -> int:
+    """Stream results to ``handle`` as JSON lines; returns the number written."""
+
+    count = 0
+    for result in iter_batch_properties(smiles, properties, **kwargs):
+        handle.write(json.dumps(result) + "\n")
+        count += 1
+    return count
+
+
+__all__ = [
+    "DEFAULT_PROPERTIES",
+    "PropertyCache",
+    "RDKIT_AVAILABLE",
+    "compute_properties",
+    "iter_batch_properties",
+    "iter_smiles_file",
+    "resolve_properties",
+    "write_batch_properties",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compute descriptors for a SMILES library.")
+    parser.add_argument("path", help=".smi / text file with one SMILES per line (optionally .gz)")
+    parser.add_argument("-o", "--output", help="JSON lines output (default: stdout)")
+    parser.add_argument("--properties", nargs="+", default=None, help=", ".join(DEFAULT_PROPERTIES))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    args = parser.parse_args()
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        count = write_batch_properties(
+            iter_smiles_file(args.path),
+            output,
+            args.properties,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            cache=PropertyCache(),
+        )
+    finally:
+        if args.output:
+            output.close()
+    print(f"Wrote {count} results.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Pluggable embedding backends for the RAG pipeline.
+
+``sentence_transformers`` (the default) runs the model through PyTorch in
+float32. For CPU-only deployments the ``onnx`` and ``onnx_int8`` backends run
+the same model through ONNX Runtime instead; ``onnx_int8`` additionally
+quantizes the weights to int8 (dynamic quantization) for lower CPU latency.
+``benchmarks/embedding_benchmark.py`` measures the speed-up and the drift in
+cosine scores against the default backend on a given machine.
+
+The ONNX model is exported from the configured SentenceTransformer the first
+time it is needed (this step needs torch, sentence-transformers and
+``onnx``) and cached under ``cache_dir/<model>/``. After that, loading and
+encoding only need ``onnxruntime`` and ``tokenizers``. Models made of a
+Transformer followed by mean, CLS or max Pooling and an optional Normalize
+module (e.g. ``all-MiniLM-L6-v2``) are supported.
+
+Every backend returns an object with the ``SentenceTransformer`` methods the
+pipeline uses: ``encode`` and ``get_sentence_embedding_dimension``.
+"""
+from __future__ import annotations
+
+import importlib.util
+import inspect
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("sentence_transformers", "onnx", "onnx_int8")
+DEFAULT_BACKEND = "sentence_transformers"
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / "models" / "onnx"
+POOLING_MODES = ("mean", "cls", "max")
+EXPORT_VERSION = 1
+
+# onnxruntime is imported when an ONNX backend is loaded, not with this module.
+ONNXRUNTIME_AVAILABLE = importlib.util.find_spec("onnxruntime") is not None
+
+
+def embedding_key(model_name: str, backend: str = DEFAULT_BACKEND) -> str:
+    """Identify the vectors a backend produces, for embedding cache keys.
+
+    Quantized vectors differ slightly from float32 ones, so each backend gets
+    its own key; the default backend keeps the bare model name.
+    """
+
+    return model_name if backend == DEFAULT_BACKEND else f"{model_name}@{backend}"
+
+
+def _model_directory(model_name: str, cache_dir: Optional[Union[str, Path]]) -> Path:
+    return Path(cache_dir or DEFAULT_CACHE_DIR) / model_name.replace("/", "--")
+
+
+def _pooling_mode(module: Any) -> str:
+    mode = getattr(module, "pooling_mode", None)
+    if mode is None and hasattr(module, "get_pooling_mode_str"):
+        mode = module.get_pooling_mode_str()  # sentence-transformers < 3
+    if isinstance(mode, (list, tuple)):
+        mode = mode[0] if len(mode) == 1 else "+".join(mode)
+    if mode not in POOLING_MODES:
+        raise ValueError(f"Cannot export pooling mode {mode!r}; supported: {', '.join(POOLING_MODES)}.")
+    return mode
+
+
+def export_onnx(model_name: str, directory: Union[str, Path], *, quantize: bool = True) -> Path:
+    """Export ``model_name`` to ONNX in ``directory`` (int8 copy if ``quantize``).
+
+    Writes ``model.onnx``, optionally ``model.int8.onnx``, the tokenizer and
+    ``export.json`` describing pooling and normalisation. Returns the
+    directory.
+    """
+
+    if importlib.util.find_spec("onnx") is None:
+        raise ImportError("Exporting to ONNX needs the onnx package. Install it with: pip install onnx")
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    model = SentenceTransformer(model_name, device="cpu")
+    modules = list(model)
+    kinds = [type(module).__name__ for module in modules]
+    if kinds[:2] != ["Transformer", "Pooling"] or set(kinds[2:]) - {"Normalize"}:
+        raise ValueError(f"Cannot export {model_name}: unsupported module layout {kinds}.")
+    pooling = _pooling_mode(modules[1])
+    transformer, tokenizer = modules[0].auto_model.eval(), model.tokenizer
+    if not getattr(tokenizer, "is_fast", False):
+        raise ValueError(f"Cannot export {model_name}: it has no fast (tokenizer.json) tokenizer.")
+
+    sample = tokenizer(["An example sentence to trace."], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class HiddenStates(torch.nn.Module):
+        def __init__(self) -> None:
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, *inputs):
+            return self.transformer(**dict(zip(input_names, inputs))).last_hidden_state
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    options: Dict[str, Any] = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        options["dynamo"] = False  # the TorchScript exporter handles dynamic_axes
+    fp32_path = directory / "model.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            HiddenStates(),
+            tuple(sample[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            do_constant_folding=True,
+            **options,
+        )
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(fp32_path), str(directory / "model.int8.onnx"), weight_type=QuantType.QInt8)
+
+    tokenizer.save_pretrained(str(directory))
+    metadata = {
+        "version": EXPORT_VERSION,
+        "model": model_name,
+        "inputs": input_names,
+        "pooling": pooling,
+        "normalize": "Normalize" in kinds,
+        "max_seq_length": int(model.max_seq_length or tokenizer.model_max_length),
+        "dimension": int(model.get_sentence_embedding_dimension()),
+        "pad_token": tokenizer.pad_token,
+        "pad_id": int(tokenizer.pad_token_id or 0),
+    }
+    (directory / "export.json").write_text(json.dumps(metadata, indent=2), encoding="utf-8")
+    logger.info("Exported %s to ONNX in %s.", model_name, directory)
+    return directory
+
+
+def pool(hidden: np.ndarray, attention_mask: np.ndarray, mode: str) -> np.ndarray:
+    """Reduce ``(batch, tokens, dim)`` hidden states to one vector per row."""
+
+    if mode == "cls":
+        return hidden[:, 0]
+    mask = attention_mask[:, :, None].astype(hidden.dtype)
+    if mode == "mean":
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+    if mode == "max":
+        return np.where(mask > 0, hidden, -np.inf).max(axis=1)
+    raise ValueError(f"Unknown pooling mode: {mode}")
+
+
+class OnnxEmbedder:
+    """SentenceTransformer-compatible encoder running an exported ONNX model."""
+
+    def __init__(self, session: Any, tokenizer: Any, metadata: Dict[str, Any], *, batch_size: int = 32) -> None:
+        self.session = session
+        self.tokenizer = tokenizer
+        self.metadata = metadata
+        self.batch_size = max(batch_size, 1)
+        self._inputs = [item.name for item in session.get_inputs()]
+        self.tokenizer.enable_truncation(max_length=int(metadata["max_seq_length"]))
+        self.tokenizer.enable_padding(pad_id=int(metadata["pad_id"]), pad_token=metadata["pad_token"])
+
+    @classmethod
+    def load(
+        cls,
+        directory: Union[str, Path],
+        *,
+        quantized: bool = True,
+        threads: int = 0,
+        batch_size: int = 32,
+    ) -> "OnnxEmbedder":
+        if not ONNXRUNTIME_AVAILABLE:
+            raise ImportError("ONNX embedding backends need onnxruntime. Install it with: pip install onnxruntime")
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        directory = Path(directory)
+        metadata = json.loads((directory / "export.json").read_text(encoding="utf-8"))
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        session = onnxruntime.InferenceSession(
+            str(directory / ("model.int8.onnx" if quantized else "model.onnx")),
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+        tokenizer = Tokenizer.from_file(str(directory / "tokenizer.json"))
+        return cls(session, tokenizer, metadata, batch_size=batch_size)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.metadata["dimension"])
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        columns = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64),
+        }
+        (hidden,) = self.session.run(["last_hidden_state"], {name: columns[name] for name in self._inputs})
+        return pool(np.asarray(hidden, dtype=np.float32), columns["attention_mask"], self.metadata["pooling"])
+
+    def encode(
+        self,
+        sentences: Union[str, Sequence[str]],
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        batch_size: Optional[int] = None,
+        **kwargs: Any,
+    ) -> np.ndarray:
+        """Embed ``sentences``; other SentenceTransformer keyword arguments are ignored."""
+
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        dimension = self.get_sentence_embedding_dimension()
+        output = np.empty((len(texts), dimension), dtype=np.float32)
+        # Longest first, like SentenceTransformer, so batches pad to similar lengths.
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        step = batch_size or self.batch_size
+        for start in range(0, len(texts), step):
+            rows = order[start:start + step]
+            output[rows] = self._encode_batch([texts[row] for row in rows])
+        if normalize_embeddings or self.metadata.get("normalize"):
+            output /= np.maximum(np.linalg.norm(output, axis=1, keepdims=True), 1e-12)
+        return output[0] if single else output
+
+
+def load_embedder(
+    model_name: str,
+    backend: str = DEFAULT_BACKEND,
+    *,
+    cache_dir: Optional[Union[str, Path]] = None,
+    threads: int = 0,
+) -> Any:
+    """Load ``model_name`` with ``backend``, exporting it to ONNX on first use."""
+
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Use one of: {', '.join(EMBEDDING_BACKENDS)}")
+    if backend == "sentence_transformers":
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(model_name)
+
+    if not ONNXRUNTIME_AVAILABLE:
+        raise ImportError("ONNX embedding backends need onnxruntime. Install it with: pip install onnxruntime")
+    quantized = backend == "onnx_int8"
+    directory = _model_directory(model_name, cache_dir)
+    model_file = directory / ("model.int8.onnx" if quantized else "model.onnx")
+    metadata_file = directory / "export.json"
+    current = metadata_file.exists() and json.loads(metadata_file.read_text(encoding="utf-8")).get("version") == EXPORT_VERSION
+    if not (current and model_file.exists()):
+        export_onnx(model_name, directory, quantize=quantized)
+    return OnnxEmbedder.load(directory, quantized=quantized, threads=threads)
+
+
+__all__ = [
+    "DEFAULT_BACKEND",
+    "EMBEDDING_BACKENDS",
+    "OnnxEmbedder",
+    "embedding_key",
+    "export_onnx",
+    "load_embedder",
+    "pool",
+]
@@ -0,0 +1,182 @@
+"""Embedding caches used by the RAG pipeline.
+
+Query embedding is the dominant per-turn retrieval cost, and the same user
+input is frequently embedded more than once per turn (for example the
+Streamlit app retrieves context for display and then ``process_query``
+retrieves again). ``EmbeddingLRUCache`` keeps recently used query vectors in
+memory, bounded by both entry count and bytes.
+
+Document chunks are identified by ``content_hash`` of their normalised text.
+``PersistentEmbeddingStore`` maps those hashes to vectors on disk so that
+re-ingesting an unchanged corpus does not run the embedding model again.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys.
+
+    Applies Unicode NFKC normalisation and collapses runs of whitespace.
+    Embedding tokenizers split on whitespace and NFKC-fold compatibility
+    characters, so these variants embed identically.
+    """
+
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def content_hash(text: str) -> str:
+    """Stable identifier for a chunk's content (SHA-256 of normalised text)."""
+
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingLRUCache:
+    """Thread-safe LRU of embedding vectors capped by entries and bytes."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_entries = max(max_entries, 0)
+        self.max_bytes = max(max_bytes, 0)
+        self._entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model_name: str, text: str, *, normalized: bool = True) -> Tuple[str, str, bool]:
+        return (model_name, normalize_text(text), normalized)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: Hashable, vector: np.ndarray) -> None:
+        if not self.enabled or vector.nbytes > self.max_bytes:
+            return
+        stored = np.array(vector, dtype=np.float32, copy=True)
+        stored.setflags(write=False)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = stored
+            self._bytes += stored.nbytes
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class PersistentEmbeddingStore:
+    """SQLite-backed ``content hash -> embedding`` map, namespaced by model.
+
+    ``model_key`` should identify everything that changes the vectors (model
+    name and normalisation), so a model switch never reuses stale embeddings.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " hash TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, hash))"
+            )
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model_key: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    (model_key, *batch),
+                ).fetchall()
+                for digest, blob in rows:
+                    found[digest] = np.frombuffer(blob, dtype=np.float32)
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, model_key: str, items: Iterable[Tuple[str, np.ndarray]]) -> None:
+        rows = [
+            (model_key, digest, np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+            for digest, vector in items
+        ]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                rows,
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+__all__ = ["EmbeddingLRUCache", "PersistentEmbeddingStore", "content_hash", "normalize_text"]
@@ -0,0 +1,489 @@
+"""Shared embedding server so processes do not each load the model.
+
+Every process that embeds text (the API workers, the Streamlit app, ingest
+scripts) would otherwise hold its own ``SentenceTransformer`` copy and pay its
+own cold load. Run one server instead::
+
+    python embedding_server.py --address unix:/tmp/biomed-embeddings.sock
+
+and point ``config.RAG_EMBEDDING_SERVER`` (env ``RAG_EMBEDDING_SERVER``) at
+the same address; ``FlexibleRAGPipeline`` then embeds through
+``EmbeddingClient``. Addresses are ``unix:/path/to.sock`` (or a bare path)
+for a Unix socket, or ``host:port`` / ``http://host:port`` for TCP.
+
+The protocol is plain HTTP/1.1 with keep-alive:
+
+* ``GET /info`` returns the model name, dimension and batching statistics;
+* ``POST /encode`` takes ``{"texts": [...], "normalize": true}`` and returns
+  the float32 embeddings as raw little-endian bytes, with the row and
+  column counts in the ``X-Embedding-Shape`` header.
+
+Requests from all clients are collected by a ``MicroBatcher``: after the
+first request arrives it waits up to ``batch_wait`` seconds for others and
+encodes them together (up to ``max_batch_size`` texts), which keeps the model
+busy with full batches when many small queries come in at once.
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SHAPE_HEADER = "X-Embedding-Shape"
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+Address = Union[str, Tuple[str, int]]
+
+
+def parse_address(address: str) -> Address:
+    """Return a Unix socket path or a ``(host, port)`` pair."""
+
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+    if address.startswith("/") or address.startswith("."):
+        return address
+    host_port = address.split("://", 1)[-1].rstrip("/")
+    host, separator, port = host_port.rpartition(":")
+    if not separator or not port.isdigit():
+        raise ValueError(f"Embedding server address must be unix:/path or host:port, got {address!r}")
+    return host or "127.0.0.1", int(port)
+
+
+def format_address(address: Address) -> str:
+    if isinstance(address, str):
+        return f"unix:{address}"
+    return f"{address[0]}:{address[1]}"
+
+
+@dataclass
+class _EncodeRequest:
+    texts: List[str]
+    normalize: bool
+    future: Future = field(default_factory=Future)
+
+
+class MicroBatcher:
+    """Coalesce concurrent encode requests into shared model calls.
+
+    ``encode(texts, normalize)`` must return one float32 row per text.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str], bool], np.ndarray],
+        *,
+        max_batch_size: int = 64,
+        batch_wait: float = 0.005,
+    ) -> None:
+        self._encode = encode
+        self.max_batch_size = max(max_batch_size, 1)
+        self.batch_wait = max(batch_wait, 0.0)
+        self._pending: Deque[_EncodeRequest] = deque()
+        self._pending_texts = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: Sequence[str], normalize: bool = True) -> Future:
+        request = _EncodeRequest(list(texts), bool(normalize))
+        if not request.texts:
+            request.future.set_result(np.empty((0, 0), dtype=np.float32))
+            return request.future
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Embedding batcher has been shut down")
+            self._pending.append(request)
+            self._pending_texts += len(request.texts)
+            self._condition.notify()
+        return request.future
+
+    def encode(self, texts: Sequence[str], normalize: bool = True, timeout: Optional[float] = None) -> np.ndarray:
+        return self.submit(texts, normalize).result(timeout=timeout)
+
+    def status(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "texts": self.texts,
+                "mean_batch_texts": round(self.texts / self.batches, 2) if self.batches else None,
+                "queue_depth": len(self._pending),
+                "max_batch_size": self.max_batch_size,
+                "batch_wait": self.batch_wait,
+            }
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout=5)
+
+    def _take_batch(self) -> List[_EncodeRequest]:
+        """Pop whole requests up to ``max_batch_size`` texts (at least one request)."""
+
+        batch: List[_EncodeRequest] = []
+        size = 0
+        while self._pending:
+            request = self._pending[0]
+            if batch and size + len(request.texts) > self.max_batch_size:
+                break
+            batch.append(self._pending.popleft())
+            size += len(request.texts)
+        self._pending_texts -= size
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed and not self._pending:
+                    return
+                if self.batch_wait and self._pending_texts < self.max_batch_size:
+                    # Give concurrent callers a moment to land in the same batch.
+                    deadline = time.monotonic() + self.batch_wait
+                    while self._pending_texts < self.max_batch_size and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                batch = self._take_batch()
+            for normalize in (True, False):
+                group = [request for request in batch if request.normalize is normalize]
+                if group:
+                    self._encode_group(group, normalize)
+
+    def _encode_group(self, group: List[_EncodeRequest], normalize: bool) -> None:
+        texts = [text for request in group for text in request.texts]
+        try:
+            vectors = np.ascontiguousarray(self._encode(texts, normalize), dtype=np.float32)
+            if vectors.shape[0] != len(texts):
+                raise RuntimeError(f"Embedder returned {vectors.shape[0]} rows for {len(texts)} texts")
+        except Exception as exc:  # noqa: BLE001 - fail the batch, keep serving
+            for request in group:
+                request.future.set_exception(exc)
+            return
+        with self._condition:
+            self.requests += len(group)
+            self.batches += 1
+            self.texts += len(texts)
+        offset = 0
+        for request in group:
+            request.future.set_result(vectors[offset:offset + len(request.texts)])
+            offset += len(request.texts)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: Any
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - stdlib signature
+        # The default writes to stderr and expects a TCP peer address.
+        logger.debug("embedding server: " + format, *args)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def do_GET(self) -> None:  # noqa: N802 - stdlib hook
+        if self.path != "/info":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        self._send_json(200, self.server.embedding_server.info())
+
+    def do_POST(self) -> None:  # noqa: N802 - stdlib hook
+        if self.path != "/encode":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self._send_json(413, {"error": "Request too large"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            texts = payload["texts"]
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                raise ValueError("'texts' must be a list of strings")
+            normalize = bool(payload.get("normalize", True))
+        except (ValueError, KeyError, TypeError) as exc:
+            self._send_json(400, {"error": f"Bad encode request: {exc}"})
+            return
+        try:
+            vectors = self.server.embedding_server.batcher.encode(texts, normalize)
+        except Exception as exc:  # noqa: BLE001 - reported to the client
+            self._send_json(500, {"error": f"Encoding failed: {exc}"})
+            return
+        rows = len(texts)
+        columns = vectors.shape[1] if rows else self.server.embedding_server.dimension
+        self._send(
+            200,
+            vectors.astype("<f4", copy=False).tobytes(),
+            "application/octet-stream",
+            {SHAPE_HEADER: f"{rows},{columns}"},
+        )
+
+
+# Every client thread holds its own keep-alive connection, and a full unix
+# socket backlog fails connect() immediately (EAGAIN) rather than queueing.
+LISTEN_BACKLOG = 128
+
+
+class _TCPHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def _remove_stale_socket(path: str) -> None:
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)  # left behind by a server that did not shut down cleanly
+    else:
+        raise OSError(f"An embedding server is already listening on {path}")
+    finally:
+        probe.close()
+
+
+class EmbeddingServer:
+    """Serve ``embedder.encode`` to other processes with micro-batching.
+
+    ``embedder`` is anything with the ``SentenceTransformer`` ``encode`` and
+    ``get_sentence_embedding_dimension`` methods.
+    """
+
+    def __init__(
+        self,
+        embedder: Any,
+        address: str,
+        *,
+        model_name: str,
+        max_batch_size: int = 64,
+        batch_wait: float = 0.005,
+    ) -> None:
+        self.embedder = embedder
+        self.model_name = model_name
+        self.dimension = int(embedder.get_sentence_embedding_dimension())
+        self.batcher = MicroBatcher(self._encode, max_batch_size=max_batch_size, batch_wait=batch_wait)
+        parsed = parse_address(address)
+        if isinstance(parsed, str):
+            _remove_stale_socket(parsed)
+            self._httpd = _UnixHTTPServer(parsed, _Handler)
+            self.address = format_address(parsed)
+        else:
+            self._httpd = _TCPHTTPServer(parsed, _Handler)
+            self.address = format_address(self._httpd.server_address[:2])
+        self._httpd.embedding_server = self
+        self._socket_path = parsed if isinstance(parsed, str) else None
+        self._thread: Optional[threading.Thread] = None
+
+    def _encode(self, texts: List[str], normalize: bool) -> np.ndarray:
+        return self.embedder.encode(texts, convert_to_numpy=True, normalize_embeddings=normalize)
+
+    def info(self) -> Dict[str, Any]:
+        return {"model": self.model_name, "dimension": self.dimension, "batching": self.batcher.status()}
+
+    def start(self) -> "EmbeddingServer":
+        """Serve on a background thread."""
+
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="embedding-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._httpd.server_close()
+        self.batcher.shutdown()
+        if self._socket_path and os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+
+    def __enter__(self) -> "EmbeddingServer":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+class EmbeddingClient:
+    """``SentenceTransformer``-compatible embedder backed by an ``EmbeddingServer``.
+
+    Connections are kept alive per thread. With ``expected_model`` set, the
+    server's model is checked on first contact so cached vectors of one model
+    are never mixed with another's.
+    """
+
+    def __init__(self, address: str, *, timeout: float = 60.0, expected_model: Optional[str] = None) -> None:
+        self.address = parse_address(address)
+        self.timeout = timeout
+        self._local = threading.local()
+        self._info: Optional[Dict[str, Any]] = None
+        if expected_model is not None:
+            served = self.info()["model"]
+            if served != expected_model:
+                raise ValueError(
+                    f"Embedding server at {address} serves {served!r}, expected {expected_model!r}."
+                )
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            if isinstance(self.address, str):
+                connection = _UnixHTTPConnection(self.address, self.timeout)
+            else:
+                connection = http.client.HTTPConnection(*self.address, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def _request(self, method: str, path: str, body: Optional[bytes] = None) -> Tuple[int, Any, bytes]:
+        """Return ``(status, headers, body)``, reconnecting once if the connection dropped."""
+
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in (0, 1):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                return response.status, response.headers, response.read()
+            except (ConnectionError, http.client.HTTPException) as exc:
+                # The server may have closed an idle keep-alive connection.
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise ConnectionError(f"Embedding server request failed: {exc}") from exc
+        raise AssertionError("unreachable")
+
+    @staticmethod
+    def _error(status: int, data: bytes) -> RuntimeError:
+        try:
+            message = json.loads(data)["error"]
+        except (ValueError, KeyError, TypeError):
+            message = f"HTTP {status}"
+        return RuntimeError(f"Embedding server error: {message}")
+
+    def info(self) -> Dict[str, Any]:
+        status, _, data = self._request("GET", "/info")
+        if status != 200:
+            raise self._error(status, data)
+        self._info = json.loads(data)
+        return self._info
+
+    def get_sentence_embedding_dimension(self) -> int:
+        info = self._info or self.info()
+        return int(info["dimension"])
+
+    def encode(
+        self,
+        sentences: Union[str, Sequence[str]],
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        **kwargs: Any,
+    ) -> np.ndarray:
+        """Embed ``sentences`` on the server; extra keyword arguments are ignored."""
+
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        body = json.dumps({"texts": texts, "normalize": normalize_embeddings}).encode("utf-8")
+        status, headers, data = self._request("POST", "/encode", body)
+        if status != 200:
+            raise self._error(status, data)
+        rows, columns = (int(value) for value in headers.get(SHAPE_HEADER, "0,0").split(","))
+        vectors = np.frombuffer(data, dtype="<f4").reshape(rows, columns).astype(np.float32)
+        return vectors[0] if single else vectors
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def main() -> None:
+    import config
+    from embedding_backends import EMBEDDING_BACKENDS, embedding_key, load_embedder
+
+    parser = argparse.ArgumentParser(description="Serve sentence embeddings to local processes.")
+    parser.add_argument("--address", default=config.RAG_EMBEDDING_SERVER or "127.0.0.1:8765",
+                        help="unix:/path/to.sock or host:port")
+    parser.add_argument("--model", default=config.RAG_MODEL)
+    parser.add_argument("--backend", choices=EMBEDDING_BACKENDS, default=config.RAG_EMBEDDING_BACKEND)
+    parser.add_argument("--max-batch-size", type=int, default=config.EMBEDDING_SERVER_MAX_BATCH_SIZE)
+    parser.add_argument("--batch-wait", type=float, default=config.EMBEDDING_SERVER_BATCH_WAIT,
+                        help="seconds to wait for more requests before encoding")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = EmbeddingServer(
+        load_embedder(args.model, args.backend, cache_dir=config.RAG_ONNX_CACHE_DIR),
+        args.address,
+        # Clients check this against their own model and backend.
+        model_name=embedding_key(args.model, args.backend),
+        max_batch_size=args.max_batch_size,
+        batch_wait=args.batch_wait,
+    )
+    logger.info("Serving %s embeddings (%s) on %s", args.model, args.backend, server.address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
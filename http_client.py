@@ -0,0 +1,231 @@
+"""Shared, pooled HTTP client for outbound tool requests.
+
+Bare ``requests.get`` opens a fresh TCP + TLS connection per call and gives up
+on the first transient failure. ``HTTPClient`` wraps one ``requests.Session``
+so connections are kept alive and capped per host, throttles each host with a
+token bucket (NCBI allows 3 requests/s, or 10/s with an API key), retries
+429 / 5xx responses and connection errors with exponential backoff, and keeps
+a latency histogram per endpoint.
+"""
+from __future__ import annotations
+
+import bisect
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+NCBI_HOST = "eutils.ncbi.nlm.nih.gov"
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Upper bounds (seconds) of the latency histogram buckets; the last is open.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def ncbi_rate_limit(api_key: Optional[str]) -> float:
+    """Requests per second NCBI E-utilities permits with or without a key."""
+
+    return 10.0 if api_key else 3.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens/s, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available; returns the wait."""
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of request latencies."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._total = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self._total += seconds
+            self._max = max(self._max, seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile (max for the open bucket)."""
+
+        with self._lock:
+            count = sum(self._counts)
+            if not count:
+                return None
+            rank = q * count
+            seen = 0
+            for index, bucket_count in enumerate(self._counts):
+                seen += bucket_count
+                if seen >= rank and bucket_count:
+                    return self.buckets[index] if index < len(self.buckets) else self._max
+            return self._max
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.quantile(0.5), self.quantile(0.95)
+        with self._lock:
+            count = sum(self._counts)
+            labels = [f"<={bound}" for bound in self.buckets] + [f">{self.buckets[-1]}"]
+            return {
+                "count": count,
+                "mean": round(self._total / count, 4) if count else None,
+                "max": round(self._max, 4),
+                "p50": p50,
+                "p95": p95,
+                "buckets": dict(zip(labels, self._counts)),
+            }
+
+
+class HTTPClient:
+    """Keep-alive session with per-host rate limits, retries and latency metrics."""
+
+    def __init__(
+        self,
+        *,
+        pool_connections: int = 4,
+        pool_maxsize: int = 8,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        backoff_max: float = 10.0,
+        retry_statuses: Iterable[int] = RETRY_STATUSES,
+        rate_limits: Optional[Mapping[str, float]] = None,
+        user_agent: Optional[str] = None,
+    ) -> None:
+        self.max_retries = max(max_retries, 0)
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.session = requests.Session()
+        # Retries are handled here so each attempt is rate limited and timed.
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=True,
+            max_retries=0,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+        self._buckets: Dict[str, TokenBucket] = {
+            host: TokenBucket(rate) for host, rate in (rate_limits or {}).items()
+        }
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.throttled_seconds = 0.0
+
+    def set_rate_limit(self, host: str, rate: float) -> None:
+        with self._lock:
+            self._buckets[host] = TokenBucket(rate)
+
+    def _histogram(self, endpoint: str) -> LatencyHistogram:
+        with self._lock:
+            histogram = self._histograms.get(endpoint)
+            if histogram is None:
+                histogram = self._histograms[endpoint] = LatencyHistogram()
+            return histogram
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), self.backoff_max)
+            except ValueError:
+                pass  # HTTP-date form; fall back to exponential backoff
+        delay = self.backoff_factor * (2 ** attempt)
+        # Full jitter keeps concurrent callers from retrying in lockstep.
+        return min(random.uniform(0, delay), self.backoff_max)
+
+    def get(
+        self,
+        url: str,
+        *,
+        params: Optional[Mapping[str, Any]] = None,
+        timeout: float = 10,
+        endpoint: Optional[str] = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """GET ``url``, retrying transient failures.
+
+        Returns the last response (callers still ``raise_for_status``); a
+        connection error or timeout on the final attempt is raised.
+        """
+
+        parts = urlsplit(url)
+        bucket = self._buckets.get(parts.hostname or "")
+        histogram = self._histogram(endpoint or parts.path.rsplit("/", 1)[-1] or parts.netloc)
+
+        attempt = 0
+        while True:
+            if bucket is not None:
+                waited = bucket.acquire()
+                if waited:
+                    with self._lock:
+                        self.throttled_seconds += waited
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                histogram.record(time.perf_counter() - started)
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+            else:
+                histogram.record(time.perf_counter() - started)
+                if response.status_code not in self.retry_statuses or attempt >= self.max_retries:
+                    return response
+            with self._lock:
+                self.retries += 1
+            time.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            histograms = dict(self._histograms)
+            retries, throttled = self.retries, self.throttled_seconds
+        return {
+            "retries": retries,
+            "throttled_seconds": round(throttled, 3),
+            "endpoints": {name: histogram.snapshot() for name, histogram in histograms.items()},
+        }
+
+    def close(self) -> None:
+        self.session.close()
+
+
+__all__ = [
+    "HTTPClient",
+    "LatencyHistogram",
+    "NCBI_HOST",
+    "TokenBucket",
+    "ncbi_rate_limit",
+]
@@ -0,0 +1,394 @@
+"""Continuous batching scheduler for the local Qwen model.
+
+Instead of serving one prompt at a time behind a global lock, concurrent
+requests are queued and decoded together in a single token-by-token loop:
+
+* pending prompts join the running batch between decode steps (up to
+  ``max_batch_size`` rows and a ``max_batch_tokens`` padded-token budget),
+* batches are left-padded with matching attention masks and position ids,
+* each request stops on EOS or its own ``max_new_tokens`` and leaves the
+  batch immediately, so short answers are not held back by long ones,
+* results (or streamed text deltas) are fanned back out to the callers.
+
+When rows join, the batch is re-prefilled from the token ids generated so far
+rather than splicing KV caches, which keeps the scheduler independent of the
+cache layout of a particular ``transformers`` release. Finished rows are
+dropped from the cache in place when the cache supports
+``batch_select_indices``.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import torch
+except ImportError:  # pragma: no cover - optional dependency for local inference
+    torch = None
+
+
+@dataclass
+class GenerationRequest:
+    """A single prompt waiting for, or taking part in, batched decoding."""
+
+    prompt_ids: List[int]
+    max_new_tokens: int
+    future: Future = field(default_factory=Future)
+    on_text: Optional[Callable[[str], None]] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    first_token_at: Optional[float] = None
+    generated: List[int] = field(default_factory=list)
+    # Incremental detokenisation window: generated[prefix_offset:read_offset]
+    # was decoded last time and gives the context for the next delta.
+    prefix_offset: int = 0
+    read_offset: int = 0
+
+    @property
+    def token_ids(self) -> List[int]:
+        return self.prompt_ids + self.generated
+
+
+class BatchingMetrics:
+    """Throughput and latency counters reported through ``get_status()``."""
+
+    def __init__(self, window: int = 256) -> None:
+        self._lock = threading.Lock()
+        self.requests_completed = 0
+        self.requests_failed = 0
+        self.prefills = 0
+        self.decode_steps = 0
+        self.tokens_generated = 0
+        self.row_steps = 0
+        self.busy_seconds = 0.0
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._first_token: Deque[float] = deque(maxlen=window)
+
+    def record_step(self, rows: int, seconds: float, *, prefill: bool) -> None:
+        with self._lock:
+            if prefill:
+                self.prefills += 1
+            self.decode_steps += 1
+            self.row_steps += rows
+            self.tokens_generated += rows
+            self.busy_seconds += seconds
+
+    def record_first_token(self, seconds: float) -> None:
+        with self._lock:
+            self._first_token.append(seconds)
+
+    def record_done(self, seconds: float, *, failed: bool = False) -> None:
+        with self._lock:
+            if failed:
+                self.requests_failed += 1
+            else:
+                self.requests_completed += 1
+                self._latencies.append(seconds)
+
+    @staticmethod
+    def _percentile(values: Iterable[float], fraction: float) -> Optional[float]:
+        ordered = sorted(values)
+        if not ordered:
+            return None
+        index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+        return round(ordered[index], 4)
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            return {
+                "requests_completed": self.requests_completed,
+                "requests_failed": self.requests_failed,
+                "prefills": self.prefills,
+                "decode_steps": self.decode_steps,
+                "tokens_generated": self.tokens_generated,
+                "avg_batch_size": (
+                    round(self.row_steps / self.decode_steps, 2) if self.decode_steps else 0.0
+                ),
+                "tokens_per_second": (
+                    round(self.tokens_generated / self.busy_seconds, 2)
+                    if self.busy_seconds
+                    else 0.0
+                ),
+                "latency_p50_s": self._percentile(self._latencies, 0.5),
+                "latency_p95_s": self._percentile(self._latencies, 0.95),
+                "time_to_first_token_p50_s": self._percentile(self._first_token, 0.5),
+            }
+
+
+class ContinuousBatchScheduler:
+    """Serve concurrent generation requests from one batched decode loop."""
+
+    def __init__(
+        self,
+        model,
+        tokenizer,
+        *,
+        device: str = "cpu",
+        max_batch_size: int = 8,
+        max_batch_tokens: int = 16384,
+        batch_wait: float = 0.02,
+        temperature: float = 0.3,
+        top_p: float = 0.9,
+        eos_token_ids: Optional[Iterable[int]] = None,
+    ) -> None:
+        if torch is None:
+            raise RuntimeError("PyTorch is required for batched local inference.")
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_batch_tokens = max(max_batch_tokens, 1)
+        self.batch_wait = max(batch_wait, 0.0)
+        self.temperature = temperature
+        self.top_p = top_p
+        self.eos_token_ids = set(eos_token_ids or [])
+        if not self.eos_token_ids and getattr(tokenizer, "eos_token_id", None) is not None:
+            self.eos_token_ids.add(tokenizer.eos_token_id)
+        pad_id = getattr(tokenizer, "pad_token_id", None)
+        if pad_id is None:
+            pad_id = next(iter(self.eos_token_ids), 0)
+        self.pad_token_id = pad_id
+
+        self.metrics = BatchingMetrics()
+        self._pending: Deque[GenerationRequest] = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="local-model-batcher", daemon=True
+        )
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def submit(
+        self,
+        prompt: str,
+        max_new_tokens: int,
+        on_text: Optional[Callable[[str], None]] = None,
+    ) -> Future:
+        """Queue ``prompt``; the returned future resolves to the generated text."""
+
+        prompt_ids = list(self.tokenizer(prompt)["input_ids"])
+        request = GenerationRequest(
+            prompt_ids=prompt_ids, max_new_tokens=max(max_new_tokens, 1), on_text=on_text
+        )
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Local model scheduler has been shut down")
+            self._pending.append(request)
+            self._condition.notify()
+        return request.future
+
+    def generate(self, prompt: str, max_new_tokens: int, timeout: Optional[float] = None) -> str:
+        return self.submit(prompt, max_new_tokens).result(timeout=timeout)
+
+    def stream(self, prompt: str, max_new_tokens: int) -> Iterator[str]:
+        """Yield text deltas for ``prompt`` as its batch decodes."""
+
+        deltas: "queue.Queue[str]" = queue.Queue()
+        future = self.submit(prompt, max_new_tokens, on_text=deltas.put)
+        while True:
+            try:
+                yield deltas.get(timeout=0.05)
+                continue
+            except queue.Empty:
+                pass
+            if future.done():
+                break
+        while not deltas.empty():
+            yield deltas.get_nowait()
+        future.result()
+
+    def queue_depth(self) -> int:
+        with self._condition:
+            return len(self._pending)
+
+    def status(self) -> Dict[str, Optional[float]]:
+        snapshot = self.metrics.snapshot()
+        snapshot["queue_depth"] = self.queue_depth()
+        snapshot["max_batch_size"] = self.max_batch_size
+        return snapshot
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout=5)
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+    def _admit(self, active: List[GenerationRequest]) -> List[GenerationRequest]:
+        """Move pending requests into the batch within the row/token budget."""
+
+        joined: List[GenerationRequest] = []
+        with self._condition:
+            longest = max((len(req.token_ids) for req in active), default=0)
+            while self._pending and len(active) + len(joined) < self.max_batch_size:
+                candidate = self._pending[0]
+                rows = len(active) + len(joined) + 1
+                horizon = max(longest, len(candidate.prompt_ids)) + candidate.max_new_tokens
+                if (active or joined) and rows * horizon > self.max_batch_tokens:
+                    break
+                joined.append(self._pending.popleft())
+                longest = max(longest, len(candidate.prompt_ids))
+        return joined
+
+    def _run(self) -> None:
+        active: List[GenerationRequest] = []
+        state = None
+        while True:
+            with self._condition:
+                if not active:
+                    while not self._pending and not self._closed:
+                        self._condition.wait()
+                    if self._closed and not self._pending:
+                        return
+                    if self.batch_wait and len(self._pending) < self.max_batch_size:
+                        # Give concurrent callers a moment to land in the same batch.
+                        self._condition.wait(self.batch_wait)
+
+            joined = self._admit(active)
+            if not active and not joined:
+                continue
+            try:
+                if joined or state is None:
+                    active.extend(joined)
+                    state = self._step(active, None)
+                else:
+                    state = self._step(active, state)
+                active, state = self._retire(active, state)
+            except Exception as exc:  # noqa: BLE001 - fail the batch, keep serving
+                for request in active:
+                    self._finish(request, error=exc)
+                active, state = [], None
+
+    # ------------------------------------------------------------------
+    # Decoding
+    # ------------------------------------------------------------------
+    def _step(self, active: List[GenerationRequest], state):
+        """Run one forward pass (a prefill when ``state`` is None) and sample."""
+
+        started = time.monotonic()
+        with torch.inference_mode():
+            if state is None:
+                width = max(len(req.token_ids) for req in active)
+                input_ids = torch.full((len(active), width), self.pad_token_id, dtype=torch.long)
+                attention_mask = torch.zeros((len(active), width), dtype=torch.long)
+                for row, request in enumerate(active):
+                    ids = request.token_ids
+                    input_ids[row, width - len(ids):] = torch.tensor(ids, dtype=torch.long)
+                    attention_mask[row, width - len(ids):] = 1
+                position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+                past = None
+            else:
+                past, attention_mask, position_ids, last_tokens = state
+                input_ids = last_tokens.unsqueeze(-1)
+                attention_mask = torch.cat(
+                    [attention_mask, torch.ones((len(active), 1), dtype=torch.long)], dim=1
+                )
+                position_ids = position_ids[:, -1:] + 1
+
+            outputs = self.model(
+                input_ids=input_ids.to(self.device),
+                attention_mask=attention_mask.to(self.device),
+                position_ids=position_ids.to(self.device),
+                past_key_values=past,
+                use_cache=True,
+            )
+            next_tokens = self._sample(outputs.logits[:, -1, :]).cpu()
+
+        now = time.monotonic()
+        self.metrics.record_step(len(active), now - started, prefill=state is None)
+        for request, token in zip(active, next_tokens.tolist()):
+            if request.first_token_at is None:
+                request.first_token_at = now
+                self.metrics.record_first_token(now - request.enqueued_at)
+            request.generated.append(token)
+            self._emit(request)
+        return outputs.past_key_values, attention_mask, position_ids, next_tokens
+
+    def _sample(self, logits):
+        logits = logits.float()
+        if self.temperature <= 0:
+            return logits.argmax(dim=-1)
+        probs = torch.softmax(logits / self.temperature, dim=-1)
+        if 0 < self.top_p < 1:
+            sorted_probs, sorted_idx = probs.sort(dim=-1, descending=True)
+            cumulative = sorted_probs.cumsum(dim=-1)
+            sorted_probs[(cumulative - sorted_probs) > self.top_p] = 0
+            probs = torch.zeros_like(probs).scatter(-1, sorted_idx, sorted_probs)
+        return torch.multinomial(probs, num_samples=1).squeeze(-1)
+
+    def _retire(self, active: List[GenerationRequest], state):
+        """Complete finished requests and shrink the batch to the survivors."""
+
+        keep = []
+        for row, request in enumerate(active):
+            hit_eos = request.generated and request.generated[-1] in self.eos_token_ids
+            if hit_eos or len(request.generated) >= request.max_new_tokens:
+                self._finish(request)
+            else:
+                keep.append(row)
+
+        if len(keep) == len(active):
+            return active, state
+        survivors = [active[row] for row in keep]
+        if not survivors:
+            return [], None
+
+        past, attention_mask, position_ids, last_tokens = state
+        if not hasattr(past, "batch_select_indices"):
+            return survivors, None  # Re-prefill the survivors on the next step.
+        index = torch.tensor(keep, dtype=torch.long)
+        past.batch_select_indices(index.to(self.device))
+        return survivors, (past, attention_mask[index], position_ids[index], last_tokens[index])
+
+    # ------------------------------------------------------------------
+    # Fan-out
+    # ------------------------------------------------------------------
+    def _decode_tokens(self, tokens: List[int]) -> str:
+        tokens = [tok for tok in tokens if tok not in self.eos_token_ids]
+        text = self.tokenizer.decode(tokens, skip_special_tokens=True)
+        return text.replace("<|im_end|>", "")
+
+    def _decode(self, request: GenerationRequest) -> str:
+        return self._decode_tokens(request.generated)
+
+    def _emit(self, request: GenerationRequest) -> None:
+        """Stream the text added by the newest tokens.
+
+        Only the tokens since the last emit are decoded, together with the
+        previous window so merges and leading spaces come out right; decoding
+        the whole output every step would make streaming quadratic.
+        """
+
+        if request.on_text is None:
+            return
+        generated = request.generated
+        prefix = self._decode_tokens(generated[request.prefix_offset : request.read_offset])
+        text = self._decode_tokens(generated[request.prefix_offset :])
+        if text.endswith("\ufffd"):
+            return  # Wait for the rest of a multi-byte character.
+        if len(text) > len(prefix):
+            request.on_text(text[len(prefix) :])
+            request.prefix_offset = request.read_offset
+            request.read_offset = len(generated)
+
+    def _finish(self, request: GenerationRequest, error: Optional[BaseException] = None) -> None:
+        elapsed = time.monotonic() - request.enqueued_at
+        if error is not None:
+            self.metrics.record_done(elapsed, failed=True)
+            request.future.set_exception(error)
+            return
+        self.metrics.record_done(elapsed)
+        request.future.set_result(self._decode(request).strip())
+
+
+__all__ = ["BatchingMetrics", "ContinuousBatchScheduler", "GenerationRequest"]
@@ -10,19 +10,19 @@ from __future__ import annotations
 
 import threading
 from pathlib import Path
-from typing import Dict
+from typing import TYPE_CHECKING, Any, Dict, Iterator
 
-try:
-    import torch
-except ImportError:  # pragma: no cover - optional dependency for local inference
-    torch = None
+import config
+import subsystems
 
-try:
-    from unsloth import FastLanguageModel
-except (ImportError, NotImplementedError):  # pragma: no cover - optional dependency for local inference
-    FastLanguageModel = None
+if TYPE_CHECKING:
+    from local_batching import ContinuousBatchScheduler
 
-import config
+# PyTorch and unsloth take seconds to import, so they are imported the first
+# time local inference is considered rather than when this module loads.
+_NOT_IMPORTED: Any = object()
+torch: Any = _NOT_IMPORTED
+FastLanguageModel: Any = _NOT_IMPORTED
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -31,11 +31,13 @@ MAX_SEQ_LENGTH = 2048
 MAX_NEW_TOKENS = 512
 GENERATION_TEMPERATURE = 0.3
 GENERATION_TOP_P = 0.9
+MAX_BATCH_SIZE = 8  # Concurrent requests decoded together
+MAX_BATCH_TOKENS = 16384  # Padded prompt+generation tokens allowed in one batch
+BATCH_WAIT_SECONDS = 0.02  # How long an idle scheduler waits for more requests
 SENTINEL_PATH = BASE_DIR / "models" / "qwen2.5-7b-medical-lora" / ".ready"
 
 
 _status_lock = threading.Lock()
-_generation_lock = threading.Lock()
 _status: Dict[str, str | None] = {
     "state": "not_downloaded",
     "error": None,
@@ -44,19 +46,43 @@ _status: Dict[str, str | None] = {
 }
 _model = None
 _tokenizer = None
+_scheduler: ContinuousBatchScheduler | None = None
 _download_thread: threading.Thread | None = None
 
 
+def _import_torch() -> Any:
+    global torch
+
+    if torch is _NOT_IMPORTED:
+        try:
+            import torch
+        except ImportError:  # pragma: no cover - optional dependency for local inference
+            torch = None
+    return torch
+
+
+def _import_unsloth() -> Any:
+    global FastLanguageModel
+
+    if FastLanguageModel is _NOT_IMPORTED:
+        try:
+            from unsloth import FastLanguageModel
+        except (ImportError, NotImplementedError):  # pragma: no cover - optional dependency for local inference
+            FastLanguageModel = None
+    return FastLanguageModel
+
+
 def _has_cuda() -> bool:
-    return torch is not None and torch.cuda.is_available()
+    return _import_torch() is not None and torch.cuda.is_available()
 
 
 def _gpu_ready() -> bool:
-    return _has_cuda() and FastLanguageModel is not None
+    # unsloth is only worth importing once CUDA is known to be usable.
+    return _has_cuda() and _import_unsloth() is not None
 
 
 def _torch_available() -> bool:
-    return torch is not None
+    return _import_torch() is not None
 
 
 def _set_status(
@@ -74,10 +100,19 @@ def _set_status(
             _status["device"] = device
 
 
-def get_status() -> Dict[str, str | None]:
-    """Return the current status of the local model."""
+def get_status() -> Dict[str, object]:
+    """Return the current status of the local model.
+
+    Once the model is loaded, ``batching`` reports scheduler throughput,
+    latency percentiles and queue depth.
+    """
+    _autoload.get()
     with _status_lock:
-        return dict(_status)
+        status = dict(_status)
+        scheduler = _scheduler
+    if scheduler is not None:
+        status["batching"] = scheduler.status()
+    return status
 
 
 def _mark_ready() -> None:
@@ -85,6 +120,33 @@ def _mark_ready() -> None:
     SENTINEL_PATH.write_text("ready")
 
 
+def _start_scheduler(model, tokenizer, device: str) -> None:
+    global _scheduler
+
+    from local_batching import ContinuousBatchScheduler
+
+    eos_ids = {tokenizer.eos_token_id} if tokenizer.eos_token_id is not None else set()
+    im_end_id = tokenizer.convert_tokens_to_ids("<|im_end|>")
+    if isinstance(im_end_id, int) and im_end_id != getattr(tokenizer, "unk_token_id", None):
+        eos_ids.add(im_end_id)
+
+    scheduler = ContinuousBatchScheduler(
+        model,
+        tokenizer,
+        device=device,
+        max_batch_size=MAX_BATCH_SIZE,
+        max_batch_tokens=MAX_BATCH_TOKENS,
+        batch_wait=BATCH_WAIT_SECONDS,
+        temperature=GENERATION_TEMPERATURE,
+        top_p=GENERATION_TOP_P,
+        eos_token_ids=eos_ids,
+    )
+    with _status_lock:
+        previous, _scheduler = _scheduler, scheduler
+    if previous is not None:
+        previous.shutdown()
+
+
 def _load_model() -> None:
     global _model, _tokenizer
 
@@ -108,6 +170,7 @@ def _load_model() -> None:
             with _status_lock:
                 _model = model
                 _tokenizer = tokenizer
+            _start_scheduler(model, tokenizer, "cuda")
 
             _set_status(
                 "ready",
@@ -169,6 +232,7 @@ def _load_model() -> None:
         with _status_lock:
             _model = merged_model
             _tokenizer = tokenizer
+        _start_scheduler(merged_model, tokenizer, "cpu")
 
         _set_status(
             "ready",
@@ -195,6 +259,8 @@ def _start_background_load(state: str) -> None:
 
 
 def _autoload_if_cache_present() -> None:
+    """Start reloading previously downloaded weights in the background."""
+
     if not SENTINEL_PATH.exists():
         return
 
@@ -206,7 +272,8 @@ def _autoload_if_cache_present() -> None:
         )
         return
 
-    current_state = get_status().get("state")
+    with _status_lock:
+        current_state = _status.get("state")
     if current_state in {"ready", "downloading", "loading"}:
         return
 
@@ -217,15 +284,18 @@ def _autoload_if_cache_present() -> None:
 
 def start_download() -> Dict[str, str | None]:
     """Kick off a background download/load of the local model if needed."""
+    _autoload.get()
     with _status_lock:
-        current_state = _status.get("state")
-
-        if current_state == "ready":
-            return dict(_status)
-        if current_state in {"downloading", "loading"}:
+        if _status.get("state") in {"ready", "downloading", "loading"}:
             return dict(_status)
 
-        if not _gpu_ready() and not _torch_available():
+    # Probing imports torch (and unsloth on GPU hosts), which can take
+    # seconds; do it without holding the lock status readers need.
+    dependencies_ready = _gpu_ready() or _torch_available()
+    with _status_lock:
+        if _status.get("state") in {"ready", "downloading", "loading"}:
+            return dict(_status)
+        if not dependencies_ready:
             _status["state"] = "error"
             _status["error"] = (
                 "Setup incomplete: The setup script hasn't been run. Please run "
@@ -265,35 +335,46 @@ def _extract_assistant_response(generated_text: str) -> str:
     return assistant_text.replace("<|im_end|>", "").strip()
 
 
-def generate_response(question: str, rag_context: str | None = None) -> str:
-    """Generate a response from the local model. Raises if not ready."""
+def _ready_scheduler() -> ContinuousBatchScheduler:
     status = get_status()
     if status.get("state") != "ready":
         raise RuntimeError("Local model is not ready")
-
-    with _generation_lock:
-        prompt = build_prompt(question, rag_context)
-
-        if not _torch_available():
-            raise RuntimeError("Local model dependencies are missing")
-
-        inputs = _tokenizer([prompt], return_tensors="pt")
-        device = get_status().get("device")
-        if _has_cuda() and device == "cuda":
-            inputs = {key: value.to("cuda") for key, value in inputs.items()}
-
-        with torch.inference_mode():
-            outputs = _model.generate(
-                **inputs,
-                max_new_tokens=MAX_NEW_TOKENS,
-                temperature=GENERATION_TEMPERATURE,
-                do_sample=True,
-                top_p=GENERATION_TOP_P,
-                use_cache=True,
-            )
-
-        full_response = _tokenizer.decode(outputs[0], skip_special_tokens=True)
-        return _extract_assistant_response(full_response)
-
-
-_autoload_if_cache_present()
+    if not _torch_available() or _scheduler is None:
+        raise RuntimeError("Local model dependencies are missing")
+    return _scheduler
+
+
+def generate_response(
+    question: str,
+    rag_context: str | None = None,
+    max_new_tokens: int | None = None,
+) -> str:
+    """Generate a response from the local model. Raises if not ready.
+
+    Requests from concurrent callers are decoded together by the batching
+    scheduler rather than one at a time.
+    """
+    scheduler = _ready_scheduler()
+    prompt = build_prompt(question, rag_context)
+    return scheduler.generate(prompt, max_new_tokens or MAX_NEW_TOKENS)
+
+
+def stream_response(
+    question: str,
+    rag_context: str | None = None,
+    max_new_tokens: int | None = None,
+) -> Iterator[str]:
+    """Yield response text incrementally as the local model generates it.
+
+    The request shares decode steps with any other in-flight requests, so the
+    first tokens arrive long before the full answer is done. Raises if the
+    model is not ready.
+    """
+    scheduler = _ready_scheduler()
+    prompt = build_prompt(question, rag_context)
+    yield from scheduler.stream(prompt, max_new_tokens or MAX_NEW_TOKENS)
+
+
+# Cached weights are reloaded on the first status check or generation request,
+# or earlier when the service warms up its subsystems.
+_autoload = subsystems.register("local_model", _autoload_if_cache_present)
@@ -0,0 +1,812 @@
+"""Memory-bounded analysis of medical image volumes.
+
+Volumes are opened without reading the voxels: ``.npy`` files and
+uncompressed NIfTI-1 (``.nii``) files are memory-mapped, uncompressed DICOM
+pixel data is mapped at its file offset, and DICOM series (a directory with
+one file per slice) are read slice by slice. Every analysis walks the
+volume in slabs of whole slices, at most ``slab_voxels`` voxels each, on a
+thread pool with a bounded number of slabs in flight. Memory therefore
+depends on the slab size, not the volume size. Per-slab partial results
+(moments, histograms, mask statistics) are merged as slabs finish.
+
+Analyses:
+
+* ``measurement``: extent, intensity statistics and percentiles, and the
+  foreground volume at an Otsu (or given) threshold;
+* ``segmentation``: threshold mask statistics (volume, bounding box,
+  centroid, largest slice), optionally written to an output volume;
+* ``enhancement``: CT windowing or percentile contrast stretch to ``uint8``
+  with optional in-plane Gaussian smoothing, written to an output volume.
+
+Arrays are indexed ``(slice, row, column)``; spacings are in millimetres.
+"""
+from __future__ import annotations
+
+import importlib.util
+import math
+import os
+import struct
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+# SciPy is only needed for smoothing and costs ~0.4 s to import; load it there.
+SCIPY_AVAILABLE = importlib.util.find_spec("scipy") is not None
+
+try:
+    import pydicom
+    PYDICOM_AVAILABLE = True
+except ImportError:
+    PYDICOM_AVAILABLE = False
+
+try:
+    import nibabel
+    NIBABEL_AVAILABLE = True
+except ImportError:
+    NIBABEL_AVAILABLE = False
+
+MODALITIES = ("CT", "MRI", "X-ray", "ultrasound")
+ANALYSIS_TYPES = ("measurement", "segmentation", "enhancement", "registration")
+# CT display windows as (level, width) in Hounsfield units.
+CT_WINDOWS = {
+    "soft_tissue": (40.0, 400.0),
+    "lung": (-600.0, 1500.0),
+    "bone": (400.0, 1800.0),
+    "brain": (40.0, 80.0),
+}
+# Histogram range used for CT, so padding values (e.g. -3024) do not
+# stretch the bins.
+CT_RANGE = (-1024.0, 3071.0)
+HISTOGRAM_BINS = 4096
+# Whole-slab temporaries are avoided where NumPy widens values (bin indices
+# are 8 bytes each); such steps run a block of voxels at a time.
+_BLOCK_VOXELS = 1 << 20
+
+T = TypeVar("T")
+
+# NIfTI-1 datatype codes.
+_NIFTI_DTYPES = {
+    2: np.uint8, 4: np.int16, 8: np.int32, 16: np.float32, 64: np.float64,
+    256: np.int8, 512: np.uint16, 768: np.uint32, 1024: np.int64, 1280: np.uint64,
+}
+_NIFTI_CODES = {np.dtype(dtype): code for code, dtype in _NIFTI_DTYPES.items()}
+_NIFTI_HEADER_SIZE = 348
+_NIFTI_VOX_OFFSET = 352
+
+
+# ----------------------------------------------------------------------
+# Volumes
+# ----------------------------------------------------------------------
+class Volume:
+    """A 2-D or 3-D image read one slab of slices at a time.
+
+    ``data`` is anything shaped ``(slices, rows, columns)`` whose first axis
+    can be sliced (a memory map, a lazy proxy); stored values are mapped to
+    physical units as ``value * slope + intercept``.
+    """
+
+    def __init__(
+        self,
+        data: Any,
+        spacing: Sequence[float] = (1.0, 1.0, 1.0),
+        *,
+        slope: float = 1.0,
+        intercept: float = 0.0,
+        source: str = "",
+    ) -> None:
+        if len(data.shape) == 2:
+            data = _Stacked(data)
+        if len(data.shape) != 3:
+            raise ValueError(f"Expected a 2-D or 3-D grayscale image, got shape {tuple(data.shape)}.")
+        self.data = data
+        self.shape: Tuple[int, int, int] = tuple(int(size) for size in data.shape)
+        self.spacing = tuple(float(value) for value in spacing)
+        self.slope = float(slope)
+        self.intercept = float(intercept)
+        self.source = source
+
+    @property
+    def voxels(self) -> int:
+        return self.shape[0] * self.shape[1] * self.shape[2]
+
+    @property
+    def voxel_volume_ml(self) -> float:
+        return self.spacing[0] * self.spacing[1] * self.spacing[2] / 1000.0
+
+    def slab(self, start: int, stop: int) -> np.ndarray:
+        """Slices ``start:stop`` in physical units as ``float32``."""
+
+        values = np.asarray(self.data[start:stop], dtype=np.float32)
+        if self.slope != 1.0:
+            values = values * np.float32(self.slope)
+        if self.intercept:
+            values = values + np.float32(self.intercept)
+        return values
+
+
+class _Stacked:
+    """Present a 2-D image as a single-slice volume without copying it."""
+
+    def __init__(self, image: Any) -> None:
+        self.image = image
+        self.shape = (1, *image.shape)
+
+    def __getitem__(self, index: slice) -> np.ndarray:
+        return np.asarray(self.image)[None][index]
+
+
+class _Transposed:
+    """``(x, y, z)`` proxy (nibabel) exposed as ``(z, y, x)``."""
+
+    def __init__(self, proxy: Any) -> None:
+        self.proxy = proxy
+        self.shape = tuple(proxy.shape[:3])[::-1]
+
+    def __getitem__(self, index: slice) -> np.ndarray:
+        return np.asarray(self.proxy[:, :, index]).T
+
+
+class _DicomSlices:
+    """A DICOM series read lazily, one file per slice."""
+
+    def __init__(self, paths: Sequence[str], shape: Tuple[int, int, int]) -> None:
+        self.paths = list(paths)
+        self.shape = shape
+
+    def __getitem__(self, index: slice) -> np.ndarray:
+        return np.stack([pydicom.dcmread(path).pixel_array for path in self.paths[index]])
+
+
+def read_nifti_header(path: str) -> Dict[str, Any]:
+    """The fields of an uncompressed single-file NIfTI-1 header we need."""
+
+    with open(path, "rb") as handle:
+        header = handle.read(_NIFTI_HEADER_SIZE)
+    if len(header) < _NIFTI_HEADER_SIZE:
+        raise ValueError(f"{path} is too short to be a NIfTI-1 file.")
+    for endian in "<>":
+        if struct.unpack(endian + "i", header[:4])[0] == _NIFTI_HEADER_SIZE:
+            break
+    else:
+        raise ValueError(f"{path} is not a NIfTI-1 file.")
+    if header[344:347] != b"n+1":
+        raise ValueError(f"{path} is not a single-file NIfTI-1 image (magic 'n+1').")
+    dim = struct.unpack(endian + "8h", header[40:56])
+    datatype = struct.unpack(endian + "h", header[70:72])[0]
+    pixdim = struct.unpack(endian + "8f", header[76:108])
+    vox_offset, slope, intercept = struct.unpack(endian + "3f", header[108:120])
+    if datatype not in _NIFTI_DTYPES:
+        raise ValueError(f"Unsupported NIfTI datatype code {datatype}.")
+    ndim = dim[0]
+    shape = tuple(dim[1 : ndim + 1])
+    # A trailing singleton time axis is allowed.
+    while len(shape) > 3 and shape[-1] == 1:
+        shape = shape[:-1]
+    if len(shape) not in (2, 3):
+        raise ValueError(f"Only 2-D and 3-D NIfTI images are supported, got dim {shape}.")
+    return {
+        "shape": shape,
+        "dtype": np.dtype(_NIFTI_DTYPES[datatype]).newbyteorder(endian),
+        "spacing": tuple(abs(value) or 1.0 for value in pixdim[1 : len(shape) + 1]),
+        "vox_offset": int(vox_offset),
+        "slope": slope if slope and math.isfinite(slope) else 1.0,
+        "intercept": intercept if math.isfinite(intercept) else 0.0,
+    }
+
+
+def _open_nifti(path: str) -> Volume:
+    header = read_nifti_header(path)
+    # NIfTI stores x fastest; a Fortran-ordered (x, y, z) map transposed to
+    # (z, y, x) is C-contiguous, so each slab is one contiguous read.
+    data = np.memmap(path, dtype=header["dtype"], mode="r", offset=header["vox_offset"],
+                     shape=header["shape"], order="F").T
+    spacing = header["spacing"][::-1]
+    if len(spacing) == 2:
+        spacing = (1.0, *spacing)
+    return Volume(data, spacing, slope=header["slope"], intercept=header["intercept"], source=path)
+
+
+def _dicom_pixel_dtype(dataset: Any) -> np.dtype:
+    kind = "i" if getattr(dataset, "PixelRepresentation", 0) == 1 else "u"
+    dtype = np.dtype(f"{kind}{dataset.BitsAllocated // 8}")
+    return dtype.newbyteorder("<" if dataset.is_little_endian else ">")
+
+
+def _dicom_spacing(dataset: Any) -> Tuple[float, float, float]:
+    rows, columns = (float(value) for value in getattr(dataset, "PixelSpacing", (1.0, 1.0)))
+    thickness = float(getattr(dataset, "SpacingBetweenSlices", 0) or getattr(dataset, "SliceThickness", 0) or 1.0)
+    return thickness, rows, columns
+
+
+def _open_dicom_file(path: str) -> Volume:
+    # Defer the pixel data so only the header is read.
+    dataset = pydicom.dcmread(path, defer_size=1024)
+    if getattr(dataset, "SamplesPerPixel", 1) != 1:
+        raise ValueError("Only grayscale DICOM images are supported.")
+    frames = int(getattr(dataset, "NumberOfFrames", 1) or 1)
+    shape = (frames, int(dataset.Rows), int(dataset.Columns))
+    slope = float(getattr(dataset, "RescaleSlope", 1.0) or 1.0)
+    intercept = float(getattr(dataset, "RescaleIntercept", 0.0) or 0.0)
+    spacing = _dicom_spacing(dataset)
+    element = dataset.get_item("PixelData") if "PixelData" in dataset else None
+    offset = getattr(element, "value_tell", None)
+    compressed = dataset.file_meta.TransferSyntaxUID.is_compressed
+    if offset is not None and not compressed and dataset.BitsAllocated in (8, 16, 32):
+        data = np.memmap(path, dtype=_dicom_pixel_dtype(dataset), mode="r", offset=offset, shape=shape)
+    else:
+        # Compressed pixel data cannot be mapped; decode it once.
+        data = pydicom.dcmread(path).pixel_array.reshape(shape)
+    return Volume(data, spacing, slope=slope, intercept=intercept, source=path)
+
+
+def _open_dicom_series(directory: str) -> Volume:
+    headers = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        try:
+            headers.append((path, pydicom.dcmread(path, stop_before_pixels=True)))
+        except Exception:  # not a DICOM file
+            continue
+    if not headers:
+        raise ValueError(f"No DICOM files found in {directory}.")
+
+    def position(item: Tuple[str, Any]) -> float:
+        dataset = item[1]
+        if "ImagePositionPatient" in dataset:
+            return float(dataset.ImagePositionPatient[2])
+        return float(getattr(dataset, "InstanceNumber", 0) or 0)
+
+    headers.sort(key=position)
+    first = headers[0][1]
+    spacing = list(_dicom_spacing(first))
+    if len(headers) > 1 and "ImagePositionPatient" in first:
+        spacing[0] = abs(position(headers[1]) - position(headers[0])) or spacing[0]
+    shape = (len(headers), int(first.Rows), int(first.Columns))
+    return Volume(
+        _DicomSlices([path for path, _ in headers], shape),
+        spacing,
+        slope=float(getattr(first, "RescaleSlope", 1.0) or 1.0),
+        intercept=float(getattr(first, "RescaleIntercept", 0.0) or 0.0),
+        source=directory,
+    )
+
+
+def open_volume(path: str, spacing: Optional[Sequence[float]] = None) -> Volume:
+    """Open ``path`` lazily: ``.npy``, ``.nii``, ``.nii.gz``, DICOM file or series directory.
+
+    ``spacing`` (slice, row, column in mm) overrides the file's spacing;
+    ``.npy`` files have none and default to 1 mm.
+    """
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Image not found: {path}")
+    lower = path.lower()
+    if os.path.isdir(path):
+        if not PYDICOM_AVAILABLE:
+            raise ValueError("pydicom is not installed. Install it with: pip install pydicom")
+        volume = _open_dicom_series(path)
+    elif lower.endswith(".npy"):
+        volume = Volume(np.load(path, mmap_mode="r"), source=path)
+    elif lower.endswith(".nii"):
+        volume = _open_nifti(path)
+    elif lower.endswith(".nii.gz"):
+        # Compressed files cannot be memory-mapped; nibabel reads them lazily.
+        if not NIBABEL_AVAILABLE:
+            raise ValueError(
+                "Compressed NIfTI needs nibabel (pip install nibabel), or decompress it to .nii."
+            )
+        image = nibabel.load(path)
+        zooms = tuple(float(value) for value in image.header.get_zooms()[:3])
+        data = image.dataobj if len(image.shape) == 2 else _Transposed(image.dataobj)
+        volume = Volume(data, zooms[::-1] if len(zooms) == 3 else (1.0, *zooms[::-1]), source=path)
+    elif lower.endswith((".dcm", ".dicom")):
+        if not PYDICOM_AVAILABLE:
+            raise ValueError("pydicom is not installed. Install it with: pip install pydicom")
+        volume = _open_dicom_file(path)
+    else:
+        raise ValueError("Unsupported image format. Use .npy, .nii, .nii.gz, .dcm or a DICOM directory.")
+    if spacing is not None:
+        volume.spacing = tuple(float(value) for value in spacing)
+    return volume
+
+
+def create_output(path: str, shape: Sequence[int], dtype: Any, spacing: Sequence[float] = (1.0, 1.0, 1.0)) -> np.ndarray:
+    """A writable, memory-mapped ``(slices, rows, columns)`` ``.npy`` or ``.nii`` volume."""
+
+    dtype = np.dtype(dtype)
+    shape = tuple(int(size) for size in shape)
+    if path.lower().endswith(".npy"):
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+    if not path.lower().endswith(".nii"):
+        raise ValueError("Output volumes must be .npy or .nii files.")
+    if dtype not in _NIFTI_CODES:
+        raise ValueError(f"NIfTI cannot store {dtype}.")
+    header = bytearray(_NIFTI_VOX_OFFSET)
+    struct.pack_into("<i", header, 0, _NIFTI_HEADER_SIZE)
+    struct.pack_into("<8h", header, 40, 3, shape[2], shape[1], shape[0], 1, 1, 1, 1)
+    struct.pack_into("<2h", header, 70, _NIFTI_CODES[dtype], dtype.itemsize * 8)
+    struct.pack_into("<8f", header, 76, 1.0, spacing[2], spacing[1], spacing[0], 1.0, 1.0, 1.0, 1.0)
+    struct.pack_into("<3f", header, 108, float(_NIFTI_VOX_OFFSET), 1.0, 0.0)
+    header[123] = 2  # xyzt_units: millimetres
+    header[344:348] = b"n+1\0"
+    with open(path, "wb") as handle:
+        handle.write(header)
+        handle.truncate(_NIFTI_VOX_OFFSET + dtype.itemsize * math.prod(shape))
+    return np.memmap(path, dtype=dtype.newbyteorder("<"), mode="r+", offset=_NIFTI_VOX_OFFSET,
+                     shape=shape[::-1], order="F").T
+
+
+def _flush(array: np.ndarray) -> None:
+    while array is not None:
+        if isinstance(array, np.memmap):
+            array.flush()
+            return
+        array = array.base
+
+
+def write_nifti(path: str, array: np.ndarray, spacing: Sequence[float] = (1.0, 1.0, 1.0)) -> None:
+    """Write a ``(slices, rows, columns)`` array as an uncompressed NIfTI-1 file."""
+
+    array = np.asarray(array)
+    output = create_output(path, array.shape, array.dtype, spacing)
+    output[...] = array
+    _flush(output)
+    del output
+
+
+# ----------------------------------------------------------------------
+# Slab engine
+# ----------------------------------------------------------------------
+def slab_bounds(volume: Volume, slab_voxels: int) -> List[Tuple[int, int]]:
+    per_slice = volume.shape[1] * volume.shape[2]
+    step = max(slab_voxels // max(per_slice, 1), 1)
+    return [(start, min(start + step, volume.shape[0])) for start in range(0, volume.shape[0], step)]
+
+
+def map_slabs(
+    volume: Volume,
+    function: Callable[[int, int, np.ndarray], T],
+    *,
+    workers: int = 1,
+    slab_voxels: int = 8_000_000,
+) -> Iterator[T]:
+    """Yield ``function(start, stop, slab)`` for every slab, in slice order.
+
+    With ``workers > 1`` slabs are read and processed on a thread pool (NumPy
+    and memory-map reads release the GIL) with at most ``2 * workers`` slabs
+    in flight.
+    """
+
+    def run(bounds: Tuple[int, int]) -> T:
+        start, stop = bounds
+        return function(start, stop, volume.slab(start, stop))
+
+    bounds = slab_bounds(volume, slab_voxels)
+    if workers <= 1 or len(bounds) == 1:
+        for item in bounds:
+            yield run(item)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-slab") as pool:
+        in_flight: Deque[Future] = deque()
+        for item in bounds:
+            in_flight.append(pool.submit(run, item))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+# ----------------------------------------------------------------------
+# Streaming statistics
+# ----------------------------------------------------------------------
+class Moments:
+    """Count, extrema, mean and sum of squared deviations, mergeable across slabs."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @classmethod
+    def of(cls, values: np.ndarray) -> "Moments":
+        moments = cls()
+        if values.size:
+            moments.count = int(values.size)
+            moments.minimum = float(values.min())
+            moments.maximum = float(values.max())
+            moments.mean = float(values.mean(dtype=np.float64))
+            flat = values.ravel()
+            for first in range(0, len(flat), _BLOCK_VOXELS):
+                centred = flat[first : first + _BLOCK_VOXELS] - np.float32(moments.mean)
+                moments.m2 += float(np.dot(centred.astype(np.float64), centred))
+        return moments
+
+    def merge(self, other: "Moments") -> None:
+        # Chan et al. pairwise update.
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+
+def volume_moments(volume: Volume, **engine: Any) -> Moments:
+    total = Moments()
+    for moments in map_slabs(volume, lambda start, stop, slab: Moments.of(slab), **engine):
+        total.merge(moments)
+    return total
+
+
+def _histogram_range(moments: Moments, modality: str) -> Tuple[float, float]:
+    low, high = moments.minimum, moments.maximum
+    if modality == "CT":
+        low, high = max(low, CT_RANGE[0]), min(high, CT_RANGE[1])
+    if not high > low:
+        high = low + 1.0
+    return low, high
+
+
+def volume_histogram(volume: Volume, low: float, high: float, bins: int = HISTOGRAM_BINS, **engine: Any) -> np.ndarray:
+    """Voxel counts in ``bins`` equal bins over ``[low, high]`` (outliers go to the end bins)."""
+
+    scale = np.float32(bins / (high - low))
+    offset = np.float32(low)
+
+    def count(start: int, stop: int, slab: np.ndarray) -> np.ndarray:
+        flat = slab.ravel()
+        counts = np.zeros(bins, dtype=np.int64)
+        for first in range(0, len(flat), _BLOCK_VOXELS):
+            index = ((flat[first : first + _BLOCK_VOXELS] - offset) * scale).astype(np.intp)
+            np.clip(index, 0, bins - 1, out=index)
+            counts += np.bincount(index, minlength=bins)
+        return counts
+
+    counts = np.zeros(bins, dtype=np.int64)
+    for partial in map_slabs(volume, count, **engine):
+        counts += partial
+    return counts
+
+
+def histogram_percentiles(counts: np.ndarray, low: float, high: float, qs: Sequence[float]) -> List[float]:
+    """Percentiles (0-100) interpolated within histogram bins."""
+
+    width = (high - low) / len(counts)
+    cumulative = np.cumsum(counts)
+    total = cumulative[-1]
+    values = []
+    for q in qs:
+        rank = q / 100.0 * total
+        index = int(np.searchsorted(cumulative, rank, side="left"))
+        index = min(index, len(counts) - 1)
+        below = cumulative[index - 1] if index else 0
+        fraction = (rank - below) / counts[index] if counts[index] else 0.0
+        values.append(low + (index + min(max(fraction, 0.0), 1.0)) * width)
+    return values
+
+
+def otsu_threshold(counts: np.ndarray, low: float, high: float) -> float:
+    """Otsu's threshold from a histogram: voxels ``>= threshold`` are foreground."""
+
+    edges = np.linspace(low, high, len(counts) + 1)
+    centres = (edges[:-1] + edges[1:]) / 2
+    weight = np.cumsum(counts, dtype=np.float64)
+    total = weight[-1]
+    background_sum = np.cumsum(counts * centres)
+    foreground_weight = total - weight
+    with np.errstate(divide="ignore", invalid="ignore"):
+        background_mean = background_sum / weight
+        foreground_mean = (background_sum[-1] - background_sum) / foreground_weight
+        between = weight * foreground_weight * (background_mean - foreground_mean) ** 2
+    between[~np.isfinite(between)] = -1.0
+    return float(edges[int(np.argmax(between)) + 1])
+
+
+# ----------------------------------------------------------------------
+# Analyses
+# ----------------------------------------------------------------------
+def _rounded(value: float, digits: int = 4) -> float:
+    return round(float(value), digits)
+
+
+def _describe(volume: Volume, modality: str, analysis_type: str) -> Dict[str, Any]:
+    return {
+        "modality": modality,
+        "analysis_type": analysis_type,
+        "source": volume.source,
+        "shape": list(volume.shape),
+        "spacing_mm": [_rounded(value) for value in volume.spacing],
+        "extent_mm": [_rounded(size * spacing) for size, spacing in zip(volume.shape, volume.spacing)],
+        "voxels": volume.voxels,
+        "units": "HU" if modality == "CT" else "a.u.",
+    }
+
+
+def _histogram(volume: Volume, modality: str, **engine: Any) -> Tuple[Moments, np.ndarray, float, float]:
+    moments = volume_moments(volume, **engine)
+    low, high = _histogram_range(moments, modality)
+    return moments, volume_histogram(volume, low, high, **engine), low, high
+
+
+def measure(volume: Volume, modality: str, *, threshold: Optional[float] = None, **engine: Any) -> Dict[str, Any]:
+    """Intensity statistics, percentiles and foreground volume (two passes)."""
+
+    moments, counts, low, high = _histogram(volume, modality, **engine)
+    p1, p50, p99 = histogram_percentiles(counts, low, high, (1, 50, 99))
+    method = "manual" if threshold is not None else "otsu"
+    if threshold is None:
+        threshold = otsu_threshold(counts, low, high)
+        # The Otsu threshold is a bin edge: count from the histogram, no extra pass.
+        first = int(round((threshold - low) / (high - low) * len(counts)))
+        foreground = int(counts[first:].sum())
+    else:
+        foreground = sum(
+            map_slabs(volume, lambda start, stop, slab: int(np.count_nonzero(slab >= threshold)), **engine)
+        )
+    result = _describe(volume, modality, "measurement")
+    result["intensity"] = {
+        "min": _rounded(moments.minimum),
+        "max": _rounded(moments.maximum),
+        "mean": _rounded(moments.mean),
+        "std": _rounded(moments.std),
+        "p1": _rounded(p1),
+        "p50": _rounded(p50),
+        "p99": _rounded(p99),
+    }
+    result["foreground"] = {
+        "threshold": _rounded(threshold),
+        "method": method,
+        "voxels": foreground,
+        "volume_ml": _rounded(foreground * volume.voxel_volume_ml),
+        "fraction": _rounded(foreground / volume.voxels),
+    }
+    return result
+
+
+def segment(
+    volume: Volume,
+    modality: str,
+    *,
+    threshold: Optional[float] = None,
+    output_path: Optional[str] = None,
+    **engine: Any,
+) -> Dict[str, Any]:
+    """Threshold the volume (Otsu when ``threshold`` is None) and describe the mask.
+
+    With ``output_path`` (``.npy`` or ``.nii``) the ``uint8`` mask is written
+    slab by slab to a memory-mapped output volume.
+    """
+
+    method = "manual" if threshold is not None else "otsu"
+    if threshold is None:
+        _, counts, low, high = _histogram(volume, modality, **engine)
+        threshold = otsu_threshold(counts, low, high)
+    output = create_output(output_path, volume.shape, np.uint8, volume.spacing) if output_path else None
+    level = np.float32(threshold)
+
+    def label(start: int, stop: int, slab: np.ndarray) -> Dict[str, Any]:
+        mask = slab >= level
+        if output is not None:
+            output[start:stop] = mask
+        areas = np.count_nonzero(mask.reshape(len(mask), -1), axis=1)
+        rows = np.count_nonzero(mask, axis=(0, 2))
+        columns = np.count_nonzero(mask, axis=(0, 1))
+        return {
+            "start": start,
+            "areas": areas,
+            "rows": rows,
+            "columns": columns,
+            "intensity": float(slab[mask].sum(dtype=np.float64)),
+        }
+
+    areas = np.zeros(volume.shape[0], dtype=np.int64)
+    rows = np.zeros(volume.shape[1], dtype=np.int64)
+    columns = np.zeros(volume.shape[2], dtype=np.int64)
+    intensity = 0.0
+    for part in map_slabs(volume, label, **engine):
+        areas[part["start"] : part["start"] + len(part["areas"])] = part["areas"]
+        rows += part["rows"]
+        columns += part["columns"]
+        intensity += part["intensity"]
+    if output is not None:
+        _flush(output)
+        del output
+
+    voxels = int(areas.sum())
+    result = _describe(volume, modality, "segmentation")
+    result["segmentation"] = {
+        "threshold": _rounded(threshold),
+        "method": method,
+        "voxels": voxels,
+        "volume_ml": _rounded(voxels * volume.voxel_volume_ml),
+        "fraction": _rounded(voxels / volume.voxels),
+        "mean_intensity": _rounded(intensity / voxels) if voxels else None,
+    }
+    if voxels:
+        box_min, box_max, centroid = [], [], []
+        for counts, spacing in zip((areas, rows, columns), volume.spacing):
+            occupied = np.flatnonzero(counts)
+            box_min.append(int(occupied[0]))
+            box_max.append(int(occupied[-1]))
+            centroid.append(_rounded(float(np.dot(np.arange(len(counts)), counts)) / voxels * spacing, 2))
+        largest = int(np.argmax(areas))
+        result["segmentation"].update(
+            bounding_box={"min": box_min, "max": box_max},
+            centroid_mm=centroid,
+            largest_slice={
+                "index": largest,
+                "area_mm2": _rounded(areas[largest] * volume.spacing[1] * volume.spacing[2], 2),
+            },
+        )
+    if output_path:
+        result["output_path"] = output_path
+    return result
+
+
+def enhance(
+    volume: Volume,
+    modality: str,
+    *,
+    window: Optional[str] = None,
+    smoothing_sigma: float = 0.0,
+    output_path: Optional[str] = None,
+    **engine: Any,
+) -> Dict[str, Any]:
+    """Map intensities to ``uint8`` display values, optionally smoothing each slice.
+
+    CT uses a display ``window`` preset (``CT_WINDOWS``, soft tissue by
+    default); other modalities, or ``window="auto"``, stretch the 1st-99th
+    percentile range.
+    """
+
+    if smoothing_sigma:
+        if not SCIPY_AVAILABLE:
+            raise ValueError("Smoothing needs SciPy. Install it with: pip install scipy")
+        from scipy import ndimage
+    if window is None:
+        window = "soft_tissue" if modality == "CT" else "auto"
+    if window == "auto":
+        _, counts, low, high = _histogram(volume, modality, **engine)
+        lower, upper = histogram_percentiles(counts, low, high, (1, 99))
+    elif window in CT_WINDOWS and modality == "CT":
+        level, width = CT_WINDOWS[window]
+        lower, upper = level - width / 2, level + width / 2
+    else:
+        presets = ", ".join(CT_WINDOWS) if modality == "CT" else "none"
+        raise ValueError(f"Unknown window '{window}'. Use 'auto' (CT presets: {presets}).")
+    if not upper > lower:
+        upper = lower + 1.0
+    scale = np.float32(255.0 / (upper - lower))
+    output = create_output(output_path, volume.shape, np.uint8, volume.spacing) if output_path else None
+
+    def apply(start: int, stop: int, slab: np.ndarray) -> Tuple[Moments, Moments]:
+        before = Moments.of(slab)
+        if smoothing_sigma:
+            slab = ndimage.gaussian_filter(slab, sigma=(0, smoothing_sigma, smoothing_sigma))
+        mapped = slab - np.float32(lower)
+        mapped *= scale
+        np.clip(mapped, 0, 255, out=mapped)
+        display = np.rint(mapped, out=mapped).astype(np.uint8)
+        if output is not None:
+            output[start:stop] = display
+        flat = display.ravel()
+        counts = np.zeros(256, dtype=np.int64)
+        for first in range(0, len(flat), _BLOCK_VOXELS):
+            counts += np.bincount(flat[first : first + _BLOCK_VOXELS], minlength=256)
+        return before, counts
+
+    original, levels = Moments(), np.zeros(256, dtype=np.int64)
+    for before, counts in map_slabs(volume, apply, **engine):
+        original.merge(before)
+        levels += counts
+    if output is not None:
+        _flush(output)
+        del output
+    values = np.arange(256)
+    display_mean = float(np.dot(levels, values)) / volume.voxels
+    display_std = math.sqrt(max(float(np.dot(levels, values ** 2)) / volume.voxels - display_mean ** 2, 0.0))
+
+    result = _describe(volume, modality, "enhancement")
+    result["enhancement"] = {
+        "method": "window" if window != "auto" else "percentile_stretch",
+        "window": window,
+        "input_range": [_rounded(lower), _rounded(upper)],
+        "smoothing_sigma": smoothing_sigma,
+        "input": {"mean": _rounded(original.mean), "std": _rounded(original.std)},
+        "output": {"mean": _rounded(display_mean), "std": _rounded(display_std)},
+    }
+    if output_path:
+        result["output_path"] = output_path
+    return result
+
+
+def analyze_image(
+    path: str,
+    modality: str,
+    analysis_type: str = "measurement",
+    *,
+    spacing: Optional[Sequence[float]] = None,
+    workers: int = 1,
+    slab_voxels: int = 8_000_000,
+    **options: Any,
+) -> Dict[str, Any]:
+    """Open ``path`` lazily and run one analysis; ``options`` go to the analysis."""
+
+    if modality not in MODALITIES:
+        raise ValueError(f"Invalid modality. Must be one of: {', '.join(MODALITIES)}.")
+    if analysis_type not in ANALYSIS_TYPES:
+        raise ValueError(f"Invalid analysis_type. Must be one of: {', '.join(ANALYSIS_TYPES)}.")
+    if analysis_type == "registration":
+        raise ValueError("Registration needs a reference image and is not supported yet.")
+    volume = open_volume(path, spacing)
+    analysis = {"measurement": measure, "segmentation": segment, "enhancement": enhance}[analysis_type]
+    return analysis(volume, modality, workers=workers, slab_voxels=slab_voxels, **options)
+
+
+def make_phantom(
+    shape: Sequence[int],
+    modality: str = "CT",
+    *,
+    seed: int = 0,
+    out: Optional[np.ndarray] = None,
+    slab_slices: int = 16,
+) -> np.ndarray:
+    """Synthetic ``int16`` test volume: an ellipsoidal body holding a dense sphere.
+
+    CT values are in HU (air -1000, soft tissue 40, bone 700); other
+    modalities use arbitrary positive intensities. Gaussian noise is added.
+    Slices are generated ``slab_slices`` at a time into ``out`` (e.g. a
+    memory-mapped output volume) so large phantoms need little memory.
+    """
+
+    slices, rows, columns = (int(size) for size in shape)
+    if out is None:
+        out = np.empty((slices, rows, columns), dtype=np.int16)
+    background, tissue, dense, noise = (-1000, 40, 700, 20) if modality == "CT" else (0, 300, 900, 25)
+    rng = np.random.default_rng(seed)
+    y = ((np.arange(rows) - rows / 2) / (rows * 0.4))[:, None]
+    x = ((np.arange(columns) - columns / 2) / (columns * 0.45))[None, :]
+    for start in range(0, slices, slab_slices):
+        z = ((np.arange(start, min(start + slab_slices, slices)) - slices / 2) / max(slices * 0.45, 1))[:, None, None]
+        radius = z ** 2 + y[None] ** 2 + x[None] ** 2
+        values = np.where(radius <= 1.0, tissue, background).astype(np.float32)
+        values[radius <= 0.3 ** 2] = dense
+        values += rng.normal(0, noise, values.shape).astype(np.float32)
+        out[start : start + len(values)] = np.clip(np.rint(values), -32768, 32767).astype(np.int16)
+    return out
+
+
+__all__ = [
+    "ANALYSIS_TYPES",
+    "CT_WINDOWS",
+    "MODALITIES",
+    "Moments",
+    "Volume",
+    "analyze_image",
+    "create_output",
+    "enhance",
+    "histogram_percentiles",
+    "make_phantom",
+    "map_slabs",
+    "measure",
+    "open_volume",
+    "otsu_threshold",
+    "read_nifti_header",
+    "segment",
+    "volume_histogram",
+    "volume_moments",
+    "write_nifti",
+]
@@ -258,7 +258,7 @@ async function sendMessage() {
   inputEl.disabled = true;
 
   try {
-    const resp = await fetch('/api/chat', {
+    const resp = await fetch('/api/chat/stream', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({ messages: conversation, model: selectedModel }),
@@ -270,6 +270,10 @@ async function sendMessage() {
       return;
     }
 
+    if (resp.status === 429 || resp.status === 503) {
+      throw new Error('The assistant is busy right now. Please try again in a moment.');
+    }
+
     if (!resp.ok || !resp.body) {
       throw new Error(`HTTP ${resp.status}`);
     }
@@ -289,12 +293,20 @@ async function sendMessage() {
       for (const block of blocks) {
         const line = block.trim();
         if (!line) continue;
-        const dataLine = line.split('\n').find(l => l.startsWith('data: '));
+        const lines = line.split('\n');
+        const isError = lines.some(l => l.trim() === 'event: error');
+        const dataLine = lines.find(l => l.startsWith('data: '));
         if (!dataLine) continue;
         const payload = dataLine.slice(6);
         if (payload === '[DONE]') continue;
         try {
           const parsed = JSON.parse(payload);
+          if (isError) {
+            const message = parsed?.error?.message || 'Generation failed.';
+            assistantAccum += `${assistantAccum ? '\n\n' : ''}⚠️ ${message}`;
+            assistantBubble.innerHTML = renderMarkdown(assistantAccum);
+            continue;
+          }
           const delta = parsed?.choices?.[0]?.delta?.content ?? '';
           if (delta) {
             assistantAccum += delta;
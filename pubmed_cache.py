@@ -0,0 +1,189 @@
+"""Disk-backed TTL cache for NCBI E-utilities results.
+
+``tools.search_pubmed`` issues an ``esearch`` and an ``efetch`` request per
+call, yet users repeat the same literature queries constantly and NCBI
+throttles unauthenticated clients to 3 requests per second. ``PubMedCache``
+stores both halves in SQLite:
+
+* ``searches`` maps a normalised query and ``max_results`` to the PMID list.
+  A cached search with a larger ``max_results`` also answers smaller ones,
+  since esearch returns the same ranking truncated to ``retmax``.
+* ``records`` maps a PMID to its parsed article, so overlapping searches only
+  fetch the articles that are not cached yet.
+
+Entries expire after ``ttl`` seconds; each table is capped at ``max_entries``
+rows, evicting the least recently used ones.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from embedding_cache import normalize_text
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a PubMed query (E-utilities matching is case-insensitive)."""
+
+    return normalize_text(query).casefold()
+
+
+class PubMedCache:
+    """SQLite cache of esearch PMID lists and efetch records with a TTL."""
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, max_entries: int = 50_000) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max(max_entries, 1)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS searches ("
+                " query TEXT NOT NULL,"
+                " max_results INTEGER NOT NULL,"
+                " pmids TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL,"
+                " PRIMARY KEY (query, max_results))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                " pmid TEXT PRIMARY KEY,"
+                " record TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS searches_accessed ON searches (accessed)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS records_accessed ON records (accessed)")
+        self.search_hits = 0
+        self.search_misses = 0
+        self.record_hits = 0
+        self.record_misses = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------
+    # esearch
+    # ------------------------------------------------------------------
+    def get_search(self, query: str, max_results: int) -> Optional[List[str]]:
+        """Cached PMIDs for ``query``, or ``None`` if absent or expired."""
+
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT max_results, pmids FROM searches"
+                " WHERE query = ? AND max_results >= ? AND created > ?"
+                " ORDER BY max_results LIMIT 1",
+                (normalize_query(query), max_results, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.search_misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE searches SET accessed = ? WHERE query = ? AND max_results = ?",
+                (now, normalize_query(query), row[0]),
+            )
+            self.search_hits += 1
+        return json.loads(row[1])[:max_results]
+
+    def put_search(self, query: str, max_results: int, pmids: Sequence[str]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches (query, max_results, pmids, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (normalize_query(query), max_results, json.dumps(list(pmids)), now, now),
+            )
+            self._evict("searches")
+
+    # ------------------------------------------------------------------
+    # efetch
+    # ------------------------------------------------------------------
+    def get_records(self, pmids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """Cached, unexpired records for whichever of ``pmids`` are present."""
+
+        unique = list(dict.fromkeys(pmids))
+        found: Dict[str, Dict[str, Any]] = {}
+        now = time.time()
+        with self._lock, self._conn:
+            # Stay well below SQLite's bound-parameter limit.
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT pmid, record FROM records WHERE pmid IN ({placeholders}) AND created > ?",
+                    (*batch, now - self.ttl),
+                ).fetchall()
+                for pmid, record in rows:
+                    found[pmid] = json.loads(record)
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE records SET accessed = ? WHERE pmid = ?",
+                        [(now, pmid) for pmid, _ in rows],
+                    )
+            self.record_hits += len(found)
+            self.record_misses += len(unique) - len(found)
+        return found
+
+    def put_records(self, records: Dict[str, Dict[str, Any]]) -> None:
+        if not records:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records (pmid, record, created, accessed) VALUES (?, ?, ?, ?)",
+                [(pmid, json.dumps(record), now, now) for pmid, record in records.items()],
+            )
+            self._evict("records")
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def _evict(self, table: str) -> None:
+        """Drop expired rows, then the least recently used beyond ``max_entries``."""
+
+        cursor = self._conn.execute(f"DELETE FROM {table} WHERE created <= ?", (time.time() - self.ttl,))
+        removed = max(cursor.rowcount, 0)
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            cursor = self._conn.execute(
+                f"DELETE FROM {table} WHERE rowid IN"
+                f" (SELECT rowid FROM {table} ORDER BY accessed LIMIT ?)",
+                (excess,),
+            )
+            removed += max(cursor.rowcount, 0)
+        self.evictions += removed
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM searches")
+            self._conn.execute("DELETE FROM records")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            searches = self._conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+            records = self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+            lookups = self.search_hits + self.search_misses + self.record_hits + self.record_misses
+            hits = self.search_hits + self.record_hits
+            return {
+                "searches": searches,
+                "records": records,
+                "search_hits": self.search_hits,
+                "search_misses": self.search_misses,
+                "record_hits": self.record_hits,
+                "record_misses": self.record_misses,
+                "evictions": self.evictions,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+__all__ = ["PubMedCache", "normalize_query"]
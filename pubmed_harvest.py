@@ -0,0 +1,258 @@
+"""Bulk PubMed-to-RAG harvesting.
+
+The chat tool loops only ever store truncated abstracts. ``PubMedHarvester``
+runs one ``esearch`` with ``usehistory=y`` and then pages through the stored
+result set (``WebEnv`` / ``query_key``) with large ``efetch`` batches fetched
+concurrently on the shared, NCBI rate-limited ``tools.http_session``. Each
+article becomes one document (title and full abstract) carrying its pmid,
+journal, year, authors and MeSH terms as metadata, and is streamed through
+``BulkIngestor`` so the run checkpoints and resumes like any bulk ingest.
+
+NCBI serves at most the first 10,000 records of a PubMed search through the
+history server; narrow larger queries (for example by publication date). A
+resumed run repeats the search, so pin moving result sets with ``maxdate``.
+
+Usage:
+    python pubmed_harvest.py "crispr base editing" --checkpoint crispr.ckpt.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+import tools
+from http_client import HTTPClient
+from pubmed_cache import PubMedCache
+from pubmed_xml import NO_ABSTRACT, iter_pubmed_articles
+from rag_ingest import BulkIngestor, IngestStats
+from rag_pipeline import FlexibleRAGPipeline
+
+logger = logging.getLogger(__name__)
+
+HISTORY_LIMIT = 10_000
+
+
+@dataclass
+class SearchHistory:
+    """Result set stored on the E-utilities history server."""
+
+    count: int
+    webenv: str
+    query_key: str
+
+
+def article_document(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a parsed efetch record into a ``BulkIngestor`` document."""
+
+    pmid = record["pmid"]
+    abstract = record.get("abstract")
+    text = record.get("title", "")
+    if abstract and abstract != NO_ABSTRACT:
+        text = f"{text}\n\n{abstract}"
+    metadata: Dict[str, Any] = {
+        "source": "pubmed",
+        "pmid": pmid,
+        "title": record.get("title", ""),
+        "journal": record.get("journal", ""),
+        "authors": record.get("authors", []),
+        "mesh_terms": record.get("mesh_terms", []),
+        "url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
+    }
+    if record.get("year") is not None:
+        metadata["year"] = record["year"]
+    return {"id": pmid, "text": text, "metadata": metadata}
+
+
+class PubMedHarvester:
+    """Page a PubMed search into the RAG store in large, parallel batches."""
+
+    def __init__(
+        self,
+        pipeline: FlexibleRAGPipeline,
+        *,
+        batch_size: int = 500,
+        workers: int = 3,
+        http: Optional[HTTPClient] = None,
+        base_url: Optional[str] = None,
+        cache: Optional[PubMedCache] = None,
+        ingest_batch_size: int = 256,
+        checkpoint_interval: int = 10,
+        chunk_workers: int = 0,
+        timeout: float = 60,
+    ) -> None:
+        self.pipeline = pipeline
+        self.batch_size = max(batch_size, 1)
+        self.workers = max(workers, 1)
+        self.http = http or tools.http_session
+        self.base_url = base_url or tools.EUTILS_BASE_URL
+        self.cache = cache
+        self.ingest_batch_size = ingest_batch_size
+        self.checkpoint_interval = checkpoint_interval
+        # Abstracts are one or two chunks, so chunking in-process is cheaper
+        # than shipping them to a worker pool.
+        self.chunk_workers = chunk_workers
+        self.timeout = timeout
+        self.fetched = 0
+
+    def search(self, query: str, **filters: Any) -> SearchHistory:
+        """Run ``esearch`` and keep the result set on the history server."""
+
+        response = self.http.get(
+            self.base_url + "esearch.fcgi",
+            params=tools.eutils_params(
+                db="pubmed", term=query, usehistory="y", retmax=0, retmode="json", **filters
+            ),
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        result = response.json()["esearchresult"]
+        return SearchHistory(int(result["count"]), result["webenv"], result["querykey"])
+
+    def fetch_batch(self, history: SearchHistory, retstart: int, retmax: int) -> List[Dict[str, Any]]:
+        """Fetch and parse records ``retstart .. retstart + retmax`` of ``history``."""
+
+        response = self.http.get(
+            self.base_url + "efetch.fcgi",
+            params=tools.eutils_params(
+                db="pubmed",
+                WebEnv=history.webenv,
+                query_key=history.query_key,
+                retstart=retstart,
+                retmax=retmax,
+                retmode="xml",
+            ),
+            timeout=self.timeout,
+            stream=True,
+        )
+        with response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            records = [record for record in iter_pubmed_articles(response.raw) if record["pmid"]]
+        if self.cache is not None:
+            # Harvested articles also answer later search_pubmed calls.
+            self.cache.put_records({record["pmid"]: record for record in records})
+        return records
+
+    def documents(
+        self,
+        query: str,
+        *,
+        start: int = 0,
+        max_records: Optional[int] = None,
+        **filters: Any,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield one document per search result from position ``start`` on.
+
+        Exactly one document is yielded per result position; records
+        missing from a batch (e.g. withdrawn articles) are padded with empty
+        documents at the end of it, so document counts line up with history
+        positions and a resumed run never skips an article.
+        """
+
+        history = self.search(query, **filters)
+        total = history.count
+        if max_records is not None:
+            total = min(total, max_records)
+        if total > HISTORY_LIMIT:
+            logger.warning(
+                "PubMed returns only the first %d of %d results; narrow the query.",
+                HISTORY_LIMIT,
+                total,
+            )
+            total = HISTORY_LIMIT
+        logger.info("Harvesting %d PubMed records for %r from %d.", total, query, start)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pubmed-harvest") as pool:
+            in_flight: Deque[Future] = deque()
+            expected: Deque[int] = deque()
+            retstarts = iter(range(start, total, self.batch_size))
+
+            def submit() -> bool:
+                retstart = next(retstarts, None)
+                if retstart is None:
+                    return False
+                retmax = min(self.batch_size, total - retstart)
+                in_flight.append(pool.submit(self.fetch_batch, history, retstart, retmax))
+                expected.append(retmax)
+                return True
+
+            while len(in_flight) < self.workers * 2 and submit():
+                pass
+            while in_flight:
+                records = in_flight.popleft().result()
+                retmax = expected.popleft()
+                submit()
+                self.fetched += len(records)
+                for record in records[:retmax]:
+                    yield article_document(record)
+                for _ in range(retmax - len(records)):
+                    yield {"text": ""}
+
+    def harvest(
+        self,
+        query: str,
+        *,
+        checkpoint_path: Optional[str] = None,
+        max_records: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **filters: Any,
+    ) -> IngestStats:
+        """Ingest every result of ``query``, resuming from ``checkpoint_path``.
+
+        ``filters`` are extra esearch parameters such as ``mindate``,
+        ``maxdate`` and ``datetype``. Use one checkpoint file per query.
+        """
+
+        ingestor = BulkIngestor(
+            self.pipeline,
+            batch_size=self.ingest_batch_size,
+            workers=self.chunk_workers,
+            docs_per_task=self.batch_size,  # one chunking task per efetch batch
+            checkpoint_path=checkpoint_path,
+            checkpoint_interval=self.checkpoint_interval,
+            metadata=metadata,
+        )
+        start = int(ingestor.load_checkpoint().get("documents", 0))
+        documents = self.documents(query, start=start, max_records=max_records, **filters)
+        return ingestor.ingest(documents, positioned=True)
+
+
+__all__ = ["HISTORY_LIMIT", "PubMedHarvester", "SearchHistory", "article_document"]
+
+
+def main() -> None:
+    import rag
+
+    parser = argparse.ArgumentParser(description="Harvest a PubMed search into the RAG store.")
+    parser.add_argument("query", help="PubMed query, e.g. 'crispr AND 2023[dp]'")
+    parser.add_argument("--checkpoint", help="Resume file for this query")
+    parser.add_argument("--max-records", type=int, default=None)
+    parser.add_argument("--mindate", help="Earliest publication date (YYYY/MM/DD)")
+    parser.add_argument("--maxdate", help="Latest publication date (YYYY/MM/DD)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    filters = {}
+    if args.mindate or args.maxdate:
+        # E-utilities ignores a date range unless both ends are given.
+        filters = {
+            "datetype": "pdat",
+            "mindate": args.mindate or "1800",
+            "maxdate": args.maxdate or "3000",
+        }
+    stats = rag.harvest_pubmed(
+        args.query,
+        checkpoint_path=args.checkpoint,
+        max_records=args.max_records,
+        **filters,
+    )
+    print(json.dumps(stats.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Streaming parser for PubMed efetch XML.
+
+Building the whole efetch document with ``ElementTree.fromstring`` and then
+running XPath lookups per article keeps every article in memory at once, which
+matters once hundreds of records are fetched per request for RAG ingestion.
+``iter_pubmed_articles`` walks the response with ``iterparse``, extracts each
+``PubmedArticle`` as soon as its closing tag is seen and then clears it, so
+memory stays flat however many articles the response holds.
+"""
+from __future__ import annotations
+
+import io
+import re
+from typing import IO, Any, Dict, Iterator, List, Optional, Union
+from xml.etree import ElementTree
+
+NO_TITLE = "No title found"
+NO_ABSTRACT = "No abstract available."
+_YEAR = re.compile(r"\d{4}")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _text(element: Optional[ElementTree.Element]) -> str:
+    """All text inside ``element`` (including inline markup such as ``<i>``)."""
+
+    if element is None:
+        return ""
+    return _WHITESPACE.sub(" ", "".join(element.itertext())).strip()
+
+
+def _abstract(article: ElementTree.Element) -> str:
+    # Structured abstracts split into labelled sections (BACKGROUND, METHODS, ...).
+    sections = []
+    for section in article.iterfind("Abstract/AbstractText"):
+        text = _text(section)
+        if not text:
+            continue
+        label = section.get("Label")
+        sections.append(f"{label}: {text}" if label else text)
+    return "\n".join(sections)
+
+
+def _authors(article: ElementTree.Element) -> List[str]:
+    authors = []
+    for author in article.iterfind("AuthorList/Author"):
+        collective = _text(author.find("CollectiveName"))
+        if collective:
+            authors.append(collective)
+            continue
+        last = _text(author.find("LastName"))
+        initials = _text(author.find("Initials")) or _text(author.find("ForeName"))
+        if last:
+            authors.append(f"{last} {initials}".strip())
+    return authors
+
+
+def _year(article: ElementTree.Element) -> Optional[int]:
+    pub_date = article.find("Journal/JournalIssue/PubDate")
+    if pub_date is None:
+        return None
+    year = _text(pub_date.find("Year"))
+    if not year:
+        # e.g. <MedlineDate>1998 Dec-1999 Jan</MedlineDate>
+        match = _YEAR.search(_text(pub_date.find("MedlineDate")))
+        year = match.group(0) if match else ""
+    return int(year) if year.isdigit() else None
+
+
+def parse_article(element: ElementTree.Element) -> Dict[str, Any]:
+    """Extract the fields we use from one ``PubmedArticle`` element."""
+
+    citation = element.find("MedlineCitation")
+    if citation is None:
+        citation = element
+    article = citation.find("Article")
+    if article is None:
+        article = ElementTree.Element("Article")
+    return {
+        "pmid": _text(citation.find("PMID")),
+        "title": _text(article.find("ArticleTitle")) or NO_TITLE,
+        "abstract": _abstract(article) or NO_ABSTRACT,
+        "authors": _authors(article),
+        "journal": _text(article.find("Journal/Title")) or _text(citation.find("MedlineJournalInfo/MedlineTA")),
+        "year": _year(article),
+        "mesh_terms": [
+            _text(descriptor)
+            for descriptor in citation.iterfind("MeshHeadingList/MeshHeading/DescriptorName")
+        ],
+    }
+
+
+def iter_pubmed_articles(source: Union[bytes, str, IO[bytes]]) -> Iterator[Dict[str, Any]]:
+    """Yield one parsed record per ``PubmedArticle`` in an efetch response.
+
+    ``source`` is the response body or a binary file-like object (for example
+    a streamed ``response.raw``), which is consumed incrementally.
+    """
+
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    events = ElementTree.iterparse(source, events=("start", "end"))
+    root = None
+    for event, element in events:
+        if event == "start":
+            if root is None:
+                root = element
+            continue
+        if element.tag == "PubmedArticle":
+            yield parse_article(element)
+            # Drop the finished article; the root would otherwise keep
+            # every (empty) child alive for the rest of the document.
+            element.clear()
+            if root is not None:
+                root.clear()
+
+
+def parse_pubmed_articles(source: Union[bytes, str, IO[bytes]]) -> Dict[str, Dict[str, Any]]:
+    """Map PMID -> record for every article in an efetch response."""
+
+    return {record["pmid"]: record for record in iter_pubmed_articles(source)}
+
+
+__all__ = ["NO_ABSTRACT", "NO_TITLE", "iter_pubmed_articles", "parse_article", "parse_pubmed_articles"]
@@ -2,20 +2,73 @@
 
 from __future__ import annotations
 
-from typing import Dict, Iterable, List, Optional
+import atexit
+from typing import Dict, Iterable, List, Optional, Sequence, Union
 
 import config
-from rag_pipeline import FlexibleRAGPipeline, SearchResult
+import subsystems
+from rag_ingest import BulkIngestor, IngestStats
+from rag_pipeline import ANNIndexConfig, FlexibleRAGPipeline, SearchResult
 
 
-pipeline = FlexibleRAGPipeline(
-    config.RAG_MODEL,
-    chunk_size=config.RAG_CHUNK_SIZE,
-    default_top_k=config.RAG_TOP_K,
-    index_path=config.RAG_INDEX_PATH,
-    documents_path=config.RAG_DOCUMENTS_PATH,
-    auto_load=True,
-)
+def _build_pipeline() -> FlexibleRAGPipeline:
+    """Construct the shared pipeline and read the persisted index."""
+
+    pipeline = FlexibleRAGPipeline(
+        config.RAG_MODEL,
+        chunk_size=config.RAG_CHUNK_SIZE,
+        default_top_k=config.RAG_TOP_K,
+        index_factory=config.RAG_INDEX_FACTORY,
+        ann_config=ANNIndexConfig(
+            promotion_threshold=config.RAG_ANN_PROMOTION_THRESHOLD,
+            nprobe=config.RAG_ANN_NPROBE,
+            ef_search=config.RAG_ANN_EF_SEARCH,
+        ),
+        index_path=config.RAG_INDEX_PATH,
+        documents_path=config.RAG_DOCUMENTS_PATH,
+        auto_load=True,
+        persistence_mode=config.RAG_PERSISTENCE_MODE,
+        wal_flush_interval=config.RAG_WAL_FLUSH_INTERVAL,
+        wal_flush_batch_size=config.RAG_WAL_FLUSH_BATCH_SIZE,
+        wal_compact_threshold=config.RAG_WAL_COMPACT_THRESHOLD,
+        query_cache_size=config.RAG_QUERY_CACHE_SIZE,
+        query_cache_max_bytes=config.RAG_QUERY_CACHE_MAX_BYTES,
+        deduplicate=config.RAG_DEDUPLICATE,
+        embedding_cache_path=config.RAG_EMBEDDING_CACHE_PATH,
+        document_format=config.RAG_DOCUMENT_FORMAT,
+        mmap_index=config.RAG_MMAP_INDEX,
+        filter_exact_threshold=config.RAG_FILTER_EXACT_THRESHOLD,
+        embedding_server=config.RAG_EMBEDDING_SERVER,
+        embedding_backend=config.RAG_EMBEDDING_BACKEND,
+        embedding_backend_dir=config.RAG_ONNX_CACHE_DIR,
+        vector_codec=config.RAG_VECTOR_CODEC,
+        rescore=config.RAG_RESCORE,
+        rescore_factor=config.RAG_RESCORE_FACTOR,
+        hybrid_search=config.RAG_HYBRID_SEARCH,
+        keyword_weight=config.RAG_HYBRID_KEYWORD_WEIGHT,
+        identifier_boost=config.RAG_HYBRID_IDENTIFIER_BOOST,
+        rrf_k=config.RAG_HYBRID_RRF_K,
+        keyword_budget=config.RAG_HYBRID_KEYWORD_BUDGET,
+    )
+    atexit.register(pipeline.close)
+    return pipeline
+
+
+_pipeline = subsystems.register("rag_index", _build_pipeline)
+subsystems.register("embedder", lambda: get_pipeline().warm_up())
+
+
+def get_pipeline() -> FlexibleRAGPipeline:
+    """Return the shared pipeline, building it (and loading the index) on first use."""
+
+    return _pipeline.get()
+
+
+def __getattr__(name: str) -> object:
+    # ``rag.pipeline`` predates the lazy registry; keep it working.
+    if name == "pipeline":
+        return get_pipeline()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def add_to_rag(
@@ -26,7 +79,7 @@ def add_to_rag(
 ) -> List[SearchResult]:
     """Add pre-chunked strings directly to the vector store."""
 
-    added_chunks = pipeline.add_texts(
+    added_chunks = get_pipeline().add_texts(
         chunks,
         metadata=metadata,
         source_id=source_id,
@@ -49,7 +102,7 @@ def ingest_documents(
 ) -> List[SearchResult]:
     """Ingest raw documents with automatic chunking."""
 
-    added_chunks = pipeline.add_texts(
+    added_chunks = get_pipeline().add_texts(
         documents,
         metadata=metadata,
         source_id=source_id,
@@ -64,6 +117,69 @@ def ingest_documents(
     ]
 
 
+def ingest_corpus(
+    source: Union[str, Iterable[object]],
+    *,
+    checkpoint_path: Optional[str] = None,
+    metadata: Optional[Dict[str, str]] = None,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> IngestStats:
+    """Stream a large corpus (file path or iterable of documents) into the store.
+
+    Progress is checkpointed to ``checkpoint_path`` so rerunning the same
+    call after an interruption resumes where it stopped.
+    """
+
+    ingestor = BulkIngestor(
+        get_pipeline(),
+        batch_size=batch_size or config.RAG_INGEST_BATCH_SIZE,
+        workers=config.RAG_INGEST_WORKERS if workers is None else workers,
+        checkpoint_path=checkpoint_path,
+        checkpoint_interval=config.RAG_INGEST_CHECKPOINT_INTERVAL,
+        metadata=metadata,
+    )
+    if isinstance(source, str):
+        return ingestor.ingest_file(source)
+    return ingestor.ingest(source)
+
+
+def harvest_pubmed(
+    query: str,
+    *,
+    checkpoint_path: Optional[str] = None,
+    max_records: Optional[int] = None,
+    metadata: Optional[Dict[str, str]] = None,
+    **filters: object,
+) -> IngestStats:
+    """Ingest full abstracts for every PubMed result of ``query``.
+
+    Extra keyword arguments are passed to esearch (e.g. ``mindate``,
+    ``maxdate``). Rerunning with the same ``checkpoint_path`` resumes.
+    """
+
+    # Imported lazily: the harvester pulls in the tools module and its
+    # optional chemistry / sequence dependencies.
+    import tools
+    from pubmed_harvest import PubMedHarvester
+
+    harvester = PubMedHarvester(
+        get_pipeline(),
+        batch_size=config.PUBMED_HARVEST_BATCH_SIZE,
+        workers=config.PUBMED_HARVEST_WORKERS,
+        cache=tools.get_pubmed_cache(),
+        ingest_batch_size=config.RAG_INGEST_BATCH_SIZE,
+        checkpoint_interval=config.RAG_INGEST_CHECKPOINT_INTERVAL,
+    )
+    return harvester.harvest(
+        query,
+        checkpoint_path=checkpoint_path,
+        max_records=max_records,
+        metadata=metadata,
+        **filters,
+    )
+
+
 def retrieve_structured(
     query: str,
     *,
@@ -72,13 +188,28 @@ def retrieve_structured(
 ) -> List[SearchResult]:
     """Retrieve structured search results for advanced consumers."""
 
-    return pipeline.query(
+    return get_pipeline().query(
         query,
         top_k=top_k,
         metadata_filters=metadata_filters,
     )
 
 
+def retrieve_structured_batch(
+    queries: Sequence[str],
+    *,
+    top_k: Optional[int] = None,
+    metadata_filters: Optional[Dict[str, object]] = None,
+) -> List[List[SearchResult]]:
+    """Retrieve structured results for several queries in one batched search."""
+
+    return get_pipeline().query_batch(
+        queries,
+        top_k=top_k,
+        metadata_filters=metadata_filters,
+    )
+
+
 def retrieve_from_rag(
     query: str,
     top_k: Optional[int] = None,
@@ -97,7 +228,14 @@ def save_rag_index(
     index_path: Optional[str] = None,
     documents_path: Optional[str] = None,
 ) -> None:
-    pipeline.save(index_path=index_path, documents_path=documents_path)
+    get_pipeline().save(index_path=index_path, documents_path=documents_path)
+
+
+def persist_rag_index() -> None:
+    """Cheaply record recent additions; safe to call after every request."""
+
+    if _pipeline.ready:  # nothing to record before the pipeline is first used
+        get_pipeline().persist()
 
 
 def load_rag_index(
@@ -105,20 +243,25 @@ def load_rag_index(
     index_path: Optional[str] = None,
     documents_path: Optional[str] = None,
 ) -> None:
-    pipeline.load(index_path=index_path, documents_path=documents_path)
+    get_pipeline().load(index_path=index_path, documents_path=documents_path)
 
 
 def reset_rag_index() -> None:
-    pipeline.reset()
+    get_pipeline().reset()
 
 
 __all__ = [
     "add_to_rag",
+    "get_pipeline",
+    "harvest_pubmed",
+    "ingest_corpus",
     "ingest_documents",
     "load_rag_index",
+    "persist_rag_index",
     "pipeline",
     "retrieve_from_rag",
     "retrieve_structured",
+    "retrieve_structured_batch",
     "save_rag_index",
     "reset_rag_index",
     "SearchResult",
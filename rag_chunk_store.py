@@ -0,0 +1,303 @@
+"""Memory-mapped, lazily materialised storage for RAG document chunks.
+
+Loading ``documents.jsonl`` used to parse every chunk into a Python object,
+so start-up time and heap usage grew with the corpus even though a query only
+needs its ``top_k`` hits. ``ChunkStore`` instead keeps a snapshot in a single
+packed file that is memory-mapped and decoded one row at a time:
+
+* a UTF-8 text blob with an ``int64`` offset table,
+* the chunk ids stored the same way, and
+* metadata stored column by column (one offset table and blob of
+  JSON-encoded cells per key) so a single field can be scanned without
+  touching texts or other fields.
+
+Chunks added after the snapshot was loaded are kept in an in-memory tail until
+the next snapshot folds them in. Legacy JSONL documents files are still read.
+
+File layout: ``MAGIC`` followed by 8-byte aligned sections, then a JSON footer
+describing them, the footer length as ``uint64`` and ``MAGIC`` again.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import mmap
+import struct
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"RAGCHNK1"
+_FOOTER_LENGTH = struct.Struct("<Q")
+_EMPTY = b""
+_WRITE_BLOCK_BYTES = 1 << 20
+
+# (chunk id, UTF-8 text, {metadata key: JSON-encoded value})
+RawRow = Tuple[str, bytes, Dict[str, bytes]]
+
+
+def _encode_cell(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def is_chunk_store(path: str) -> bool:
+    """Return whether ``path`` holds a packed chunk store (vs. legacy JSONL)."""
+
+    try:
+        with open(path, "rb") as handle:
+            return handle.read(len(MAGIC)) == MAGIC
+    except FileNotFoundError:
+        return False
+
+
+class _PackedColumn:
+    """Variable-width cells addressed through an ``int64`` offset table."""
+
+    def __init__(self, buffer: mmap.mmap, offsets: Tuple[int, int], data: Tuple[int, int]) -> None:
+        self._buffer = buffer
+        self._offsets = np.frombuffer(buffer, dtype="<i8", count=offsets[1] // 8, offset=offsets[0])
+        self._data_start = data[0]
+
+    def cell(self, row: int) -> bytes:
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        if start == end:
+            return _EMPTY
+        return self._buffer[self._data_start + start:self._data_start + end]
+
+
+class _PackedFile:
+    """Read-only view over one packed snapshot file."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as handle:
+            self._buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        trailer = len(MAGIC) + _FOOTER_LENGTH.size
+        if self._buffer[:len(MAGIC)] != MAGIC or self._buffer[-len(MAGIC):] != MAGIC:
+            raise ValueError(f"{path} is not a packed chunk store")
+        (footer_length,) = _FOOTER_LENGTH.unpack_from(self._buffer, len(self._buffer) - trailer)
+        footer_start = len(self._buffer) - trailer - footer_length
+        footer = json.loads(self._buffer[footer_start:footer_start + footer_length].decode("utf-8"))
+
+        self.count: int = footer["count"]
+        self.texts = _PackedColumn(self._buffer, *footer["texts"])
+        self.ids = _PackedColumn(self._buffer, *footer["ids"])
+        self.columns: Dict[str, _PackedColumn] = {
+            name: _PackedColumn(self._buffer, *sections)
+            for name, sections in footer["columns"].items()
+        }
+
+    def raw_row(self, row: int) -> RawRow:
+        cells = {}
+        for name, column in self.columns.items():
+            cell = column.cell(row)
+            if cell:
+                cells[name] = cell
+        return self.ids.cell(row).decode("utf-8"), self.texts.cell(row), cells
+
+
+def write_chunk_store(
+    handle,
+    count: int,
+    texts: Iterable[bytes],
+    ids: Iterable[bytes],
+    columns: Dict[str, Iterable[bytes]],
+) -> None:
+    """Write ``count`` rows to the binary ``handle`` in the packed layout.
+
+    Every iterable yields one encoded cell per row (empty bytes for a missing
+    metadata value) and is consumed once. Cell payloads are streamed to
+    ``handle`` in blocks of ``_WRITE_BLOCK_BYTES``; only the column being
+    written has its ``int64`` offset table (8 bytes per row) held in memory,
+    and it is written after the payload (the footer records both positions).
+    """
+
+    position = 0
+
+    def pad() -> None:
+        nonlocal position
+        padding = -position % 8
+        if padding:
+            handle.write(b"\0" * padding)
+            position += padding
+
+    def emit(payload: bytes) -> Tuple[int, int]:
+        nonlocal position
+        start = position
+        handle.write(payload)
+        position += len(payload)
+        pad()
+        return start, len(payload)
+
+    def emit_cells(cells: Iterable[bytes]) -> List[Tuple[int, int]]:
+        nonlocal position
+        offsets = np.zeros(count + 1, dtype="<i8")
+        start = position
+        written = 0
+        block = bytearray()
+        for row, cell in enumerate(cells):
+            block += cell
+            offsets[row + 1] = written + len(block)
+            if len(block) >= _WRITE_BLOCK_BYTES:
+                handle.write(block)
+                written += len(block)
+                block = bytearray()
+        handle.write(block)
+        written += len(block)
+        position += written
+        pad()
+        return [emit(offsets.tobytes()), (start, written)]
+
+    emit(MAGIC)
+    footer = {
+        "count": count,
+        "texts": emit_cells(texts),
+        "ids": emit_cells(ids),
+        "columns": {name: emit_cells(cells) for name, cells in columns.items()},
+    }
+    encoded = json.dumps(footer).encode("utf-8")
+    handle.write(encoded)
+    handle.write(_FOOTER_LENGTH.pack(len(encoded)))
+    handle.write(MAGIC)
+
+
+class ChunkStore:
+    """Sequence of document chunks: a mapped snapshot plus an in-memory tail.
+
+    Indexing materialises a fresh chunk object via ``chunk_factory`` (called
+    as ``chunk_factory(text=..., metadata=..., id=...)``) for snapshot rows;
+    mutate chunks only through the tail, i.e. before they are snapshotted.
+    """
+
+    def __init__(
+        self,
+        chunk_factory: Callable[..., Any],
+        path: Optional[str] = None,
+        tail: Optional[List[Any]] = None,
+        *,
+        _packed: Optional[_PackedFile] = None,
+    ) -> None:
+        self._chunk_factory = chunk_factory
+        self._packed = _packed or (_PackedFile(path) if path is not None else None)
+        self._tail: List[Any] = list(tail or [])
+
+    @property
+    def snapshot_count(self) -> int:
+        return self._packed.count if self._packed is not None else 0
+
+    def __len__(self) -> int:
+        return self.snapshot_count + len(self._tail)
+
+    def __getitem__(self, position: int) -> Any:
+        position = int(position)
+        if position < 0:
+            position += len(self)
+        base = self.snapshot_count
+        if position >= base:
+            return self._tail[position - base]
+        if position < 0:
+            raise IndexError(position)
+        chunk_id, text, cells = self._packed.raw_row(position)
+        return self._chunk_factory(
+            text=text.decode("utf-8"),
+            metadata={name: json.loads(cell) for name, cell in cells.items()},
+            id=chunk_id,
+        )
+
+    def __iter__(self) -> Iterator[Any]:
+        for position in range(len(self)):
+            yield self[position]
+
+    def append(self, chunk: Any) -> None:
+        self._tail.append(chunk)
+
+    def extend(self, chunks: Sequence[Any]) -> None:
+        self._tail.extend(chunks)
+
+    def ids(self) -> List[str]:
+        """All chunk ids, without decoding texts or metadata."""
+
+        snapshot = []
+        if self._packed is not None:
+            snapshot = [
+                self._packed.ids.cell(row).decode("utf-8") for row in range(self._packed.count)
+            ]
+        return snapshot + [chunk.id for chunk in self._tail]
+
+    def column_names(self) -> List[str]:
+        """Every metadata field present in at least one row."""
+
+        names: Dict[str, None] = dict.fromkeys(self._packed.columns if self._packed is not None else ())
+        for chunk in self._tail:
+            names.update(dict.fromkeys(chunk.metadata))
+        return list(names)
+
+    def column(self, name: str) -> List[Any]:
+        """Values of one metadata field for every row (``None`` when absent)."""
+
+        values: List[Any] = []
+        packed_column = self._packed.columns.get(name) if self._packed is not None else None
+        if packed_column is not None:
+            for row in range(self._packed.count):
+                cell = packed_column.cell(row)
+                values.append(json.loads(cell) if cell else None)
+        else:
+            values.extend([None] * self.snapshot_count)
+        values.extend(chunk.metadata.get(name) for chunk in self._tail)
+        return values
+
+    def frozen(self) -> "ChunkStore":
+        """Cheap point-in-time copy, safe to serialise outside the owner's lock."""
+
+        return ChunkStore(self._chunk_factory, tail=self._tail, _packed=self._packed)
+
+    def starts_with(self, other: "ChunkStore") -> bool:
+        """Whether ``other`` (e.g. an earlier :meth:`frozen` copy) is a prefix of this store."""
+
+        if self._packed is not other._packed or len(self._tail) < len(other._tail):
+            return False
+        count = len(other._tail)
+        return count == 0 or self._tail[count - 1] is other._tail[count - 1]
+
+    def rebased(self, path: str, snapshot_count: int) -> "ChunkStore":
+        """Map the snapshot at ``path`` holding this store's first rows.
+
+        Rows appended after those ``snapshot_count`` stay in the new tail, so
+        memory held by the tail is released once it has been written out.
+        """
+
+        packed = _PackedFile(path)
+        if packed.count != snapshot_count:
+            raise ValueError("Snapshot row count does not match the chunk store.")
+        tail = self._tail[snapshot_count - self.snapshot_count:]
+        return ChunkStore(self._chunk_factory, tail=tail, _packed=packed)
+
+    def write(self, handle) -> None:
+        """Write every row to ``handle``, copying snapshot cells without decoding."""
+
+        packed = self._packed
+        snapshot_rows = range(self.snapshot_count)
+        names = self.column_names()
+
+        def column_cells(name: str) -> Iterator[bytes]:
+            packed_column = packed.columns.get(name) if packed is not None else None
+            for row in snapshot_rows:
+                yield packed_column.cell(row) if packed_column is not None else _EMPTY
+            for chunk in self._tail:
+                yield _encode_cell(chunk.metadata[name]) if name in chunk.metadata else _EMPTY
+
+        write_chunk_store(
+            handle,
+            len(self),
+            texts=itertools.chain(
+                (packed.texts.cell(row) for row in snapshot_rows),
+                (chunk.text.encode("utf-8") for chunk in self._tail),
+            ),
+            ids=itertools.chain(
+                (packed.ids.cell(row) for row in snapshot_rows),
+                (chunk.id.encode("utf-8") for chunk in self._tail),
+            ),
+            columns={name: column_cells(name) for name in names},
+        )
+
+
+__all__ = ["ChunkStore", "MAGIC", "is_chunk_store", "write_chunk_store"]
@@ -0,0 +1,140 @@
+"""Text chunking shared by the RAG pipeline and the bulk ingest workers.
+
+Kept free of FAISS / model imports so process-pool workers start quickly.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+def chunk_text(
+    text: str,
+    *,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    strategy: Optional[str] = "auto",
+) -> List[str]:
+    """Split ``text`` into chunks of at most ``chunk_size`` characters.
+
+    ``strategy`` is ``"auto"`` (paragraphs, then sentences, then characters),
+    ``"paragraph"``, ``"sentence"``, ``"character"`` or ``"none"``.
+    """
+
+    chunk_size = max(chunk_size, 1)
+    effective_overlap = chunk_overlap
+    max_overlap = chunk_size - 1
+    if effective_overlap < 0:
+        effective_overlap = 0
+    if effective_overlap > max_overlap:
+        effective_overlap = max_overlap
+
+    chosen_strategy = (strategy or "auto").lower()
+    cleaned = text.strip()
+    if not cleaned:
+        return []
+
+    if chosen_strategy == "none":
+        return [cleaned]
+
+    if chosen_strategy == "paragraph":
+        units = [para.strip() for para in cleaned.split("\n\n") if para.strip()]
+        return _chunk_units(units, chunk_size, effective_overlap)
+
+    if chosen_strategy == "sentence":
+        units = [s.strip() for s in re.split(r"(?<=[.!?])\s+", cleaned) if s.strip()]
+        return _chunk_units(units, chunk_size, effective_overlap)
+
+    if chosen_strategy == "auto":
+        units = [para.strip() for para in cleaned.split("\n\n") if para.strip()]
+        if units:
+            return _chunk_units(units, chunk_size, effective_overlap)
+        units = [s.strip() for s in re.split(r"(?<=[.!?])\s+", cleaned) if s.strip()]
+        if units:
+            return _chunk_units(units, chunk_size, effective_overlap)
+
+    # Fallback to raw character-based chunking
+    return _chunk_by_character(cleaned, chunk_size, effective_overlap)
+
+
+def _chunk_units(units: Sequence[str], chunk_size: int, chunk_overlap: int) -> List[str]:
+    if not units:
+        return []
+    chunks: List[str] = []
+    buffer: List[str] = []
+    current_len = 0
+
+    for unit in units:
+        unit_len = len(unit)
+        separator = 1 if buffer else 0  # Account for newline join
+        if current_len + unit_len + separator <= chunk_size:
+            buffer.append(unit)
+            current_len += unit_len + separator
+            continue
+
+        if buffer:
+            chunks.append("\n".join(buffer))
+            if chunk_overlap > 0:
+                overlap_text = chunks[-1][-chunk_overlap:]
+                buffer = [overlap_text]
+                current_len = len(overlap_text)
+            else:
+                buffer = []
+                current_len = 0
+
+        if unit_len >= chunk_size:
+            chunks.extend(_chunk_by_character(unit, chunk_size, chunk_overlap))
+            buffer = []
+            current_len = 0
+        else:
+            buffer = [unit]
+            current_len = len(unit)
+
+    if buffer:
+        chunks.append("\n".join(buffer))
+
+    return chunks
+
+
+def _chunk_by_character(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    if not text:
+        return []
+    if chunk_overlap >= chunk_size:
+        chunk_overlap = max(chunk_size - 1, 0)
+
+    chunks: List[str] = []
+    start = 0
+    text_length = len(text)
+    while start < text_length:
+        end = min(start + chunk_size, text_length)
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end == text_length:
+            break
+        if chunk_overlap > 0:
+            start = max(end - chunk_overlap, start + 1)
+        else:
+            start = end
+    return chunks
+
+
+def chunk_documents(
+    documents: Sequence[Tuple[int, str, Dict[str, Any]]],
+    chunk_size: int,
+    chunk_overlap: int,
+    strategy: Optional[str],
+) -> List[Tuple[int, List[str], Dict[str, Any]]]:
+    """Chunk a batch of ``(ordinal, text, metadata)`` documents (worker entry point)."""
+
+    return [
+        (
+            ordinal,
+            chunk_text(text, chunk_size=chunk_size, chunk_overlap=chunk_overlap, strategy=strategy),
+            metadata,
+        )
+        for ordinal, text, metadata in documents
+    ]
+
+
+__all__ = ["chunk_documents", "chunk_text"]
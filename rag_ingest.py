@@ -0,0 +1,306 @@
+"""Streaming bulk ingestion for large corpora.
+
+``FlexibleRAGPipeline.add_texts`` chunks, embeds and indexes everything it is
+given in one call, which does not scale to multi-gigabyte literature dumps.
+``BulkIngestor`` streams documents from any iterable (or a JSONL / text file),
+chunks them in a process pool while the main process embeds, feeds the
+pipeline fixed-size embedding batches, and periodically checkpoints how many
+input documents are durably stored so an interrupted run can resume.
+
+Usage:
+    python rag_ingest.py corpus.jsonl.gz --checkpoint corpus.ckpt.json
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from rag_chunking import chunk_documents
+from rag_persistence import atomic_write
+from rag_pipeline import DocumentChunk, FlexibleRAGPipeline
+
+logger = logging.getLogger(__name__)
+
+Document = Any  # str, or a mapping with "text" and optional "id" / "metadata"
+
+
+@dataclass
+class IngestStats:
+    """Progress counters for one ingest run."""
+
+    documents: int = 0
+    chunks: int = 0
+    added: int = 0
+    resumed_from: int = 0
+    seconds: float = 0.0
+
+    @property
+    def docs_per_second(self) -> float:
+        return (self.documents - self.resumed_from) / self.seconds if self.seconds else 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        payload = asdict(self)
+        payload["docs_per_second"] = round(self.docs_per_second, 2)
+        payload["chunks_per_second"] = round(self.chunks_per_second, 2)
+        return payload
+
+
+def iter_documents_file(path: str) -> Iterator[Document]:
+    """Stream documents from ``path`` (optionally gzip-compressed).
+
+    ``.jsonl`` / ``.ndjson`` files hold one JSON document per line; any other
+    file is read as plain text with one document per non-empty line.
+    """
+
+    opener = gzip.open if path.endswith(".gz") else open
+    base = path[:-3] if path.endswith(".gz") else path
+    is_json = base.endswith((".jsonl", ".ndjson"))
+    with opener(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            cleaned = line.strip()
+            if not cleaned:
+                continue
+            yield json.loads(cleaned) if is_json else cleaned
+
+
+def _split_document(document: Document) -> Tuple[str, Dict[str, Any]]:
+    if isinstance(document, str):
+        return document, {}
+    if not isinstance(document, dict):
+        return str(document), {}
+    metadata = dict(document.get("metadata") or {})
+    doc_id = document.get("id") or document.get("pmid")
+    if doc_id is not None:
+        metadata.setdefault("source_id", str(doc_id))
+    return str(document.get("text") or ""), metadata
+
+
+class BulkIngestor:
+    """Chunk, embed and index a document stream in bounded memory."""
+
+    def __init__(
+        self,
+        pipeline: FlexibleRAGPipeline,
+        *,
+        batch_size: int = 256,
+        workers: Optional[int] = None,
+        docs_per_task: int = 64,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_interval: int = 10,
+        metadata: Optional[Dict[str, Any]] = None,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        chunking_strategy: Optional[str] = None,
+        progress_interval: float = 10.0,
+        progress: Optional[Callable[[IngestStats], None]] = None,
+    ) -> None:
+        self.pipeline = pipeline
+        self.batch_size = max(batch_size, 1)
+        if workers is None:
+            workers = max((os.cpu_count() or 2) - 1, 1)
+        self.workers = max(workers, 0)
+        self.docs_per_task = max(docs_per_task, 1)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = max(checkpoint_interval, 1)
+        self.metadata = dict(metadata or {})
+        self.chunk_size = chunk_size or pipeline.chunk_size
+        self.chunk_overlap = pipeline.chunk_overlap if chunk_overlap is None else chunk_overlap
+        self.chunking_strategy = chunking_strategy or pipeline.chunking_strategy
+        self.progress_interval = progress_interval
+        self.progress = progress
+
+    # ------------------------------------------------------------------
+    # Checkpoints
+    # ------------------------------------------------------------------
+    def load_checkpoint(self) -> Dict[str, int]:
+        if self.checkpoint_path is None or not os.path.exists(self.checkpoint_path):
+            return {"documents": 0, "chunks": 0, "added": 0}
+        with open(self.checkpoint_path, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def _commit(self, stats: IngestStats, documents_done: int) -> None:
+        """Make everything added so far durable, then record the resume point."""
+
+        if self.checkpoint_path is None:
+            return
+        if self.pipeline.persistence_mode == "append":
+            self.pipeline.flush()
+        else:
+            self.pipeline.save()
+        payload = {"documents": documents_done, "chunks": stats.chunks, "added": stats.added}
+        atomic_write(self.checkpoint_path, lambda handle: json.dump(payload, handle))
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+    def ingest_file(self, path: str) -> IngestStats:
+        return self.ingest(iter_documents_file(path))
+
+    def ingest(self, documents: Iterable[Document], *, positioned: bool = False) -> IngestStats:
+        """Ingest ``documents``, skipping any already covered by the checkpoint.
+
+        Sources that can seek (see :meth:`load_checkpoint`) pass
+        ``positioned=True`` when ``documents`` already starts after the
+        checkpointed ones, so nothing is read just to be skipped. In
+        ``append`` mode the write-ahead log is compacted once at the end
+        rather than each time it crosses its threshold.
+        """
+
+        with self.pipeline.deferred_compaction():
+            return self._ingest(documents, positioned)
+
+    def _ingest(self, documents: Iterable[Document], positioned: bool) -> IngestStats:
+        checkpoint = self.load_checkpoint()
+        resume_from = int(checkpoint.get("documents", 0))
+        stats = IngestStats(
+            documents=resume_from,
+            chunks=int(checkpoint.get("chunks", 0)),
+            added=int(checkpoint.get("added", 0)),
+            resumed_from=resume_from,
+        )
+        if resume_from:
+            logger.info("Resuming ingest after %d documents.", resume_from)
+
+        if positioned:
+            numbered: Iterable[Tuple[int, Document]] = enumerate(documents, resume_from)
+        else:
+            numbered = itertools.islice(enumerate(documents), resume_from, None)
+        started = time.perf_counter()
+        last_report = started
+
+        pending: List[DocumentChunk] = []
+        # (cumulative chunk count once the document is complete, ordinal)
+        boundaries: Deque[Tuple[int, int]] = deque()
+        emitted = flushed = 0
+        documents_done = resume_from
+        batches_since_commit = 0
+
+        for ordinal, texts, metadata in self._chunked(numbered):
+            for chunk_index, text in enumerate(texts):
+                chunk_meta = dict(self.metadata)
+                chunk_meta.update(metadata)
+                chunk_meta["document_index"] = ordinal
+                chunk_meta["chunk_index"] = chunk_index
+                pending.append(DocumentChunk(text=text, metadata=chunk_meta))
+            emitted += len(texts)
+            boundaries.append((emitted, ordinal))
+
+            while len(pending) >= self.batch_size:
+                batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+                stats.added += len(self.pipeline.add_chunks(batch))
+                stats.chunks += len(batch)
+                flushed += len(batch)
+                batches_since_commit += 1
+
+            while boundaries and boundaries[0][0] <= flushed:
+                documents_done = boundaries.popleft()[1] + 1
+            stats.documents = documents_done
+            stats.seconds = time.perf_counter() - started
+
+            if batches_since_commit >= self.checkpoint_interval:
+                self._commit(stats, documents_done)
+                batches_since_commit = 0
+            if time.perf_counter() - last_report >= self.progress_interval:
+                last_report = time.perf_counter()
+                self._report(stats)
+
+        if pending:
+            stats.added += len(self.pipeline.add_chunks(pending))
+            stats.chunks += len(pending)
+        if boundaries:
+            documents_done = boundaries[-1][1] + 1
+        stats.documents = documents_done
+        stats.seconds = time.perf_counter() - started
+        self._commit(stats, documents_done)
+        self._report(stats)
+        return stats
+
+    def _report(self, stats: IngestStats) -> None:
+        logger.info(
+            "Ingested %d documents (%d chunks, %d new) at %.1f docs/s.",
+            stats.documents,
+            stats.chunks,
+            stats.added,
+            stats.docs_per_second,
+        )
+        if self.progress is not None:
+            self.progress(stats)
+
+    def _tasks(
+        self, numbered: Iterable[Tuple[int, Document]]
+    ) -> Iterator[List[Tuple[int, str, Dict[str, Any]]]]:
+        iterator = iter(numbered)
+        while True:
+            task = [
+                (ordinal, *_split_document(document))
+                for ordinal, document in itertools.islice(iterator, self.docs_per_task)
+            ]
+            if not task:
+                return
+            yield task
+
+    def _chunked(
+        self, numbered: Iterable[Tuple[int, Document]]
+    ) -> Iterator[Tuple[int, List[str], Dict[str, Any]]]:
+        """Yield ``(ordinal, chunk texts, metadata)`` in input order."""
+
+        options = (self.chunk_size, self.chunk_overlap, self.chunking_strategy)
+        if self.workers == 0:
+            for task in self._tasks(numbered):
+                yield from chunk_documents(task, *options)
+            return
+
+        # Spawned workers import only the lightweight chunking module and
+        # do not inherit the parent's model, index or writer threads.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            in_flight: Deque[Future] = deque()
+            max_in_flight = self.workers * 2
+            for task in self._tasks(numbered):
+                in_flight.append(pool.submit(chunk_documents, task, *options))
+                if len(in_flight) >= max_in_flight:
+                    yield from in_flight.popleft().result()
+            while in_flight:
+                yield from in_flight.popleft().result()
+
+
+__all__ = ["BulkIngestor", "IngestStats", "iter_documents_file"]
+
+
+def main() -> None:
+    import rag
+
+    parser = argparse.ArgumentParser(description="Bulk-ingest a corpus into the RAG store.")
+    parser.add_argument("path", help=".jsonl / .ndjson (optionally .gz) or plain text file")
+    parser.add_argument("--checkpoint", help="Resume file; defaults to <path>.ckpt.json")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    stats = rag.ingest_corpus(
+        args.path,
+        checkpoint_path=args.checkpoint or args.path + ".ckpt.json",
+        batch_size=args.batch_size,
+        workers=args.workers,
+    )
+    print(json.dumps(stats.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
+
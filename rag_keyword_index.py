@@ -0,0 +1,443 @@
+"""BM25 keyword index over RAG chunk text, for hybrid retrieval.
+
+Dense embeddings blur exact identifiers: gene symbols (BRCA1), drug codes
+(CYP2C9), variants (rs334) and accessions (NM_007294.4) look much alike to a
+sentence encoder. ``BM25Index`` scores them lexically and
+``FlexibleRAGPipeline`` merges its ranking with the vector search through
+:func:`reciprocal_rank_fusion`.
+
+Postings are kept as flat arrays, never as per-document dicts:
+
+* a snapshot ("base") in a single memory-mapped file holding the sorted
+  vocabulary (UTF-8 blob + ``int64`` offsets), CSR postings (``int64``
+  offsets, ``int32`` document positions, ``uint16`` term frequencies) and the
+  ``int32`` document lengths, and
+* an in-memory tail of per-term ``array`` postings for chunks added since,
+  folded into a new snapshot by :meth:`BM25Index.snapshot` on save.
+
+A query touches only the postings of its own terms. Terms that occur in more
+than ``max_df_ratio`` of the chunks carry almost no BM25 weight and are
+skipped, which bounds the work per query term.
+
+File layout matches ``rag_chunk_store``: ``MAGIC`` followed by 8-byte aligned
+sections, a JSON footer describing them, the footer length as ``uint64`` and
+``MAGIC`` again.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import math
+import mmap
+import re
+import struct
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+KEYWORD_INDEX_SUFFIX = ".bm25"
+MAGIC = b"RAGBM251"
+_FOOTER_LENGTH = struct.Struct("<Q")
+_MAX_TF = np.iinfo(np.uint16).max
+
+# Words joined by -, ., :, / or _ stay one token (SARS-CoV-2, NM_007294.4,
+# 5-HT2A); their parts are indexed as well so "SARS CoV 2" still matches.
+_TOKEN_RE = re.compile(r"\w+(?:[-.:/]\w+)*")
+_PART_RE = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or that the their "
+    "this to was were which with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms of ``text`` with compound identifiers kept whole."""
+
+    tokens: List[str] = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = _PART_RE.findall(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part not in STOPWORDS)
+    return tokens
+
+
+def is_identifier(token: str) -> bool:
+    """Whether ``token`` (original case) looks like a symbol or code.
+
+    Letters mixed with digits (BRCA1, rs334, NM_007294.4, SARS-CoV-2) or
+    capitals after the first letter (EGFR, mTOR) qualify; ordinary words,
+    hyphenated or not ("long-term"), do not.
+    """
+
+    if not any(char.isalpha() for char in token):
+        return False
+    return any(char.isdigit() for char in token) or any(char.isupper() for char in token[1:])
+
+
+def has_identifier(text: str) -> bool:
+    """Whether ``text`` names at least one identifier (see :func:`is_identifier`)."""
+
+    return any(is_identifier(token) for token in _TOKEN_RE.findall(text))
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Hashable]],
+    weights: Optional[Sequence[float]] = None,
+    *,
+    k: int = 60,
+) -> List[Tuple[Hashable, float]]:
+    """Merge best-first rankings into ``(key, score)`` pairs, best first.
+
+    Each ranking contributes ``weight / (k + rank)`` (ranks start at 1) for
+    every key it contains; a key appearing in several rankings accumulates.
+    """
+
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[Hashable, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class _TermTable:
+    """Sorted UTF-8 terms in a blob, addressable for ``bisect``."""
+
+    def __init__(self, blob: memoryview, offsets: np.ndarray) -> None:
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int) -> bytes:
+        return bytes(self._blob[int(self._offsets[row]):int(self._offsets[row + 1])])
+
+    def find(self, term: bytes) -> int:
+        row = bisect.bisect_left(self, term)
+        return row if row < len(self) and self[row] == term else -1
+
+
+class _Base:
+    """Read-only view over one BM25 snapshot file."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as handle:
+            self._buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        trailer = len(MAGIC) + _FOOTER_LENGTH.size
+        if (
+            len(self._buffer) < 2 * len(MAGIC) + _FOOTER_LENGTH.size
+            or self._buffer[:len(MAGIC)] != MAGIC
+            or self._buffer[-len(MAGIC):] != MAGIC
+        ):
+            raise ValueError(f"{path} is not a BM25 keyword index")
+        (footer_length,) = _FOOTER_LENGTH.unpack_from(self._buffer, len(self._buffer) - trailer)
+        footer_start = len(self._buffer) - trailer - footer_length
+        footer = json.loads(self._buffer[footer_start:footer_start + footer_length].decode("utf-8"))
+
+        def section(name: str, dtype: str) -> np.ndarray:
+            start, length = footer[name]
+            return np.frombuffer(self._buffer, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=start)
+
+        self.count: int = footer["count"]
+        self.total_length: int = footer["total_length"]
+        blob_start, blob_length = footer["terms"]
+        self.terms = _TermTable(
+            memoryview(self._buffer)[blob_start:blob_start + blob_length], section("term_offsets", "<i8")
+        )
+        self.offsets = section("posting_offsets", "<i8")
+        self.docs = section("docs", "<i4")
+        self.tfs = section("tfs", "<u2")
+        self.lengths = section("lengths", "<i4")
+
+    def postings(self, term: bytes) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        row = self.terms.find(term)
+        if row < 0:
+            return None
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return self.docs[start:end], self.tfs[start:end]
+
+
+class KeywordSnapshot:
+    """Frozen copy of a :class:`BM25Index`'s first ``count`` rows, writable to disk."""
+
+    def __init__(
+        self,
+        base: Optional[_Base],
+        tail: Dict[str, Tuple[np.ndarray, np.ndarray]],
+        tail_lengths: np.ndarray,
+        generation: int,
+    ) -> None:
+        self.base = base
+        self.tail = tail
+        self.tail_lengths = tail_lengths
+        self.generation = generation
+        self.count = (base.count if base else 0) + len(tail_lengths)
+
+    def write(self, handle) -> None:
+        """Write the merged snapshot to the binary ``handle``."""
+
+        base = self.base
+        base_terms = [base.terms[row] for row in range(len(base.terms))] if base else []
+        base_counts = np.diff(base.offsets) if base else np.zeros(0, dtype=np.int64)
+        tail_items = sorted((term.encode("utf-8"), postings) for term, postings in self.tail.items())
+        tail_counts = np.array([len(docs) for _, (docs, _) in tail_items], dtype=np.int64)
+
+        # Base and tail vocabularies are both sorted; merge them and scatter
+        # each side's postings into the merged CSR (base rows precede tail rows).
+        merged = sorted(set(base_terms).union(term for term, _ in tail_items))
+        row_of = {term: row for row, term in enumerate(merged)}
+        base_rows = np.array([row_of[term] for term in base_terms], dtype=np.int64)
+        tail_rows = np.array([row_of[term] for term, _ in tail_items], dtype=np.int64)
+        counts = np.zeros(len(merged), dtype=np.int64)
+        counts[base_rows] += base_counts
+        counts[tail_rows] += tail_counts
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype("<i8")
+        docs = np.empty(int(offsets[-1]), dtype="<i4")
+        tfs = np.empty(int(offsets[-1]), dtype="<u2")
+
+        if base is not None and len(base_rows):
+            term_of = np.repeat(np.arange(len(base_rows)), base_counts)
+            within = np.arange(len(base.docs)) - base.offsets[:-1][term_of]
+            target = offsets[base_rows][term_of] + within
+            docs[target] = base.docs
+            tfs[target] = base.tfs
+        if tail_items:
+            base_in_merged = np.zeros(len(merged), dtype=np.int64)
+            base_in_merged[base_rows] = base_counts
+            term_of = np.repeat(np.arange(len(tail_rows)), tail_counts)
+            tail_offsets = np.concatenate([[0], np.cumsum(tail_counts)])
+            within = np.arange(int(tail_offsets[-1])) - tail_offsets[:-1][term_of]
+            target = offsets[tail_rows][term_of] + base_in_merged[tail_rows][term_of] + within
+            docs[target] = np.concatenate([postings[0] for _, postings in tail_items])
+            tfs[target] = np.concatenate([postings[1] for _, postings in tail_items])
+
+        lengths = np.concatenate(
+            [base.lengths if base else np.zeros(0, dtype="<i4"), self.tail_lengths]
+        ).astype("<i4")
+        term_offsets = np.concatenate([[0], np.cumsum([len(term) for term in merged])]).astype("<i8")
+
+        position = 0
+
+        def emit(payload) -> Tuple[int, int]:
+            nonlocal position
+            data = memoryview(payload).cast("B")
+            start = position
+            handle.write(data)
+            position += len(data)
+            padding = -position % 8
+            if padding:
+                handle.write(b"\0" * padding)
+                position += padding
+            return start, len(data)
+
+        emit(MAGIC)
+        footer = {
+            "count": self.count,
+            "total_length": int(lengths.sum()),
+            "term_offsets": emit(term_offsets),
+            "terms": emit(b"".join(merged)),
+            "posting_offsets": emit(offsets),
+            "docs": emit(docs),
+            "tfs": emit(tfs),
+            "lengths": emit(lengths),
+        }
+        encoded = json.dumps(footer).encode("utf-8")
+        handle.write(encoded)
+        handle.write(_FOOTER_LENGTH.pack(len(encoded)))
+        handle.write(MAGIC)
+
+
+class BM25Index:
+    """Incrementally updated Okapi BM25 index over document positions.
+
+    Rows must be added in order (``start`` equal to the current size), the
+    same positions the FAISS index and chunk store use. Adds and searches are
+    serialised by an internal lock, so searches can run on another thread
+    while the pipeline holds its own lock.
+    """
+
+    def __init__(self, *, k1: float = 1.5, b: float = 0.75, max_df_ratio: float = 0.5) -> None:
+        self.k1 = k1
+        self.b = b
+        self.max_df_ratio = max_df_ratio
+        self._lock = threading.Lock()
+        self._base: Optional[_Base] = None
+        self._tail: Dict[str, Tuple[array, array]] = {}
+        self._tail_lengths = array("i")
+        self._total_length = 0
+        self.generation = 0
+
+    @property
+    def size(self) -> int:
+        return (self._base.count if self._base else 0) + len(self._tail_lengths)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._base = None
+            self._tail = {}
+            self._tail_lengths = array("i")
+            self._total_length = 0
+            self.generation += 1
+
+    def load(self, path: str) -> None:
+        """Replace the contents with the snapshot at ``path`` (memory-mapped)."""
+
+        base = _Base(path)
+        with self._lock:
+            self._base = base
+            self._tail = {}
+            self._tail_lengths = array("i")
+            self._total_length = base.total_length
+            self.generation += 1
+
+    def add(self, start: int, token_lists: Sequence[Sequence[str]]) -> None:
+        """Index rows ``start .. start + len(token_lists)`` from :func:`tokenize` output."""
+
+        with self._lock:
+            if start != self.size:
+                raise ValueError(f"Keyword rows must be appended in order: got {start}, expected {self.size}.")
+            for offset, tokens in enumerate(token_lists):
+                position = start + offset
+                for term, frequency in Counter(tokens).items():
+                    postings = self._tail.get(term)
+                    if postings is None:
+                        postings = self._tail[term] = (array("i"), array("H"))
+                    postings[0].append(position)
+                    postings[1].append(min(frequency, _MAX_TF))
+                self._tail_lengths.append(len(tokens))
+                self._total_length += len(tokens)
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        parts = []
+        if self._base is not None:
+            found = self._base.postings(term.encode("utf-8"))
+            if found is not None:
+                parts.append(found)
+        tail = self._tail.get(term)
+        if tail is not None:
+            # Copies: a live buffer export would make the next append fail.
+            parts.append((np.array(tail[0], dtype=np.int32), np.array(tail[1], dtype=np.uint16)))
+        if not parts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.uint16)
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate([part[0] for part in parts]), np.concatenate([part[1] for part in parts])
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-``k`` ``(scores, positions)`` for ``query``, best first."""
+
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            count = self.size
+            if not terms or not count or k <= 0:
+                return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+            base_count = self._base.count if self._base else 0
+            base_lengths = self._base.lengths if self._base else None
+            tail_lengths = np.array(self._tail_lengths, dtype=np.int32)
+            average_length = max(self._total_length / count, 1e-9)
+            max_df = max(int(self.max_df_ratio * count), 1)
+
+            doc_parts: List[np.ndarray] = []
+            score_parts: List[np.ndarray] = []
+            for term in terms:
+                docs, tfs = self._postings(term)
+                df = len(docs)
+                if not df or (df > max_df and len(terms) > 1):
+                    continue
+                lengths = np.empty(df, dtype=np.float32)
+                in_base = docs < base_count
+                if base_lengths is not None:
+                    lengths[in_base] = base_lengths[docs[in_base]]
+                lengths[~in_base] = tail_lengths[docs[~in_base] - base_count]
+                idf = math.log(1.0 + (count - df + 0.5) / (df + 0.5))
+                tf = tfs.astype(np.float32)
+                norm = self.k1 * (1.0 - self.b + self.b * lengths / average_length)
+                doc_parts.append(docs)
+                score_parts.append((idf * tf * (self.k1 + 1.0) / (tf + norm)).astype(np.float32))
+
+        if not doc_parts:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        if len(doc_parts) == 1:
+            ids, scores = doc_parts[0].astype(np.int64), score_parts[0]
+        elif sum(len(part) for part in doc_parts) > count // 16:
+            # Common terms: a dense accumulator is cheaper than sorting postings.
+            totals = np.zeros(count, dtype=np.float32)
+            for docs, contribution in zip(doc_parts, score_parts):
+                totals[docs] += contribution  # positions are unique within a term
+            ids = np.flatnonzero(totals)
+            scores = totals[ids]
+        else:
+            ids, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts)).astype(np.float32)
+
+        if len(ids) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[top], scores[top]
+        order = np.lexsort((ids, -scores))
+        return scores[order], ids[order].astype(np.int64)
+
+    def snapshot(self) -> KeywordSnapshot:
+        """Capture the current rows for :meth:`KeywordSnapshot.write` outside the lock."""
+
+        with self._lock:
+            tail = {
+                term: (np.array(docs, dtype="<i4"), np.array(tfs, dtype="<u2"))
+                for term, (docs, tfs) in self._tail.items()
+            }
+            return KeywordSnapshot(
+                self._base, tail, np.array(self._tail_lengths, dtype="<i4"), self.generation
+            )
+
+    def rebase(self, path: str, snapshot: KeywordSnapshot) -> None:
+        """Map the file ``snapshot`` was written to and keep only newer rows in the tail."""
+
+        base = _Base(path)
+        with self._lock:
+            # A clear or load since the snapshot means the file is stale.
+            if snapshot.generation != self.generation or base.count != snapshot.count:
+                return
+            old_base_count = self._base.count if self._base else 0
+            tail: Dict[str, Tuple[array, array]] = {}
+            for term, (docs, tfs) in self._tail.items():
+                if docs[-1] < base.count:
+                    continue
+                keep = np.array(docs, dtype=np.int32) >= base.count
+                tail[term] = (
+                    array("i", np.array(docs, dtype=np.int32)[keep].tobytes()),
+                    array("H", np.array(tfs, dtype=np.uint16)[keep].tobytes()),
+                )
+            self._tail = tail
+            self._tail_lengths = self._tail_lengths[base.count - old_base_count:]
+            self._base = base
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            base_postings = len(self._base.docs) if self._base else 0
+            return {
+                "documents": self.size,
+                "base_terms": len(self._base.terms) if self._base else 0,
+                "tail_terms": len(self._tail),
+                "postings": base_postings + sum(len(docs) for docs, _ in self._tail.values()),
+            }
+
+
+__all__ = [
+    "BM25Index",
+    "KEYWORD_INDEX_SUFFIX",
+    "KeywordSnapshot",
+    "STOPWORDS",
+    "has_identifier",
+    "is_identifier",
+    "reciprocal_rank_fusion",
+    "tokenize",
+]
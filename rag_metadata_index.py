@@ -0,0 +1,130 @@
+"""Inverted metadata index used to pre-filter RAG vector search.
+
+``FlexibleRAGPipeline.query`` used to fetch ``top_k * candidate_multiplier``
+neighbours and then drop the ones whose metadata did not match, so selective
+filters often came back short or empty. ``MetadataIndex`` maps each indexed
+``field -> value`` to the vector ids (document positions) that carry it and
+turns equality / membership filters into a bitmap that FAISS applies during
+the search via ``IDSelectorBitmap``.
+"""
+from __future__ import annotations
+
+import json
+from array import array
+from typing import Any, Dict, Hashable, Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Unique-per-chunk fields gain nothing from an inverted index and would cost
+# one posting list per chunk.
+DEFAULT_UNINDEXED_FIELDS = frozenset({"chunk_id", "content_hash", "chunk_char_length"})
+
+
+def value_key(value: Any) -> Hashable:
+    """Hashable key with the same equality semantics as ``==`` on metadata."""
+
+    try:
+        hash(value)
+    except TypeError:
+        return ("__json__", json.dumps(value, sort_keys=True, default=str))
+    return value
+
+
+class MetadataIndex:
+    """``field -> value -> ids`` posting lists over document positions."""
+
+    def __init__(self, unindexed_fields: Iterable[str] = DEFAULT_UNINDEXED_FIELDS) -> None:
+        self.unindexed_fields = frozenset(unindexed_fields)
+        self._postings: Dict[str, Dict[Hashable, array]] = {}
+        self.size = 0
+
+    def add(self, start: int, metadatas: Sequence[Mapping[str, Any]]) -> None:
+        """Index rows ``start .. start + len(metadatas)`` (must be appended in order)."""
+
+        for offset, metadata in enumerate(metadatas):
+            position = start + offset
+            for field, value in metadata.items():
+                if field in self.unindexed_fields:
+                    continue
+                values = self._postings.setdefault(field, {})
+                values.setdefault(value_key(value), array("q")).append(position)
+        self.size = max(self.size, start + len(metadatas))
+
+    def add_column(self, field: str, values: Sequence[Any]) -> None:
+        """Bulk-index one field for rows ``0 .. len(values)``; ``None`` means absent."""
+
+        if field in self.unindexed_fields:
+            return
+        postings = self._postings.setdefault(field, {})
+        for position, value in enumerate(values):
+            if value is not None:
+                postings.setdefault(value_key(value), array("q")).append(position)
+        self.size = max(self.size, len(values))
+
+    def clear(self) -> None:
+        self._postings = {}
+        self.size = 0
+
+    def split_filters(
+        self, filters: Mapping[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Separate filters answerable from the index from ones needing a row check."""
+
+        indexed: Dict[str, Any] = {}
+        residual: Dict[str, Any] = {}
+        for field, expected in filters.items():
+            if callable(expected) or field in self.unindexed_fields:
+                residual[field] = expected
+            else:
+                indexed[field] = expected
+        return indexed, residual
+
+    def mask(self, filters: Mapping[str, Any], size: int) -> np.ndarray:
+        """Boolean mask of rows matching every (indexed) filter."""
+
+        result = np.ones(size, dtype=bool)
+        for field, expected in filters.items():
+            if isinstance(expected, (list, tuple, set, frozenset)):
+                options = list(expected)
+            else:
+                options = [expected]
+            result &= self._field_mask(field, options, size)
+            if not result.any():
+                break
+        return result
+
+    def _field_mask(self, field: str, options: Sequence[Any], size: int) -> np.ndarray:
+        postings = self._postings.get(field, {})
+        matched = np.zeros(size, dtype=bool)
+        for option in options:
+            if option is None:
+                # ``metadata.get(field)`` is None for rows that lack the field.
+                present = np.zeros(size, dtype=bool)
+                for ids in postings.values():
+                    present[self._ids(ids, size)] = True
+                matched |= ~present
+            ids = postings.get(value_key(option))
+            if ids is not None:
+                matched[self._ids(ids, size)] = True
+        return matched
+
+    @staticmethod
+    def _ids(ids: array, size: int) -> np.ndarray:
+        positions = np.frombuffer(ids, dtype=np.int64) if len(ids) else np.empty(0, np.int64)
+        return positions[positions < size]
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        return {
+            "rows": self.size,
+            "fields": len(self._postings),
+            "postings": sum(len(values) for values in self._postings.values()),
+        }
+
+
+def bitmap(mask: np.ndarray) -> np.ndarray:
+    """Pack a boolean mask into the bit order ``faiss.IDSelectorBitmap`` expects."""
+
+    return np.packbits(mask, bitorder="little")
+
+
+__all__ = ["DEFAULT_UNINDEXED_FIELDS", "MetadataIndex", "bitmap", "value_key"]
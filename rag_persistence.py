@@ -0,0 +1,335 @@
+"""Append-only, write-behind persistence for the RAG vector store.
+
+``FlexibleRAGPipeline.save`` rewrites the whole FAISS index and every document
+line, which is fine for occasional checkpoints but far too expensive to run
+after every chat turn. This module provides a write-ahead log (WAL) that new
+chunks are appended to, a background writer that flushes it on a time/size
+threshold, and the helpers the pipeline uses to compact the log into a fresh
+snapshot and to replay it after a crash.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WAL_SUFFIX = ".wal"
+COMPACTING_SUFFIX = ".compacting"
+MAX_RETRY_DELAY = 60.0
+
+
+def encode_vector(vector: np.ndarray) -> str:
+    """Serialise an embedding as base64-encoded little-endian float32."""
+
+    data = np.ascontiguousarray(vector, dtype="<f4").tobytes()
+    return base64.b64encode(data).decode("ascii")
+
+
+def decode_vector(payload: str) -> np.ndarray:
+    """Inverse of :func:`encode_vector`."""
+
+    return np.frombuffer(base64.b64decode(payload), dtype="<f4").astype(np.float32)
+
+
+def make_record(
+    chunk_id: str, text: str, metadata: Dict[str, Any], embedding: np.ndarray, row: int
+) -> Dict[str, Any]:
+    """Build the WAL record for a single added chunk.
+
+    ``row`` is the chunk's position in the store. Chunk ids need not be
+    unique, so replay uses it to skip records a snapshot already covers.
+    """
+
+    return {
+        "op": "add",
+        "row": row,
+        "id": chunk_id,
+        "text": text,
+        "metadata": metadata,
+        "embedding": encode_vector(embedding),
+    }
+
+
+def read_wal(path: str) -> Tuple[List[Dict[str, Any]], int]:
+    """Read WAL records, stopping at the first torn or corrupt line.
+
+    Returns the decoded records and the byte length of the valid prefix so the
+    caller can truncate a partially written tail left behind by a crash.
+    """
+
+    records: List[Dict[str, Any]] = []
+    valid_bytes = 0
+    if not os.path.exists(path):
+        return records, valid_bytes
+
+    with open(path, "rb") as handle:
+        for raw_line in handle:
+            if not raw_line.endswith(b"\n"):
+                break
+            stripped = raw_line.strip()
+            if stripped:
+                try:
+                    record = json.loads(stripped.decode("utf-8"))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    break
+                if not isinstance(record, dict) or "embedding" not in record:
+                    break
+                records.append(record)
+            valid_bytes += len(raw_line)
+    return records, valid_bytes
+
+
+def truncate_file(path: str, size: int) -> None:
+    """Drop everything after ``size`` bytes, used to discard a torn WAL tail."""
+
+    if os.path.exists(path) and os.path.getsize(path) > size:
+        logger.warning("Discarding %d torn bytes from %s", os.path.getsize(path) - size, path)
+        with open(path, "r+b") as handle:
+            handle.truncate(size)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+def atomic_write(path: str, write: Callable[[Any], None], *, binary: bool = False) -> None:
+    """Write a file via a temporary sibling and ``os.replace`` it into place."""
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        mode = "wb" if binary else "w"
+        kwargs = {} if binary else {"encoding": "utf-8"}
+        with os.fdopen(fd, mode, **kwargs) as handle:
+            write(handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class WriteBehindLog:
+    """Buffered append-only log flushed to disk by a background thread.
+
+    Records are queued in memory by :meth:`append` and written out when either
+    ``flush_batch_size`` records are pending or ``flush_interval`` seconds have
+    elapsed. Once the on-disk log holds ``compact_threshold`` records the
+    ``on_compact`` callback is invoked from the writer thread so the owner can
+    fold the log into a new snapshot.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        flush_interval: float = 2.0,
+        flush_batch_size: int = 64,
+        compact_threshold: int = 5000,
+        on_compact: Optional[Callable[[], None]] = None,
+        fsync: bool = True,
+    ) -> None:
+        self.path = path
+        self.compacting_path = path + COMPACTING_SUFFIX
+        self.flush_interval = max(flush_interval, 0.01)
+        self.flush_batch_size = max(flush_batch_size, 1)
+        self.compact_threshold = max(compact_threshold, 1)
+        self.on_compact = on_compact
+        self.fsync = fsync
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending: List[Dict[str, Any]] = []
+        self._closed = False
+        self._compaction_holds = 0
+        self._thread: Optional[threading.Thread] = None
+        self.wal_entries = len(read_wal(path)[0]) + len(read_wal(self.compacting_path)[0])
+
+    # ------------------------------------------------------------------
+    # Producer API
+    # ------------------------------------------------------------------
+    def append(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Queue records for the background writer."""
+
+        with self._lock:
+            self._pending.extend(records)
+            self._start_thread()
+            if len(self._pending) >= self.flush_batch_size:
+                self._wakeup.notify()
+
+    def request_flush(self) -> None:
+        """Ask the writer thread to flush soon without waiting for it."""
+
+        with self._lock:
+            if self._pending:
+                self._start_thread()
+                self._wakeup.notify()
+
+    def flush(self) -> None:
+        """Synchronously write all pending records to disk.
+
+        Raises ``OSError`` if the write fails; the records stay queued.
+        """
+
+        with self._lock:
+            self._flush_locked()
+
+    def discard_pending(self) -> None:
+        """Drop records that have not been written yet."""
+
+        with self._lock:
+            self._pending = []
+
+    def reset(self) -> None:
+        """Drop pending records and delete the on-disk log, including a ``.compacting`` one."""
+
+        with self._lock:
+            self._pending = []
+            for path in (self.path, self.compacting_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.wal_entries = 0
+
+    def hold_compaction(self) -> None:
+        """Stop ``on_compact`` from firing until :meth:`release_compaction`."""
+
+        with self._lock:
+            self._compaction_holds += 1
+
+    def release_compaction(self) -> bool:
+        """Undo one :meth:`hold_compaction`; True once the log has crossed its threshold."""
+
+        with self._lock:
+            self._compaction_holds = max(self._compaction_holds - 1, 0)
+            return not self._compaction_holds and self.wal_entries >= self.compact_threshold
+
+    def rotate(self) -> str:
+        """Flush and move the live log aside so a snapshot can absorb it.
+
+        If a previous compaction was interrupted the live log is appended to
+        the existing ``.compacting`` file rather than replacing it, so no
+        record is lost before the new snapshot is durable.
+        """
+
+        with self._lock:
+            self._flush_locked()
+            if os.path.exists(self.path):
+                if os.path.exists(self.compacting_path):
+                    with open(self.path, "rb") as src, open(self.compacting_path, "ab") as dst:
+                        shutil.copyfileobj(src, dst)
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                    os.remove(self.path)
+                else:
+                    os.replace(self.path, self.compacting_path)
+            self.wal_entries = 0
+            return self.compacting_path
+
+    def close(self) -> None:
+        """Flush outstanding records and stop the writer thread."""
+
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+            self._flush_locked()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    @property
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    # ------------------------------------------------------------------
+    # Writer internals
+    # ------------------------------------------------------------------
+    def _start_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            if self._closed:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="rag-wal-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        payload = "".join(json.dumps(record) + "\n" for record in batch)
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        try:
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(payload)
+                handle.flush()
+                if self.fsync:
+                    os.fsync(handle.fileno())
+        except OSError:
+            # Keep the batch queued for the next attempt and drop any partial
+            # write, so a retry cannot leave a torn line ahead of it.
+            self._pending[:0] = batch
+            try:
+                truncate_file(self.path, size)
+            except OSError:
+                pass
+            raise
+        self.wal_entries += len(batch)
+
+    def _run(self) -> None:
+        retry_delay = 0.0
+        while True:
+            with self._lock:
+                if retry_delay:
+                    retry_at = time.monotonic() + retry_delay
+                    while not self._closed and time.monotonic() < retry_at:
+                        self._wakeup.wait(retry_at - time.monotonic())
+                elif not self._closed and len(self._pending) < self.flush_batch_size:
+                    self._wakeup.wait(self.flush_interval)
+                try:
+                    self._flush_locked()
+                    retry_delay = 0.0
+                except OSError as exc:
+                    retry_delay = min(max(2 * retry_delay, self.flush_interval), MAX_RETRY_DELAY)
+                    logger.error(
+                        "Failed to flush RAG write-ahead log (%d records kept, retrying in %.1fs): %s",
+                        len(self._pending),
+                        retry_delay,
+                        exc,
+                    )
+                    if self._closed:
+                        return
+                    continue
+                should_compact = (
+                    not self._compaction_holds and self.wal_entries >= self.compact_threshold
+                )
+                if self._closed:
+                    return
+            if should_compact and self.on_compact is not None:
+                try:
+                    self.on_compact()
+                except Exception as exc:  # pragma: no cover - defensive logging
+                    logger.warning("Background RAG compaction failed: %s", exc)
+
+
+__all__ = [
+    "COMPACTING_SUFFIX",
+    "WAL_SUFFIX",
+    "WriteBehindLog",
+    "atomic_write",
+    "decode_vector",
+    "encode_vector",
+    "make_record",
+    "read_wal",
+    "truncate_file",
+]
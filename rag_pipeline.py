@@ -8,19 +8,187 @@ from __future__ import annotations
 
 import json
 import logging
+import math
 import os
-import re
-from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from uuid import uuid4
 
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+from rag_chunk_store import ChunkStore, is_chunk_store
+from rag_chunking import chunk_text
+from rag_keyword_index import (
+    KEYWORD_INDEX_SUFFIX,
+    BM25Index,
+    KeywordSnapshot,
+    has_identifier,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+from rag_metadata_index import MetadataIndex, bitmap
+from embedding_cache import EmbeddingLRUCache, PersistentEmbeddingStore, content_hash
+from embedding_backends import DEFAULT_BACKEND, EMBEDDING_BACKENDS, embedding_key, load_embedder
+from rag_persistence import (
+    COMPACTING_SUFFIX,
+    WAL_SUFFIX,
+    WriteBehindLog,
+    atomic_write,
+    decode_vector,
+    make_record,
+    read_wal,
+    truncate_file,
+)
+from rag_vector_store import VECTORS_SUFFIX, FloatVectorStore, exact_scores, rescore
+
+if TYPE_CHECKING:  # sentence-transformers imports torch; load it on first use.
+    from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
 
 
+FLAT_INDEX_FACTORIES = ("flat_ip", "flat_l2")
+ANN_INDEX_FACTORIES = ("hnsw", "ivf_flat", "ivf_pq")
+# How the index stores each vector: float32 (4*d bytes), float16 (2*d), sq8
+# (d, one byte per dimension) or pq (pq_m bytes with 8-bit codes).
+VECTOR_CODECS = ("float32", "float16", "sq8", "pq")
+TRAINED_CODECS = ("sq8", "pq")
+SCALAR_QUANTIZER_TYPES = {
+    "float16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+@dataclass
+class ANNIndexConfig:
+    """Build and search settings for approximate-nearest-neighbour indexes.
+
+    ANN factories start out as an exact flat index and are promoted once the
+    store holds ``promotion_threshold`` vectors (and at least enough to train
+    the quantizers), so small stores keep exact results. Flat factories with a
+    trained ``vector_codec`` (sq8, pq) are staged and promoted the same way.
+    """
+
+    metric: str = "ip"
+    promotion_threshold: int = 10000
+    nlist: Optional[int] = None
+    pq_m: Optional[int] = None
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    nprobe: int = 16
+    ef_search: int = 64
+
+
+def _faiss_metric(metric: str) -> int:
+    metric = metric.lower()
+    if metric == "ip":
+        return faiss.METRIC_INNER_PRODUCT
+    if metric == "l2":
+        return faiss.METRIC_L2
+    raise ValueError(f"Unsupported index metric: {metric}")
+
+
+def default_nlist(ntotal: int) -> int:
+    """Number of IVF lists for ``ntotal`` vectors (~4*sqrt(n), >=39 points per list)."""
+
+    return max(1, min(int(4 * math.sqrt(max(ntotal, 1))), ntotal // 39, 65536))
+
+
+def default_pq_m(dimension: int) -> int:
+    """Largest sub-quantizer count that divides ``dimension`` with >=8 dims each."""
+
+    for m in range(max(dimension // 8, 1), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def min_training_points(kind: str, config: ANNIndexConfig, codec: str = "float32") -> int:
+    """Minimum vectors required before an index of ``kind`` can be trained."""
+
+    points = 1
+    if kind in ("ivf_flat", "ivf_pq"):
+        points = config.nlist or 1
+    if kind == "ivf_pq" or codec == "pq":
+        points = max(points, 2 ** config.pq_nbits)
+    return points
+
+
+def build_flat_index(codec: str, dimension: int, metric: int, config: ANNIndexConfig) -> faiss.Index:
+    """Create an exhaustive-search index storing vectors with ``codec``."""
+
+    if codec == "float32":
+        if metric == faiss.METRIC_INNER_PRODUCT:
+            return faiss.IndexFlatIP(dimension)
+        return faiss.IndexFlatL2(dimension)
+    if codec in SCALAR_QUANTIZER_TYPES:
+        return faiss.IndexScalarQuantizer(dimension, SCALAR_QUANTIZER_TYPES[codec], metric)
+    if codec == "pq":
+        pq_m = config.pq_m or default_pq_m(dimension)
+        return faiss.IndexPQ(dimension, pq_m, config.pq_nbits, metric)
+    raise ValueError(f"Unsupported vector codec: {codec}")
+
+
+def build_ann_index(
+    kind: str, dimension: int, ntotal: int, config: ANNIndexConfig, codec: str = "float32"
+) -> faiss.Index:
+    """Create an empty (possibly untrained) ANN index sized for ``ntotal`` vectors."""
+
+    metric = _faiss_metric(config.metric)
+    pq_m = config.pq_m or default_pq_m(dimension)
+    if kind == "hnsw":
+        if codec == "float32":
+            index = faiss.IndexHNSWFlat(dimension, config.hnsw_m, metric)
+        elif codec == "pq":
+            index = faiss.IndexHNSWPQ(dimension, pq_m, config.hnsw_m, config.pq_nbits, metric)
+        else:
+            index = faiss.IndexHNSWSQ(dimension, SCALAR_QUANTIZER_TYPES[codec], config.hnsw_m, metric)
+        index.hnsw.efConstruction = config.ef_construction
+        index.hnsw.efSearch = config.ef_search
+        return index
+
+    nlist = config.nlist or default_nlist(ntotal)
+    if metric == faiss.METRIC_INNER_PRODUCT:
+        quantizer = faiss.IndexFlatIP(dimension)
+    else:
+        quantizer = faiss.IndexFlatL2(dimension)
+    if kind == "ivf_flat" and codec == "float32":
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist, metric)
+    elif kind == "ivf_flat" and codec in SCALAR_QUANTIZER_TYPES:
+        index = faiss.IndexIVFScalarQuantizer(
+            quantizer, dimension, nlist, SCALAR_QUANTIZER_TYPES[codec], metric
+        )
+    elif kind in ("ivf_flat", "ivf_pq") and codec in ("float32", "pq"):
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, config.pq_nbits, metric)
+    else:
+        raise ValueError(f"Unsupported index factory/codec: {kind}/{codec}")
+    index.nprobe = min(config.nprobe, nlist)
+    return index
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """Approximate bytes held by ``index``: vector codes plus graph/list overhead."""
+
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        # Neighbour lists are int32 ids.
+        return index_memory_bytes(index.storage) + 4 * index.hnsw.neighbors.size()
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        # Each inverted-list entry carries an int64 id next to its code.
+        return ivf.ntotal * (ivf.code_size + 8) + index_memory_bytes(ivf.quantizer)
+    if isinstance(index, faiss.IndexFlatCodes):
+        return index.ntotal * index.code_size
+    return index.ntotal * index.d * 4
+
+
 @dataclass
 class DocumentChunk:
     """A single chunk of text captured in the vector store."""
@@ -38,6 +206,9 @@ class SearchResult:
     metadata: Dict[str, Any]
     score: float
     chunk_id: str
+    # Reciprocal-rank-fusion score when hybrid search merged keyword hits;
+    # ``score`` stays the vector similarity either way.
+    fused_score: Optional[float] = None
 
 
 class FlexibleRAGPipeline:
@@ -57,13 +228,72 @@ class FlexibleRAGPipeline:
         auto_load: bool = False,
         candidate_multiplier: int = 3,
         chunking_strategy: str = "auto",
+        persistence_mode: str = "snapshot",
+        wal_path: Optional[str] = None,
+        wal_flush_interval: float = 2.0,
+        wal_flush_batch_size: int = 64,
+        wal_compact_threshold: int = 5000,
+        ann_config: Optional[ANNIndexConfig] = None,
+        query_cache_size: int = 1024,
+        query_cache_max_bytes: int = 64 * 1024 * 1024,
+        deduplicate: bool = True,
+        embedding_cache_path: Optional[str] = None,
+        document_format: str = "packed",
+        mmap_index: bool = True,
+        filter_exact_threshold: int = 4096,
+        embedding_server: Optional[str] = None,
+        embedding_backend: str = DEFAULT_BACKEND,
+        embedding_backend_dir: Optional[str] = None,
+        vector_codec: str = "float32",
+        rescore: bool = False,
+        rescore_factor: int = 4,
+        vectors_path: Optional[str] = None,
+        hybrid_search: bool = False,
+        keyword_weight: float = 1.0,
+        identifier_boost: float = 2.0,
+        rrf_k: int = 60,
+        keyword_budget: Optional[float] = 0.05,
     ) -> None:
         self.embedding_model = embedding_model
+        self.embedding_server = embedding_server
+        if embedding_backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unsupported embedding backend: {embedding_backend}")
+        self.embedding_backend = embedding_backend
+        self.embedding_backend_dir = embedding_backend_dir
+        # Cache keys: quantized backends produce slightly different vectors.
+        self.embedding_key = embedding_key(embedding_model, embedding_backend)
         self.chunk_size = max(chunk_size, 1)
         self.chunk_overlap = min(max(chunk_overlap, 0), self.chunk_size - 1)
         self.default_top_k = max(default_top_k, 1)
         self.normalize_embeddings = normalize_embeddings
         self.index_factory = index_factory.lower()
+        if self.index_factory not in FLAT_INDEX_FACTORIES + ANN_INDEX_FACTORIES:
+            raise ValueError(f"Unsupported index factory: {index_factory}")
+        self.ann_config = ann_config or ANNIndexConfig()
+        self.vector_codec = vector_codec.lower()
+        if self.vector_codec not in VECTOR_CODECS:
+            raise ValueError(f"Unsupported vector codec: {vector_codec}")
+        if self.index_factory == "ivf_pq" and self.vector_codec not in ("float32", "pq"):
+            raise ValueError("The ivf_pq factory always stores PQ codes; use vector_codec='pq'.")
+        # Exact re-scoring reads float32 rows from a memory-mapped file so the
+        # compressed index is the only per-vector data kept in RAM. The live
+        # rows sit in a working file (vectors_path, or an anonymous temporary
+        # file); <index_path>.vectors is only replaced wholesale by save() and
+        # compact(), so it always matches the snapshot beside it.
+        self.rescore = rescore
+        self.rescore_factor = max(rescore_factor, 1)
+        self.vectors_path = vectors_path
+        self._float_vectors: Optional[FloatVectorStore] = None
+        # Hybrid retrieval: a BM25 index over the same rows, searched on a
+        # worker thread and merged with the dense ranking by reciprocal rank
+        # fusion. Keyword results arriving after keyword_budget seconds are
+        # dropped so hybrid queries never wait on a slow keyword search.
+        self.keyword_index: Optional[BM25Index] = BM25Index() if hybrid_search else None
+        self.keyword_weight = keyword_weight
+        self.identifier_boost = identifier_boost
+        self.rrf_k = max(rrf_k, 1)
+        self.keyword_budget = keyword_budget
+        self._keyword_executor: Optional[ThreadPoolExecutor] = None
         self.index_path = index_path
         self.documents_path = documents_path
         self.candidate_multiplier = max(candidate_multiplier, 1)
@@ -72,9 +302,42 @@ class FlexibleRAGPipeline:
         self.embedder: Optional[SentenceTransformer] = None
         self.dimension: Optional[int] = None
         self.index: Optional[faiss.Index] = None
-        self.documents: List[DocumentChunk] = []
+        self.documents: ChunkStore = ChunkStore(DocumentChunk)
+        self.document_format = document_format.lower()
+        if self.document_format not in {"packed", "jsonl"}:
+            raise ValueError(f"Unsupported document format: {document_format}")
+        self.mmap_index = mmap_index
+        self._mapped_index_path: Optional[str] = None
+        self.metadata_index = MetadataIndex()
+        self.filter_exact_threshold = max(filter_exact_threshold, 0)
         self._is_loaded = False
         self._auto_load = auto_load
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self.query_cache = EmbeddingLRUCache(query_cache_size, query_cache_max_bytes)
+        self.deduplicate = deduplicate
+        self._content_hashes: Dict[str, str] = {}
+        self.embedding_store: Optional[PersistentEmbeddingStore] = None
+        if embedding_cache_path is not None:
+            self.embedding_store = PersistentEmbeddingStore(embedding_cache_path)
+
+        self.persistence_mode = persistence_mode.lower()
+        if self.persistence_mode not in {"snapshot", "append"}:
+            raise ValueError(f"Unsupported persistence mode: {persistence_mode}")
+        if wal_path is None and documents_path is not None:
+            wal_path = documents_path + WAL_SUFFIX
+        self.wal_path = wal_path
+        self._wal: Optional[WriteBehindLog] = None
+        if self.persistence_mode == "append":
+            if self.wal_path is None:
+                raise ValueError("Append persistence requires documents_path or wal_path.")
+            self._wal = WriteBehindLog(
+                self.wal_path,
+                flush_interval=wal_flush_interval,
+                flush_batch_size=wal_flush_batch_size,
+                compact_threshold=wal_compact_threshold,
+                on_compact=self.compact,
+            )
 
         if auto_load:
             try:
@@ -89,9 +352,34 @@ class FlexibleRAGPipeline:
     # ------------------------------------------------------------------
     def _ensure_model(self) -> None:
         if self.embedder is None:
-            self.embedder = SentenceTransformer(self.embedding_model)
+            self.embedder = self._connect_embedding_server() or self._load_embedder()
             self.dimension = self.embedder.get_sentence_embedding_dimension()
 
+    def _load_embedder(self) -> Any:
+        return load_embedder(self.embedding_model, self.embedding_backend, cache_dir=self.embedding_backend_dir)
+
+    def _connect_embedding_server(self) -> Optional[Any]:
+        """Use the shared embedding server when configured and reachable."""
+
+        if not self.embedding_server:
+            return None
+        from embedding_server import EmbeddingClient
+
+        try:
+            return EmbeddingClient(self.embedding_server, expected_model=self.embedding_key)
+        except OSError as exc:
+            logger.warning(
+                "Embedding server %s unavailable (%s); loading %s in-process.",
+                self.embedding_server, exc, self.embedding_model,
+            )
+            return None
+
+    def warm_up(self) -> None:
+        """Load the embedding model now rather than on the first add or query."""
+
+        with self._lock:
+            self._ensure_model()
+
     def _ensure_index(self) -> None:
         if self.index is not None:
             return
@@ -100,12 +388,187 @@ class FlexibleRAGPipeline:
         if self.dimension is None:
             raise RuntimeError("Embedding dimension is undefined; model failed to load.")
 
+        if self.index_factory in FLAT_INDEX_FACTORIES and self.vector_codec not in TRAINED_CODECS:
+            codec = self.vector_codec
+        else:
+            # ANN factories and trained codecs stage vectors in an exact index
+            # until promotion.
+            codec = "float32"
+        self.index = build_flat_index(codec, self.dimension, self._metric(), self.ann_config)
+        self._sync_float_vectors()
+
+    def _metric(self) -> int:
         if self.index_factory == "flat_ip":
-            self.index = faiss.IndexFlatIP(self.dimension)
-        elif self.index_factory == "flat_l2":
-            self.index = faiss.IndexFlatL2(self.dimension)
+            return faiss.METRIC_INNER_PRODUCT
+        if self.index_factory == "flat_l2":
+            return faiss.METRIC_L2
+        return _faiss_metric(self.ann_config.metric)
+
+    def _writable_index(self) -> faiss.Index:
+        """Return the index, first detaching it from a read-only mapping.
+
+        Memory-mapped flat and HNSW indexes copy their storage on write, but
+        mapped IVF inverted lists are read-only and cannot be re-serialised,
+        so they are read fully into memory before the first mutation.
+        """
+
+        self._ensure_index()
+        if self._mapped_index_path is not None:
+            if faiss.try_extract_index_ivf(self.index) is not None:
+                self.index = faiss.read_index(self._mapped_index_path)
+            self._mapped_index_path = None
+        return self.index
+
+    def _add_to_index(self, embeddings: np.ndarray) -> None:
+        index = self._writable_index()
+        if self._float_vectors is not None:
+            self._float_vectors.append(embeddings)
+        index.add(embeddings)
+        self._maybe_promote_index()
+
+    def _maybe_promote_index(self) -> None:
+        """Rebuild the staged flat index as the configured ANN index or codec once large enough."""
+
+        if self.index is None or not isinstance(self.index, faiss.IndexFlat):
+            return
+        if self.index_factory in ANN_INDEX_FACTORIES:
+            kind = self.index_factory
+        elif self.vector_codec != "float32":
+            kind = "flat"
+        else:
+            return
+        ntotal = self.index.ntotal
+        config = self.ann_config
+        required = max(
+            config.promotion_threshold,
+            min_training_points(kind, config, self.vector_codec),
+        )
+        if ntotal < required:
+            return
+
+        vectors = self.index.reconstruct_n(0, ntotal)
+        if kind == "flat":
+            promoted = build_flat_index(self.vector_codec, self.index.d, self.index.metric_type, config)
+        else:
+            promoted = build_ann_index(kind, self.index.d, ntotal, config, self.vector_codec)
+        if not promoted.is_trained:
+            promoted.train(vectors)
+        promoted.add(vectors)
+        self.index = promoted
+        self._mapped_index_path = None
+        logger.info("Promoted RAG index to %s/%s at %d vectors.", kind, self.vector_codec, ntotal)
+
+    def _sync_float_vectors(self) -> None:
+        """Open the re-scoring store and align it with the index rows.
+
+        Rows past ``index.ntotal`` (added but never saved) are dropped. A store
+        that is short is rebuilt from an exact index; for a compressed one
+        re-scoring stays off until the store is rebuilt by re-adding the data.
+        """
+
+        if not self.rescore or self.index is None:
+            return
+        if self._float_vectors is not None and self._float_vectors.dimension != self.index.d:
+            self._float_vectors.close()
+            self._float_vectors = None
+        if self._float_vectors is None:
+            self._float_vectors = FloatVectorStore(self.index.d, self.vectors_path)
+
+        store, ntotal = self._float_vectors, self.index.ntotal
+        if len(store) > ntotal:
+            store.truncate(ntotal)
+        elif len(store) < ntotal:
+            if isinstance(self.index, faiss.IndexFlat):
+                store.truncate(0)
+                for start in range(0, ntotal, 65536):
+                    store.append(self.index.reconstruct_n(start, min(65536, ntotal - start)))
+            else:
+                logger.warning(
+                    "Float vector store holds %d of %d vectors; exact re-scoring is disabled.",
+                    len(store), ntotal,
+                )
+
+    def _can_rescore(self) -> bool:
+        return (
+            self._float_vectors is not None
+            and len(self._float_vectors) == self.index.ntotal
+            and not isinstance(self.index, faiss.IndexFlat)
+        )
+
+    def _search_params(
+        self,
+        k: int,
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+        selector: Optional[faiss.IDSelector] = None,
+    ):
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            return faiss.SearchParametersIVF(
+                sel=selector,
+                nprobe=max(1, min(nprobe or self.ann_config.nprobe, ivf.nlist)),
+            )
+        if isinstance(self.index, faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(
+                sel=selector,
+                efSearch=max(ef_search or self.ann_config.ef_search, k),
+            )
+        if selector is not None:
+            return faiss.SearchParameters(sel=selector)
+        return None
+
+    def _search(
+        self,
+        query_embeddings: np.ndarray,
+        k: int,
+        mask: Optional[np.ndarray],
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+    ):
+        """Nearest neighbours for each query row, restricted to ``mask`` rows if given.
+
+        Small match sets are scored exactly from reconstructed vectors: graph
+        and inverted-list searches lose recall when few ids pass the filter.
+        Larger ones are filtered inside FAISS through an ``IDSelectorBitmap``.
+        With re-scoring enabled, ``rescore_factor * k`` candidates are fetched
+        from the compressed index and re-ranked by their float32 vectors.
+        """
+
+        can_rescore = self._can_rescore()
+        selector = None
+        if mask is not None:
+            matches = np.flatnonzero(mask)
+            if len(matches) <= self.filter_exact_threshold:
+                try:
+                    if can_rescore:
+                        vectors = self._float_vectors.get(matches)
+                    else:
+                        vectors = self.index.reconstruct_batch(matches)
+                except RuntimeError:
+                    pass  # e.g. IVF without a direct map; use the selector instead
+                else:
+                    return self._exact_scores(query_embeddings, vectors, matches, k)
+            bits = bitmap(mask)
+            selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bits))
+
+        fetch = min(k * self.rescore_factor, self.index.ntotal) if can_rescore else k
+        params = self._search_params(fetch, nprobe, ef_search, selector)
+        if params is None:
+            scores, ids = self.index.search(query_embeddings, fetch)
         else:
-            raise ValueError(f"Unsupported index factory: {self.index_factory}")
+            scores, ids = self.index.search(query_embeddings, fetch, params=params)
+        if can_rescore:
+            return rescore(
+                query_embeddings, ids, self._float_vectors, k,
+                inner_product=self.index.metric_type == faiss.METRIC_INNER_PRODUCT,
+            )
+        return scores, ids
+
+    def _exact_scores(self, queries: np.ndarray, vectors: np.ndarray, ids: np.ndarray, k: int):
+        return exact_scores(
+            queries, vectors, ids, k,
+            inner_product=self.index.metric_type == faiss.METRIC_INNER_PRODUCT,
+        )
 
     def _ensure_loaded(self) -> None:
         if self._auto_load and not self._is_loaded:
@@ -130,109 +593,64 @@ class FlexibleRAGPipeline:
         chunk_overlap: Optional[int] = None,
         strategy: Optional[str] = None,
     ) -> List[str]:
-        chunk_size = max(chunk_size or self.chunk_size, 1)
-        effective_overlap = chunk_overlap
-        if effective_overlap is None:
-            effective_overlap = self.chunk_overlap
-        max_overlap = chunk_size - 1
-        if effective_overlap < 0:
-            effective_overlap = 0
-        if effective_overlap > max_overlap:
-            effective_overlap = max_overlap
-
-        chosen_strategy = (strategy or self.chunking_strategy or "auto").lower()
-        cleaned = text.strip()
-        if not cleaned:
-            return []
-
-        if chosen_strategy == "none":
-            return [cleaned]
-
-        if chosen_strategy == "paragraph":
-            units = [para.strip() for para in cleaned.split("\n\n") if para.strip()]
-            return self._chunk_units(units, chunk_size, effective_overlap)
-
-        if chosen_strategy == "sentence":
-            units = [s.strip() for s in re.split(r"(?<=[.!?])\s+", cleaned) if s.strip()]
-            return self._chunk_units(units, chunk_size, effective_overlap)
-
-        if chosen_strategy == "auto":
-            units = [para.strip() for para in cleaned.split("\n\n") if para.strip()]
-            if units:
-                return self._chunk_units(units, chunk_size, effective_overlap)
-            units = [s.strip() for s in re.split(r"(?<=[.!?])\s+", cleaned) if s.strip()]
-            if units:
-                return self._chunk_units(units, chunk_size, effective_overlap)
-
-        # Fallback to raw character-based chunking
-        return self._chunk_by_character(cleaned, chunk_size, effective_overlap)
-
-    def _chunk_units(self, units: Sequence[str], chunk_size: int, chunk_overlap: int) -> List[str]:
-        if not units:
-            return []
-        chunks: List[str] = []
-        buffer: List[str] = []
-        current_len = 0
-
-        for unit in units:
-            unit_len = len(unit)
-            separator = 1 if buffer else 0  # Account for newline join
-            if current_len + unit_len + separator <= chunk_size:
-                buffer.append(unit)
-                current_len += unit_len + separator
-                continue
-
-            if buffer:
-                chunks.append("\n".join(buffer))
-                if chunk_overlap > 0:
-                    overlap_text = chunks[-1][-chunk_overlap:]
-                    buffer = [overlap_text]
-                    current_len = len(overlap_text)
-                else:
-                    buffer = []
-                    current_len = 0
-
-            if unit_len >= chunk_size:
-                chunks.extend(self._chunk_by_character(unit, chunk_size, chunk_overlap))
-                buffer = []
-                current_len = 0
-            else:
-                buffer = [unit]
-                current_len = len(unit)
-
-        if buffer:
-            chunks.append("\n".join(buffer))
-
-        return chunks
-
-    def _chunk_by_character(self, text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
-        if not text:
-            return []
-        if chunk_overlap >= chunk_size:
-            chunk_overlap = max(chunk_size - 1, 0)
-
-        chunks: List[str] = []
-        start = 0
-        text_length = len(text)
-        while start < text_length:
-            end = min(start + chunk_size, text_length)
-            chunk = text[start:end].strip()
-            if chunk:
-                chunks.append(chunk)
-            if end == text_length:
-                break
-            if chunk_overlap > 0:
-                start = max(end - chunk_overlap, start + 1)
-            else:
-                start = end
-        return chunks
+        return chunk_text(
+            text,
+            chunk_size=chunk_size or self.chunk_size,
+            chunk_overlap=self.chunk_overlap if chunk_overlap is None else chunk_overlap,
+            strategy=strategy or self.chunking_strategy,
+        )
 
     # ------------------------------------------------------------------
     # Embedding utilities
     # ------------------------------------------------------------------
-    def _embed_texts(self, texts: Sequence[str]) -> np.ndarray:
+    def _embed_texts(self, texts: Sequence[str], *, use_cache: bool = False) -> np.ndarray:
+        """Embed ``texts``; with ``use_cache`` consult the query LRU first.
+
+        Only query paths opt in to the cache so bulk ingestion does not evict
+        the hot query set.
+        """
+
         if not texts:
             return np.empty((0, self.dimension or 0), dtype=np.float32)
+        if not use_cache or not self.query_cache.enabled:
+            return self._encode(texts)
+
+        keys = [
+            EmbeddingLRUCache.make_key(self.embedding_key, text, normalized=self.normalize_embeddings)
+            for text in texts
+        ]
+        vectors: List[Optional[np.ndarray]] = [self.query_cache.get(key) for key in keys]
+        missing = [position for position, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # Embed each distinct missing key once, even if repeated in the batch.
+            unique: Dict[Any, int] = {}
+            for position in missing:
+                unique.setdefault(keys[position], position)
+            encoded = self._encode([texts[position] for position in unique.values()])
+            by_key = dict(zip(unique.keys(), encoded))
+            for key, vector in by_key.items():
+                self.query_cache.put(key, vector)
+            for position in missing:
+                vectors[position] = by_key[keys[position]]
+        return np.ascontiguousarray(np.vstack(vectors), dtype=np.float32)
+
+    def _embed_documents(self, texts: Sequence[str], hashes: Sequence[str]) -> np.ndarray:
+        """Embed chunk texts, reusing vectors from the persistent store."""
+
+        if self.embedding_store is None or not texts:
+            return self._embed_texts(texts)
+
+        model_key = f"{self.embedding_key}|normalize={self.normalize_embeddings}"
+        stored = self.embedding_store.get_many(model_key, hashes)
+        missing = [position for position, digest in enumerate(hashes) if digest not in stored]
+        if missing:
+            encoded = self._embed_texts([texts[position] for position in missing])
+            fresh = {hashes[position]: vector for position, vector in zip(missing, encoded)}
+            self.embedding_store.put_many(model_key, fresh.items())
+            stored.update(fresh)
+        return np.ascontiguousarray(np.vstack([stored[digest] for digest in hashes]), dtype=np.float32)
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
         self._ensure_model()
         embeddings = self.embedder.encode(
             list(texts),
@@ -257,7 +675,12 @@ class FlexibleRAGPipeline:
         chunking_strategy: Optional[str] = None,
         auto_chunk: bool = True,
     ) -> List[DocumentChunk]:
-        """Add one or more documents to the RAG store."""
+        """Add one or more documents to the RAG store.
+
+        With ``deduplicate`` enabled, chunks whose normalised text is already
+        stored (or repeated within this call) are skipped and only the newly
+        added chunks are returned.
+        """
 
         self._ensure_loaded()
 
@@ -297,26 +720,75 @@ class FlexibleRAGPipeline:
                 chunk_meta["chunk_char_length"] = len(chunk_text)
                 chunks.append(DocumentChunk(text=chunk_text, metadata=chunk_meta))
 
+        return self.add_chunks(chunks)
+
+    def add_chunks(self, chunks: Sequence[DocumentChunk]) -> List[DocumentChunk]:
+        """Embed and store already-chunked documents with their final metadata.
+
+        This is the second half of :meth:`add_texts`, for callers such as the
+        bulk ingest engine that chunk elsewhere. Returns the chunks actually
+        added (duplicates are dropped when ``deduplicate`` is enabled).
+        """
+
+        self._ensure_loaded()
+        chunks = list(chunks)
+        for chunk in chunks:
+            chunk.metadata.setdefault("chunk_char_length", len(chunk.text))
+            chunk.metadata["content_hash"] = content_hash(chunk.text)
+
+        if self.deduplicate:
+            chunks = self._unique_chunks(chunks)
         if not chunks:
             return []
 
         self._ensure_index()
-        embeddings = self._embed_texts([chunk.text for chunk in chunks])
+        embeddings = self._embed_documents(
+            [chunk.text for chunk in chunks],
+            [chunk.metadata["content_hash"] for chunk in chunks],
+        )
         if embeddings.size == 0:
             return []
-
-        self.index.add(embeddings)
-
-        start_offset = len(self.documents)
-        for offset, chunk in enumerate(chunks):
-            if "chunk_id" in chunk.metadata:
-                chunk_id = str(chunk.metadata["chunk_id"])
-            else:
-                source_hint = chunk.metadata.get("source_id", "chunk")
-                chunk_id = f"{source_hint}-{start_offset + offset}"
-            chunk.id = chunk_id
-            chunk.metadata.setdefault("chunk_id", chunk_id)
-            self.documents.append(chunk)
+        token_lists = None
+        if self.keyword_index is not None:
+            token_lists = [tokenize(chunk.text) for chunk in chunks]
+
+        with self._lock:
+            if self.deduplicate:
+                # Another thread may have stored the same content while we embedded.
+                keep = self._unique_chunks(chunks)
+                if len(keep) != len(chunks):
+                    kept_ids = {id(chunk) for chunk in keep}
+                    mask = [id(chunk) in kept_ids for chunk in chunks]
+                    embeddings = np.ascontiguousarray(embeddings[mask])
+                    if token_lists is not None:
+                        token_lists = [tokens for tokens, kept in zip(token_lists, mask) if kept]
+                    chunks = keep
+                if not chunks:
+                    return []
+            self._add_to_index(embeddings)
+
+            start_offset = len(self.documents)
+            for offset, chunk in enumerate(chunks):
+                if "chunk_id" in chunk.metadata:
+                    chunk_id = str(chunk.metadata["chunk_id"])
+                else:
+                    source_hint = chunk.metadata.get("source_id", "chunk")
+                    chunk_id = f"{source_hint}-{start_offset + offset}"
+                chunk.id = chunk_id
+                chunk.metadata.setdefault("chunk_id", chunk_id)
+                self.documents.append(chunk)
+                self._content_hashes.setdefault(chunk.metadata["content_hash"], chunk.id)
+            self.metadata_index.add(start_offset, [chunk.metadata for chunk in chunks])
+            if token_lists is not None:
+                self.keyword_index.add(start_offset, token_lists)
+
+            if self._wal is not None:
+                self._wal.append(
+                    make_record(
+                        chunk.id, chunk.text, chunk.metadata, embeddings[offset], start_offset + offset
+                    )
+                    for offset, chunk in enumerate(chunks)
+                )
 
         return chunks
 
@@ -328,13 +800,47 @@ class FlexibleRAGPipeline:
         metadata_filters: Optional[Dict[str, Any]] = None,
         reranker: Optional[Callable[[str, List[SearchResult]], List[SearchResult]]] = None,
         max_candidates: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
     ) -> List[SearchResult]:
-        """Retrieve relevant chunks for the supplied query."""
+        """Retrieve relevant chunks for the supplied query.
+
+        ``nprobe`` (IVF indexes) and ``ef_search`` (HNSW) override the
+        configured recall/latency trade-off for this query only.
+        """
+
+        return self.query_batch(
+            [query_text],
+            top_k=top_k,
+            metadata_filters=metadata_filters,
+            reranker=reranker,
+            max_candidates=max_candidates,
+            nprobe=nprobe,
+            ef_search=ef_search,
+        )[0]
+
+    def query_batch(
+        self,
+        queries: Sequence[str],
+        *,
+        top_k: Optional[int] = None,
+        metadata_filters: Optional[Dict[str, Any]] = None,
+        reranker: Optional[Callable[[str, List[SearchResult]], List[SearchResult]]] = None,
+        max_candidates: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[List[SearchResult]]:
+        """Retrieve results for several queries with one encode and one search.
 
+        Returns one result list per query, in input order. Options apply to
+        every query exactly as in :meth:`query`.
+        """
+
+        queries = list(queries)
         self._ensure_loaded()
 
-        if self.index is None or self.index.ntotal == 0:
-            return []
+        if not queries or self.index is None or self.index.ntotal == 0:
+            return [[] for _ in queries]
 
         top_k = max(top_k or self.default_top_k, 1)
         if max_candidates is None:
@@ -342,44 +848,201 @@ class FlexibleRAGPipeline:
         else:
             max_candidates = max(max_candidates, top_k)
 
-        query_embedding = self._embed_texts([query_text])
-        if query_embedding.size == 0:
-            return []
-
-        scores, indices = self.index.search(query_embedding, max_candidates)
-        candidates: List[SearchResult] = []
-        seen_ids = set()
-        for idx, score in zip(indices[0], scores[0]):
-            if idx < 0 or idx >= len(self.documents):
+        keyword_future: Optional[Future] = None
+        if self.keyword_index is not None and len(self.keyword_index):
+            # Runs while the queries are embedded and searched densely.
+            keyword_k = max_candidates * 4 if metadata_filters else max_candidates
+            keyword_future = self._keyword_pool().submit(self._keyword_search, queries, keyword_k)
+            started = time.monotonic()
+
+        query_embeddings = self._embed_texts(queries, use_cache=True)
+        if query_embeddings.size == 0:
+            return [[] for _ in queries]
+
+        indexed_filters: Dict[str, Any] = {}
+        residual_filters: Dict[str, Any] = {}
+        if metadata_filters:
+            indexed_filters, residual_filters = self.metadata_index.split_filters(metadata_filters)
+
+        # (row, result) pairs; rows identify chunks uniquely for fusion.
+        batch_candidates: List[List[Tuple[int, SearchResult]]] = [[] for _ in queries]
+        with self._lock:
+            ntotal = min(self.index.ntotal, len(self.documents))
+            mask = None
+            limit = ntotal
+            if indexed_filters:
+                mask = self.metadata_index.mask(indexed_filters, ntotal)
+                limit = int(mask.sum())
+                if limit == 0:
+                    return [[] for _ in queries]
+
+            # Indexed filters are applied inside the search. Filters that the
+            # index cannot answer (callables, unindexed fields) are checked on
+            # the hits, widening the search for short queries until enough
+            # rows pass.
+            k = min(max_candidates, limit)
+            pending = np.arange(len(queries))
+            while len(pending):
+                scores, indices = self._search(
+                    query_embeddings[pending], k, mask, nprobe, ef_search
+                )
+                for row, position in enumerate(pending):
+                    batch_candidates[position] = self._collect_rows(
+                        scores[row], indices[row], residual_filters, max_candidates
+                    )
+                if not residual_filters or k >= limit:
+                    break
+                pending = np.array(
+                    [position for position in pending if len(batch_candidates[position]) < top_k],
+                    dtype=np.int64,
+                )
+                k = min(k * 4, limit)
+
+        if keyword_future is not None:
+            keyword_hits = self._keyword_results(keyword_future, started)
+            if keyword_hits is not None:
+                with self._lock:
+                    for position, (scores, ids) in enumerate(keyword_hits):
+                        keep = ids < ntotal
+                        if mask is not None:
+                            keep[keep] = mask[ids[keep]]
+                        keyword_candidates = self._collect_rows(
+                            scores[keep], ids[keep], residual_filters, max_candidates
+                        )
+                        batch_candidates[position] = self._fuse(
+                            queries[position],
+                            query_embeddings[position],
+                            batch_candidates[position],
+                            keyword_candidates,
+                            max_candidates,
+                        )
+
+        results: List[List[SearchResult]] = []
+        for query_text, pairs in zip(queries, batch_candidates):
+            candidates = [result for _, result in pairs]
+            if candidates:
+                candidates.sort(
+                    key=lambda result: result.score if result.fused_score is None else result.fused_score,
+                    reverse=True,
+                )
+                if reranker:
+                    reranked = reranker(query_text, candidates)
+                    if reranked:
+                        candidates = reranked
+            results.append(candidates[:top_k])
+        return results
+
+    def _keyword_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._keyword_executor is None:
+                self._keyword_executor = ThreadPoolExecutor(
+                    max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="rag-keyword"
+                )
+            return self._keyword_executor
+
+    def _keyword_search(self, queries: Sequence[str], k: int):
+        return [self.keyword_index.search(query, k) for query in queries]
+
+    def _keyword_results(self, future: Future, started: float):
+        """Keyword hits per query, or None if they missed the budget or failed."""
+
+        timeout = None
+        if self.keyword_budget is not None:
+            timeout = max(self.keyword_budget - (time.monotonic() - started), 0.0)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            logger.debug("Keyword search missed its %.3fs budget; using dense results only.", self.keyword_budget)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.warning("Keyword search failed (%s); using dense results only.", exc)
+        return None
+
+    def _fuse(
+        self,
+        query_text: str,
+        query_embedding: np.ndarray,
+        dense: List[Tuple[int, SearchResult]],
+        keyword: List[Tuple[int, SearchResult]],
+        limit: int,
+    ) -> List[Tuple[int, SearchResult]]:
+        """Merge dense and keyword candidates by reciprocal rank fusion.
+
+        Candidates are keyed by row, since chunk ids can repeat across adds.
+        Each result gets its RRF value as ``fused_score`` and keeps its vector
+        similarity as ``score``; keyword-only hits are scored against the
+        query embedding. Queries naming identifiers (gene symbols, drug codes,
+        accessions) weight the keyword ranking by ``identifier_boost``.
+        """
+
+        if not keyword:
+            return dense
+        weight = self.keyword_weight
+        if has_identifier(query_text):
+            weight *= self.identifier_boost
+        fused = reciprocal_rank_fusion(
+            [[row for row, _ in dense], [row for row, _ in keyword]],
+            [1.0, weight],
+            k=self.rrf_k,
+        )[:limit]
+        by_row = dict(keyword)
+        by_row.update(dense)
+        keyword_only = [row for row, _ in fused if row not in dict(dense)]
+        vector_scores = dict(zip(keyword_only, self._vector_scores(query_embedding, keyword_only)))
+        merged: List[Tuple[int, SearchResult]] = []
+        for row, fused_score in fused:
+            result = by_row[row]
+            score = vector_scores[row] if row in vector_scores else result.score
+            merged.append((row, replace(result, score=float(score), fused_score=fused_score)))
+        return merged
+
+    def _vector_scores(self, query_embedding: np.ndarray, rows: Sequence[int]) -> np.ndarray:
+        """Vector similarity of ``rows`` to one query, NaN where vectors cannot be read."""
+
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return np.empty(0, dtype=np.float32)
+        try:
+            if self._can_rescore():
+                vectors = self._float_vectors.get(rows)
+            else:
+                vectors = self.index.reconstruct_batch(rows)
+        except RuntimeError:  # e.g. IVF without a direct map
+            return np.full(len(rows), np.nan, dtype=np.float32)
+        if self.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            return vectors @ query_embedding
+        return np.square(vectors - query_embedding).sum(axis=1)
+
+    def _collect_rows(
+        self,
+        scores: np.ndarray,
+        indices: np.ndarray,
+        filters: Dict[str, Any],
+        limit: int,
+    ) -> List[Tuple[int, SearchResult]]:
+        candidates: List[Tuple[int, SearchResult]] = []
+        seen_rows = set()
+        for idx, score in zip(indices, scores):
+            if idx < 0 or idx >= len(self.documents) or idx in seen_rows:
                 continue
             chunk = self.documents[idx]
-            if metadata_filters and not self._metadata_matches(chunk.metadata, metadata_filters):
-                continue
-            if chunk.id in seen_ids:
+            if filters and not self._metadata_matches(chunk.metadata, filters):
                 continue
             candidates.append(
-                SearchResult(
-                    text=chunk.text,
-                    metadata=dict(chunk.metadata),
-                    score=float(score),
-                    chunk_id=chunk.id,
+                (
+                    int(idx),
+                    SearchResult(
+                        text=chunk.text,
+                        metadata=dict(chunk.metadata),
+                        score=float(score),
+                        chunk_id=chunk.id,
+                    ),
                 )
             )
-            seen_ids.add(chunk.id)
-            if len(candidates) >= max_candidates:
+            seen_rows.add(idx)
+            if len(candidates) >= limit:
                 break
-
-        if not candidates:
-            return []
-
-        candidates.sort(key=lambda result: result.score, reverse=True)
-
-        if reranker:
-            reranked = reranker(query_text, candidates)
-            if reranked:
-                candidates = reranked
-
-        return candidates[:top_k]
+        return candidates
 
     # ------------------------------------------------------------------
     # Persistence helpers
@@ -398,24 +1061,102 @@ class FlexibleRAGPipeline:
         if target_index_path is None or target_documents_path is None:
             raise ValueError("Both index_path and documents_path must be provided to save().")
 
-        self._ensure_index()
-        if self.index is None:
-            raise RuntimeError("FAISS index failed to initialize before saving.")
+        if self._wal is not None and self._is_own_store(target_index_path, target_documents_path):
+            self.compact()
+            return
 
-        faiss.write_index(self.index, target_index_path)
+        with self._lock:
+            self._ensure_index()
+            if self.index is None:
+                raise RuntimeError("FAISS index failed to initialize before saving.")
+            index_bytes = faiss.serialize_index(self._writable_index())
+            documents = self.documents.frozen()
+            vector_rows = self._float_vector_rows()
+            keywords = self.keyword_index.snapshot() if self.keyword_index is not None else None
+
+        self._write_snapshot(index_bytes, documents, target_index_path, target_documents_path)
+        own = self._is_own_store(target_index_path, target_documents_path)
+        if own:
+            self._remap_documents(documents)
+        self._save_float_vectors(target_index_path, vector_rows)
+        self._save_keyword_index(keywords, target_index_path, rebase=own)
+
+    def persist(self) -> None:
+        """Make recent additions durable using the configured persistence mode.
+
+        In ``append`` mode this only nudges the background writer, so it is
+        cheap enough to call after every request; ``snapshot`` mode falls back
+        to a full :meth:`save`.
+        """
+
+        if self._wal is not None:
+            self._wal.request_flush()
+        else:
+            self.save()
 
-        with open(target_documents_path, "w", encoding="utf-8") as handle:
-            for chunk in self.documents:
-                handle.write(
-                    json.dumps(
-                        {
-                            "id": chunk.id,
-                            "text": chunk.text,
-                            "metadata": chunk.metadata,
-                        }
-                    )
-                    + "\n"
-                )
+    def compact(self) -> None:
+        """Fold the write-ahead log into a fresh snapshot and truncate it."""
+
+        if self._wal is None:
+            self.save()
+            return
+        if self.index_path is None or self.documents_path is None:
+            raise ValueError("Both index_path and documents_path must be set to compact().")
+
+        with self._compact_lock:
+            with self._lock:
+                index_bytes = faiss.serialize_index(self._writable_index())
+                documents = self.documents.frozen()
+                vector_rows = self._float_vector_rows()
+                keywords = self.keyword_index.snapshot() if self.keyword_index is not None else None
+                compacting_path = self._wal.rotate()
+
+            self._write_snapshot(index_bytes, documents, self.index_path, self.documents_path)
+            self._remap_documents(documents)
+            self._save_float_vectors(self.index_path, vector_rows)
+            self._save_keyword_index(keywords, self.index_path, rebase=True)
+            if os.path.exists(compacting_path):
+                os.remove(compacting_path)
+
+    @contextmanager
+    def deferred_compaction(self) -> Iterator[None]:
+        """Suspend automatic log compaction for a bulk load, then compact once.
+
+        Each compaction rewrites the whole snapshot under the pipeline lock, so
+        letting the threshold fire repeatedly during a large ingest costs
+        quadratic I/O and stalls queries.
+        """
+
+        if self._wal is None:
+            yield
+            return
+        self._wal.hold_compaction()
+        try:
+            yield
+        finally:
+            due = self._wal.release_compaction()
+        if due:
+            self.compact()
+
+    def flush(self) -> None:
+        """Synchronously write any buffered write-ahead log records."""
+
+        if self._wal is not None:
+            self._wal.flush()
+
+    def close(self) -> None:
+        """Flush buffered records and stop the background writer."""
+
+        if self._wal is not None:
+            self._wal.close()
+        if self.embedding_store is not None:
+            self.embedding_store.close()
+        if self._float_vectors is not None:
+            self._float_vectors.close()
+            self._float_vectors = None
+        if self._keyword_executor is not None:
+            self._keyword_executor.shutdown(wait=False, cancel_futures=True)
+            self._keyword_executor = None
 
     def load(
         self,
@@ -423,7 +1164,12 @@ class FlexibleRAGPipeline:
         index_path: Optional[str] = None,
         documents_path: Optional[str] = None,
     ) -> None:
-        """Load a previously saved FAISS index and document metadata."""
+        """Load a previously saved FAISS index and document metadata.
+
+        In ``append`` mode any write-ahead log records not yet folded into the
+        snapshot are replayed afterwards, and a torn final record left by a
+        crash is discarded.
+        """
 
         target_index_path = index_path or self.index_path
         target_documents_path = documents_path or self.documents_path
@@ -431,52 +1177,316 @@ class FlexibleRAGPipeline:
         if target_index_path is None or target_documents_path is None:
             raise ValueError("Both index_path and documents_path must be provided to load().")
 
-        if not os.path.exists(target_index_path):
+        replay_paths: List[str] = []
+        if self._wal is not None and self._is_own_store(target_index_path, target_documents_path):
+            replay_paths = [
+                path
+                for path in (self.wal_path + COMPACTING_SUFFIX, self.wal_path)
+                if os.path.exists(path)
+            ]
+
+        if not os.path.exists(target_index_path) and not replay_paths:
             raise FileNotFoundError(target_index_path)
 
-        self.index = faiss.read_index(target_index_path)
+        with self._lock:
+            if os.path.exists(target_index_path):
+                self._load_snapshot(target_index_path, target_documents_path)
+            else:
+                if self.index is not None:
+                    self._writable_index().reset()
+                    self._sync_float_vectors()
+                self.documents = ChunkStore(DocumentChunk)
+                if self.keyword_index is not None:
+                    self.keyword_index.clear()
+
+            if replay_paths:
+                self._replay_wal(replay_paths)
+
+            self._rebuild_content_hashes()
+            self._rebuild_metadata_index()
+            self._is_loaded = True
+
+    def _load_snapshot(self, index_path: str, documents_path: str) -> None:
+        if self.mmap_index:
+            self.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+            self._mapped_index_path = index_path
+        else:
+            self.index = faiss.read_index(index_path)
+            self._mapped_index_path = None
         self.dimension = self.index.d
+        self._load_float_vectors(index_path)
 
-        self.documents = []
-        if os.path.exists(target_documents_path):
-            with open(target_documents_path, "r", encoding="utf-8") as handle:
-                for line in handle:
-                    cleaned = line.strip()
-                    if not cleaned:
-                        continue
-                    if cleaned.startswith("{"):
-                        payload = json.loads(cleaned)
-                        text = payload.get("text", "").strip()
-                        metadata = payload.get("metadata") or {}
-                        chunk_id = payload.get("id") or payload.get("chunk_id")
-                    else:
-                        text = cleaned
-                        metadata = {}
-                        chunk_id = None
-                    if not text:
-                        continue
-                    self.documents.append(
-                        DocumentChunk(text=text, metadata=metadata, id=chunk_id or str(uuid4()))
-                    )
+        if is_chunk_store(documents_path):
+            self.documents = ChunkStore(DocumentChunk, documents_path)
+        else:
+            self.documents = ChunkStore(DocumentChunk, tail=self._read_jsonl_documents(documents_path))
+        self._load_keyword_index(index_path)
 
         if len(self.documents) != self.index.ntotal:
             # Rebuild index to avoid mismatches
             texts = [chunk.text for chunk in self.documents]
             self._ensure_model()
-            self._ensure_index()
-            self.index.reset()
+            self._writable_index().reset()
+            self._sync_float_vectors()
             if texts:
-                embeddings = self._embed_texts(texts)
+                embeddings = self._embed_documents(
+                    texts, [self._chunk_hash(chunk) for chunk in self.documents]
+                )
+                if self._float_vectors is not None:
+                    self._float_vectors.append(embeddings)
                 self.index.add(embeddings)
 
-        self._is_loaded = True
+        self._maybe_promote_index()
+
+    def _load_keyword_index(self, index_path: str) -> None:
+        """Map the BM25 snapshot saved next to ``index_path``, rebuilding it if missing or stale."""
+
+        if self.keyword_index is None:
+            return
+        path = index_path + KEYWORD_INDEX_SUFFIX
+        try:
+            self.keyword_index.load(path)
+        except (OSError, ValueError) as exc:
+            logger.debug("No usable keyword index at %s: %s", path, exc)
+            self.keyword_index.clear()
+        if len(self.keyword_index) == len(self.documents):
+            return
+        logger.info("Rebuilding the keyword index for %d RAG chunks.", len(self.documents))
+        self.keyword_index.clear()
+        batch: List[List[str]] = []
+        for position, chunk in enumerate(self.documents):
+            batch.append(tokenize(chunk.text))
+            if len(batch) == 4096:
+                self.keyword_index.add(position + 1 - len(batch), batch)
+                batch = []
+        if batch:
+            self.keyword_index.add(len(self.documents) - len(batch), batch)
+
+    def _save_keyword_index(
+        self, snapshot: Optional[KeywordSnapshot], index_path: str, *, rebase: bool
+    ) -> None:
+        if snapshot is None:
+            return
+        path = index_path + KEYWORD_INDEX_SUFFIX
+        atomic_write(path, snapshot.write, binary=True)
+        if rebase:
+            # Serve the new snapshot from its mapping; only newer rows stay in memory.
+            self.keyword_index.rebase(path, snapshot)
+
+    def _load_float_vectors(self, index_path: str) -> None:
+        """Copy the float32 rows saved next to ``index_path`` into the working store."""
+
+        if not self.rescore:
+            return
+        if self._float_vectors is None or self._float_vectors.dimension != self.index.d:
+            if self._float_vectors is not None:
+                self._float_vectors.close()
+            self._float_vectors = FloatVectorStore(self.index.d, self.vectors_path)
+        if not self._float_vectors.replace_from(index_path + VECTORS_SUFFIX):
+            self._float_vectors.truncate(0)
+        self._sync_float_vectors()
+
+    def _float_vector_rows(self) -> Optional[int]:
+        """Flush the working store and return its row count; call under ``_lock``."""
+
+        if self._float_vectors is None:
+            return None
+        self._float_vectors.flush()
+        return len(self._float_vectors)
+
+    def _save_float_vectors(self, index_path: str, rows: Optional[int]) -> None:
+        """Write the first ``rows`` re-scoring rows next to the snapshot at ``index_path``."""
+
+        store = self._float_vectors
+        if store is None or rows is None:
+            return
+        store.copy_to(index_path + VECTORS_SUFFIX, rows)
+
+    @staticmethod
+    def _read_jsonl_documents(documents_path: str) -> List[DocumentChunk]:
+        """Parse the legacy one-JSON-object-per-line documents format."""
+
+        documents: List[DocumentChunk] = []
+        if not os.path.exists(documents_path):
+            return documents
+        with open(documents_path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                cleaned = line.strip()
+                if not cleaned:
+                    continue
+                if cleaned.startswith("{"):
+                    payload = json.loads(cleaned)
+                    text = payload.get("text", "").strip()
+                    metadata = payload.get("metadata") or {}
+                    chunk_id = payload.get("id") or payload.get("chunk_id")
+                else:
+                    text = cleaned
+                    metadata = {}
+                    chunk_id = None
+                if not text:
+                    continue
+                documents.append(
+                    DocumentChunk(text=text, metadata=metadata, id=chunk_id or str(uuid4()))
+                )
+        return documents
+
+    def _replay_wal(self, paths: Sequence[str]) -> None:
+        # Records are logged in row order, and the snapshot holds the first
+        # len(self.documents) rows; anything below that (e.g. a .compacting
+        # file left by a crash after the snapshot was written) is already in.
+        next_row = len(self.documents)
+        vectors: List[np.ndarray] = []
+        replayed: List[DocumentChunk] = []
+        for path in paths:
+            records, valid_bytes = read_wal(path)
+            truncate_file(path, valid_bytes)
+            for record in records:
+                row = record.get("row")
+                if record.get("op") != "add" or row is None or row < next_row:
+                    continue
+                next_row = row + 1
+                vectors.append(decode_vector(record["embedding"]))
+                replayed.append(
+                    DocumentChunk(
+                        text=record.get("text", ""),
+                        metadata=record.get("metadata") or {},
+                        id=record.get("id") or str(uuid4()),
+                    )
+                )
+
+        if not replayed:
+            return
+
+        matrix = np.ascontiguousarray(np.vstack(vectors), dtype=np.float32)
+        if self.index is None:
+            self.dimension = matrix.shape[1]
+        self._add_to_index(matrix)
+        start = len(self.documents)
+        self.documents.extend(replayed)
+        if self.keyword_index is not None:
+            self.keyword_index.add(start, [tokenize(chunk.text) for chunk in replayed])
+        logger.info("Replayed %d RAG chunks from the write-ahead log.", len(replayed))
+
+    def _write_snapshot(
+        self,
+        index_bytes: np.ndarray,
+        documents: ChunkStore,
+        index_path: str,
+        documents_path: str,
+    ) -> None:
+        atomic_write(index_path, lambda handle: handle.write(index_bytes.tobytes()), binary=True)
+
+        if self.document_format == "packed":
+            atomic_write(documents_path, documents.write, binary=True)
+            return
+
+        def write_documents(handle) -> None:
+            for chunk in documents:
+                handle.write(
+                    json.dumps(
+                        {
+                            "id": chunk.id,
+                            "text": chunk.text,
+                            "metadata": chunk.metadata,
+                        }
+                    )
+                    + "\n"
+                )
+
+        atomic_write(documents_path, write_documents)
+
+    def _remap_documents(self, written: ChunkStore) -> None:
+        """Swap the rows just written for a mapping of the new snapshot file."""
+
+        if self.document_format != "packed":
+            return
+        with self._lock:
+            # A reset or reload since the write means the file no longer
+            # describes the current store's leading rows.
+            if self.documents.starts_with(written):
+                self.documents = self.documents.rebased(self.documents_path, len(written))
+
+    def _is_own_store(self, index_path: str, documents_path: str) -> bool:
+        if self.index_path is None or self.documents_path is None:
+            return False
+        return os.path.abspath(index_path) == os.path.abspath(self.index_path) and (
+            os.path.abspath(documents_path) == os.path.abspath(self.documents_path)
+        )
 
     def reset(self) -> None:
-        """Completely clear the in-memory index and documents."""
+        """Completely clear the index and documents.
+
+        In ``append`` mode the clear is made durable too: an empty snapshot
+        replaces the saved one and the write-ahead log is deleted, otherwise a
+        reload would bring the old chunks back (and, as positional chunk ids
+        restart at zero, skip new log records as already known).
+        """
+
+        with self._compact_lock, self._lock:
+            if self.index is not None:
+                self._writable_index().reset()
+            if self._float_vectors is not None:
+                self._float_vectors.truncate(0)
+            self.documents = ChunkStore(DocumentChunk)
+            self._content_hashes = {}
+            self.metadata_index.clear()
+            if self.keyword_index is not None:
+                self.keyword_index.clear()
+            if self._wal is None:
+                return
+            if self.index is not None:
+                self._write_snapshot(
+                    faiss.serialize_index(self._writable_index()),
+                    self.documents.frozen(),
+                    self.index_path,
+                    self.documents_path,
+                )
+                self._save_float_vectors(self.index_path, self._float_vector_rows())
+                if self.keyword_index is not None:
+                    self._save_keyword_index(self.keyword_index.snapshot(), self.index_path, rebase=True)
+            self._wal.reset()
 
-        if self.index is not None:
-            self.index.reset()
-        self.documents = []
+    # ------------------------------------------------------------------
+    # Content-hash helpers
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _chunk_hash(chunk: DocumentChunk) -> str:
+        digest = chunk.metadata.get("content_hash")
+        if not digest:
+            # Stores written before content hashing carry no digest.
+            digest = content_hash(chunk.text)
+            chunk.metadata["content_hash"] = digest
+        return digest
+
+    def _unique_chunks(self, chunks: Sequence[DocumentChunk]) -> List[DocumentChunk]:
+        seen = set()
+        unique: List[DocumentChunk] = []
+        for chunk in chunks:
+            digest = chunk.metadata["content_hash"]
+            if digest in self._content_hashes or digest in seen:
+                continue
+            seen.add(digest)
+            unique.append(chunk)
+        skipped = len(chunks) - len(unique)
+        if skipped:
+            logger.debug("Skipped %d duplicate RAG chunks.", skipped)
+        return unique
+
+    def _rebuild_content_hashes(self) -> None:
+        # Read the hash and id columns only; chunk texts stay on disk.
+        self._content_hashes = {}
+        hashes = self.documents.column("content_hash")
+        for position, (digest, chunk_id) in enumerate(zip(hashes, self.documents.ids())):
+            if not digest:
+                digest = self._chunk_hash(self.documents[position])
+            self._content_hashes.setdefault(digest, chunk_id)
+
+    def _rebuild_metadata_index(self) -> None:
+        # Built column by column from the chunk store without decoding texts.
+        self.metadata_index.clear()
+        for field in self.documents.column_names():
+            if field not in self.metadata_index.unindexed_fields:
+                self.metadata_index.add_column(field, self.documents.column(field))
 
     # ------------------------------------------------------------------
     # Introspection helpers
@@ -484,6 +1494,28 @@ class FlexibleRAGPipeline:
     def __len__(self) -> int:  # pragma: no cover - trivial
         return len(self.documents)
 
+    def storage_stats(self) -> Dict[str, Any]:
+        """Memory used by the index's vectors compared with plain float32."""
+
+        with self._lock:
+            index = self.index
+            vectors = index.ntotal if index is not None else 0
+            dimension = index.d if index is not None else (self.dimension or 0)
+            index_bytes = index_memory_bytes(index) if index is not None else 0
+            float32_bytes = 4 * dimension * vectors
+            return {
+                "codec": self.vector_codec,
+                "index_type": type(faiss.downcast_index(index)).__name__ if index is not None else None,
+                "vectors": vectors,
+                "dimension": dimension,
+                "index_bytes": index_bytes,
+                "float32_bytes": float32_bytes,
+                "bytes_per_vector": index_bytes / vectors if vectors else 0.0,
+                "compression_ratio": float32_bytes / index_bytes if index_bytes else 1.0,
+                "rescore": index is not None and self._can_rescore(),
+                "float_store_bytes": self._float_vectors.nbytes if self._float_vectors is not None else 0,
+            }
+
     def _metadata_matches(self, metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
         for key, expected in filters.items():
             value = metadata.get(key)
@@ -0,0 +1,220 @@
+"""On-disk float32 vectors for exact re-scoring of compressed RAG indexes.
+
+With a compressed ``vector_codec`` (float16, SQ8 or PQ) the FAISS index only
+holds approximate codes, so its scores and its ranking of near-ties drift from
+the float32 ones. :class:`FloatVectorStore` keeps the original float32 rows in
+a flat file next to the index (``<index_path>.vectors``) and memory-maps it, so
+the pipeline can fetch a few times ``top_k`` candidates from the compressed
+index and re-rank them exactly while only the candidate rows are paged in.
+
+File layout: a 16-byte header (magic, dimension) followed by the rows as
+little-endian float32, in index order. The pipeline appends rows to a working
+store as chunks are added and copies it over the saved file on save, so the
+saved file never holds rows the index beside it does not.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import struct
+import tempfile
+from typing import Optional, Tuple
+
+import numpy as np
+
+from rag_persistence import atomic_write
+
+logger = logging.getLogger(__name__)
+
+VECTORS_SUFFIX = ".vectors"
+MAGIC = b"RAGVEC1\n"
+HEADER = struct.Struct("<8sI4x")
+COPY_BLOCK_BYTES = 16 * 1024 * 1024
+
+
+def _read_header(handle) -> Tuple[bytes, int]:
+    handle.seek(0)
+    raw = handle.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        return b"", 0
+    return HEADER.unpack(raw)
+
+
+class FloatVectorStore:
+    """Append-only float32 matrix on disk with memory-mapped row lookups.
+
+    ``path=None`` keeps the rows in an anonymous temporary file, so a pipeline
+    without an index path still re-scores without holding them in RAM.
+    """
+
+    def __init__(self, dimension: int, path: Optional[str] = None) -> None:
+        self.dimension = int(dimension)
+        self.path = path
+        if path is None:
+            self._handle = tempfile.TemporaryFile(prefix="rag-vectors-")
+        else:
+            self._handle = open(path, "r+b" if os.path.exists(path) else "w+b")
+        self._map: Optional[np.memmap] = None
+        self._rows = self._open_rows()
+
+    @property
+    def row_bytes(self) -> int:
+        return 4 * self.dimension
+
+    @property
+    def nbytes(self) -> int:
+        return HEADER.size + self._rows * self.row_bytes
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def _open_rows(self) -> int:
+        size = self._handle.seek(0, os.SEEK_END)
+        if size:
+            magic, dimension = _read_header(self._handle)
+            if magic == MAGIC and dimension == self.dimension:
+                # A torn final row from a crash is ignored and overwritten.
+                return (size - HEADER.size) // self.row_bytes
+            logger.warning("Discarding incompatible float vector store %s.", self.path)
+        self._handle.seek(0)
+        self._handle.truncate()
+        self._handle.write(HEADER.pack(MAGIC, self.dimension))
+        return 0
+
+    def append(self, vectors: np.ndarray) -> None:
+        data = np.ascontiguousarray(vectors, dtype="<f4")
+        if data.ndim != 2 or data.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of shape (n, {self.dimension}), got {data.shape}.")
+        self._map = None
+        self._handle.seek(HEADER.size + self._rows * self.row_bytes)
+        self._handle.write(data.tobytes())
+        self._rows += len(data)
+
+    def get(self, ids: np.ndarray) -> np.ndarray:
+        """Return the float32 rows at ``ids`` (sorted ids read fastest)."""
+
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return np.empty((0, self.dimension), dtype=np.float32)
+        if self._map is None:
+            self._handle.flush()
+            self._map = np.memmap(
+                self._handle, dtype="<f4", mode="r", offset=HEADER.size,
+                shape=(self._rows, self.dimension),
+            )
+        return np.asarray(self._map[ids], dtype=np.float32)
+
+    def truncate(self, rows: int) -> None:
+        """Drop every row from ``rows`` onwards."""
+
+        rows = max(min(rows, self._rows), 0)
+        self._map = None
+        self._handle.flush()
+        self._handle.truncate(HEADER.size + rows * self.row_bytes)
+        self._rows = rows
+
+    def flush(self) -> None:
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def replace_from(self, path: str) -> bool:
+        """Overwrite this store with the rows saved at ``path``.
+
+        Returns False, leaving the store unchanged, if ``path`` is missing or
+        holds vectors of another dimension.
+        """
+
+        if not os.path.exists(path):
+            return False
+        with open(path, "rb") as source:
+            if _read_header(source) != (MAGIC, self.dimension):
+                return False
+            source.seek(0)
+            self._map = None
+            self._handle.seek(0)
+            self._handle.truncate()
+            shutil.copyfileobj(source, self._handle, COPY_BLOCK_BYTES)
+        size = self._handle.seek(0, os.SEEK_END)
+        self._rows = (size - HEADER.size) // self.row_bytes
+        return True
+
+    def copy_to(self, path: str, rows: Optional[int] = None) -> None:
+        """Atomically write the header and the first ``rows`` rows (default all) to ``path``.
+
+        With ``rows`` given, the caller must have flushed those rows; the copy
+        then reads with ``os.pread`` and may overlap later appends.
+        """
+
+        if rows is None:
+            self._handle.flush()
+            rows = self._rows
+        fileno = self._handle.fileno()
+
+        def write(handle) -> None:
+            position, end = 0, HEADER.size + min(rows, self._rows) * self.row_bytes
+            while position < end:
+                block = os.pread(fileno, min(end - position, COPY_BLOCK_BYTES), position)
+                if not block:
+                    raise OSError(f"Float vector store ended early while copying to {path}.")
+                handle.write(block)
+                position += len(block)
+
+        atomic_write(path, write, binary=True)
+
+    def close(self) -> None:
+        self._map = None
+        self._handle.close()
+
+
+def exact_scores(
+    queries: np.ndarray, vectors: np.ndarray, ids: np.ndarray, k: int, *, inner_product: bool
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-``k`` ``(scores, ids)`` per query over ``vectors``, in FAISS order."""
+
+    if inner_product:
+        scores = queries @ vectors.T
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    else:
+        scores = (
+            np.square(queries).sum(axis=1, keepdims=True)
+            - 2 * queries @ vectors.T
+            + np.square(vectors).sum(axis=1)
+        )
+        order = np.argsort(scores, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(scores, order, axis=1), ids[order]
+
+
+def rescore(
+    queries: np.ndarray,
+    candidates: np.ndarray,
+    store: FloatVectorStore,
+    k: int,
+    *,
+    inner_product: bool,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Re-rank each query's FAISS candidate ids by exact scores from ``store``.
+
+    Missing slots are padded like FAISS pads them (id -1, worst score).
+    """
+
+    worst = -np.finfo(np.float32).max if inner_product else np.finfo(np.float32).max
+    scores = np.full((len(queries), k), worst, dtype=np.float32)
+    ids = np.full((len(queries), k), -1, dtype=np.int64)
+    unique = np.unique(candidates[candidates >= 0])
+    vectors = store.get(unique)  # one sorted read for the whole batch
+    for row, (query, row_ids) in enumerate(zip(queries, candidates)):
+        row_ids = np.sort(row_ids[row_ids >= 0])  # ties keep the lowest id first
+        if not len(row_ids):
+            continue
+        row_vectors = vectors[np.searchsorted(unique, row_ids)]
+        row_scores, row_ids = exact_scores(
+            query[None, :], row_vectors, row_ids, k, inner_product=inner_product
+        )
+        found = row_ids.shape[1]
+        scores[row, :found] = row_scores[0]
+        ids[row, :found] = row_ids[0]
+    return scores, ids
+
+
+__all__ = ["FloatVectorStore", "VECTORS_SUFFIX", "exact_scores", "rescore"]
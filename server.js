@@ -139,6 +139,7 @@ app.use(express.static(path.join(__dirname, 'public')));
 const pythonApiPort = process.env.PYTHON_API_PORT || 8000;
 const PYTHON_API_BASE = `http://localhost:${pythonApiPort}/api`;
 const PYTHON_CHAT_URL = `${PYTHON_API_BASE}/chat`;
+const PYTHON_CHAT_STREAM_URL = `${PYTHON_API_BASE}/chat/stream`;
 const PYTHON_LOCAL_MODEL_STATUS_URL = `${PYTHON_API_BASE}/models/local/status`;
 const PYTHON_LOCAL_MODEL_DOWNLOAD_URL = `${PYTHON_API_BASE}/models/local/download`;
 
@@ -259,6 +260,72 @@ app.post('/api/chat', async (req, res) => {
   }
 });
 
+// Token streaming: relay the Python service's SSE stream as it is produced.
+app.post('/api/chat/stream', async (req, res) => {
+  const controller = new AbortController();
+  res.on('close', () => {
+    if (!res.writableEnded) {
+      console.log('[INFO] Client disconnected, aborting upstream stream.');
+      controller.abort();
+    }
+  });
+
+  const { messages, model } = req.body || {};
+  if (!Array.isArray(messages) || messages.length === 0) {
+    return res.status(400).json({ error: 'messages must be a non-empty array' });
+  }
+  const userQuery = messages[messages.length - 1].content;
+
+  try {
+    const upstream = await fetch(PYTHON_CHAT_STREAM_URL, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Accept': 'text/event-stream',
+      },
+      body: JSON.stringify({ query: userQuery, model }),
+      signal: controller.signal,
+    });
+
+    if (!upstream.ok) {
+      const errorBody = await upstream.text();
+      console.error('[ERROR] Python stream returned an error:', upstream.status, errorBody);
+      const retryAfter = upstream.headers.get('retry-after');
+      if (retryAfter) res.setHeader('Retry-After', retryAfter);
+      const status = upstream.status === 429 || upstream.status === 503 ? upstream.status : 502;
+      return res.status(status).json({ error: 'The chat service is busy. Please retry shortly.' });
+    }
+
+    res.setHeader('Content-Type', 'text/event-stream');
+    res.setHeader('Cache-Control', 'no-cache');
+    res.setHeader('Connection', 'keep-alive');
+    res.setHeader('X-Accel-Buffering', 'no');
+    res.flushHeaders();
+
+    for await (const chunk of upstream.body) {
+      res.write(chunk);
+    }
+    res.end();
+  } catch (err) {
+    if (err.name === 'AbortError') {
+      return res.end();
+    }
+    console.error('[ERROR] Failed to stream from Python RAG service:', err.message);
+    if (!res.headersSent) {
+      res.setHeader('Content-Type', 'text/event-stream');
+      res.setHeader('Cache-Control', 'no-cache');
+    }
+    const errorPayload = {
+      error: {
+        message: 'The backend RAG service is currently unavailable. Please try again later.'
+      }
+    };
+    res.write(`event: error\n`);
+    res.write(`data: ${JSON.stringify(errorPayload)}\n\n`);
+    res.end();
+  }
+});
+
 app.get('/api/models/local/status', async (_req, res) => {
   try {
     const upstream = await fetch(PYTHON_LOCAL_MODEL_STATUS_URL, {
@@ -9,7 +9,7 @@ import time
 import streamlit as st
 
 import config
-from api_client import USE_MOCK_MODE, process_query, process_query_with_context
+from api_client import USE_MOCK_MODE, process_query_with_context, stream_query
 from rag import load_rag_index, retrieve_from_rag, save_rag_index
 
 # Page configuration with custom theme
@@ -605,7 +605,8 @@ if (send_button or user_input) and user_input:
                 )
                 st.session_state.conversation_history = new_history
             else:
-                response = process_query(user_input)
+                # Render tokens as they arrive instead of waiting for the full answer
+                response = st.write_stream(stream_query(user_input))
                 st.session_state.conversation_history = [
                     {"role": "user", "content": user_input},
                     {"role": "assistant", "content": response},
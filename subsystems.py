@@ -0,0 +1,146 @@
+"""Registry of lazily initialised application subsystems.
+
+Importing the service must stay cheap: loading the embedding model, reading
+the FAISS index, constructing provider SDK clients and reloading the local
+model each take seconds. Modules register such work here as a factory. The
+subsystem is built on first use (``get``) or ahead of time by ``warm_up``,
+which the API service runs in the background at startup. A failed factory
+is not cached, so the next use retries it.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Iterable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Subsystem(Generic[T]):
+    """One lazily built resource; ``get`` is thread-safe and builds at most once."""
+
+    def __init__(self, name: str, factory: Callable[[], T]) -> None:
+        self.name = name
+        self.factory = factory
+        self._value: Optional[T] = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self.seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self) -> T:
+        if self._ready:
+            return self._value  # type: ignore[return-value]
+        with self._lock:
+            if not self._ready:
+                started = time.perf_counter()
+                try:
+                    value = self.factory()
+                except Exception as exc:
+                    self.error = str(exc)
+                    raise
+                self.seconds = time.perf_counter() - started
+                self.error = None
+                self._value, self._ready = value, True
+                logger.info("Initialised %s in %.2fs.", self.name, self.seconds)
+        return self._value  # type: ignore[return-value]
+
+    def set(self, value: T) -> None:
+        """Install an already built value (custom wiring, tests)."""
+
+        with self._lock:
+            self._value, self._ready = value, True
+
+    def reset(self) -> None:
+        """Forget the value; the next ``get`` builds it again."""
+
+        with self._lock:
+            self._value, self._ready = None, False
+            self.seconds = self.error = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self._ready,
+            "init_seconds": round(self.seconds, 3) if self.seconds is not None else None,
+            "error": self.error,
+        }
+
+
+_registry: Dict[str, Subsystem] = {}
+_registry_lock = threading.Lock()
+
+
+def register(name: str, factory: Callable[[], T]) -> Subsystem[T]:
+    """Register ``factory`` under ``name`` (replacing any earlier registration)."""
+
+    subsystem = Subsystem(name, factory)
+    with _registry_lock:
+        _registry[name] = subsystem
+    return subsystem
+
+
+def get(name: str) -> Any:
+    with _registry_lock:
+        subsystem = _registry.get(name)
+    if subsystem is None:
+        raise KeyError(f"Unknown subsystem: {name}")
+    return subsystem.get()
+
+
+def names() -> list:
+    with _registry_lock:
+        return list(_registry)
+
+
+def warm_up(selected: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Initialise ``selected`` subsystems (all by default), in registration order.
+
+    Failures are logged and reported in the returned status instead of being
+    raised, so one unavailable subsystem does not block the others. Unknown
+    names are ignored; their modules may not have been imported.
+    """
+
+    with _registry_lock:
+        chosen = [
+            subsystem for name, subsystem in _registry.items()
+            if selected is None or name in set(selected)
+        ]
+    for subsystem in chosen:
+        try:
+            subsystem.get()
+        except Exception as exc:  # noqa: BLE001 - reported in the status
+            logger.warning("Warm-up of %s failed: %s", subsystem.name, exc)
+    return {subsystem.name: subsystem.status() for subsystem in chosen}
+
+
+def warm_up_in_background(selected: Optional[Iterable[str]] = None) -> threading.Thread:
+    """Run ``warm_up`` on a daemon thread and return the thread."""
+
+    selected = None if selected is None else list(selected)
+    thread = threading.Thread(target=warm_up, args=(selected,), name="subsystem-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def status() -> Dict[str, Dict[str, Any]]:
+    with _registry_lock:
+        subsystems = list(_registry.values())
+    return {subsystem.name: subsystem.status() for subsystem in subsystems}
+
+
+__all__ = [
+    "Subsystem",
+    "get",
+    "names",
+    "register",
+    "status",
+    "warm_up",
+    "warm_up_in_background",
+]
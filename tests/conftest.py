@@ -1,5 +1,64 @@
+import re
 import sys
+import zlib
 from pathlib import Path
 
+import pytest
+
 # Add the project root to sys.path so tests can import modules directly.
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words stand-in for SentenceTransformer.
+
+    Lets pipeline tests exercise indexing and persistence without downloading
+    an embedding model.
+    """
+
+    def __init__(self, dimension: int = 64) -> None:
+        self.dimension = dimension
+        self.encode_calls = 0
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, texts, convert_to_numpy=True, normalize_embeddings=True, **kwargs):
+        import numpy as np
+
+        self.encode_calls += 1
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", str(text).lower()):
+                vectors[row, zlib.crc32(token.encode("utf-8")) % self.dimension] += 1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+        return vectors
+
+
+@pytest.fixture
+def hashing_embedder():
+    return HashingEmbedder()
+
+
+@pytest.fixture
+def make_pipeline(tmp_path, hashing_embedder):
+    """Build FlexibleRAGPipeline instances backed by the hashing embedder."""
+
+    from rag_pipeline import FlexibleRAGPipeline
+
+    created = []
+
+    def factory(**kwargs):
+        kwargs.setdefault("index_path", str(tmp_path / "index.faiss"))
+        kwargs.setdefault("documents_path", str(tmp_path / "documents.jsonl"))
+        pipeline = FlexibleRAGPipeline("hashing-test-model", **kwargs)
+        pipeline.embedder = hashing_embedder
+        pipeline.dimension = hashing_embedder.dimension
+        created.append(pipeline)
+        return pipeline
+
+    yield factory
+    for pipeline in created:
+        pipeline.close()
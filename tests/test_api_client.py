@@ -1,5 +1,6 @@
 """Tests for api_client.py error handling and provider routing."""
 
+import json
 from unittest.mock import MagicMock, patch
 import pytest
 
@@ -61,3 +62,175 @@ def test_openai_exception_handling_uses_generic_exception():
         from api_client import process_openai_query
         result = process_openai_query("test", "")
         assert "fallback" in result or "Error" in result
+
+
+def _delta_chunk(content=None, tool_calls=None):
+    delta = MagicMock()
+    delta.content = content
+    delta.tool_calls = tool_calls
+    chunk = MagicMock()
+    chunk.choices = [MagicMock(delta=delta)]
+    return chunk
+
+
+def _tool_call_delta(index, call_id=None, name=None, arguments=None):
+    call = MagicMock()
+    call.index = index
+    call.id = call_id
+    call.function.name = name
+    call.function.arguments = arguments
+    return call
+
+
+def test_stream_query_mock_mode_yields_chunks():
+    """In mock mode, stream_query should relay the mock streaming generator."""
+    mock_gen = MagicMock()
+    mock_gen.get_streaming_response.return_value = iter(["Hello ", "world"])
+    with patch("api_client.USE_MOCK_MODE", True), \
+         patch("api_client.mock_generator", mock_gen), \
+         patch("api_client.retrieve_from_rag", return_value=""):
+        from api_client import stream_query
+        assert list(stream_query("test query")) == ["Hello ", "world"]
+
+
+def test_stream_chat_completion_resolves_streamed_tool_calls():
+    """Tool-call fragments are reassembled, executed, and the stream continues."""
+    first_turn = [
+        _delta_chunk(tool_calls=[_tool_call_delta(0, "call-1", "analyze_sequence", '{"sequence": ')]),
+        _delta_chunk(tool_calls=[_tool_call_delta(0, arguments='"ATG", "sequence_type": "DNA"}')]),
+    ]
+    second_turn = [_delta_chunk("The sequence "), _delta_chunk("encodes M.")]
+    client = MagicMock()
+    client.chat.completions.create.side_effect = [iter(first_turn), iter(second_turn)]
+
+    with patch("api_client.tools.analyze_sequence", return_value={"translation": "M"}) as tool, \
+         patch("api_client.add_to_rag"):
+        from api_client import _stream_chat_completion
+        messages = [{"role": "user", "content": "analyze ATG"}]
+        chunks = list(_stream_chat_completion(client, "grok-4", messages))
+
+    assert chunks == ["The sequence ", "encodes M."]
+    tool.assert_called_once_with(sequence="ATG", sequence_type="DNA")
+    assert messages[-1]["role"] == "tool"
+    assert messages[-1]["tool_call_id"] == "call-1"
+
+
+def test_stream_grok_query_falls_back_on_error():
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.side_effect = Exception("connection refused")
+    mock_gen = MagicMock()
+    mock_gen.get_response.return_value = "fallback"
+    with patch("api_client.grok_client", mock_client), \
+         patch("api_client.mock_generator", mock_gen):
+        from api_client import stream_grok_query
+        assert "fallback" in "".join(stream_grok_query("test", ""))
+
+
+def _message_with_tool_calls(*calls):
+    message = MagicMock()
+    message.tool_calls = []
+    for call_id, name, arguments in calls:
+        tool_call = MagicMock()
+        tool_call.id = call_id
+        tool_call.function.name = name
+        tool_call.function.arguments = arguments
+        message.tool_calls.append(tool_call)
+    return MagicMock(choices=[MagicMock(message=message)])
+
+
+def test_tool_calls_in_one_turn_run_concurrently_in_order():
+    import threading
+    import time
+
+    barrier = threading.Barrier(3, timeout=2)
+
+    def slow_search(query, max_results=3):
+        barrier.wait()  # only passes if all three calls run at once
+        time.sleep(0.01 * int(query))
+        return {"query": query}
+
+    final = MagicMock(choices=[MagicMock(message=MagicMock(tool_calls=None, content="done"))])
+    client = MagicMock()
+    client.chat.completions.create.side_effect = [
+        _message_with_tool_calls(
+            *[(f"call-{i}", "search_pubmed", json.dumps({"query": str(3 - i)})) for i in range(3)]
+        ),
+        final,
+    ]
+    with patch("api_client.grok_client", client), \
+         patch("api_client.tools.search_pubmed", side_effect=slow_search), \
+         patch("api_client.add_to_rag") as add_to_rag:
+        from api_client import process_grok_query
+        assert process_grok_query("papers", "") == "done"
+
+    messages = client.chat.completions.create.call_args.kwargs["messages"]
+    tool_messages = [m for m in messages if isinstance(m, dict) and m.get("role") == "tool"]
+    assert [m["tool_call_id"] for m in tool_messages] == ["call-0", "call-1", "call-2"]
+    assert [json.loads(m["content"])["query"] for m in tool_messages] == ["3", "2", "1"]
+    add_to_rag.assert_called_once()
+    assert len(add_to_rag.call_args.args[0]) == 3
+
+
+def test_tool_call_timeout_and_failure_become_error_results():
+    import threading
+
+    release = threading.Event()
+
+    def hanging(**kwargs):
+        release.wait(5)
+        return {"late": True}
+
+    with patch("api_client.tools.search_pubmed", side_effect=hanging), \
+         patch("api_client.tools.analyze_sequence", side_effect=ValueError("bad sequence")), \
+         patch("api_client.tools.calculate_drug_properties", return_value={"mw": 180.2}), \
+         patch.dict("api_client.config.TOOL_CALL_TIMEOUTS", {"search_pubmed": 0.05}), \
+         patch("api_client.add_to_rag") as add_to_rag:
+        from api_client import _run_tool_calls
+        results = _run_tool_calls([
+            ("search_pubmed", '{"query": "x"}'),
+            ("analyze_sequence", '{"sequence": "Z", "sequence_type": "DNA"}'),
+            ("calculate_drug_properties", '{"smiles": "C"}'),
+        ])
+    release.set()
+
+    assert "timed out" in results[0]["error"]
+    assert "bad sequence" in results[1]["error"]
+    assert results[2] == {"mw": 180.2}
+    assert add_to_rag.call_args.args[0] == ['[Tool: calculate_drug_properties] {"mw": 180.2}']
+
+
+def test_tool_call_timeout_starts_when_the_call_runs():
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    release = threading.Event()
+
+    def slow(**kwargs):
+        time.sleep(0.3)
+        return {"slow": True}
+
+    def fast(**kwargs):
+        time.sleep(0.2)
+        return {"fast": True}
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    with patch("api_client._tool_executor", pool), \
+         patch("api_client.tools.search_pubmed", side_effect=slow), \
+         patch("api_client.tools.calculate_drug_properties", side_effect=fast), \
+         patch.dict("api_client.config.TOOL_CALL_TIMEOUTS",
+                    {"search_pubmed": 5.0, "calculate_drug_properties": 0.4}), \
+         patch("api_client.add_to_rag"):
+        from api_client import _run_tool_calls
+        # Queued for 0.3 s and running for 0.2 s: only the run counts.
+        results = _run_tool_calls([
+            ("search_pubmed", '{"query": "x"}'),
+            ("calculate_drug_properties", '{"smiles": "C"}'),
+        ])
+        assert results == [{"slow": True}, {"fast": True}]
+
+        pool.submit(release.wait, 5)  # every worker is busy
+        results = _run_tool_calls([("calculate_drug_properties", '{"smiles": "C"}')])
+        assert "not started" in results[0]["error"]
+    release.set()
+    pool.shutdown()
@@ -0,0 +1,156 @@
+"""Tests for the FastAPI chat endpoints, worker pool and backpressure."""
+
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api_service
+from api_service import ChatExecutor, ChatQueueFull, ChatQueueTimeout
+
+
+def test_chat_endpoint_runs_on_worker_thread():
+    seen_threads = []
+
+    def fake_process_query(query, model=None):
+        seen_threads.append(threading.current_thread().name)
+        return f"answer to {query}"
+
+    with patch("api_service.process_query", fake_process_query):
+        client = TestClient(api_service.app)
+        response = client.post("/api/chat", json={"query": "hello"})
+
+    assert response.status_code == 200
+    assert response.json() == {"response": "answer to hello"}
+    assert seen_threads and seen_threads[0].startswith("chat-worker")
+
+
+def test_executor_rejects_when_queue_full():
+    executor = ChatExecutor(max_workers=1, max_queue_depth=0, queue_timeout=30)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ChatQueueFull):
+            await executor.run(lambda: None)
+        release.set()
+        await blocked
+
+    asyncio.run(scenario())
+    assert executor.stats()["rejected"] == 1
+    executor.shutdown()
+
+
+def test_cancelled_request_keeps_its_slot_until_the_job_finishes():
+    executor = ChatExecutor(max_workers=1, max_queue_depth=0, queue_timeout=30)
+    release = threading.Event()
+
+    async def scenario():
+        abandoned = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        abandoned.cancel()  # e.g. the client disconnected
+        await asyncio.sleep(0)
+        with pytest.raises(ChatQueueFull):
+            await executor.run(lambda: None)
+        release.set()
+        deadline = time.monotonic() + 5
+        stats = executor.stats()
+        while stats["running"] + stats["queued"] and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+            stats = executor.stats()
+        assert await executor.run(lambda: "admitted") == "admitted"
+
+    asyncio.run(scenario())
+    executor.shutdown()
+
+
+def test_executor_drops_requests_that_waited_too_long():
+    executor = ChatExecutor(max_workers=1, max_queue_depth=1, queue_timeout=0.05)
+
+    async def scenario():
+        slow = asyncio.ensure_future(executor.run(time.sleep, 0.2))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ChatQueueTimeout):
+            await executor.run(lambda: "never")
+        await slow
+
+    asyncio.run(scenario())
+    assert executor.stats()["timed_out"] == 1
+    executor.shutdown()
+
+
+@pytest.mark.parametrize(
+    "error, status_code",
+    [(ChatQueueFull(), 429), (ChatQueueTimeout(), 503)],
+)
+def test_chat_endpoint_maps_backpressure_to_http(error, status_code):
+    class SaturatedExecutor:
+        async def run(self, *args, **kwargs):
+            raise error
+
+        def stats(self):
+            return {}
+
+    with patch("api_service.chat_executor", SaturatedExecutor()):
+        client = TestClient(api_service.app)
+        response = client.post("/api/chat", json={"query": "hello"})
+
+    assert response.status_code == status_code
+    assert "Retry-After" in response.headers
+
+
+def test_health_reports_pool_stats():
+    client = TestClient(api_service.app)
+    body = client.get("/api/health").json()
+    assert body["status"] == "ok"
+    assert body["chat_pool"]["workers"] >= 1
+    assert "retries" in body["tool_http"]
+
+
+def test_chat_stream_endpoint_emits_sse_chunks():
+    def fake_stream_query(query, model=None):
+        yield "Hello "
+        yield "world"
+
+    with patch("api_service.stream_query", fake_stream_query):
+        client = TestClient(api_service.app)
+        response = client.post("/api/chat/stream", json={"query": "hi"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in response.text.split("\n\n") if block]
+    assert events[-1] == "data: [DONE]"
+    payloads = [json.loads(block[len("data: "):]) for block in events[:-1]]
+    deltas = [payload["choices"][0]["delta"]["content"] for payload in payloads]
+    assert deltas == ["Hello ", "world"]
+
+
+def test_chat_stream_endpoint_reports_generation_errors():
+    def failing_stream_query(query, model=None):
+        yield "partial"
+        raise ValueError("boom")
+
+    with patch("api_service.stream_query", failing_stream_query):
+        client = TestClient(api_service.app)
+        response = client.post("/api/chat/stream", json={"query": "hi"})
+
+    assert "event: error" in response.text
+    assert "boom" in response.text
+    assert response.text.endswith("data: [DONE]\n\n")
+
+
+def test_chat_stream_endpoint_rejects_when_saturated():
+    class SaturatedExecutor:
+        def stream(self, *args, **kwargs):
+            raise ChatQueueFull()
+
+    with patch("api_service.chat_executor", SaturatedExecutor()):
+        client = TestClient(api_service.app)
+        response = client.post("/api/chat/stream", json={"query": "hi"})
+
+    assert response.status_code == 429
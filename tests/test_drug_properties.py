@@ -0,0 +1,59 @@
+"""Tests for batch molecular property calculation."""
+
+import gzip
+
+import pytest
+
+pytest.importorskip("rdkit")
+
+from drug_properties import (  # noqa: E402
+    PropertyCache,
+    iter_batch_properties,
+    iter_smiles_file,
+    resolve_properties,
+)
+from tools import calculate_drug_properties  # noqa: E402
+
+ASPIRIN = "CC(=O)OC1=CC=CC=C1C(=O)O"
+
+
+def test_only_requested_properties_are_returned():
+    result = calculate_drug_properties(ASPIRIN, ["logP", "tpsa"])
+    assert set(result) == {"canonical_smiles", "logp", "tpsa"}
+    assert round(result["logp"], 2) == 1.31
+    assert "error" in calculate_drug_properties(ASPIRIN, ["boiling_point"])
+    assert resolve_properties(None)[0] == "molecular_weight"
+
+
+def test_cache_matches_other_spellings_of_the_same_compound():
+    cache = PropertyCache()
+    results = list(iter_batch_properties(["CCO", "OCC", "CCO", "bad"], ["molecular_weight"], cache=cache))
+
+    assert [r.get("canonical_smiles") for r in results] == ["CCO", "CCO", "CCO", None]
+    assert results[3]["error"] == "Invalid SMILES string provided."
+    assert len(cache) == 1
+    # "OCC" was answered after canonicalisation, the second "CCO" by raw lookup.
+    assert cache.stats()["hits"] == 2
+
+    assert cache.get("OCC", ["molecular_weight"]) is not None
+    assert cache.get("OCC", ["logp"]) is None  # not computed yet
+
+
+def test_process_pool_streams_results_in_input_order():
+    library = ["C" * (i % 7 + 1) + "O" for i in range(40)] + ["not smiles"]
+    results = list(iter_batch_properties(library, ["hbd"], workers=2, chunk_size=8, cache=PropertyCache()))
+
+    assert [r["smiles"] for r in results] == library
+    assert all(r["hbd"] == 1 for r in results[:-1])
+    assert "error" in results[-1]
+
+
+def test_smiles_files_are_streamed(tmp_path):
+    path = tmp_path / "library.smi.gz"
+    with gzip.open(path, "wt") as handle:
+        handle.write("smiles name\n# comment\nCCO ethanol\n\nc1ccccc1 benzene\n")
+    assert list(iter_smiles_file(str(path))) == ["CCO", "c1ccccc1"]
+
+    batch = calculate_drug_properties(list(iter_smiles_file(str(path))), ["molecular_weight"])
+    assert batch["num_compounds"] == 2
+    assert round(batch["results"][1]["molecular_weight"], 2) == 78.11
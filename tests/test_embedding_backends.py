@@ -0,0 +1,109 @@
+"""Tests for the pluggable (ONNX / int8) embedding backends."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from embedding_backends import OnnxEmbedder, embedding_key, load_embedder, pool
+from rag_pipeline import FlexibleRAGPipeline
+
+VOCAB = ["[PAD]", "[UNK]", "brca1", "mutation", "risk", "insulin", "glucose", "tumour", "suppressor", "gene"]
+
+
+class FakeSession:
+    """Stands in for an onnxruntime session: hidden state = embedding-table row per token."""
+
+    def __init__(self, dimension=6, seed=0):
+        self.table = np.random.default_rng(seed).normal(size=(len(VOCAB), dimension)).astype(np.float32)
+        self.batches = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input_ids"), SimpleNamespace(name="attention_mask")]
+
+    def run(self, outputs, feeds):
+        assert outputs == ["last_hidden_state"] and set(feeds) == {"input_ids", "attention_mask"}
+        self.batches.append(feeds["input_ids"].shape)
+        return [self.table[feeds["input_ids"]]]
+
+
+def make_embedder(session, pooling="mean", normalize=True, max_seq_length=8):
+    from tokenizers import Tokenizer, models, pre_tokenizers
+
+    tokenizer = Tokenizer(models.WordLevel({token: index for index, token in enumerate(VOCAB)}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    metadata = {
+        "pooling": pooling, "normalize": normalize, "max_seq_length": max_seq_length,
+        "dimension": session.table.shape[1], "pad_token": "[PAD]", "pad_id": 0,
+    }
+    return OnnxEmbedder(session, tokenizer, metadata, batch_size=2)
+
+
+def test_pooling_ignores_padding():
+    hidden = np.arange(2 * 3 * 2, dtype=np.float32).reshape(2, 3, 2)
+    mask = np.array([[1, 1, 0], [1, 0, 0]])
+    np.testing.assert_allclose(pool(hidden, mask, "mean"), [[1, 2], [6, 7]])
+    np.testing.assert_allclose(pool(hidden, mask, "max"), [[2, 3], [6, 7]])
+    np.testing.assert_allclose(pool(hidden, mask, "cls"), [[0, 1], [6, 7]])
+
+
+def test_onnx_embedder_pools_each_text_in_input_order():
+    session = FakeSession()
+    embedder = make_embedder(session, max_seq_length=3)
+    texts = ["insulin", "brca1 mutation risk gene", "tumour suppressor", "glucose unknownword"]
+    vectors = embedder.encode(texts, normalize_embeddings=True)
+
+    ids = {token: index for index, token in enumerate(VOCAB)}
+    for text, vector in zip(texts, vectors):
+        tokens = [ids.get(token, 1) for token in text.split()][:3]  # truncated to max_seq_length
+        expected = session.table[tokens].mean(axis=0)
+        np.testing.assert_allclose(vector, expected / np.linalg.norm(expected), rtol=1e-5)
+    # Longest texts are batched together, two at a time.
+    assert [shape[0] for shape in session.batches] == [2, 2]
+    assert embedder.encode("insulin").shape == (embedder.get_sentence_embedding_dimension(),)
+
+
+def test_backend_selection_and_cache_keys(make_pipeline):
+    with pytest.raises(ValueError):
+        load_embedder("all-MiniLM-L6-v2", "tensorflow")
+    with pytest.raises(ValueError):
+        FlexibleRAGPipeline("all-MiniLM-L6-v2", embedding_backend="tensorflow")
+
+    assert embedding_key("m") == "m"
+    assert embedding_key("m", "onnx_int8") == "m@onnx_int8"
+    pipeline = make_pipeline(embedding_backend="onnx_int8")
+    pipeline.add_texts(["BRCA1 raises breast cancer risk."])
+    pipeline.query("BRCA1 risk")
+    assert pipeline.embedding_key == "hashing-test-model@onnx_int8"
+
+
+def test_int8_backend_matches_sentence_transformers(tmp_path):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    from sentence_transformers import SentenceTransformer
+
+    import config
+
+    try:
+        reference = SentenceTransformer(config.RAG_MODEL)
+    except OSError as exc:  # offline without a cached model
+        pytest.skip(f"{config.RAG_MODEL} is not available: {exc}")
+    quantized = load_embedder(config.RAG_MODEL, "onnx_int8", cache_dir=tmp_path)
+
+    documents = [
+        "BRCA1 mutations increase the lifetime risk of breast and ovarian cancer.",
+        "Metformin lowers hepatic glucose production in type 2 diabetes.",
+        "CRISPR-Cas9 introduces double-strand breaks at guide-RNA-specified loci.",
+        "Warfarin dosing is influenced by CYP2C9 and VKORC1 genotypes.",
+    ]
+    queries = ["hereditary breast cancer genes", "diabetes first-line drug", "genome editing nuclease"]
+    expected_docs = reference.encode(documents, normalize_embeddings=True)
+    expected_queries = reference.encode(queries, normalize_embeddings=True)
+    docs = quantized.encode(documents, normalize_embeddings=True)
+    query_vectors = quantized.encode(queries, normalize_embeddings=True)
+
+    assert np.min(np.sum(docs * expected_docs, axis=1)) > 0.98
+    expected_scores = expected_queries @ expected_docs.T
+    scores = query_vectors @ docs.T
+    assert np.abs(scores - expected_scores).max() < 0.03
+    np.testing.assert_array_equal(scores.argmax(axis=1), expected_scores.argmax(axis=1))
@@ -0,0 +1,118 @@
+"""Tests for the query embedding cache."""
+
+import numpy as np
+
+from embedding_cache import EmbeddingLRUCache, normalize_text
+
+
+def test_normalize_text_collapses_whitespace_and_compatibility_forms():
+    assert normalize_text("  BRCA1\tmutation \n risk ") == "BRCA1 mutation risk"
+    assert normalize_text("ﬁbrosis") == "fibrosis"
+    assert normalize_text("BRCA1") != normalize_text("brca1")
+
+
+def test_lru_evicts_by_entry_count_and_bytes():
+    vector = np.ones(16, dtype=np.float32)  # 64 bytes
+    cache = EmbeddingLRUCache(max_entries=2, max_bytes=1024)
+    cache.put("a", vector)
+    cache.put("b", vector)
+    assert cache.get("a") is not None  # "b" is now least recently used
+    cache.put("c", vector)
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    small = EmbeddingLRUCache(max_entries=100, max_bytes=128)
+    for key in "abc":
+        small.put(key, vector)
+    assert len(small) == 2
+    assert small.stats()["bytes"] == 128
+    assert small.stats()["evictions"] == 1
+
+
+def test_cached_vectors_are_read_only_copies():
+    vector = np.arange(4, dtype=np.float32)
+    cache = EmbeddingLRUCache()
+    cache.put("k", vector)
+    vector[0] = 99
+    cached = cache.get("k")
+    assert cached[0] == 0
+    assert not cached.flags.writeable
+
+
+def test_repeated_queries_skip_the_embedder(make_pipeline, hashing_embedder):
+    pipeline = make_pipeline()
+    pipeline.add_texts(["BRCA1 mutations raise breast cancer risk."], auto_chunk=False)
+    calls_after_ingest = hashing_embedder.encode_calls
+
+    first = pipeline.query("BRCA1 breast cancer")
+    second = pipeline.query("  BRCA1   breast cancer\n")
+
+    assert hashing_embedder.encode_calls == calls_after_ingest + 1
+    assert [r.chunk_id for r in first] == [r.chunk_id for r in second]
+    stats = pipeline.query_cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_ingestion_does_not_populate_query_cache(make_pipeline):
+    pipeline = make_pipeline()
+    pipeline.add_texts(["alpha beta", "gamma delta"], auto_chunk=False)
+    assert len(pipeline.query_cache) == 0
+
+
+def test_query_cache_can_be_disabled(make_pipeline, hashing_embedder):
+    pipeline = make_pipeline(query_cache_size=0)
+    pipeline.add_texts(["alpha beta"], auto_chunk=False)
+    calls = hashing_embedder.encode_calls
+    pipeline.query("alpha")
+    pipeline.query("alpha")
+    assert hashing_embedder.encode_calls == calls + 2
+
+
+def test_duplicate_chunks_are_skipped(make_pipeline):
+    pipeline = make_pipeline()
+    payload = '[Tool: search_pubmed] {"pmid": "1"}'
+    first = pipeline.add_texts([payload, "other text", payload], auto_chunk=False)
+    second = pipeline.add_texts([f"  {payload} "], auto_chunk=False)
+
+    assert len(first) == 2
+    assert second == []
+    assert pipeline.index.ntotal == len(pipeline.documents) == 2
+
+
+def test_deduplication_survives_reload(make_pipeline):
+    pipeline = make_pipeline(persistence_mode="append")
+    pipeline.add_texts(["alpha beta"], auto_chunk=False)
+    pipeline.close()
+
+    reloaded = make_pipeline(persistence_mode="append")
+    reloaded.load()
+    assert reloaded.add_texts(["alpha beta"], auto_chunk=False) == []
+    assert reloaded.add_texts(["alpha gamma"], auto_chunk=False)
+    assert reloaded.index.ntotal == 2
+
+
+def test_deduplication_can_be_disabled(make_pipeline):
+    pipeline = make_pipeline(deduplicate=False)
+    pipeline.add_texts(["same", "same"], auto_chunk=False)
+    assert pipeline.index.ntotal == 2
+
+
+def test_reingest_reuses_persisted_embeddings(make_pipeline, hashing_embedder, tmp_path):
+    cache_path = str(tmp_path / "embeddings.sqlite")
+    corpus = ["first document", "second document", "third document"]
+    original = make_pipeline(embedding_cache_path=cache_path)
+    original.add_texts(corpus, auto_chunk=False)
+    calls = hashing_embedder.encode_calls
+
+    rebuilt = make_pipeline(
+        embedding_cache_path=cache_path,
+        index_path=str(tmp_path / "rebuilt.faiss"),
+        documents_path=str(tmp_path / "rebuilt.jsonl"),
+    )
+    rebuilt.add_texts(corpus + ["fourth document"], auto_chunk=False)
+
+    assert hashing_embedder.encode_calls == calls + 1
+    assert rebuilt.embedding_store.stats()["hits"] == 3
+    np.testing.assert_allclose(
+        rebuilt.index.reconstruct(0), original.index.reconstruct(0), rtol=1e-6
+    )
@@ -0,0 +1,103 @@
+"""Tests for the shared embedding server, its micro-batcher and client mode."""
+
+import threading
+
+import numpy as np
+import pytest
+
+from embedding_server import EmbeddingClient, EmbeddingServer, MicroBatcher, parse_address
+from rag_pipeline import FlexibleRAGPipeline
+
+MODEL = "hashing-test-model"
+
+
+@pytest.fixture(params=["unix", "tcp"])
+def server(request, tmp_path, hashing_embedder):
+    address = f"unix:{tmp_path / 'embed.sock'}" if request.param == "unix" else "127.0.0.1:0"
+    with EmbeddingServer(hashing_embedder, address, model_name=MODEL, batch_wait=0.02).start() as running:
+        yield running
+
+
+def test_parse_address():
+    assert parse_address("unix:/tmp/e.sock") == "/tmp/e.sock"
+    assert parse_address("/tmp/e.sock") == "/tmp/e.sock"
+    assert parse_address("http://localhost:8765/") == ("localhost", 8765)
+    with pytest.raises(ValueError):
+        parse_address("localhost")
+
+
+def test_client_matches_direct_encoding(server, hashing_embedder):
+    client = EmbeddingClient(server.address, expected_model=MODEL)
+    texts = ["BRCA1 mutation risk", "tumour suppressor", "BRCA1"]
+    for normalize in (True, False):
+        expected = hashing_embedder.encode(texts, normalize_embeddings=normalize)
+        np.testing.assert_array_equal(client.encode(texts, normalize_embeddings=normalize), expected)
+    assert client.get_sentence_embedding_dimension() == hashing_embedder.dimension
+    assert client.encode("BRCA1").shape == (hashing_embedder.dimension,)
+    assert client.encode([]).shape == (0, hashing_embedder.dimension)
+    client.close()
+
+    with pytest.raises(ValueError):
+        EmbeddingClient(server.address, expected_model="another-model")
+
+
+def test_concurrent_requests_are_micro_batched(server, hashing_embedder):
+    client = EmbeddingClient(server.address)
+    texts = [f"query {index} about gene {index}" for index in range(8)]
+    results = [None] * len(texts)
+    barrier = threading.Barrier(len(texts))
+
+    def worker(index):
+        barrier.wait()
+        results[index] = client.encode([texts[index]], normalize_embeddings=True)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    np.testing.assert_array_equal(np.vstack(results), hashing_embedder.encode(texts))
+    batching = client.info()["batching"]
+    assert batching["requests"] == len(texts)
+    assert batching["batches"] < len(texts)
+
+
+def test_batcher_splits_by_size_and_isolates_failures():
+    calls = []
+
+    def encode(texts, normalize):
+        calls.append(list(texts))
+        if "boom" in texts:
+            raise RuntimeError("model failed")
+        return np.full((len(texts), 2), len(calls), dtype=np.float32)
+
+    batcher = MicroBatcher(encode, max_batch_size=4, batch_wait=0.05)
+    try:
+        futures = [batcher.submit(["a", "b", "c"]), batcher.submit(["d", "e"]), batcher.submit(["f"])]
+        shapes = [future.result(timeout=5).shape for future in futures]
+        assert shapes == [(3, 2), (2, 2), (1, 2)]
+        assert [len(call) for call in calls] == [3, 3]
+        with pytest.raises(RuntimeError, match="model failed"):
+            batcher.encode(["boom"], timeout=5)
+        assert batcher.encode(["ok"], timeout=5).shape == (1, 2)
+    finally:
+        batcher.shutdown()
+
+
+def test_pipeline_embeds_through_the_server(server, hashing_embedder, tmp_path, monkeypatch):
+    pipeline = FlexibleRAGPipeline(MODEL, embedding_server=server.address, index_path=str(tmp_path / "index.faiss"))
+    monkeypatch.setattr(pipeline, "_load_embedder", lambda: pytest.fail("loaded the model in-process"))
+    try:
+        pipeline.add_texts(["BRCA1 is a tumour suppressor gene.", "Insulin regulates glucose."])
+        assert pipeline.query("tumour suppressor BRCA1", top_k=1)[0].text.startswith("BRCA1")
+        assert isinstance(pipeline.embedder, EmbeddingClient)
+        assert hashing_embedder.encode_calls >= 2
+    finally:
+        pipeline.close()
+
+    unreachable = FlexibleRAGPipeline(MODEL, embedding_server=f"unix:{tmp_path / 'missing.sock'}")
+    monkeypatch.setattr(unreachable, "_load_embedder", lambda: hashing_embedder)
+    unreachable.warm_up()
+    assert unreachable.embedder is hashing_embedder
+    unreachable.close()
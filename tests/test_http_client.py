@@ -0,0 +1,81 @@
+"""Tests for the pooled tool HTTP client."""
+
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+import http_client
+from http_client import HTTPClient, LatencyHistogram, TokenBucket, ncbi_rate_limit
+
+
+def _response(status, headers=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = headers or {}
+    return response
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(http_client.time, "sleep", recorded.append)
+    return recorded
+
+
+def test_retries_transient_statuses_with_backoff(sleeps):
+    client = HTTPClient(max_retries=3, backoff_factor=0.5)
+    client.session.get = MagicMock(
+        side_effect=[_response(503), _response(429, {"Retry-After": "2"}), _response(200)]
+    )
+
+    response = client.get("https://example.org/api/esearch.fcgi", params={"q": 1})
+
+    assert response.status_code == 200
+    assert client.session.get.call_count == 3
+    assert 0 <= sleeps[0] <= 0.5 and sleeps[1] == 2.0
+    stats = client.stats()
+    assert stats["retries"] == 2
+    assert stats["endpoints"]["esearch.fcgi"]["count"] == 3
+
+
+def test_gives_up_after_max_retries(sleeps):
+    client = HTTPClient(max_retries=1)
+    client.session.get = MagicMock(return_value=_response(500))
+    assert client.get("https://example.org/x").status_code == 500
+    assert client.session.get.call_count == 2
+
+    client.session.get = MagicMock(side_effect=requests.exceptions.ConnectionError("down"))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.get("https://example.org/x")
+    assert client.session.get.call_count == 2
+
+
+def test_client_errors_are_not_retried(sleeps):
+    client = HTTPClient()
+    client.session.get = MagicMock(return_value=_response(404))
+    assert client.get("https://example.org/x").status_code == 404
+    assert client.session.get.call_count == 1 and sleeps == []
+
+
+def test_token_bucket_throttles_per_host(sleeps, monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(http_client.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(http_client.time, "sleep", lambda seconds: clock.__setitem__(0, clock[0] + seconds))
+    bucket = TokenBucket(rate=ncbi_rate_limit(None))
+
+    waits = [bucket.acquire() for _ in range(5)]
+
+    assert waits[:3] == [0.0, 0.0, 0.0]  # burst of 3, then 3 per second
+    assert waits[3] == pytest.approx(1 / 3) and waits[4] == pytest.approx(1 / 3)
+    assert ncbi_rate_limit("key") == 10.0
+
+
+def test_latency_histogram_quantiles():
+    histogram = LatencyHistogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.05, 0.5, 3.0):
+        histogram.record(seconds)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"<=0.1": 2, "<=1.0": 1, ">1.0": 1}
+    assert snapshot["p50"] == 0.1
+    assert snapshot["p95"] == 3.0
@@ -0,0 +1,187 @@
+"""Tests for the continuous batching scheduler used by the local model."""
+
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+import local_model  # noqa: E402
+from local_batching import ContinuousBatchScheduler  # noqa: E402
+
+VOCAB = 32
+EOS = 31
+
+
+class CountingTokenizer:
+    """Whitespace tokenizer over integer token ids."""
+
+    eos_token_id = EOS
+    pad_token_id = 0
+
+    def __call__(self, text):
+        return {"input_ids": [int(tok) for tok in text.split()]}
+
+    def decode(self, tokens, skip_special_tokens=True):
+        return " ".join(str(tok) for tok in tokens if tok != EOS) + (" " if tokens else "")
+
+
+class FakeCache:
+    def __init__(self):
+        self.selected = []
+
+    def batch_select_indices(self, indices):
+        self.selected.append(indices.tolist())
+
+
+class SuccessorModel:
+    """Always predicts ``last_token + 1``; records batch shapes per forward."""
+
+    def __init__(self, delay=0.0, fail_on=None):
+        self.batch_sizes = []
+        self.delay = delay
+        self.fail_on = fail_on
+
+    def __call__(self, input_ids, attention_mask, position_ids, past_key_values, use_cache):
+        assert attention_mask.shape[0] == input_ids.shape[0] == position_ids.shape[0]
+        if self.fail_on is not None and self.fail_on in input_ids.tolist()[0]:
+            raise ValueError("forward failed")
+        self.batch_sizes.append(input_ids.shape[0])
+        time.sleep(self.delay)
+        logits = torch.full((*input_ids.shape, VOCAB), -1e9)
+        successors = (input_ids + 1).clamp(max=EOS)
+        logits.scatter_(-1, successors.unsqueeze(-1), 0.0)
+        return SimpleNamespace(logits=logits, past_key_values=past_key_values or FakeCache())
+
+
+def _scheduler(model, **kwargs):
+    kwargs.setdefault("batch_wait", 0.05)
+    return ContinuousBatchScheduler(
+        model, CountingTokenizer(), temperature=0.0, eos_token_ids=[EOS], **kwargs
+    )
+
+
+def test_concurrent_requests_share_decode_steps():
+    model = SuccessorModel()
+    scheduler = _scheduler(model)
+    futures = [scheduler.submit(prompt, 3) for prompt in ("1", "5 6", "10 11 12")]
+
+    assert [future.result(timeout=5) for future in futures] == ["2 3 4", "7 8 9", "13 14 15"]
+    assert max(model.batch_sizes) == 3
+    assert scheduler.status()["avg_batch_size"] > 1
+    scheduler.shutdown()
+
+
+def test_rows_exit_early_on_eos_and_own_budget():
+    model = SuccessorModel()
+    scheduler = _scheduler(model)
+    short = scheduler.submit("29", 10)  # 30 then EOS
+    long = scheduler.submit("1", 6)
+
+    assert short.result(timeout=5) == "30"
+    assert long.result(timeout=5) == "2 3 4 5 6 7"
+    assert model.batch_sizes[:2] == [2, 2]
+    assert model.batch_sizes[-1] == 1
+    scheduler.shutdown()
+
+
+def test_new_requests_join_a_running_batch():
+    model = SuccessorModel(delay=0.01)
+    scheduler = _scheduler(model, batch_wait=0.0)
+    long = scheduler.submit("1", 25)
+    time.sleep(0.05)
+    late = scheduler.submit("20", 2)
+
+    assert late.result(timeout=5) == "21 22"
+    assert not long.done()
+    assert long.result(timeout=5).split()[-1] == "26"
+    assert 2 in model.batch_sizes
+    assert scheduler.status()["prefills"] >= 2
+    scheduler.shutdown()
+
+
+def test_padded_token_budget_defers_admission():
+    model = SuccessorModel()
+    scheduler = _scheduler(model, max_batch_tokens=8)
+    futures = [scheduler.submit("1 2", 4), scheduler.submit("3 4", 4)]
+    for future in futures:
+        future.result(timeout=5)
+    assert max(model.batch_sizes) == 1
+    scheduler.shutdown()
+
+
+def test_stream_yields_incremental_text():
+    scheduler = _scheduler(SuccessorModel())
+    chunks = list(scheduler.stream("1", 4))
+    assert len(chunks) == 4
+    assert "".join(chunks).strip() == "2 3 4 5"
+    scheduler.shutdown()
+
+
+class ByteTokenizer(CountingTokenizer):
+    """Byte-level decoding where token 2 opens a two-byte character."""
+
+    BYTES = {2: b"\xc3", 3: b"\xa9", 4: b"a", 5: b"b"}
+
+    def __init__(self):
+        self.decoded_lengths = []
+
+    def decode(self, tokens, skip_special_tokens=True):
+        self.decoded_lengths.append(len(tokens))
+        data = b"".join(self.BYTES.get(tok, b"z") for tok in tokens if tok != EOS)
+        return data.decode("utf-8", errors="replace")
+
+
+def test_stream_decodes_a_bounded_window_and_holds_back_partial_characters():
+    tokenizer = ByteTokenizer()
+    scheduler = ContinuousBatchScheduler(
+        SuccessorModel(), tokenizer, temperature=0.0, eos_token_ids=[EOS], batch_wait=0.05
+    )
+    chunks = list(scheduler.stream("1", 20))
+    assert chunks[:3] == ["\u00e9", "a", "b"]
+    assert "".join(chunks) == "\u00e9abzzzzzzzzzzzzzzzz"
+    # Every step decodes the new token plus the previous window, never the
+    # whole output; only the final result decodes everything.
+    assert max(tokenizer.decoded_lengths[:-1]) <= 3
+    scheduler.shutdown()
+
+
+def test_forward_failure_fails_batch_but_scheduler_recovers():
+    scheduler = _scheduler(SuccessorModel(fail_on=9))
+    failing = scheduler.submit("9", 3)
+    with pytest.raises(ValueError):
+        failing.result(timeout=5)
+    assert scheduler.generate("1", 2, timeout=5) == "2 3"
+    assert scheduler.status()["requests_failed"] == 1
+    scheduler.shutdown()
+
+
+def test_local_model_routes_through_scheduler():
+    scheduler = _scheduler(SuccessorModel())
+    results = []
+    with patch("local_model._scheduler", scheduler), \
+         patch("local_model.build_prompt", lambda question, context=None: question), \
+         patch("local_model.get_status", return_value={"state": "ready"}):
+        def ask(prompt):
+            results.append(local_model.generate_response(prompt, max_new_tokens=2))
+
+        threads = [threading.Thread(target=ask, args=(prompt,)) for prompt in ("1", "4")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+    assert sorted(results) == ["2 3", "5 6"]
+    scheduler.shutdown()
+
+
+def test_get_status_reports_batching_metrics():
+    scheduler = _scheduler(SuccessorModel())
+    scheduler.generate("1", 2, timeout=5)
+    with patch("local_model._scheduler", scheduler):
+        status = local_model.get_status()
+    assert status["batching"]["requests_completed"] == 1
+    assert status["batching"]["tokens_generated"] == 2
+    scheduler.shutdown()
@@ -108,6 +108,25 @@ class TestDependencyChecks:
         assert local_model._torch_available() is True
 
 
+class TestStartDownload:
+    """Test the download trigger."""
+
+    def test_dependency_probe_runs_without_the_status_lock(self):
+        """Status readers must not wait behind a slow torch/unsloth import."""
+        probed = []
+
+        def probe():
+            probed.append(local_model._status_lock.locked())
+            return False
+
+        with patch("local_model._gpu_ready", probe), patch("local_model._torch_available", probe):
+            status = local_model.start_download()
+
+        assert probed and not any(probed)
+        assert status["state"] == "error"
+        assert "PyTorch" in status["detail"]
+
+
 class TestPromptBuilding:
     """Test prompt construction functionality."""
 
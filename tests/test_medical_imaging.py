@@ -0,0 +1,133 @@
+"""Tests for slab-wise medical image analysis on synthetic volumes."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from medical_imaging import (
+    analyze_image,
+    create_output,
+    make_phantom,
+    open_volume,
+    read_nifti_header,
+    volume_moments,
+    write_nifti,
+)
+from tools import analyze_medical_image
+
+SHAPE = (24, 40, 48)
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="module")
+def phantom():
+    return make_phantom(SHAPE, "CT", seed=1)
+
+
+@pytest.fixture
+def phantom_files(tmp_path, phantom):
+    npy = tmp_path / "phantom.npy"
+    nii = tmp_path / "phantom.nii"
+    np.save(npy, phantom)
+    write_nifti(str(nii), phantom, spacing=(2.5, 0.7, 0.7))
+    return npy, nii
+
+
+def test_volumes_are_memory_mapped_with_their_spacing(phantom_files, phantom):
+    npy, nii = phantom_files
+    header = read_nifti_header(str(nii))
+    assert header["shape"] == SHAPE[::-1]
+    for path, spacing in ((npy, (1.0, 1.0, 1.0)), (nii, (2.5, 0.7, 0.7))):
+        volume = open_volume(str(path))
+        assert isinstance(volume.data, np.memmap) or isinstance(volume.data.base, np.memmap)
+        assert volume.spacing == pytest.approx(spacing)
+        np.testing.assert_array_equal(volume.slab(5, 9), phantom[5:9])
+
+    moments = volume_moments(open_volume(str(nii)), workers=3, slab_voxels=2000)
+    assert moments.mean == pytest.approx(phantom.mean())
+    assert moments.std == pytest.approx(phantom.std())
+    with pytest.raises(ValueError):
+        create_output(str(npy) + ".png", SHAPE, np.uint8)
+
+
+@pytest.mark.parametrize("workers, slab_voxels", [(1, 10**9), (3, 1000)])
+def test_segmentation_matches_whole_array_threshold(phantom_files, phantom, tmp_path, workers, slab_voxels):
+    _, nii = phantom_files
+    mask_path = tmp_path / "mask.nii"
+    result = analyze_image(
+        str(nii), "CT", "segmentation", threshold=300, output_path=str(mask_path),
+        workers=workers, slab_voxels=slab_voxels,
+    )["segmentation"]
+
+    expected = phantom >= 300
+    zs, ys, xs = np.nonzero(expected)
+    assert result["voxels"] == expected.sum()
+    assert result["volume_ml"] == pytest.approx(expected.sum() * 2.5 * 0.7 * 0.7 / 1000, abs=1e-4)
+    assert result["bounding_box"] == {"min": [zs.min(), ys.min(), xs.min()], "max": [zs.max(), ys.max(), xs.max()]}
+    assert result["centroid_mm"] == pytest.approx([zs.mean() * 2.5, ys.mean() * 0.7, xs.mean() * 0.7], abs=0.01)
+    assert result["mean_intensity"] == pytest.approx(phantom[expected].mean(), abs=1e-3)
+    np.testing.assert_array_equal(open_volume(str(mask_path)).slab(0, SHAPE[0]), expected)
+
+
+def test_measurement_and_enhancement(phantom_files, phantom, tmp_path):
+    npy, _ = phantom_files
+    measured = analyze_image(str(npy), "MRI", "measurement", workers=2, slab_voxels=5000)
+    intensity = measured["intensity"]
+    assert intensity["mean"] == pytest.approx(phantom.mean(), abs=1e-3)
+    assert intensity["p50"] == pytest.approx(np.percentile(phantom, 50), abs=1.0)
+    # Otsu separates air from the body.
+    body = phantom >= measured["foreground"]["threshold"]
+    assert measured["foreground"]["voxels"] == body.sum()
+    assert -960 < measured["foreground"]["threshold"] < 0
+
+    output = tmp_path / "enhanced.npy"
+    enhanced = analyze_image(str(npy), "CT", "enhancement", window="bone", output_path=str(output))
+    display = np.load(output)
+    expected = np.rint(np.clip((phantom - (400 - 900)) * (255 / 1800), 0, 255)).astype(np.uint8)
+    assert np.abs(display.astype(int) - expected).max() <= 1
+    assert enhanced["enhancement"]["input_range"] == [-500.0, 1300.0]
+
+
+def test_slab_processing_keeps_memory_bounded(tmp_path):
+    path = tmp_path / "large.npy"
+    volume = create_output(str(path), (128, 128, 128), np.int16)
+    make_phantom(volume.shape, out=volume)
+    del volume
+    # tracemalloc counts every thread in the process, so measure in a fresh
+    # interpreter where only the analysis (and its workers) is running.
+    code = (
+        "import sys, tracemalloc\n"
+        "from medical_imaging import analyze_image\n"
+        "tracemalloc.start()\n"
+        "analyze_image(sys.argv[1], 'CT', 'segmentation', workers=2, slab_voxels=128 * 128 * 4)\n"
+        "print(tracemalloc.get_traced_memory()[1])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code, str(path)], cwd=REPO_ROOT,
+        capture_output=True, text=True, timeout=120, check=True,
+    )
+    peak = int(result.stdout.strip().splitlines()[-1])
+    # A float32 copy of the whole volume would be 8 MiB; the 2 * workers slabs
+    # in flight (256 KiB each) and their temporaries peak at about 3 MiB.
+    assert peak < 4 * 2**20
+
+
+def test_tool_errors_and_path_restriction(phantom_files, monkeypatch, tmp_path):
+    npy, _ = phantom_files
+    monkeypatch.setattr("config.MEDICAL_IMAGE_DIR", str(tmp_path))
+    assert "error" in analyze_medical_image(str(npy), "PET")
+    assert "error" in analyze_medical_image(str(npy), "CT", "registration")
+    assert "error" in analyze_medical_image("missing.npy", "CT")
+    assert analyze_medical_image(str(npy), "CT")["analysis_type"] == "measurement"
+    assert analyze_medical_image("phantom.npy", "CT")["shape"] == list(SHAPE)
+    assert "error" in analyze_medical_image("../outside.npy", "CT")
+
+    # Tool calls never write files, and an unset directory refuses every path.
+    output = tmp_path / "mask.npy"
+    result = analyze_medical_image("phantom.npy", "CT", "segmentation", output_path=str(output))
+    assert "error" in result and not output.exists()
+    monkeypatch.setattr("config.MEDICAL_IMAGE_DIR", "")
+    assert "error" in analyze_medical_image(str(npy), "CT")
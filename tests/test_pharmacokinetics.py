@@ -0,0 +1,98 @@
+"""Tests for the vectorised pharmacokinetic simulator."""
+
+import json
+
+import numpy as np
+import pytest
+
+from pharmacokinetics import disposition, simulate_concentrations, simulate_regimen
+from tools import simulate_pharmacokinetics
+
+TIMES = np.linspace(0, 72, 289)
+
+
+def _bateman(t, dose, half_life, volume, ka, f):
+    """Single oral dose, one compartment, written out by hand."""
+
+    k = np.log(2) / half_life
+    t = np.asarray(t)
+    values = f * dose * ka / (volume * (ka - k)) * (np.exp(-k * t) - np.exp(-ka * t))
+    return np.where(t >= 0, values, 0.0)
+
+
+def test_single_doses_match_closed_forms():
+    bolus = simulate_concentrations(TIMES, 100, 6, 20)[0]
+    np.testing.assert_allclose(bolus, 100 / 20 * np.exp(-np.log(2) / 6 * TIMES))
+
+    oral = simulate_concentrations(TIMES, 100, 6, 20, route="oral", absorption_rate=1.5, bioavailability=0.7)[0]
+    np.testing.assert_allclose(oral, _bateman(TIMES, 100, 6, 20, 1.5, 0.7), atol=1e-12)
+
+    # ka equal to the elimination rate is handled, not divided by zero.
+    flip = simulate_concentrations(TIMES, 100, 6, 20, route="oral", absorption_rate=np.log(2) / 6)[0]
+    assert np.all(np.isfinite(flip)) and flip.max() > 0
+
+    # An infusion reaches rate / CL at steady state.
+    infusion = simulate_concentrations([200.0], 1000, 6, 20, route="infusion", infusion_duration=300)[0, 0]
+    assert infusion == pytest.approx(1000 / 300 / (np.log(2) / 6 * 20), rel=1e-6)
+
+
+@pytest.mark.parametrize("route", ["iv_bolus", "infusion", "oral"])
+@pytest.mark.parametrize("model", ["one_compartment", "two_compartment"])
+def test_multiple_dosing_equals_summed_single_doses(route, model):
+    params = dict(model=model, route=route, absorption_rate=0.9, bioavailability=0.8,
+                  infusion_duration=1.5, k12=0.6, k21=0.4)
+    multiple = simulate_concentrations(TIMES, 50, 8, 25, dosing_interval=12, n_doses=4, **params)[0]
+    summed = sum(
+        simulate_concentrations(TIMES - 12 * k, 50, 8, 25, **params)[0] * (TIMES >= 12 * k)
+        for k in range(4)
+    )
+    np.testing.assert_allclose(multiple, summed, atol=1e-10)
+
+
+def test_population_rows_match_per_subject_runs_and_auc():
+    rng = np.random.default_rng(0)
+    half_life = rng.uniform(4, 12, 50)
+    volume = rng.uniform(10, 40, 50)
+    times = np.linspace(0, 400, 8001)
+    population = simulate_concentrations(
+        times, 100, half_life, volume, model="two_compartment", route="oral",
+        absorption_rate=1.2, k12=0.5, k21=0.3, block_elements=50_000,
+    )
+    for row in (0, 17, 49):
+        single = simulate_concentrations(
+            times, 100, half_life[row], volume[row], model="two_compartment", route="oral",
+            absorption_rate=1.2, k12=0.5, k21=0.3,
+        )[0]
+        np.testing.assert_allclose(population[row], single)
+
+    # Dose-normalised exposure equals 1 / clearance.
+    _, _, clearance = disposition(half_life, volume, "two_compartment", 0.5, 0.3)
+    auc = np.trapezoid(population, times, axis=1) if hasattr(np, "trapezoid") else np.trapz(population, times, axis=1)
+    np.testing.assert_allclose(auc, 100 / clearance[:, 0], rtol=1e-3)
+
+
+def test_tool_returns_profiles_bands_and_errors(monkeypatch):
+    single = simulate_pharmacokinetics(dose=500, half_life=6, volume_distribution=0.7, time_points=10)
+    assert len(single["time"]) == len(single["concentration"]) == 10
+    assert single["metrics"]["clearance"] == pytest.approx(np.log(2) / 6 * 49, abs=1e-3)
+
+    population = simulate_pharmacokinetics(
+        dose=500, half_life=6, volume_distribution=0.7, route="oral", n_doses=3,
+        dosing_interval=8, n_subjects=500, seed=1,
+    )
+    bands = population["concentration"]
+    assert len(bands["p5"]) == 24
+    assert all(low <= mid <= high for low, mid, high in zip(bands["p5"], bands["p50"], bands["p95"]))
+    assert population == simulate_regimen(
+        500, 6, 0.7, route="oral", n_doses=3, dosing_interval=8, n_subjects=500, seed=1
+    )
+    json.dumps(population)
+
+    assert "error" in simulate_pharmacokinetics(dose=1, half_life=-1, volume_distribution=1)
+    assert "error" in simulate_pharmacokinetics(dose=1, half_life=1, volume_distribution=1, route="rectal")
+    monkeypatch.setattr("config.PK_MAX_SUBJECTS", 10)
+    assert "error" in simulate_pharmacokinetics(dose=1, half_life=1, volume_distribution=1, n_subjects=11)
+    # Model-supplied strings are coerced, or rejected with the usual payload.
+    assert len(simulate_pharmacokinetics(dose=1, half_life=1, volume_distribution=1, time_points="5")["time"]) == 5
+    assert "error" in simulate_pharmacokinetics(dose=1, half_life=1, volume_distribution=1, n_subjects="11")
+    assert "error" in simulate_pharmacokinetics(dose=1, half_life=1, volume_distribution=1, time_points="many")
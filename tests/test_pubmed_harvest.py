@@ -0,0 +1,124 @@
+"""Tests for the PubMed harvester against a local E-utilities fixture server."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from xml.etree import ElementTree
+
+import pytest
+import requests
+
+from http_client import HTTPClient
+from pubmed_cache import PubMedCache
+from pubmed_harvest import PubMedHarvester
+
+FIXTURE = Path(__file__).parent / "fixtures" / "pubmed_efetch.xml"
+# Search result order; 36500004 was withdrawn and is missing from efetch.
+HISTORY = ["36500001", "36500002", "36500003", "36500004", "36500005", "36500006"]
+
+
+class EUtilitiesFixture(BaseHTTPRequestHandler):
+    articles = {
+        element.findtext("MedlineCitation/PMID"): ElementTree.tostring(element)
+        for element in ElementTree.parse(FIXTURE).getroot()
+    }
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.server.log.append((url.path.rsplit("/", 1)[-1], params))
+        if url.path.endswith("esearch.fcgi"):
+            assert params["usehistory"] == "y"
+            body = json.dumps({"esearchresult": {
+                "count": str(len(HISTORY)), "webenv": "MCID_fixture", "querykey": "1",
+            }}).encode()
+            content_type = "application/json"
+        else:
+            assert params["WebEnv"] == "MCID_fixture" and params["query_key"] == "1"
+            retstart = int(params["retstart"])
+            if retstart in self.server.fail_at:
+                self.server.fail_at.discard(retstart)
+                self.send_error(500)
+                return
+            pmids = HISTORY[retstart:retstart + int(params["retmax"])]
+            body = b"<PubmedArticleSet>" + b"".join(
+                self.articles[pmid] for pmid in pmids if pmid in self.articles
+            ) + b"</PubmedArticleSet>"
+            content_type = "text/xml"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def eutils_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EUtilitiesFixture)
+    server.log, server.fail_at = [], set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _harvester(pipeline, server, **kwargs):
+    kwargs.setdefault("http", HTTPClient(max_retries=0))
+    return PubMedHarvester(
+        pipeline,
+        base_url=f"http://127.0.0.1:{server.server_port}/entrez/eutils/",
+        batch_size=2,
+        workers=2,
+        **kwargs,
+    )
+
+
+def test_harvest_ingests_full_abstracts_with_metadata(make_pipeline, eutils_server, tmp_path):
+    pipeline = make_pipeline()
+    cache = PubMedCache(str(tmp_path / "pubmed.sqlite"))
+    stats = _harvester(pipeline, eutils_server, cache=cache).harvest("pcsk9 editing")
+
+    assert stats.documents == len(HISTORY)
+    by_pmid = {chunk.metadata["pmid"]: chunk for chunk in pipeline.documents}
+    assert sorted(by_pmid) == ["36500001", "36500002", "36500003", "36500005", "36500006"]
+
+    editing = by_pmid["36500001"]
+    assert editing.metadata["journal"] == "Nature" and editing.metadata["year"] == 2022
+    assert editing.metadata["mesh_terms"] == ["Animals", "Gene Editing", "Proprotein Convertase 9"]
+    assert editing.metadata["source_id"] == "36500001"
+    full_text = " ".join(chunk.text for chunk in pipeline.documents if chunk.metadata["pmid"] == "36500001")
+    assert "RESULTS: Editing reached 66 percent" in full_text and len(full_text) > 500
+    assert by_pmid["36500006"].text == "Off-target effects of base editors in human embryos."
+
+    efetches = sorted(int(params["retstart"]) for name, params in eutils_server.log if name == "efetch.fcgi")
+    assert efetches == [0, 2, 4]
+    assert set(cache.get_records(["36500002", "36500005"])) == {"36500002", "36500005"}
+    cache.close()
+
+
+def test_harvest_resumes_after_failure(make_pipeline, eutils_server, tmp_path):
+    checkpoint = str(tmp_path / "harvest.ckpt.json")
+    pipeline = make_pipeline(persistence_mode="append")
+    harvester = _harvester(pipeline, eutils_server, ingest_batch_size=2, checkpoint_interval=1)
+    eutils_server.fail_at.add(4)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        harvester.harvest("pcsk9 editing", checkpoint_path=checkpoint)
+    with open(checkpoint, encoding="utf-8") as handle:
+        # The padding for the withdrawn 36500004 is complete but not yet committed.
+        assert json.load(handle)["documents"] == 3
+
+    eutils_server.log.clear()
+    stats = harvester.harvest("pcsk9 editing", checkpoint_path=checkpoint)
+
+    assert stats.resumed_from == 3 and stats.documents == len(HISTORY)
+    efetches = sorted(params["retstart"] for name, params in eutils_server.log if name == "efetch.fcgi")
+    assert efetches == ["3", "5"]
+    pmids = [chunk.metadata["pmid"] for chunk in pipeline.documents if chunk.metadata["chunk_index"] == 0]
+    assert sorted(pmids) == ["36500001", "36500002", "36500003", "36500005", "36500006"]
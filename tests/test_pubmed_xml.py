@@ -0,0 +1,111 @@
+"""Tests for the streaming PubMed efetch parser."""
+
+import io
+import itertools
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from pubmed_xml import NO_ABSTRACT, iter_pubmed_articles, parse_pubmed_articles
+
+ARTICLE = b"""
+<PubmedArticle>
+  <MedlineCitation Status="MEDLINE" Owner="NLM">
+    <PMID Version="1">31000001</PMID>
+    <Article PubModel="Print">
+      <Journal>
+        <Title>Nature Medicine</Title>
+        <JournalIssue><PubDate><MedlineDate>1998 Dec-1999 Jan</MedlineDate></PubDate></JournalIssue>
+      </Journal>
+      <ArticleTitle>Base editing of <i>PCSK9</i> in vivo</ArticleTitle>
+      <Abstract>
+        <AbstractText Label="BACKGROUND">LDL cholesterol drives disease.</AbstractText>
+        <AbstractText Label="RESULTS">Editing lowered <sup>LDL</sup> levels.</AbstractText>
+      </Abstract>
+      <AuthorList>
+        <Author><LastName>Musunuru</LastName><Initials>K</Initials></Author>
+        <Author><CollectiveName>PCSK9 Study Group</CollectiveName></Author>
+      </AuthorList>
+    </Article>
+    <MeshHeadingList>
+      <MeshHeading><DescriptorName UI="D000818">Animals</DescriptorName></MeshHeading>
+      <MeshHeading><DescriptorName UI="D064112">Gene Editing</DescriptorName></MeshHeading>
+    </MeshHeadingList>
+  </MedlineCitation>
+</PubmedArticle>
+"""
+
+
+def test_extracts_structured_fields():
+    record = parse_pubmed_articles(b"<PubmedArticleSet>" + ARTICLE + b"</PubmedArticleSet>")["31000001"]
+
+    assert record["title"] == "Base editing of PCSK9 in vivo"
+    assert record["abstract"] == (
+        "BACKGROUND: LDL cholesterol drives disease.\nRESULTS: Editing lowered LDL levels."
+    )
+    assert record["authors"] == ["Musunuru K", "PCSK9 Study Group"]
+    assert record["journal"] == "Nature Medicine"
+    assert record["year"] == 1998
+    assert record["mesh_terms"] == ["Animals", "Gene Editing"]
+
+
+def test_missing_fields_fall_back():
+    xml = b"<PubmedArticleSet><PubmedArticle><MedlineCitation><PMID>7</PMID><Article>" \
+          b"<Journal><JournalIssue><PubDate><Year>2020</Year></PubDate></JournalIssue></Journal>" \
+          b"<ArticleTitle>Only a title</ArticleTitle></Article></MedlineCitation></PubmedArticle></PubmedArticleSet>"
+    (record,) = iter_pubmed_articles(xml)
+    assert record["abstract"] == NO_ABSTRACT
+    assert record["year"] == 2020 and record["authors"] == [] and record["mesh_terms"] == []
+
+
+class _StreamedResponse(io.RawIOBase):
+    """File-like efetch body generated on the fly, like a streamed response."""
+
+    def __init__(self, count):
+        self._parts = itertools.chain(
+            [b"<PubmedArticleSet>"],
+            (ARTICLE.replace(b"31000001", str(i).encode()) for i in range(count)),
+            [b"</PubmedArticleSet>"],
+        )
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self._buffer:
+            self._buffer = next(self._parts, None)
+            if self._buffer is None:
+                return 0
+        size = min(len(target), len(self._buffer))
+        target[:size], self._buffer = self._buffer[:size], self._buffer[size:]
+        return size
+
+
+def test_memory_stays_flat_for_large_responses():
+    # tracemalloc counts every thread in the process, so each measurement runs
+    # in a fresh interpreter where only the parser is allocating.
+    code = (
+        "import sys, tracemalloc\n"
+        "from pubmed_xml import iter_pubmed_articles\n"
+        "from test_pubmed_xml import _StreamedResponse\n"
+        "count = int(sys.argv[1])\n"
+        "tracemalloc.start()\n"
+        "seen = sum(1 for _ in iter_pubmed_articles(_StreamedResponse(count)))\n"
+        "print(seen, tracemalloc.get_traced_memory()[1])\n"
+    )
+    tests_dir = Path(__file__).resolve().parent
+
+    def peak_for(count):
+        result = subprocess.run(
+            [sys.executable, "-c", code, str(count)], cwd=tests_dir.parent,
+            env={**os.environ, "PYTHONPATH": os.pathsep.join([str(tests_dir.parent), str(tests_dir)])},
+            capture_output=True, text=True, timeout=120, check=True,
+        )
+        seen, peak = map(int, result.stdout.split())
+        assert seen == count
+        return peak
+
+    small, large = peak_for(50), peak_for(2000)
+    assert large < small * 2
@@ -0,0 +1,114 @@
+"""Tests for the memory-mapped packed chunk store."""
+
+import json
+
+import faiss
+import pytest
+
+from rag_chunk_store import ChunkStore, is_chunk_store
+from rag_pipeline import ANNIndexConfig, DocumentChunk
+
+
+def _chunks():
+    return [
+        DocumentChunk(text="Insulin lowers glucose.", metadata={"source": "a", "rank": 1}, id="c0"),
+        DocumentChunk(text="Glucagon raises glucose — ünïcode.", metadata={"source": "b"}, id="c1"),
+        DocumentChunk(text="Leptin signals satiety.", metadata={"tags": ["x", None]}, id="c2"),
+    ]
+
+
+def _write(path, store):
+    with open(path, "wb") as handle:
+        store.write(handle)
+
+
+def test_round_trip_materialises_rows_lazily(tmp_path):
+    path = str(tmp_path / "chunks.bin")
+    _write(path, ChunkStore(DocumentChunk, tail=_chunks()))
+
+    assert is_chunk_store(path)
+    store = ChunkStore(DocumentChunk, path)
+    assert len(store) == 3 and store.snapshot_count == 3
+    assert store[1].text == "Glucagon raises glucose — ünïcode."
+    assert store[-1].metadata == {"tags": ["x", None]}
+    assert store.ids() == ["c0", "c1", "c2"]
+    assert store.column("source") == ["a", "b", None]
+    with pytest.raises(IndexError):
+        store[3]
+
+
+def test_cells_are_written_in_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr("rag_chunk_store._WRITE_BLOCK_BYTES", 8)
+    path = str(tmp_path / "chunks.bin")
+    _write(path, ChunkStore(DocumentChunk, tail=_chunks()))
+
+    store = ChunkStore(DocumentChunk, path)
+    assert [chunk.text for chunk in store] == [chunk.text for chunk in _chunks()]
+    assert store.column("source") == ["a", "b", None]
+
+
+def test_rewrite_copies_snapshot_rows_and_appends_tail(tmp_path):
+    first = str(tmp_path / "first.bin")
+    _write(first, ChunkStore(DocumentChunk, tail=_chunks()[:2]))
+    store = ChunkStore(DocumentChunk, first)
+    store.append(_chunks()[2])
+
+    second = str(tmp_path / "second.bin")
+    frozen = store.frozen()
+    store.append(DocumentChunk(text="Added after freeze.", id="c3"))
+    _write(second, frozen)
+
+    rebased = store.rebased(second, len(frozen))
+    assert rebased.snapshot_count == 3
+    assert [chunk.text for chunk in rebased][-1] == "Added after freeze."
+    assert rebased[0].metadata == {"source": "a", "rank": 1}
+
+
+def test_pipeline_snapshot_is_packed_and_queried_lazily(make_pipeline):
+    pipeline = make_pipeline()
+    pipeline.add_texts(["Insulin lowers glucose.", "Leptin signals satiety."], auto_chunk=False)
+    pipeline.save()
+    assert is_chunk_store(pipeline.documents_path)
+    assert pipeline.documents.snapshot_count == 2  # saved rows now served from the mapping
+
+    reloaded = make_pipeline()
+    reloaded.load()
+    assert reloaded.documents.snapshot_count == 2
+    result = reloaded.query("leptin satiety", top_k=1)[0]
+    assert result.text == "Leptin signals satiety."
+    assert result.metadata["chunk_index"] == 0
+
+    reloaded.add_texts(["Ghrelin drives hunger."], auto_chunk=False)
+    assert reloaded.add_texts(["Insulin lowers glucose."], auto_chunk=False) == []
+    reloaded.save()
+    again = make_pipeline()
+    again.load()
+    assert [chunk.text for chunk in again.documents][-1] == "Ghrelin drives hunger."
+
+
+def test_legacy_jsonl_documents_are_still_loaded(make_pipeline):
+    pipeline = make_pipeline(document_format="jsonl")
+    pipeline.add_texts(["Insulin lowers glucose."], auto_chunk=False)
+    pipeline.save()
+    with open(pipeline.documents_path, encoding="utf-8") as handle:
+        assert json.loads(handle.readline())["text"] == "Insulin lowers glucose."
+
+    reloaded = make_pipeline()
+    reloaded.load()
+    assert reloaded.documents.snapshot_count == 0
+    assert reloaded.query("insulin", top_k=1)[0].text == "Insulin lowers glucose."
+
+
+def test_mapped_ivf_index_accepts_writes_after_load(make_pipeline):
+    config = ANNIndexConfig(promotion_threshold=40, nlist=4)
+    corpus = [f"document {i} about topic{i}" for i in range(45)]
+    pipeline = make_pipeline(index_factory="ivf_flat", ann_config=config)
+    pipeline.add_texts(corpus, auto_chunk=False)
+    pipeline.save()
+
+    reloaded = make_pipeline(index_factory="ivf_flat", ann_config=config)
+    reloaded.load()
+    assert isinstance(reloaded.index, faiss.IndexIVFFlat)
+    reloaded.add_texts(["a brand new document"], auto_chunk=False)
+    reloaded.save()
+    assert reloaded.index.ntotal == 46
@@ -0,0 +1,112 @@
+"""Tests for metadata pre-filtering of RAG queries."""
+
+import numpy as np
+import pytest
+
+from rag_metadata_index import MetadataIndex, bitmap
+from rag_pipeline import ANNIndexConfig
+
+
+def _populate(pipeline, sources=50, per_source=8):
+    for source in range(sources):
+        pipeline.add_texts(
+            [f"shared topic words variant {source} {i}" for i in range(per_source)],
+            metadata={"journal": f"J{source % 5}", "tags": ["review"] if source == 7 else []},
+            source_id=f"src-{source}",
+            auto_chunk=False,
+        )
+
+
+def test_metadata_index_masks_equality_membership_and_absence():
+    index = MetadataIndex()
+    index.add(0, [{"a": 1, "tags": ["x"]}, {"a": 2}, {"b": "y"}, {"a": 1.0}])
+
+    assert index.mask({"a": 1}, 4).tolist() == [True, False, False, True]
+    assert index.mask({"a": [2, 3]}, 4).tolist() == [False, True, False, False]
+    assert index.mask({"a": None}, 4).tolist() == [False, False, True, False]
+    assert index.mask({"tags": ["x"]}, 4).tolist() == [False, False, False, False]
+    assert index.mask({"tags": [["x"]]}, 4).tolist() == [True, False, False, False]
+    indexed, residual = index.split_filters({"a": 1, "chunk_id": "c", "b": callable})
+    assert list(indexed) == ["a"] and sorted(residual) == ["b", "chunk_id"]
+
+
+def test_bitmap_uses_faiss_bit_order():
+    mask = np.zeros(10, dtype=bool)
+    mask[[0, 9]] = True
+    assert bitmap(mask).tolist() == [1, 2]
+
+
+@pytest.mark.parametrize("factory", ["flat_ip", "hnsw", "ivf_flat"])
+@pytest.mark.parametrize("exact_threshold", [0, 4096])
+def test_selective_filter_returns_full_top_k(make_pipeline, factory, exact_threshold):
+    pipeline = make_pipeline(
+        index_factory=factory,
+        ann_config=ANNIndexConfig(promotion_threshold=100, nlist=8),
+        filter_exact_threshold=exact_threshold,
+    )
+    _populate(pipeline)
+
+    results = pipeline.query(
+        "shared topic words", top_k=5, metadata_filters={"source_id": "src-33"}
+    )
+    assert len(results) == 5
+    assert {result.metadata["source_id"] for result in results} == {"src-33"}
+
+
+def test_residual_filters_expand_the_search(make_pipeline):
+    pipeline = make_pipeline(candidate_multiplier=1)
+    _populate(pipeline)
+
+    results = pipeline.query(
+        "shared topic words",
+        top_k=3,
+        metadata_filters={"chunk_id": lambda value: value.startswith("src-41-")},
+    )
+    assert len(results) == 3
+    assert all(result.chunk_id.startswith("src-41-") for result in results)
+
+
+def test_filters_combine_and_survive_reload(make_pipeline):
+    pipeline = make_pipeline()
+    _populate(pipeline)
+    pipeline.save()
+
+    reloaded = make_pipeline()
+    reloaded.load()
+    filters = {"journal": "J2", "tags": [[]], "source_id": ["src-7", "src-12"]}
+    results = reloaded.query("shared topic words", top_k=20, metadata_filters=filters)
+    assert len(results) == 8
+    assert {result.metadata["source_id"] for result in results} == {"src-12"}
+    assert reloaded.query("shared", metadata_filters={"journal": "J9"}) == []
+
+
+def test_query_batch_matches_individual_queries(make_pipeline, hashing_embedder):
+    pipeline = make_pipeline(query_cache_size=0)
+    _populate(pipeline, sources=10)
+    queries = ["variant 3 1", "variant 7 2", "shared words 9 0", "no overlap at all"]
+
+    calls = hashing_embedder.encode_calls
+    batched = pipeline.query_batch(queries, top_k=4)
+    assert hashing_embedder.encode_calls == calls + 1
+
+    for query, results in zip(queries, batched):
+        single = pipeline.query(query, top_k=4)
+        assert [r.chunk_id for r in results] == [r.chunk_id for r in single]
+        assert [r.score for r in results] == pytest.approx([r.score for r in single])
+
+
+def test_query_batch_applies_filters_per_query(make_pipeline):
+    pipeline = make_pipeline()
+    _populate(pipeline, sources=10)
+
+    batched = pipeline.query_batch(
+        ["variant 3", "variant 4"],
+        top_k=2,
+        metadata_filters={
+            "journal": "J3",
+            "chunk_id": lambda value: int(value.rsplit("-", 1)[1]) % 2 == 0,
+        },
+    )
+    assert [len(results) for results in batched] == [2, 2]
+    assert all(r.metadata["journal"] == "J3" for results in batched for r in results)
+    assert pipeline.query_batch([]) == []
@@ -0,0 +1,90 @@
+"""Tests for approximate-nearest-neighbour index factories and promotion."""
+
+import faiss
+import numpy as np
+import pytest
+
+from rag_pipeline import ANNIndexConfig, build_ann_index, default_nlist, default_pq_m
+
+
+def _corpus(size):
+    return [f"document {i} about topic{i} and keyword{i % 7}" for i in range(size)]
+
+
+@pytest.mark.parametrize(
+    "factory, expected_type",
+    [
+        ("hnsw", faiss.IndexHNSW),
+        ("ivf_flat", faiss.IndexIVFFlat),
+        ("ivf_pq", faiss.IndexIVFPQ),
+    ],
+)
+def test_ann_factory_promotes_after_threshold(make_pipeline, factory, expected_type):
+    pipeline = make_pipeline(
+        index_factory=factory,
+        ann_config=ANNIndexConfig(promotion_threshold=40, nlist=4, pq_m=8, pq_nbits=4),
+    )
+    pipeline.add_texts(_corpus(20), auto_chunk=False)
+    assert isinstance(pipeline.index, faiss.IndexFlat)
+
+    pipeline.add_texts(_corpus(40)[20:], auto_chunk=False)
+    assert isinstance(pipeline.index, expected_type)
+    assert pipeline.index.ntotal == 40
+
+    pipeline.add_texts(["late addition about topic99"], auto_chunk=False)
+    assert pipeline.index.ntotal == 41
+
+    results = pipeline.query("topic17", top_k=1, nprobe=4, ef_search=32)
+    assert results and "topic17" in results[0].text
+
+
+def test_flat_factory_is_never_promoted(make_pipeline):
+    pipeline = make_pipeline(
+        index_factory="flat_ip", ann_config=ANNIndexConfig(promotion_threshold=1)
+    )
+    pipeline.add_texts(_corpus(10), auto_chunk=False)
+    assert isinstance(pipeline.index, faiss.IndexFlatIP)
+
+
+def test_unknown_factory_is_rejected(make_pipeline):
+    with pytest.raises(ValueError):
+        make_pipeline(index_factory="lsh")
+
+
+def test_promoted_index_survives_save_and_load(make_pipeline):
+    pipeline = make_pipeline(
+        index_factory="ivf_flat",
+        ann_config=ANNIndexConfig(promotion_threshold=10, nlist=2),
+    )
+    pipeline.add_texts(_corpus(30), auto_chunk=False)
+    pipeline.save()
+
+    reloaded = make_pipeline(index_factory="ivf_flat")
+    reloaded.load()
+    assert isinstance(reloaded.index, faiss.IndexIVFFlat)
+    assert reloaded.query("topic5", top_k=1, nprobe=2)[0].text == _corpus(30)[5]
+
+
+def test_loading_large_flat_store_promotes(make_pipeline):
+    writer = make_pipeline(index_factory="flat_ip")
+    writer.add_texts(_corpus(30), auto_chunk=False)
+    writer.save()
+
+    reader = make_pipeline(
+        index_factory="hnsw", ann_config=ANNIndexConfig(promotion_threshold=10)
+    )
+    reader.load()
+    assert isinstance(reader.index, faiss.IndexHNSW)
+
+
+def test_index_sizing_helpers():
+    assert default_nlist(100) == 2
+    assert default_nlist(1_000_000) == 4000
+    assert default_pq_m(384) == 48
+    assert 64 % default_pq_m(64) == 0
+
+    config = ANNIndexConfig(nlist=8, pq_nbits=4)
+    index = build_ann_index("ivf_pq", 64, 1000, config)
+    assert not index.is_trained
+    index.train(np.random.default_rng(0).random((256, 64), dtype=np.float32))
+    assert index.is_trained
@@ -0,0 +1,105 @@
+"""Tests for the streaming bulk ingest engine."""
+
+import gzip
+import json
+import os
+import time
+
+import pytest
+
+from rag_chunking import chunk_text
+from rag_ingest import BulkIngestor, iter_documents_file
+
+
+def _documents(count):
+    return [
+        {"id": f"doc{i}", "text": f"Paragraph one of doc{i}.\n\nParagraph two of doc{i} here."}
+        for i in range(count)
+    ]
+
+
+def test_chunk_text_matches_pipeline_chunking(make_pipeline):
+    pipeline = make_pipeline(chunk_size=40, chunk_overlap=5)
+    text = "First paragraph here.\n\nSecond one.\n\n" + "x" * 100
+    assert pipeline._chunk_text(text) == chunk_text(text, chunk_size=40, chunk_overlap=5)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_ingest_streams_batches_in_order(make_pipeline, hashing_embedder, workers):
+    pipeline = make_pipeline(chunk_size=40, chunk_overlap=0)
+    ingestor = BulkIngestor(pipeline, batch_size=8, workers=workers, docs_per_task=3)
+    stats = ingestor.ingest(iter(_documents(10)))
+
+    assert stats.documents == 10
+    assert stats.chunks == stats.added == 20 == len(pipeline.documents)
+    assert hashing_embedder.encode_calls == 3  # 8 + 8 + 4 chunks
+    first, second = pipeline.documents[0], pipeline.documents[1]
+    assert first.metadata["source_id"] == "doc0" and first.metadata["chunk_index"] == 0
+    assert second.text == "Paragraph two of doc0 here."
+    assert pipeline.documents[19].metadata["document_index"] == 9
+
+
+def test_ingest_resumes_from_checkpoint(make_pipeline, tmp_path):
+    checkpoint = str(tmp_path / "ingest.ckpt.json")
+    pipeline = make_pipeline(chunk_size=40, chunk_overlap=0, persistence_mode="append")
+    documents = _documents(10)
+
+    class Interrupted(Exception):
+        pass
+
+    def interrupted_stream():
+        yield from documents[:7]
+        raise Interrupted()
+
+    ingestor = BulkIngestor(
+        pipeline, batch_size=4, workers=0, docs_per_task=1,
+        checkpoint_path=checkpoint, checkpoint_interval=1,
+    )
+    with pytest.raises(Interrupted):
+        ingestor.ingest(interrupted_stream())
+    with open(checkpoint, encoding="utf-8") as handle:
+        assert json.load(handle)["documents"] == 6
+    pipeline.close()
+
+    resumed = make_pipeline(chunk_size=40, chunk_overlap=0, persistence_mode="append")
+    resumed.load()
+    stats = BulkIngestor(
+        resumed, batch_size=4, workers=0, checkpoint_path=checkpoint
+    ).ingest(iter(documents))
+
+    assert stats.resumed_from == 6 and stats.documents == 10
+    assert len(resumed.documents) == 20
+    assert sorted({chunk.metadata["source_id"] for chunk in resumed.documents}) == sorted(
+        f"doc{i}" for i in range(10)
+    )
+
+
+def test_ingest_compacts_once_at_the_end(make_pipeline):
+    pipeline = make_pipeline(
+        chunk_size=40, chunk_overlap=0, persistence_mode="append",
+        wal_flush_interval=0.01, wal_flush_batch_size=1, wal_compact_threshold=4,
+    )
+    compactions = []
+    pipeline._wal.on_compact = lambda: compactions.append("background")
+    compact = pipeline.compact
+    pipeline.compact = lambda: (compactions.append("final"), compact())
+
+    ingestor = BulkIngestor(
+        pipeline, batch_size=2, workers=0, progress_interval=0,
+        progress=lambda stats: time.sleep(0.02),  # let the writer thread flush
+    )
+    ingestor.ingest(iter(_documents(10)))
+
+    assert compactions == ["final"]
+    assert pipeline._wal.wal_entries == 0 and os.path.exists(pipeline.index_path)
+
+
+def test_iter_documents_file_reads_gzip_jsonl_and_text(tmp_path):
+    jsonl = tmp_path / "corpus.jsonl.gz"
+    with gzip.open(jsonl, "wt", encoding="utf-8") as handle:
+        handle.write('{"id": "a", "text": "alpha"}\n\n{"text": "beta"}\n')
+    text = tmp_path / "corpus.txt"
+    text.write_text("first doc\n\nsecond doc\n", encoding="utf-8")
+
+    assert list(iter_documents_file(str(jsonl))) == [{"id": "a", "text": "alpha"}, {"text": "beta"}]
+    assert list(iter_documents_file(str(text))) == ["first doc", "second doc"]
@@ -0,0 +1,170 @@
+"""Tests for the BM25 keyword index and hybrid (dense + keyword) retrieval."""
+
+import time
+
+import numpy as np
+import pytest
+
+from rag_keyword_index import (
+    KEYWORD_INDEX_SUFFIX,
+    BM25Index,
+    has_identifier,
+    is_identifier,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+from rag_persistence import atomic_write
+
+TARGET = (
+    "Long review of hereditary syndromes covering family history, counselling, imaging, surgery, "
+    "chemoprevention, survivorship and the brca1 founder allele in several populations"
+)
+
+
+def _generic(size):
+    return [f"what about mutation risk note {i}" for i in range(size)]
+
+
+def _index(texts):
+    index = BM25Index()
+    index.add(0, [tokenize(text) for text in texts])
+    return index
+
+
+def test_tokenize_keeps_identifiers_whole():
+    tokens = tokenize("The SARS-CoV-2 spike and NM_007294.4 of BRCA1")
+    assert tokens[:4] == ["sars-cov-2", "sars", "cov", "2"]
+    assert "nm_007294.4" in tokens and "007294" in tokens
+    assert "brca1" in tokens and "the" not in tokens
+    assert is_identifier("BRCA1") and is_identifier("SARS-CoV-2") and is_identifier("EGFR")
+    assert not is_identifier("Cancer") and not is_identifier("long-term") and not is_identifier("2")
+    assert has_identifier("role of mTOR in ageing") and not has_identifier("Long-term outcomes")
+
+
+def test_bm25_ranks_rare_terms_and_short_documents_first():
+    index = _index(
+        [
+            "brca1 mutation breast cancer",
+            "tp53 tumor suppressor",
+            "breast cancer screening programme with mammography and ultrasound",
+            "breast cancer",
+            "cyp2c9 warfarin dosing",
+            "hba1c glycaemic control",
+            "egfr inhibitor resistance",
+        ]
+    )
+    scores, ids = index.search("BRCA1 breast cancer", 3)
+    assert ids.tolist() == [0, 3, 2]
+    assert np.all(np.diff(scores) <= 0)
+    # Terms in more than half the documents are skipped in multi-term queries.
+    index.add(7, [["breast", "cancer"], ["breast", "cancer"]])
+    assert index.search("BRCA1 breast cancer", 3)[1].tolist() == [0]
+    assert index.search("unknown words", 3)[1].size == 0
+    with pytest.raises(ValueError):
+        index.add(2, [["late"]])
+
+
+def test_snapshot_round_trip_and_rebase(tmp_path):
+    texts = ["brca1 mutation", "tp53 tumor", "cyp2c9 warfarin", "brca1 brca2 ovarian"]
+    index = _index(texts[:3])
+    snapshot = index.snapshot()
+    index.add(3, [tokenize(texts[3])])  # arrives while the snapshot is written
+
+    path = str(tmp_path / ("index.faiss" + KEYWORD_INDEX_SUFFIX))
+    atomic_write(path, snapshot.write, binary=True)
+    expected = index.search("brca1 warfarin", 4)
+    index.rebase(path, snapshot)
+    assert index.stats()["documents"] == 4
+    for actual, wanted in zip(index.search("brca1 warfarin", 4), expected):
+        np.testing.assert_allclose(actual, wanted)
+
+    atomic_write(path, index.snapshot().write, binary=True)  # the old file stays mapped
+    reloaded = BM25Index()
+    reloaded.load(path)
+    assert len(reloaded) == 4 and reloaded.stats()["tail_terms"] == 0
+    for actual, wanted in zip(reloaded.search("brca1 warfarin", 4), expected):
+        np.testing.assert_allclose(actual, wanted)
+
+
+def test_reciprocal_rank_fusion_merges_duplicates():
+    fused = reciprocal_rank_fusion([["a", "b"], ["b", "c"]], [1.0, 2.0], k=1)
+    assert [key for key, _ in fused] == ["b", "c", "a"]
+    assert fused[0][1] == pytest.approx(1 / 3 + 2 / 2)
+
+
+def test_hybrid_search_finds_identifiers_dense_search_misses(make_pipeline, tmp_path):
+    corpus = _generic(40) + [TARGET]
+    dense = make_pipeline(index_path=str(tmp_path / "dense.faiss"))
+    hybrid = make_pipeline(hybrid_search=True, keyword_budget=None)
+    for pipeline in (dense, hybrid):
+        pipeline.add_texts(corpus, auto_chunk=False, metadata={"source": "test"})
+
+    query = "what about BRCA1 mutation risk"
+    assert dense.query(query, top_k=1)[0].text != TARGET
+    results = hybrid.query(query, top_k=3)
+    assert results[0].text == TARGET
+    assert len({result.text for result in results}) == 3
+    # Fusion orders the results but score stays the cosine similarity.
+    assert [r.fused_score for r in results] == sorted((r.fused_score for r in results), reverse=True)
+    vectors = {result.text: result.score for result in dense.query(query, top_k=41)}
+    assert [r.score for r in results] == pytest.approx([vectors[r.text] for r in results])
+    assert hybrid.query(query, top_k=1, metadata_filters={"source": "test"})[0].text == TARGET
+    assert hybrid.query(query, top_k=1, metadata_filters={"source": "other"}) == []
+
+
+def test_fusion_keeps_chunks_with_repeated_ids_apart(make_pipeline):
+    pipeline = make_pipeline(hybrid_search=True, keyword_budget=None)
+    # Callers may supply the same chunk id for distinct chunks.
+    pipeline.add_texts(["cyp2c9 warfarin dosing"], auto_chunk=False, metadata={"chunk_id": "note"})
+    pipeline.add_texts(_generic(20), auto_chunk=False)
+    pipeline.add_texts(["cyp2c9 poor metabolisers"], auto_chunk=False, metadata={"chunk_id": "note"})
+    assert pipeline.documents[0].id == pipeline.documents[21].id
+
+    texts = {result.text for result in pipeline.query("CYP2C9", top_k=2)}
+    assert texts == {"cyp2c9 warfarin dosing", "cyp2c9 poor metabolisers"}
+
+
+def test_keyword_index_persists_and_replays(make_pipeline):
+    writer = make_pipeline(hybrid_search=True, persistence_mode="append", wal_flush_interval=60)
+    writer.add_texts(_generic(40), auto_chunk=False)
+    writer.compact()
+    writer.add_texts([TARGET], auto_chunk=False)
+    writer.flush()
+    writer.close()
+
+    reader = make_pipeline(hybrid_search=True, keyword_budget=None, persistence_mode="append")
+    reader.load()
+    assert len(reader.keyword_index) == len(reader.documents) == 41
+    assert reader.query("what about BRCA1 mutation risk", top_k=1)[0].text == TARGET
+
+    reader.save()
+    assert len(reader.keyword_index) == 41 and reader.keyword_index.stats()["tail_terms"] == 0
+    reader.reset()
+    assert len(reader.keyword_index) == 0
+
+
+def test_stale_keyword_index_is_rebuilt(make_pipeline, tmp_path, caplog):
+    writer = make_pipeline()
+    writer.add_texts(_generic(40) + [TARGET], auto_chunk=False)
+    writer.save()
+    assert not (tmp_path / ("index.faiss" + KEYWORD_INDEX_SUFFIX)).exists()
+
+    reader = make_pipeline(hybrid_search=True, keyword_budget=None)
+    with caplog.at_level("INFO"):
+        reader.load()
+    assert "Rebuilding the keyword index" in caplog.text
+    assert reader.query("what about BRCA1 mutation risk", top_k=1)[0].text == TARGET
+
+
+def test_slow_keyword_search_falls_back_to_dense(make_pipeline, monkeypatch):
+    pipeline = make_pipeline(hybrid_search=True, keyword_budget=0.01)
+    pipeline.add_texts(_generic(40) + [TARGET], auto_chunk=False)
+    search = pipeline.keyword_index.search
+
+    def slow_search(query, k):
+        time.sleep(0.2)
+        return search(query, k)
+
+    monkeypatch.setattr(pipeline.keyword_index, "search", slow_search)
+    results = pipeline.query("what about BRCA1 mutation risk", top_k=1)
+    assert results and results[0].text != TARGET
@@ -0,0 +1,177 @@
+"""Tests for the append-only, write-behind RAG persistence mode."""
+
+import os
+import time
+
+import pytest
+
+from rag_persistence import COMPACTING_SUFFIX, read_wal
+
+
+def _wal_records(pipeline):
+    return read_wal(pipeline.wal_path)[0]
+
+
+def test_persist_appends_to_wal_without_snapshot(make_pipeline):
+    """persist() in append mode must not rewrite the snapshot files."""
+
+    pipeline = make_pipeline(persistence_mode="append", wal_flush_interval=60)
+    pipeline.add_texts(["CRISPR edits genomes."], auto_chunk=False)
+    pipeline.persist()
+    pipeline.flush()
+
+    assert not os.path.exists(pipeline.index_path)
+    assert [record["text"] for record in _wal_records(pipeline)] == ["CRISPR edits genomes."]
+
+
+def test_load_recovers_from_wal_only(make_pipeline):
+    """A crash before any compaction is recovered purely from the log."""
+
+    writer = make_pipeline(persistence_mode="append", wal_flush_interval=60)
+    writer.add_texts(["Mitochondria make ATP.", "Ribosomes make protein."], auto_chunk=False)
+    writer.flush()
+
+    reader = make_pipeline(persistence_mode="append")
+    reader.load()
+
+    assert reader.index.ntotal == 2
+    assert [chunk.text for chunk in reader.documents] == [
+        "Mitochondria make ATP.",
+        "Ribosomes make protein.",
+    ]
+    assert reader.query("ATP", top_k=1)[0].text == "Mitochondria make ATP."
+
+
+def test_compact_writes_snapshot_and_truncates_wal(make_pipeline):
+    pipeline = make_pipeline(persistence_mode="append", wal_flush_interval=60)
+    pipeline.add_texts(["First chunk."], auto_chunk=False)
+    pipeline.compact()
+    pipeline.add_texts(["Second chunk."], auto_chunk=False)
+    pipeline.flush()
+
+    assert os.path.exists(pipeline.index_path)
+    assert not os.path.exists(pipeline.wal_path + COMPACTING_SUFFIX)
+    assert [record["text"] for record in _wal_records(pipeline)] == ["Second chunk."]
+
+    reloaded = make_pipeline(persistence_mode="append")
+    reloaded.load()
+    assert reloaded.index.ntotal == 2
+    assert [chunk.text for chunk in reloaded.documents] == ["First chunk.", "Second chunk."]
+
+
+def test_reset_is_durable_in_append_mode(make_pipeline):
+    writer = make_pipeline(persistence_mode="append", wal_flush_interval=60)
+    writer.add_texts(["Old snapshot chunk."], auto_chunk=False)
+    writer.compact()
+    writer.add_texts(["Old logged chunk."], auto_chunk=False)
+    writer.flush()
+
+    writer.reset()
+    writer.add_texts(["new document"], auto_chunk=False)
+    writer.flush()
+    writer.close()
+
+    reloaded = make_pipeline(persistence_mode="append")
+    reloaded.load()
+    assert [chunk.text for chunk in reloaded.documents] == ["new document"]
+    assert reloaded.index.ntotal == 1
+    assert reloaded.query("document", top_k=1)[0].text == "new document"
+
+
+def test_interrupted_compaction_is_replayed_without_duplicates(make_pipeline):
+    """Records in a leftover .compacting file that the snapshot already has are skipped."""
+
+    pipeline = make_pipeline(persistence_mode="append", wal_flush_interval=60)
+    pipeline.add_texts(["Alpha."], auto_chunk=False)
+    pipeline.flush()
+    with open(pipeline.wal_path, "rb") as handle:
+        logged = handle.read()
+    pipeline.compact()
+    with open(pipeline.wal_path + COMPACTING_SUFFIX, "wb") as handle:
+        handle.write(logged)
+
+    reloaded = make_pipeline(persistence_mode="append")
+    reloaded.load()
+    assert [chunk.text for chunk in reloaded.documents] == ["Alpha."]
+    assert reloaded.index.ntotal == 1
+
+
+def test_replay_keeps_chunks_with_repeated_ids(make_pipeline):
+    """Caller-supplied chunk ids need not be unique; replay must not merge them."""
+
+    writer = make_pipeline(persistence_mode="append", wal_flush_interval=60)
+    writer.add_texts(["Snapshot chunk."], auto_chunk=False, metadata={"chunk_id": "note"})
+    writer.compact()
+    writer.add_texts(["Logged chunk one."], auto_chunk=False, metadata={"chunk_id": "note"})
+    writer.add_texts(["Logged chunk two."], auto_chunk=False, metadata={"chunk_id": "note"})
+    writer.flush()
+
+    reloaded = make_pipeline(persistence_mode="append")
+    reloaded.load()
+    assert [chunk.text for chunk in reloaded.documents] == [
+        "Snapshot chunk.",
+        "Logged chunk one.",
+        "Logged chunk two.",
+    ]
+    assert reloaded.index.ntotal == 3
+
+
+def test_failed_flush_keeps_records_queued(make_pipeline):
+    pipeline = make_pipeline(persistence_mode="append", wal_flush_interval=60)
+    os.mkdir(pipeline.wal_path)  # opening the log for append now fails
+    pipeline.add_texts(["Kept across a failed write."], auto_chunk=False)
+    with pytest.raises(OSError):
+        pipeline.flush()
+    assert pipeline._wal.pending_count == 1
+
+    os.rmdir(pipeline.wal_path)
+    pipeline.flush()
+    assert pipeline._wal.pending_count == 0
+    assert [record["text"] for record in _wal_records(pipeline)] == ["Kept across a failed write."]
+
+
+def test_torn_wal_tail_is_discarded(make_pipeline):
+    pipeline = make_pipeline(persistence_mode="append", wal_flush_interval=60)
+    pipeline.add_texts(["Intact record."], auto_chunk=False)
+    pipeline.flush()
+    intact_size = os.path.getsize(pipeline.wal_path)
+    with open(pipeline.wal_path, "a", encoding="utf-8") as handle:
+        handle.write('{"op": "add", "id": "torn", "text": "half writ')
+
+    reloaded = make_pipeline(persistence_mode="append")
+    reloaded.load()
+
+    assert [chunk.text for chunk in reloaded.documents] == ["Intact record."]
+    assert os.path.getsize(pipeline.wal_path) == intact_size
+
+
+def test_background_writer_flushes_on_batch_size(make_pipeline):
+    pipeline = make_pipeline(
+        persistence_mode="append", wal_flush_interval=60, wal_flush_batch_size=2
+    )
+    pipeline.add_texts(["One.", "Two."], auto_chunk=False)
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and len(_wal_records(pipeline)) < 2:
+        time.sleep(0.01)
+    assert len(_wal_records(pipeline)) == 2
+
+
+def test_background_compaction_on_threshold(make_pipeline):
+    pipeline = make_pipeline(
+        persistence_mode="append",
+        wal_flush_interval=0.05,
+        wal_flush_batch_size=1,
+        wal_compact_threshold=3,
+    )
+    pipeline.add_texts(["A.", "B.", "C."], auto_chunk=False)
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and not os.path.exists(pipeline.index_path):
+        time.sleep(0.01)
+    pipeline.close()
+
+    reloaded = make_pipeline(persistence_mode="append")
+    reloaded.load()
+    assert sorted(chunk.text for chunk in reloaded.documents) == ["A.", "B.", "C."]
+    assert reloaded.index.ntotal == 3
@@ -0,0 +1,164 @@
+"""Tests for compressed vector codecs and exact re-scoring from the float store."""
+
+import faiss
+import numpy as np
+import pytest
+
+from rag_pipeline import ANNIndexConfig
+from rag_vector_store import VECTORS_SUFFIX, FloatVectorStore
+
+SMALL_CODES = ANNIndexConfig(promotion_threshold=50, nlist=4, pq_m=8, pq_nbits=4)
+
+
+def _corpus(size):
+    return [f"document {i} about topic{i} and keyword{i % 7} gene{i % 11}" for i in range(size)]
+
+
+def _scores(results):
+    # The hashing embedder produces exact ties, which may be ordered differently.
+    return [round(result.score, 5) for result in results]
+
+
+@pytest.mark.parametrize(
+    "codec, expected_type, bytes_per_vector",
+    [
+        ("float16", faiss.IndexScalarQuantizer, 128),
+        ("sq8", faiss.IndexScalarQuantizer, 64),
+        ("pq", faiss.IndexPQ, 4),
+    ],
+)
+def test_flat_codecs_compress_vectors(make_pipeline, codec, expected_type, bytes_per_vector):
+    pipeline = make_pipeline(vector_codec=codec, ann_config=SMALL_CODES)
+    pipeline.add_texts(_corpus(20), auto_chunk=False)
+    if codec == "float16":
+        assert isinstance(pipeline.index, expected_type)  # needs no training
+    else:
+        assert isinstance(pipeline.index, faiss.IndexFlat)
+
+    pipeline.add_texts(_corpus(60)[20:], auto_chunk=False)
+    assert isinstance(pipeline.index, expected_type)
+    stats = pipeline.storage_stats()
+    assert stats["vectors"] == 60
+    assert stats["bytes_per_vector"] == bytes_per_vector
+    assert stats["compression_ratio"] == 256 / bytes_per_vector
+    assert not stats["rescore"] and stats["float_store_bytes"] == 0
+
+
+@pytest.mark.parametrize(
+    "factory, codec, expected_type",
+    [
+        ("hnsw", "sq8", faiss.IndexHNSWSQ),
+        ("hnsw", "pq", faiss.IndexHNSWPQ),
+        ("ivf_flat", "float16", faiss.IndexIVFScalarQuantizer),
+        ("ivf_flat", "pq", faiss.IndexIVFPQ),
+    ],
+)
+def test_ann_factories_use_the_codec(make_pipeline, factory, codec, expected_type):
+    pipeline = make_pipeline(index_factory=factory, vector_codec=codec, ann_config=SMALL_CODES, rescore=True)
+    pipeline.add_texts(_corpus(60), auto_chunk=False)
+    assert isinstance(pipeline.index, expected_type)
+    assert pipeline.storage_stats()["rescore"]
+    assert "topic17" in pipeline.query("topic17", top_k=1, nprobe=4)[0].text
+
+
+def test_invalid_codecs_are_rejected(make_pipeline):
+    with pytest.raises(ValueError):
+        make_pipeline(vector_codec="int4")
+    with pytest.raises(ValueError):
+        make_pipeline(index_factory="ivf_pq", vector_codec="sq8")
+
+
+def test_rescoring_restores_exact_float32_ranking(make_pipeline, tmp_path):
+    exact = make_pipeline(index_path=str(tmp_path / "exact.faiss"))
+    compressed = make_pipeline(vector_codec="pq", ann_config=SMALL_CODES, rescore=True, rescore_factor=1000)
+    corpus = _corpus(80)
+    for pipeline in (exact, compressed):
+        pipeline.add_texts(corpus, auto_chunk=False, metadata={"source": "test"})
+    assert isinstance(compressed.index, faiss.IndexPQ)
+    assert len(compressed._float_vectors) == 80
+
+    # Each candidate list covers the whole store, so re-scoring is exact.
+    for query in ("topic17 keyword3", "gene5 document", "keyword6 gene2 topic40"):
+        assert _scores(compressed.query(query, top_k=5)) == _scores(exact.query(query, top_k=5))
+        filtered = {"source": "test"}
+        assert _scores(compressed.query(query, top_k=5, metadata_filters=filtered)) == _scores(
+            exact.query(query, top_k=5, metadata_filters=filtered)
+        )
+
+
+def test_float_store_survives_save_load_and_wal_replay(make_pipeline, tmp_path):
+    options = dict(vector_codec="sq8", ann_config=SMALL_CODES, rescore=True)
+    writer = make_pipeline(persistence_mode="append", wal_flush_interval=60, **options)
+    writer.add_texts(_corpus(60), auto_chunk=False)
+    writer.compact()
+    writer.add_texts(["late addition about topic99"], auto_chunk=False)
+    writer.flush()
+    writer.save(index_path=str(tmp_path / "copy.faiss"), documents_path=str(tmp_path / "copy.jsonl"))
+    writer.close()
+    assert (tmp_path / ("copy.faiss" + VECTORS_SUFFIX)).exists()
+
+    reader = make_pipeline(persistence_mode="append", **options)
+    reader.load()
+    assert reader.index.ntotal == len(reader._float_vectors) == 61
+    assert reader.storage_stats()["rescore"]
+    assert reader.query("topic99", top_k=1)[0].text == "late addition about topic99"
+
+    copy = make_pipeline(index_path=str(tmp_path / "other.faiss"), **options)
+    copy.load(index_path=str(tmp_path / "copy.faiss"), documents_path=str(tmp_path / "copy.jsonl"))
+    assert copy.storage_stats()["rescore"]
+    np.testing.assert_array_equal(
+        copy._float_vectors.get(np.arange(61)), reader._float_vectors.get(np.arange(61))
+    )
+
+    reader.reset()
+    assert len(reader._float_vectors) == 0
+
+
+def test_fresh_pipeline_leaves_saved_float_store_intact(make_pipeline, tmp_path):
+    options = dict(vector_codec="sq8", ann_config=SMALL_CODES, rescore=True)
+    writer = make_pipeline(**options)
+    writer.add_texts(_corpus(60), auto_chunk=False)
+    writer.save()
+    saved = tmp_path / ("index.faiss" + VECTORS_SUFFIX)
+    before = saved.read_bytes()
+
+    # Adding to a pipeline that never loaded must not touch the saved rows.
+    make_pipeline(**options).add_texts(["unrelated chunk"], auto_chunk=False)
+    assert saved.read_bytes() == before
+
+    reader = make_pipeline(**options)
+    reader.load()
+    assert reader.storage_stats()["rescore"] and len(reader._float_vectors) == 60
+
+
+def test_missing_float_store_disables_rescoring(make_pipeline, tmp_path, caplog):
+    writer = make_pipeline(vector_codec="sq8", ann_config=SMALL_CODES)
+    writer.add_texts(_corpus(60), auto_chunk=False)
+    writer.save()
+
+    reader = make_pipeline(vector_codec="sq8", ann_config=SMALL_CODES, rescore=True)
+    reader.load()
+    assert "exact re-scoring is disabled" in caplog.text
+    assert not reader.storage_stats()["rescore"]
+    assert "topic17" in reader.query("topic17", top_k=1)[0].text
+
+
+def test_float_vector_store_round_trip(tmp_path):
+    path = str(tmp_path / "rows.vectors")
+    rows = np.random.default_rng(0).standard_normal((10, 8)).astype(np.float32)
+    store = FloatVectorStore(8, path)
+    store.append(rows[:6])
+    np.testing.assert_array_equal(store.get([5, 0]), rows[[5, 0]])
+    store.append(rows[6:])
+    store.truncate(9)
+    store.close()
+
+    reopened = FloatVectorStore(8, path)
+    assert len(reopened) == 9
+    np.testing.assert_array_equal(reopened.get(np.arange(9)), rows[:9])
+    with pytest.raises(ValueError):
+        reopened.append(rows[:, :4])
+    reopened.close()
+
+    # A store of another dimension is discarded rather than misread.
+    assert len(FloatVectorStore(4, path)) == 0
@@ -0,0 +1,67 @@
+"""Tests for vectorised batch sequence analysis."""
+
+import random
+import warnings
+
+import pytest
+
+from sequence_analysis import analyze_fasta, analyze_records, iter_fasta
+from tools import analyze_sequence
+
+Bio = pytest.importorskip("Bio")
+from Bio.Seq import Seq  # noqa: E402
+from Bio.SeqUtils import gc_fraction, molecular_weight  # noqa: E402
+
+
+def _random_records(alphabet, count=300, seed=3):
+    rng = random.Random(seed)
+    return [
+        (f"read{i}", "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 90))).encode())
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("sequence_type, alphabet", [("DNA", "ACGTWS"), ("RNA", "ACGU")])
+def test_nucleotide_results_match_biopython(sequence_type, alphabet):
+    records = _random_records(alphabet)
+    result = analyze_records(records, sequence_type, include_sequences=True, block_bases=1000)
+    columns = result["columns"]
+    transcription = "back_transcription" if sequence_type == "RNA" else "transcription"
+
+    for row, (_, sequence) in enumerate(records):
+        bio = Seq(sequence.decode())
+        assert columns["gc_content"][row] == round(gc_fraction(bio) * 100, 2)
+        expected = bio.back_transcribe() if sequence_type == "RNA" else bio.transcribe()
+        assert columns[transcription][row] == str(expected)
+        if b"W" not in sequence and b"S" not in sequence:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                assert columns["translation"][row] == str(bio[: len(bio) // 3 * 3].translate())
+    assert result["num_records"] == len(records)
+
+
+def test_protein_weights_match_biopython():
+    records = _random_records("ACDEFGHIKLMNPQRSTVWY", count=100)
+    weights = analyze_records(records, "protein")["columns"]["molecular_weight"]
+    for (_, sequence), weight in zip(records, weights):
+        if sequence:
+            assert weight == pytest.approx(molecular_weight(Seq(sequence.decode()), "protein"), abs=1e-3)
+    assert analyze_records([("bad", b"MKB")], "protein")["columns"]["molecular_weight"] == [None]
+
+
+def test_fasta_parsing_handles_wrapped_and_headerless_input():
+    fasta = ">seq1 first read\nacgt\nGG\n\n>seq2\nTTTAAA\n>\nCC\n"
+    assert list(iter_fasta(fasta)) == [("seq1", b"ACGTGG"), ("seq2", b"TTTAAA"), ("sequence_3", b"CC")]
+    assert list(iter_fasta(["ACG\n", "TTT\n"])) == [("sequence_1", b"ACGTTT")]
+
+
+def test_tool_accepts_fasta_and_truncates_columns(monkeypatch):
+    monkeypatch.setattr("config.SEQUENCE_BATCH_MAX_ROWS", 2)
+    fasta = "".join(f">r{i}\nATGGCC\n" for i in range(5))
+    result = analyze_sequence(fasta, "DNA")
+
+    assert result["num_records"] == 5 and result["truncated"] is True
+    assert result["columns"]["id"] == ["r0", "r1"]
+    assert result["summary"]["gc_content"]["mean"] == 66.67
+    assert "translation" not in result["columns"]
+    assert analyze_fasta(fasta, "DNA", include_sequences=True)["columns"]["translation"][0] == "MA"
@@ -0,0 +1,90 @@
+"""Tests for the lazy subsystem registry and the service's cold-start cost."""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+import subsystems
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# Generous enough for slow CI machines; the eager imports took ~9 s.
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "3.0"))
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "unsloth", "scipy", "openai", "anthropic")
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(subsystems, "_registry", {})
+    return subsystems
+
+
+def test_factory_runs_once_on_first_use(registry):
+    calls = []
+
+    def build():
+        calls.append(threading.get_ident())
+        return object()
+
+    subsystem = registry.register("thing", build)
+    assert not subsystem.ready and calls == []
+
+    values = []
+    threads = [threading.Thread(target=lambda: values.append(registry.get("thing"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1 and all(value is values[0] for value in values)
+    assert registry.status()["thing"]["ready"] is True
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_failed_factory_is_retried_and_warm_up_reports_it(registry):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("index unavailable")
+        return "loaded"
+
+    registry.register("flaky", flaky)
+    registry.register("other", lambda: "fine")
+
+    report = registry.warm_up()
+    assert report["flaky"] == {"ready": False, "init_seconds": None, "error": "index unavailable"}
+    assert report["other"]["ready"] is True
+
+    assert registry.warm_up(["flaky", "unknown"])["flaky"]["ready"] is True
+    assert registry.get("flaky") == "loaded" and len(attempts) == 2
+
+
+def test_service_import_defers_heavy_subsystems():
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "import api_service\n"
+        "seconds = time.perf_counter() - start\n"
+        "import subsystems\n"
+        "print(json.dumps({'seconds': seconds, 'modules': sorted(sys.modules),"
+        " 'status': subsystems.status()}))\n"
+    )
+    env = dict(os.environ, HF_HUB_OFFLINE="1")
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, env=env,
+        capture_output=True, text=True, timeout=120, check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    loaded = [name for name in HEAVY_MODULES if name in report["modules"]]
+    assert loaded == []
+    assert {"rag_index", "embedder", "llm_provider", "local_model"} <= set(report["status"])
+    assert not any(status["ready"] for status in report["status"].values())
+    assert report["seconds"] < IMPORT_BUDGET_SECONDS
@@ -1,11 +1,44 @@
 import pytest
 from unittest.mock import patch, MagicMock
 import requests
+import tools
+from pubmed_cache import PubMedCache
 from tools import search_pubmed, analyze_sequence, calculate_drug_properties
 
+
+@pytest.fixture(autouse=True)
+def pubmed_cache(tmp_path, monkeypatch):
+    """Give every test an empty PubMed cache instead of the shared on-disk one."""
+    cache = PubMedCache(str(tmp_path / "pubmed_cache.sqlite"))
+    monkeypatch.setattr(tools, "_pubmed_cache", cache)
+    monkeypatch.setattr(tools.http_session, "_buckets", {})  # no NCBI throttling in tests
+    yield cache
+    cache.close()
+
+
+def _search_response(pmids):
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = {"esearchresult": {"idlist": pmids}}
+    return response
+
+
+def _fetch_response(pmids):
+    response = MagicMock()
+    response.status_code = 200
+    articles = "".join(
+        f"<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article>"
+        f"<ArticleTitle>Title {pmid}</ArticleTitle>"
+        f"<Abstract><AbstractText>Abstract {pmid}</AbstractText></Abstract>"
+        f"</Article></MedlineCitation></PubmedArticle>"
+        for pmid in pmids
+    )
+    response.content = f"<PubmedArticleSet>{articles}</PubmedArticleSet>".encode()
+    return response
+
 # --- Tests for search_pubmed ---
 
-@patch('tools.requests.get')
+@patch('tools.http_session.session.get')
 def test_search_pubmed_success(mock_get):
     """
     Tests successful PubMed search by mocking the requests library.
@@ -37,7 +70,7 @@ def test_search_pubmed_success(mock_get):
     </PubmedArticleSet>
     '''
     
-    # The first call to requests.get is for search, the second is for fetch
+    # The first call to the session is for search, the second is for fetch
     mock_get.side_effect = [mock_search_response, mock_fetch_response]
 
     result = search_pubmed("crispr")
@@ -47,7 +80,7 @@ def test_search_pubmed_success(mock_get):
     assert "This is a test abstract" in result["results"][0]["abstract"]
     assert result["results"][0]["pmid"] == "12345"
 
-@patch('tools.requests.get')
+@patch('tools.http_session.session.get')
 def test_search_pubmed_no_results(mock_get):
     """
     Tests PubMed search with no results found.
@@ -61,7 +94,7 @@ def test_search_pubmed_no_results(mock_get):
     assert result["num_results"] == 0
     assert len(result["results"]) == 0
 
-@patch('tools.requests.get')
+@patch('tools.http_session.session.get')
 def test_search_pubmed_api_error(mock_get):
     """
     Tests handling of an API error during PubMed search.
@@ -73,6 +106,65 @@ def test_search_pubmed_api_error(mock_get):
     assert "API request failed" in result["error"]
 
 
+@patch('tools.http_session.session.get')
+def test_search_pubmed_repeated_query_is_served_from_cache(mock_get, pubmed_cache):
+    """
+    Tests that a repeated (differently formatted) query makes no requests.
+    """
+    mock_get.side_effect = [_search_response(["1", "2"]), _fetch_response(["1", "2"])]
+
+    first = search_pubmed("CRISPR  base editing", max_results=2)
+    second = search_pubmed("crispr base editing", max_results=2)
+
+    assert mock_get.call_count == 2
+    assert second == {**first, "query": "crispr base editing"}
+    stats = pubmed_cache.stats()
+    assert stats["search_hits"] == 1 and stats["record_hits"] == 2
+
+
+@patch('tools.http_session.session.get')
+def test_search_pubmed_fetches_only_uncached_records(mock_get):
+    """
+    Tests that overlapping searches only efetch articles not seen before, and
+    that a larger cached search answers a smaller one.
+    """
+    mock_get.side_effect = [
+        _search_response(["1", "2"]), _fetch_response(["1", "2"]),
+        _search_response(["2", "3", "4"]), _fetch_response(["3", "4"]),
+    ]
+
+    search_pubmed("insulin", max_results=2)
+    result = search_pubmed("glucagon", max_results=3)
+    assert [r["pmid"] for r in result["results"]] == ["2", "3", "4"]
+    assert mock_get.call_args.kwargs["params"]["id"] == "3,4"
+
+    smaller = search_pubmed("glucagon", max_results=1)
+    assert [r["pmid"] for r in smaller["results"]] == ["2"]
+    assert mock_get.call_count == 4
+
+
+def test_pubmed_cache_expires_and_evicts(tmp_path, monkeypatch):
+    """
+    Tests TTL expiry and least-recently-used eviction.
+    """
+    clock = [1000.0]
+    monkeypatch.setattr("pubmed_cache.time.time", lambda: clock[0])
+    cache = PubMedCache(str(tmp_path / "cache.sqlite"), ttl=60, max_entries=2)
+
+    cache.put_records({"1": {"title": "a"}, "2": {"title": "b"}})
+    clock[0] += 1
+    assert set(cache.get_records(["1"])) == {"1"}  # "2" is now least recently used
+    cache.put_records({"3": {"title": "c"}})
+    assert set(cache.get_records(["1", "2", "3"])) == {"1", "3"}
+    assert cache.stats()["evictions"] == 1
+
+    cache.put_search("query", 5, ["1"])
+    clock[0] += 61
+    assert cache.get_search("query", 5) is None
+    assert cache.get_records(["1", "3"]) == {}
+    cache.close()
+
+
 # --- Tests for analyze_sequence ---
 
 def test_analyze_dna_sequence():
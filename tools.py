@@ -2,8 +2,27 @@
 Biomedical engineering tools for the chatbot.
 These are functional implementations using public APIs and libraries.
 """
+import os
+import threading
+from typing import Dict, List, Optional
+
 import requests
 
+import config
+from drug_properties import (
+    RDKIT_AVAILABLE,  # RDKit is optional; see drug_properties
+    PropertyCache,
+    compute_properties,
+    iter_batch_properties,
+    resolve_properties,
+)
+from http_client import NCBI_HOST, HTTPClient, ncbi_rate_limit
+from medical_imaging import analyze_image
+from pharmacokinetics import simulate_regimen
+from pubmed_cache import PubMedCache
+from pubmed_xml import parse_pubmed_articles
+from sequence_analysis import PackedSequences, analyze_fasta, is_fasta, protein_weights
+
 # Optional dependencies for biomedical tools
 try:
     from Bio.Seq import Seq
@@ -12,64 +31,109 @@ try:
 except ImportError:
     BIOPYTHON_AVAILABLE = False
 
-try:
-    from rdkit import Chem
-    from rdkit.Chem import Descriptors, Lipinski
-    RDKIT_AVAILABLE = True
-except ImportError:
-    RDKIT_AVAILABLE = False
+
+EUTILS_BASE_URL = f"https://{NCBI_HOST}/entrez/eutils/"
+
+# Shared keep-alive session for every outbound tool request.
+http_session = HTTPClient(
+    pool_connections=config.TOOL_HTTP_POOL_CONNECTIONS,
+    pool_maxsize=config.TOOL_HTTP_POOL_MAXSIZE,
+    max_retries=config.TOOL_HTTP_MAX_RETRIES,
+    backoff_factor=config.TOOL_HTTP_BACKOFF_FACTOR,
+    rate_limits={NCBI_HOST: ncbi_rate_limit(config.PUBMED_API_KEY)},
+)
+
+drug_property_cache = PropertyCache(config.DRUG_PROPERTY_CACHE_SIZE)
+
+_pubmed_cache: Optional[PubMedCache] = None
+_pubmed_cache_lock = threading.Lock()
+
+
+def get_pubmed_cache() -> Optional[PubMedCache]:
+    """Shared E-utilities cache, opened on first use (``None`` when disabled)."""
+
+    global _pubmed_cache
+    if _pubmed_cache is None and config.PUBMED_CACHE_PATH:
+        with _pubmed_cache_lock:
+            if _pubmed_cache is None:
+                _pubmed_cache = PubMedCache(
+                    config.PUBMED_CACHE_PATH,
+                    ttl=config.PUBMED_CACHE_TTL,
+                    max_entries=config.PUBMED_CACHE_MAX_ENTRIES,
+                )
+    return _pubmed_cache
+
+
+def eutils_params(**params) -> dict:
+    """E-utilities query parameters plus the caller identification NCBI asks for."""
+
+    if config.PUBMED_API_KEY:
+        params["api_key"] = config.PUBMED_API_KEY
+    if config.PUBMED_EMAIL:
+        params["email"] = config.PUBMED_EMAIL
+        params["tool"] = "biomedchat"
+    return params
+
 
 def search_pubmed(query: str, max_results: int = 3) -> dict:
     """
     Search PubMed for biomedical literature using the NCBI E-utilities API.
+
+    PMID lists and parsed articles are served from the local cache when
+    possible; only uncached articles are fetched.
     """
-    base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
-    search_url = f"{base_url}esearch.fcgi"
-    fetch_url = f"{base_url}efetch.fcgi"
+    search_url = f"{EUTILS_BASE_URL}esearch.fcgi"
+    fetch_url = f"{EUTILS_BASE_URL}efetch.fcgi"
+    cache = get_pubmed_cache()
 
     try:
         # Step 1: Search for PMIDs
-        search_params = {
-            "db": "pubmed",
-            "term": query,
-            "retmax": max_results,
-            "retmode": "json",
-        }
-        search_response = requests.get(search_url, params=search_params, timeout=10)
-        search_response.raise_for_status()
-        search_data = search_response.json()
-        pmids = search_data.get("esearchresult", {}).get("idlist", [])
+        pmids = cache.get_search(query, max_results) if cache is not None else None
+        if pmids is None:
+            search_params = eutils_params(
+                db="pubmed",
+                term=query,
+                retmax=max_results,
+                retmode="json",
+            )
+            search_response = http_session.get(search_url, params=search_params, timeout=10)
+            search_response.raise_for_status()
+            search_data = search_response.json()
+            pmids = search_data.get("esearchresult", {}).get("idlist", [])
+            if cache is not None:
+                cache.put_search(query, max_results, pmids)
 
         if not pmids:
             return {"query": query, "num_results": 0, "results": []}
 
-        # Step 2: Fetch details for the PMIDs
-        fetch_params = {
-            "db": "pubmed",
-            "id": ",".join(pmids),
-            "retmode": "xml",
-        }
-        fetch_response = requests.get(fetch_url, params=fetch_params, timeout=10)
-        fetch_response.raise_for_status()
-        
-        # Using ElementTree to parse the XML response
-        from xml.etree import ElementTree
-        root = ElementTree.fromstring(fetch_response.content)
-        results = []
-        for article in root.findall(".//PubmedArticle"):
-            title_element = article.find(".//ArticleTitle")
-            title = title_element.text if title_element is not None else "No title found"
-            
-            abstract_element = article.find(".//Abstract/AbstractText")
-            abstract = abstract_element.text if abstract_element is not None else "No abstract available."
-
-            pmid_element = article.find(".//PMID")
-            pmid = pmid_element.text if pmid_element is not None else ""
+        # Step 2: Fetch details for the PMIDs that are not cached
+        records = cache.get_records(pmids) if cache is not None else {}
+        missing = [pmid for pmid in pmids if pmid not in records]
+        if missing:
+            fetch_params = eutils_params(
+                db="pubmed",
+                id=",".join(missing),
+                retmode="xml",
+            )
+            fetch_response = http_session.get(fetch_url, params=fetch_params, timeout=10)
+            fetch_response.raise_for_status()
+            fetched = parse_pubmed_articles(fetch_response.content)
+            if cache is not None:
+                cache.put_records({pmid: record for pmid, record in fetched.items() if pmid})
+            records.update(fetched)
 
+        results = []
+        for pmid in pmids:
+            record = records.get(pmid)
+            if record is None:
+                continue
+            abstract = record["abstract"]
             results.append({
-                "title": title,
+                "title": record["title"],
                 "abstract": abstract[:500] + '...' if abstract and len(abstract) > 500 else abstract,
                 "pmid": pmid,
+                "journal": record.get("journal", ""),
+                "year": record.get("year"),
                 "url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else ""
             })
 
@@ -80,10 +144,25 @@ def search_pubmed(query: str, max_results: int = 3) -> dict:
     except Exception as e:
         return {"error": f"An unexpected error occurred: {str(e)}"}
 
-def analyze_sequence(sequence: str, sequence_type: str) -> dict:
+def analyze_sequence(sequence: str, sequence_type: str, include_sequences: bool = False) -> dict:
     """
     Analyze DNA, RNA, or protein sequences using Biopython.
+
+    Multi-record FASTA input is analysed in one vectorised batch and returns
+    columnar per-record results plus a summary; transcriptions and
+    translations are only included when ``include_sequences`` is set.
     """
+    if is_fasta(sequence):
+        try:
+            return analyze_fasta(
+                sequence,
+                sequence_type,
+                include_sequences=include_sequences,
+                max_rows=config.SEQUENCE_BATCH_MAX_ROWS,
+            )
+        except ValueError as e:
+            return {"error": str(e)}
+
     if not BIOPYTHON_AVAILABLE:
         return {
             "error": "Biopython is not installed. Install it with: pip install biopython"
@@ -106,8 +185,10 @@ def analyze_sequence(sequence: str, sequence_type: str) -> dict:
             analysis["back_transcription"] = str(bio_seq.back_transcribe())
             analysis["translation"] = str(bio_seq.translate())
         elif sequence_type == "protein":
-            # Placeholder for protein-specific analysis
-            analysis["molecular_weight"] = "Not yet implemented."
+            weight = protein_weights(PackedSequences([seq_upper.encode("ascii", errors="replace")]))[0]
+            analysis["molecular_weight"] = (
+                f"{weight:.2f} Da" if weight == weight else "Unknown residues present."
+            )
         else:
             return {"error": "Invalid sequence_type. Must be 'DNA', 'RNA', or 'protein'."}
 
@@ -115,35 +196,115 @@ def analyze_sequence(sequence: str, sequence_type: str) -> dict:
     except Exception as e:
         return {"error": f"An error occurred during sequence analysis: {str(e)}"}
 
-def calculate_drug_properties(smiles: str) -> dict:
+def calculate_drug_properties(smiles, properties: Optional[List[str]] = None) -> dict:
     """
     Calculate molecular properties for a drug compound from its SMILES string using RDKit.
+
+    Only the requested ``properties`` are computed (all of them by default).
+    ``smiles`` may also be a list, in which case one result per compound is
+    returned and large lists are spread over worker processes. Results are
+    cached by canonical SMILES.
     """
     if not RDKIT_AVAILABLE:
         return {
             "error": "RDKit is not installed. Install it with: pip install rdkit"
         }
-    
+
     try:
-        mol = Chem.MolFromSmiles(smiles)
-        if mol is None:
-            return {"error": "Invalid SMILES string provided."}
-
-        properties = {
-            "molecular_weight": Descriptors.MolWt(mol),
-            "logp": Descriptors.MolLogP(mol),
-            "hbd": Lipinski.NumHDonors(mol),
-            "hba": Lipinski.NumHAcceptors(mol),
-            "rotatable_bonds": Lipinski.NumRotatableBonds(mol),
-            "tpsa": Descriptors.TPSA(mol),
-        }
-        return properties
+        names = resolve_properties(properties)
+        if not isinstance(smiles, str):
+            results = list(iter_batch_properties(
+                smiles,
+                names,
+                workers=config.DRUG_PROPERTY_WORKERS,
+                chunk_size=config.DRUG_PROPERTY_CHUNK_SIZE,
+                cache=drug_property_cache,
+            ))
+            return {"num_compounds": len(results), "properties": list(names), "results": results}
+
+        result = (
+            drug_property_cache.get(smiles, names)
+            or compute_properties(smiles, names, drug_property_cache)
+        )
+        if "error" in result:
+            return {"error": result["error"]}
+        del result["smiles"]
+        return result
+    except ValueError as e:
+        return {"error": str(e)}
     except Exception as e:
         return {"error": f"An error occurred during property calculation: {str(e)}"}
 
-# Placeholder for other tools from the config, returning a simple message.
-def simulate_pharmacokinetics(**kwargs) -> dict:
-    return {"status": "This tool is not yet implemented."}
+def simulate_pharmacokinetics(
+    dose: float,
+    half_life: float,
+    volume_distribution: float,
+    time_points: int = 24,
+    **options,
+) -> dict:
+    """
+    Simulate plasma concentrations for a one- or two-compartment model.
 
-def analyze_medical_image(**kwargs) -> dict:
-    return {"status": "This tool is not yet implemented."}
+    ``options`` are passed to ``pharmacokinetics.simulate_regimen``: route
+    (IV bolus, infusion, oral), multiple dosing and population simulation
+    over ``n_subjects`` virtual subjects, all evaluated in closed form with
+    NumPy.
+    """
+    try:
+        time_points = int(time_points)
+        if "n_subjects" in options:
+            options["n_subjects"] = int(options["n_subjects"])
+        if time_points > config.PK_MAX_TIME_POINTS:
+            return {"error": f"time_points is limited to {config.PK_MAX_TIME_POINTS}."}
+        if options.get("n_subjects", 1) > config.PK_MAX_SUBJECTS:
+            return {"error": f"n_subjects is limited to {config.PK_MAX_SUBJECTS}."}
+        return simulate_regimen(
+            dose, half_life, volume_distribution, time_points=time_points, **options
+        )
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"An error occurred during pharmacokinetic simulation: {str(e)}"}
+
+def _image_path(path: str) -> str:
+    """Resolve ``path`` inside ``config.MEDICAL_IMAGE_DIR``, refusing anything outside it."""
+    if not config.MEDICAL_IMAGE_DIR:
+        raise ValueError("Image analysis is disabled: MEDICAL_IMAGE_DIR is not configured.")
+    root = os.path.realpath(config.MEDICAL_IMAGE_DIR)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Images must be inside {config.MEDICAL_IMAGE_DIR}.")
+    return resolved
+
+def analyze_medical_image(
+    image_path: str,
+    modality: str,
+    analysis_type: str = "measurement",
+    output_path: Optional[str] = None,
+    **options,
+) -> dict:
+    """
+    Measure, threshold-segment or contrast-enhance a medical image volume.
+
+    Volumes (.npy, .nii, .nii.gz, DICOM file or series directory) are
+    memory-mapped and processed in slabs of slices on worker threads, so
+    memory stays bounded for large scans. ``image_path`` must lie inside
+    ``config.MEDICAL_IMAGE_DIR``. Tool calls cannot write files, so
+    ``output_path`` is refused; call ``medical_imaging.analyze_image``
+    directly to save masks or enhanced volumes.
+    """
+    try:
+        if output_path is not None:
+            raise ValueError("output_path is not supported from tool calls.")
+        return analyze_image(
+            _image_path(image_path),
+            modality,
+            analysis_type,
+            workers=config.MEDICAL_IMAGE_WORKERS,
+            slab_voxels=config.MEDICAL_IMAGE_SLAB_VOXELS,
+            **options,
+        )
+    except (FileNotFoundError, TypeError, ValueError) as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"An error occurred during image analysis: {str(e)}"}